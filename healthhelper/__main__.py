@@ -14,20 +14,96 @@ GitHub profile: https://github.com/Floyd-Droid
 Project GitHub link: https://github.com/Floyd-Droid/HealthHelper
 
 """
+import os
 import sys
+import asyncio
+import argparse
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import Qt
+from healthhelper import interface
+from healthhelper import data
+from healthhelper import archive
+from healthhelper import binlog
+from healthhelper import fsck
+from healthhelper import server
 from healthhelper.interface import LogWin
 
 
-def main():
-    """Launch the application."""
+def parse_args(argv):
+    """Parse the command line arguments. Without a command, the application is launched."""
+    parser = argparse.ArgumentParser(prog='healthhelper', description='Keep track of daily nutrition and track '
+                                                                      'spending on groceries.')
+    subparsers = parser.add_subparsers(dest='command')
+    archive_parser = subparsers.add_parser('archive', help='Pack the log files of a completed year into one file.')
+    archive_parser.add_argument('year', type=int)
+    unarchive_parser = subparsers.add_parser('unarchive', help='Unpack an archived year back into log files.')
+    unarchive_parser.add_argument('year', type=int)
+    binlog_parser = subparsers.add_parser('export-binary', help='Export the logs into a binary log store, or bring '
+                                                               'an existing one up to date.')
+    binlog_parser.add_argument('path')
+    serve_parser = subparsers.add_parser('serve', help='Serve the Food Dictionary and logs as a JSON API over HTTP.')
+    serve_parser.add_argument('--host', default=server.DEFAULT_HOST,
+                              help=f'Host to listen on. Default is {server.DEFAULT_HOST}.')
+    serve_parser.add_argument('--port', type=int, default=server.DEFAULT_PORT,
+                              help=f'Port to listen on. Default is {server.DEFAULT_PORT}.')
+    fsck_parser = subparsers.add_parser('fsck', help='Check the Food Dictionary and logs for rows that can\'t be '
+                                                     'used, and optionally repair or quarantine them.')
+    fsck_parser.add_argument('--repair', action='store_true',
+                             help='Fix the problems that can be fixed without guessing, such as short rows.')
+    fsck_parser.add_argument('--quarantine', action='store_true',
+                             help='Move rows that still have a problem into the quarantine directory.')
+    fsck_parser.add_argument('--workers', type=int, default=None,
+                             help='Number of worker processes. Default is the number of CPUs.')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Launch the application, or run the command given on the command line."""
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    try:
+        if args.command == 'archive':
+            num_days = archive.pack_year(interface.LOG_FILES_DIR, args.year)
+            print(f'Archived {num_days} log file(s) for {args.year}.')
+            return
+        if args.command == 'unarchive':
+            num_days = archive.unpack_year(interface.LOG_FILES_DIR, args.year)
+            print(f'Unpacked {num_days} log file(s) for {args.year}.')
+            return
+        if args.command == 'export-binary':
+            num_parsed, num_copied = binlog.sync_log_store(interface.LOG_FILES_DIR, args.path)
+            print(f'Exported {num_parsed} changed log file(s) and kept {num_copied} unchanged log file(s).')
+            return
+        if args.command == 'fsck':
+            quarantine_dir = os.path.join(os.path.dirname(interface.FD_PATH), 'quarantine') if args.quarantine else None
+            num_logs, problems = fsck.check_data(interface.FD_PATH, interface.LOG_FILES_DIR, interface.RECIPES_PATH,
+                                                 args.repair, quarantine_dir, args.workers)
+            for problem in problems:
+                print(fsck.format_problem(problem))
+            num_remaining = sum(problem[4] not in ['repaired', 'quarantined'] for problem in problems)
+            print(f'Checked the Food Dictionary and {num_logs} log file(s): {len(problems)} problem(s) found, '
+                  f'{len(problems) - num_remaining} resolved.')
+            if num_remaining:
+                sys.exit(1)
+            return
+        if args.command == 'serve':
+            try:
+                asyncio.run(server.serve(interface.FD_PATH, interface.LOG_FILES_DIR, interface.RECIPES_PATH,
+                                         args.host, args.port))
+            except KeyboardInterrupt:
+                pass
+            return
+    except ValueError as e:
+        sys.exit(f'healthhelper: {e}')
+
     app = QApplication([])
     app.setStyle('Fusion')
 
     # Remove the 'help' button from all windows.
     app.setAttribute(Qt.AA_DisableWindowContextHelpButton)
 
+    # Changes made in the app are written in the background, and any left by a crash are written now.
+    data.write_buffer.start(interface.PENDING_WRITES_PATH)
+
     main_win = LogWin()
     main_win.show()
 
@@ -0,0 +1,656 @@
+"""Analytics over the Food Dictionary and the logs for the Health Helper application.
+
+The calculations operate on whole columns of the FoodDictStore, one array per value, rather than on rows of strings.
+Food suggestions score every entry against the remaining amounts of a day's goals from the same columns.
+Analytics over the logs operate on a daily series: one array per value holding the totals of each calendar day in a
+range of dates, built from a summary of each day that is cached until its log changes. Window statistics over a
+daily series are answered from prefix sums built once per series, so a rolling mean costs O(1) per day.
+"""
+# Standard library imports
+import math
+import heapq
+import bisect
+import operator
+import datetime
+import itertools
+import collections
+from array import array
+
+# Local imports
+from healthhelper import data
+from healthhelper import store
+from healthhelper import archive
+
+# Day summaries calculated by get_day_totals(), keyed by log file path. Each value is [version, totals].
+_day_totals = {}
+
+# Cost-efficiency metrics, each mapped to the per-serving value that is divided by the cost per serving.
+COST_EFFICIENCY_METRICS = {
+    'Protein per dollar': 'protein',
+    'Calories per dollar': 'calories',
+    'Fiber per dollar': 'dietary fiber',
+    'Carbs per dollar': 'total carbohydrate',
+    'Fat per dollar': 'total fat',
+}
+
+# Values that food suggestions can be fitted to.
+SUGGESTION_VALUES = ['calories', 'protein', 'total carbohydrate', 'total fat', 'dietary fiber']
+
+# Food suggestions are given in multiples of this many servings.
+SUGGESTION_STEP = 0.25
+
+
+def divide_columns(numerators, denominators):
+    """Divide two arrays element by element. Where either value is blank (NaN) or the denominator is not positive,
+    the result is NaN.
+
+    :param numerators: An array of floats.
+    :param denominators: An array of floats with the same length as numerators.
+
+    :returns: An array of floats.
+    """
+    nan = math.nan
+    return array('d', [num / den if den > 0 else nan for num, den in zip(numerators, denominators)])
+
+
+def get_value_per_dollar(fd_store, value_name):
+    """Get the amount of a value per dollar for every entry of the Food Dictionary. The result is cached on the store
+    until the Food Dictionary changes.
+
+    :param fd_store: A store.FoodDictStore object.
+    :param value_name: A key of store.VALUE_INDEX, such as 'protein'.
+
+    :returns: An array of floats in store order. Entries without the value or without cost info are NaN.
+    """
+    key = ('per dollar', value_name)
+    if key not in fd_store.derived:
+        fd_store.derived[key] = divide_columns(fd_store.get_column(value_name), fd_store.get_column('cost'))
+    return fd_store.derived[key]
+
+
+def get_filter_mask(fd_store, filters):
+    """Get the positions of the entries whose per-serving values are within the given limits.
+
+    :param fd_store: A store.FoodDictStore object.
+    :param filters: A dictionary that maps keys of store.VALUE_INDEX to [minimum, maximum] lists of per-serving
+        limits. Either limit may be None. Entries with a blank value for a filtered value are excluded.
+
+    :returns: A list of booleans in store order.
+    """
+    mask = [True] * len(fd_store)
+    for value_name, (minimum, maximum) in filters.items():
+        column = fd_store.get_column(value_name)
+        low = -math.inf if minimum is None else minimum
+        high = math.inf if maximum is None else maximum
+        # NaN fails both comparisons, so blank values are excluded.
+        mask = [keep and low <= val <= high for keep, val in zip(mask, column)]
+    return mask
+
+
+def rank_cost_efficiency(fd_store, value_name, top_k=None, filters=None):
+    """Rank the Food Dictionary entries by the amount of a value they provide per dollar.
+
+    :param fd_store: A store.FoodDictStore object.
+    :param value_name: A key of store.VALUE_INDEX, such as 'protein'.
+    :param top_k: The number of entries to return. Default is None, which returns every ranked entry.
+    :param filters: A dictionary of per-serving limits, as described in get_filter_mask(). Default is None.
+
+    :returns: A list of [entry_name, value_per_dollar] lists, from the highest value per dollar to the lowest.
+        Entries without the value or without cost info are left out.
+    """
+    ratios = get_value_per_dollar(fd_store, value_name)
+    if filters:
+        mask = get_filter_mask(fd_store, filters)
+        positions = [pos for pos in range(len(ratios)) if mask[pos] and ratios[pos] == ratios[pos]]
+    else:
+        # NaN is the only value that isn't equal to itself.
+        positions = [pos for pos in range(len(ratios)) if ratios[pos] == ratios[pos]]
+
+    if top_k is None:
+        positions.sort(key=ratios.__getitem__, reverse=True)
+    else:
+        positions = heapq.nlargest(top_k, positions, key=ratios.__getitem__)
+    return [[fd_store.names[pos], ratios[pos]] for pos in positions]
+
+
+def get_cost_efficiency_table(fd_store, metric, top_k=None, filters=None):
+    """Get the rows of a cost-efficiency ranking for display.
+
+    :param fd_store: A store.FoodDictStore object.
+    :param metric: A key of COST_EFFICIENCY_METRICS.
+    :param top_k: The number of rows to return. Default is None, which returns all rows.
+    :param filters: A dictionary of per-serving limits, as described in get_filter_mask(). Default is None.
+
+    :returns: A list of [entry_name, value_per_dollar, value_per_serving, cost_per_serving] lists.
+    """
+    value_name = COST_EFFICIENCY_METRICS[metric]
+    value_index = store.VALUE_INDEX[value_name]
+    cost_index = store.VALUE_INDEX['cost']
+    table = []
+    for name, ratio in rank_cost_efficiency(fd_store, value_name, top_k, filters):
+        vector = fd_store.vectors[fd_store.index[name]]
+        table.append([name, ratio, vector[value_index], vector[cost_index]])
+    return table
+
+
+class TargetMatrix:
+    """The values that suggest_foods() fits to a set of targets, for the Food Dictionary entries that can provide
+    them: those with every one of the values, at least one of them not 0. An entry with a blank target value can't be
+    fitted to the targets, so it is left out. The values are kept by column, with their squares, and the entries are
+    in order of cost per serving, with the entries without cost info last, so the entries whose smallest amount fits
+    a cost limit are a range of positions.
+    """
+
+    def __init__(self, fd_store, value_names):
+        """Constructor.
+
+        :param fd_store: A store.FoodDictStore object.
+        :param value_names: A tuple of keys of store.VALUE_INDEX.
+        """
+        columns = [fd_store.get_column(value_name) for value_name in value_names]
+        costs = fd_store.get_column('cost')
+        self.positions = [pos for pos, values in enumerate(zip(*columns))
+                          if not any(map(math.isnan, values)) and any(values)]
+        self.positions.sort(key=lambda pos: [math.isnan(costs[pos]), 0 if math.isnan(costs[pos]) else costs[pos]])
+        # Lists rather than arrays, so the values aren't boxed again on every call.
+        self.columns = [[column[pos] for pos in self.positions] for column in columns]
+        self.squared_columns = [list(map(operator.mul, column, column)) for column in self.columns]
+        self.costs = [costs[pos] for pos in self.positions]
+        self.num_costed = len(self.costs) - sum(map(math.isnan, self.costs))
+        # Without negative values, every entry provides some of any targets.
+        self.has_negative = any(val < 0 for column in self.columns for val in column)
+
+    def get_affordable_range(self, max_cost):
+        """Return the [start, end] range of the positions of the entries whose smallest amount, one step, fits a cost
+        limit, or of every entry if max_cost is None.
+        """
+        if max_cost is None:
+            return [0, len(self.positions)]
+        start = bisect.bisect_left(self.costs, 0, 0, self.num_costed)
+        return [start, bisect.bisect_right(self.costs, max_cost / SUGGESTION_STEP, start, self.num_costed)]
+
+
+def get_target_matrix(fd_store, value_names):
+    """Get the TargetMatrix of a set of target values. It is cached on the store until the Food Dictionary changes,
+    so suggesting foods again only scales it by the targets.
+
+    :param fd_store: A store.FoodDictStore object.
+    :param value_names: A tuple of keys of store.VALUE_INDEX.
+    """
+    key = ('target matrix', value_names)
+    if key not in fd_store.derived:
+        fd_store.derived[key] = TargetMatrix(fd_store, value_names)
+    return fd_store.derived[key]
+
+
+def get_weighted_sums(columns, weights):
+    """Return the list of the sums of each row of a list of columns, each column multiplied by its weight. Whole
+    columns are combined at a time, so the arithmetic runs in map() rather than a Python loop.
+    """
+    sums = map(weights[0].__mul__, columns[0])
+    for column, weight in zip(columns[1:], weights[1:]):
+        sums = map(operator.add, sums, map(weight.__mul__, column))
+    return list(sums)
+
+
+def get_extreme_indexes(values, count, smallest=False):
+    """Return the indexes of the count largest of a list of values, or the smallest, from the most extreme on, with
+    ties in index order. The values alone are ranked first, to find the last value kept, which is much faster than
+    ranking [value, index] pairs.
+    """
+    select, keep = (heapq.nsmallest, operator.le) if smallest else (heapq.nlargest, operator.ge)
+    chosen = select(count, values)
+    if not chosen:
+        return []
+    indexes = itertools.compress(itertools.count(), map(keep, values, itertools.repeat(chosen[-1])))
+    return select(count, indexes, key=values.__getitem__)
+
+
+def round_servings(servings, max_servings):
+    """Round a number of servings to the nearest multiple of SUGGESTION_STEP from one step to max_servings. If
+    max_servings isn't a multiple of the step, a number above the last multiple is rounded down to it.
+    """
+    servings = min(max(round(servings / SUGGESTION_STEP), 1), math.floor(max_servings / SUGGESTION_STEP))
+    return servings * SUGGESTION_STEP
+
+
+def get_rounding_options(servings, max_servings):
+    """Return the numbers of servings that a number of servings may be rounded to: the multiples of SUGGESTION_STEP
+    just below and just above it, from one step to max_servings.
+    """
+    low = min(max(math.floor(servings / SUGGESTION_STEP), 1), math.floor(max_servings / SUGGESTION_STEP))
+    high = min(low + 1, math.floor(max_servings / SUGGESTION_STEP))
+    return {low * SUGGESTION_STEP, high * SUGGESTION_STEP}
+
+
+def get_fit_distance(servings, sums, squares, cross, num_targets):
+    """Get the squared distance of an amount of one entry, or of a pair of entries, from the targets.
+
+    :param servings: A list of the number of servings of each entry.
+    :param sums: A list of the sum of each entry's fractions of the targets.
+    :param squares: A list of the sum of the squares of each entry's fractions.
+    :param cross: The sum of the products of the fractions of a pair of entries. Ignored for one entry.
+    :param num_targets: The number of targets.
+
+    :returns: The mean of the squared misses of the targets, each as a fraction of its target.
+    """
+    distance = num_targets
+    for count, total, square in zip(servings, sums, squares):
+        distance += count * (count * square - 2 * total)
+    if len(servings) == 2:
+        distance += 2 * servings[0] * servings[1] * cross
+    return distance / num_targets
+
+
+def suggest_foods(fd_store, targets, max_cost=None, top_k=10, max_servings=4, pool_size=15):
+    """Suggest Food Dictionary entries, and pairs of entries, with amounts that come closest to the remaining amounts
+    of a day's goals, such as the protein and calories left, at no more than a cost.
+
+    The distance of a suggestion from the targets is the root mean square of its miss of each target, as a fraction
+    of the target, so every target counts the same however large it is. For one entry, the number of servings that
+    minimizes the distance has a closed form in the sum of the entry's fractions of the targets and the sum of their
+    squares, so every entry is scored at that number, rounded to servings that can be logged, from a few lists built a
+    column at a time. The columns come from the store's TargetMatrix for the target values, which is built once per
+    version of the Food Dictionary and sorted by cost, so a cost limit only takes a slice of it. A pair is solved the
+    same way, by least squares over two servings counts. Pairs are only tried among the closest single entries and
+    the entries richest in each target compared to the others, which are the entries that make up for each other's
+    gaps, and a pair is only rounded if its least squares fit can beat the closest suggestions found so far.
+
+    :param fd_store: A store.FoodDictStore object.
+    :param targets: A dictionary mapping keys of store.VALUE_INDEX to target amounts, in the units of the
+        per-serving values, such as {'protein': 40, 'calories': 600}. Targets that aren't positive are ignored.
+    :param max_cost: The most a suggestion may cost, in dollars. Entries without cost info are left out if it is
+        given. Default is None, for no limit.
+    :param top_k: The number of suggestions to return. Default is 10.
+    :param max_servings: The most servings of an entry that are suggested. Default is 4.
+    :param pool_size: The number of entries from which pairs are made for each way of choosing them. Default is 15.
+
+    :returns: A list of [entries, amounts, cost, distance] lists, from the closest suggestion to the farthest.
+        Entries is a list of [entry_name, servings] lists, and amounts a dictionary mapping each target's value name
+        to the amount the suggestion provides. The cost is NaN if an entry has no cost info.
+    """
+    targets = {value_name: amount for value_name, amount in targets.items() if amount > 0}
+    if not targets:
+        return []
+    num_targets = len(targets)
+    matrix = get_target_matrix(fd_store, tuple(targets))
+    weights = [1 / amount for amount in targets.values()]
+
+    # Keep the entries whose smallest amount, one step, fits the cost limit. The matrix only has entries with every
+    # target value, and the entries without cost info sort last, so no value of the kept entries is NaN. The rest of
+    # the search works on the kept entries only, and every step over all of them runs in map() rather than a Python
+    # loop. Each entry's fraction of a target is its value times the target's weight.
+    start, end = matrix.get_affordable_range(max_cost)
+    positions = matrix.positions[start:end]
+    columns = [column[start:end] for column in matrix.columns]
+    costs = matrix.costs[start:end]
+    sums = get_weighted_sums(columns, weights)
+    squares = get_weighted_sums([column[start:end] for column in matrix.squared_columns],
+                                [weight * weight for weight in weights])
+    if matrix.has_negative:
+        # Keep the entries that provide some of the targets.
+        kept = list(itertools.compress(itertools.count(), map(operator.gt, sums, itertools.repeat(0))))
+        positions, costs, sums, squares = [list(map(values.__getitem__, kept))
+                                           for values in [positions, costs, sums, squares]]
+        columns = [list(map(column.__getitem__, kept)) for column in columns]
+    if not positions:
+        return []
+    # The most steps of each entry that are suggested, within the cost limit. The entries cost in increasing order,
+    # so those that can have max_servings, free entries among them, come first.
+    max_steps = math.floor(max_servings / SUGGESTION_STEP)
+    if max_cost is None:
+        step_limits = itertools.repeat(max_steps)
+    else:
+        num_full = bisect.bisect_right(costs, max_cost / max_servings)
+        other_costs = itertools.islice(costs, num_full, None)
+        step_limits = itertools.chain(itertools.repeat(max_steps, num_full),
+                                      map(math.floor, map((max_cost / SUGGESTION_STEP).__truediv__, other_costs)))
+
+    # Score every entry at the number of servings it would be suggested at: the number that minimizes its distance,
+    # sums / squares, rounded to a whole number of steps within the limits. The score is the squared distance in
+    # units of the step squared, less the constant num_targets and before dividing by it, which doesn't change the
+    # order of the entries.
+    fits = map(operator.truediv, map((1 / SUGGESTION_STEP).__mul__, sums), squares)
+    steps = list(map(min, map(max, map(round, fits), itertools.repeat(1)), step_limits))
+    scores = list(map(operator.mul, steps, map(operator.sub, map(operator.mul, steps, squares),
+                                               map((2 / SUGGESTION_STEP).__mul__, sums))))
+
+    # Each suggestion is [squared distance, store positions of the entries, servings], so suggestions as close as
+    # each other are in store order.
+    closest = get_extreme_indexes(scores, max(top_k, pool_size), smallest=True)
+    suggestions = []
+    for i in closest:
+        count = steps[i] * SUGGESTION_STEP
+        suggestions.append([get_fit_distance([count], [sums[i]], [squares[i]], 0, num_targets), [positions[i]],
+                            [count]])
+
+    # Make pairs from the closest single entries and the entries with the largest share of each target. The order of
+    # the shares of a target is the order of its values divided by the sums, whatever the target's weight.
+    pool = set(closest[:pool_size])
+    for column in columns:
+        pool.update(get_extreme_indexes(list(map(operator.truediv, column, sums)), pool_size))
+    vectors = {i: [weight * column[i] for column, weight in zip(columns, weights)] for i in pool}
+    # The negated distances of the closest top_k suggestions so far, as a heap whose first item is the farthest.
+    farthest = [-suggestion[0] for suggestion in heapq.nsmallest(top_k, suggestions)]
+    heapq.heapify(farthest)
+    for i, j in itertools.combinations(sorted(pool, key=positions.__getitem__), 2):
+        pair_sums = [sums[i], sums[j]]
+        pair_squares = [squares[i], squares[j]]
+        cross = sum(map(operator.mul, vectors[i], vectors[j]))
+        # Solve the normal equations of the least squares fit of the two servings counts.
+        determinant = pair_squares[0] * pair_squares[1] - cross * cross
+        if determinant <= 1e-9 * pair_squares[0] * pair_squares[1]:
+            # The entries provide the targets in the same proportions, so one of them alone does as well.
+            continue
+        counts = [(pair_sums[0] * pair_squares[1] - pair_sums[1] * cross) / determinant,
+                  (pair_sums[1] * pair_squares[0] - pair_sums[0] * cross) / determinant]
+        if counts[0] <= 0 or counts[1] <= 0:
+            continue
+        # No amounts of the pair come closer than its least squares fit, whose distance is
+        # (num_targets - counts . sums) / num_targets, so a pair whose fit is farther than each of the closest
+        # suggestions isn't rounded.
+        fit_distance = (num_targets - counts[0] * pair_sums[0] - counts[1] * pair_sums[1]) / num_targets
+        if len(farthest) == top_k and fit_distance > -farthest[0] + 1e-12:
+            continue
+        if max_cost is not None:
+            cost = counts[0] * costs[i] + counts[1] * costs[j]
+            if cost > max_cost:
+                # Scale both entries down to fit the cost limit.
+                counts = [count * max_cost / cost for count in counts]
+        # Try each way of rounding the two counts down or up, and keep the closest that fits the cost limit.
+        best = None
+        for rounded in itertools.product(*[get_rounding_options(count, max_servings) for count in counts]):
+            if max_cost is not None and rounded[0] * costs[i] + rounded[1] * costs[j] > max_cost:
+                continue
+            distance = get_fit_distance(rounded, pair_sums, pair_squares, cross, num_targets)
+            if best is None or distance < best[0]:
+                best = [distance, [positions[i], positions[j]], list(rounded)]
+        if best is not None:
+            suggestions.append(best)
+            if len(farthest) < top_k:
+                heapq.heappush(farthest, -best[0])
+            elif best[0] < -farthest[0]:
+                heapq.heapreplace(farthest, -best[0])
+
+    results = []
+    for distance, entry_positions, counts in heapq.nsmallest(top_k, suggestions):
+        amounts = {value_name: sum(count * fd_store.get_column(value_name)[pos]
+                                   for pos, count in zip(entry_positions, counts)) for value_name in targets}
+        cost = sum(count * fd_store.get_column('cost')[pos] for pos, count in zip(entry_positions, counts))
+        entries = [[fd_store.names[pos], count] for pos, count in zip(entry_positions, counts)]
+        # The distance is measured again from the amounts, which is exact where the sums it was found by cancel out.
+        distance = math.sqrt(sum(((amounts[value_name] - amount) / amount) ** 2
+                                 for value_name, amount in targets.items()) / num_targets)
+        results.append([entries, amounts, cost, distance])
+    results.sort(key=operator.itemgetter(3))
+    return results
+
+
+def get_day_totals(path, version=None):
+    """Get the totals of a log, including an archived log. The totals are cached until the log changes.
+
+    :param path: A string of the log file pathname.
+    :param version: The version of the log from data.get_log_versions(), if the caller has it. Default is None, to
+        check the log file.
+
+    :returns: A list of 16 integer totals in hundredths, calories through cost.
+    """
+    if version is None:
+        version = data.get_file_version(path)
+    if version is None:
+        # Archived logs change with their archive.
+        log_dir, date = archive.split_log_path(path)
+        version = ('archive', data.get_file_version(archive.get_archive_path(log_dir, date.year)))
+    cached = _day_totals.get(path)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    entries = data.get_entries(path, return_all=True)
+    totals = data.sum_columns(data.parse_log_entries(entries)[3]) if entries != 'file not found' else [0] * 16
+    _day_totals[path] = [version, totals]
+    return totals
+
+
+class DailySeries:
+    """The totals of every calendar day in a range of dates, one array per value. Day i of the series is
+    start_date + i days. Days without a log have totals of 0 and are marked as not logged.
+    """
+
+    def __init__(self, start_date, logged, columns):
+        """Constructor.
+
+        :param start_date: A datetime.date object of the first day, or None if the series is empty.
+        :param logged: An array('b') with 1 for each day that has a log, and 0 otherwise.
+        :param columns: A list of 16 array('d') columns of daily totals, calories through cost.
+        """
+        self.start_date = start_date
+        self.logged = logged
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.logged)
+
+    def get_column(self, value_name):
+        """Return the array of daily totals of one value.
+
+        :param value_name: A key of store.VALUE_INDEX, such as 'protein' or 'cost'.
+        """
+        return self.columns[store.VALUE_INDEX[value_name]]
+
+    def get_date(self, day):
+        """Return the datetime.date object of a day of the series."""
+        return self.start_date + datetime.timedelta(days=day)
+
+    def get_day(self, date):
+        """Return the position of a date in the series. It may be outside of the series."""
+        return (date - self.start_date).days
+
+
+def get_daily_series(log_dir, start_date=None, end_date=None):
+    """Build the daily series of the logs in a range of dates, including archived logs.
+
+    :param log_dir: A string of the log files directory pathname.
+    :param start_date: A datetime.date object of the first day. Default is the date of the first log.
+    :param end_date: A datetime.date object of the last day. Default is the date of the last log.
+
+    :returns: A DailySeries object. It is empty if there are no logs and no dates were given.
+    """
+    # The logs are found in the date index of the years of the series, rather than by walking the log files directory.
+    if start_date is None or end_date is None:
+        years = data.get_log_years(log_dir)
+    else:
+        years = range(start_date.year, end_date.year + 1)
+    dated_paths = [[data.get_log_date(path), path, version]
+                   for year in years for path, version in data.get_log_versions(log_dir, year)]
+    if dated_paths:
+        start_date = start_date or dated_paths[0][0]
+        end_date = end_date or dated_paths[-1][0]
+    if start_date is None or end_date is None or end_date < start_date:
+        return DailySeries(start_date, array('b'), [array('d') for _ in range(store.NUM_VALUES)])
+
+    num_days = (end_date - start_date).days + 1
+    logged = array('b', bytes(num_days))
+    columns = [array('d', [0.0]) * num_days for _ in range(store.NUM_VALUES)]
+    for date, path, version in dated_paths:
+        if not start_date <= date <= end_date:
+            continue
+        day = (date - start_date).days
+        logged[day] = 1
+        for column, total in zip(columns, get_day_totals(path, version)):
+            column[day] = total / data.FIXED_SCALE
+    return DailySeries(start_date, logged, columns)
+
+
+def downsample_min_max(values, logged, start, end, num_buckets):
+    """Reduce the logged days of a range of a daily series to at most two points per bucket: the lowest and highest
+    values of the bucket, in day order. Spikes are kept, so a chart of the points looks the same as a chart of every
+    day at a width of num_buckets pixels.
+
+    :param values: An array of daily values.
+    :param logged: An array with a true value for each day that has a log.
+    :param start: The position of the first day in the range.
+    :param end: The position after the last day in the range.
+    :param num_buckets: The number of buckets, such as the width of a chart in pixels.
+
+    :returns: A list of [day, value] lists in day order.
+    """
+    start = max(start, 0)
+    end = min(end, len(values))
+    num_buckets = max(num_buckets, 1)
+    if end - start <= 2 * num_buckets:
+        return [[day, values[day]] for day in range(start, end) if logged[day]]
+
+    points = []
+    bucket_size = (end - start) / num_buckets
+    for bucket in range(num_buckets):
+        bucket_start = start + int(bucket * bucket_size)
+        bucket_end = start + int((bucket + 1) * bucket_size)
+        low_day = high_day = None
+        for day in range(bucket_start, bucket_end):
+            if not logged[day]:
+                continue
+            if low_day is None or values[day] < values[low_day]:
+                low_day = day
+            if high_day is None or values[day] > values[high_day]:
+                high_day = day
+        if low_day is None:
+            continue
+        for day in sorted({low_day, high_day}):
+            points.append([day, values[day]])
+    return points
+
+
+class SeriesStats:
+    """Sums, means, and extremes over windows of a daily series.
+
+    Prefix sums of each value and of the number of logged days are built once, so the sum or mean of any range of days
+    takes O(1) time. Means are per logged day: days without a log are left out rather than counted as 0.
+    """
+
+    def __init__(self, series):
+        """Constructor.
+
+        :param series: A DailySeries object.
+        """
+        self.series = series
+        # Element i of each prefix array is the total of the first i days.
+        self.value_prefixes = [array('d', itertools.accumulate(itertools.chain([0.0], column)))
+                               for column in series.columns]
+        self.logged_prefix = array('l', itertools.accumulate(itertools.chain([0], series.logged)))
+
+    def get_prefix(self, value_name):
+        """Return the prefix sums of one value."""
+        return self.value_prefixes[store.VALUE_INDEX[value_name]]
+
+    def get_num_logged(self, start, end):
+        """Return the number of logged days from day start up to, but not including, day end."""
+        start, end = self.clip(start, end)
+        return self.logged_prefix[end] - self.logged_prefix[start]
+
+    def get_sum(self, value_name, start, end):
+        """Return the total of a value from day start up to, but not including, day end."""
+        start, end = self.clip(start, end)
+        prefix = self.get_prefix(value_name)
+        return prefix[end] - prefix[start]
+
+    def get_mean(self, value_name, start, end):
+        """Return the mean of a value per logged day from day start up to, but not including, day end, or None if
+        none of the days were logged.
+        """
+        num_logged = self.get_num_logged(start, end)
+        return self.get_sum(value_name, start, end) / num_logged if num_logged else None
+
+    def clip(self, start, end):
+        """Clip a range of days to the series."""
+        start = min(max(start, 0), len(self.series))
+        return start, min(max(end, start), len(self.series))
+
+    def get_rolling_sums(self, value_name, window, start=0, end=None):
+        """Get the total of a value over the window of days ending on each day of a range.
+
+        :param value_name: A key of store.VALUE_INDEX, such as 'protein' or 'cost'.
+        :param window: The number of days in each window, such as 7 for a weekly total.
+        :param start: The position of the first day in the range. Default is the first day of the series.
+        :param end: The position after the last day in the range. Default is the end of the series.
+
+        :returns: An array('d') of totals, one for each day of the range. Windows that start before the series are
+            cut short.
+        """
+        start, end = self.clip(start, len(self.series) if end is None else end)
+        prefix = self.get_prefix(value_name)
+        return array('d', (prefix[day + 1] - prefix[max(day + 1 - window, 0)] for day in range(start, end)))
+
+    def get_rolling_means(self, value_name, window, start=0, end=None):
+        """Get the mean of a value per logged day over the window of days ending on each day of a range.
+
+        :param value_name: A key of store.VALUE_INDEX, such as 'protein' or 'cost'.
+        :param window: The number of days in each window, such as 7 for a weekly average.
+        :param start: The position of the first day in the range. Default is the first day of the series.
+        :param end: The position after the last day in the range. Default is the end of the series.
+
+        :returns: A list of means, one for each day of the range. The mean is None where no day of the window was
+            logged.
+        """
+        start, end = self.clip(start, len(self.series) if end is None else end)
+        prefix = self.get_prefix(value_name)
+        logged_prefix = self.logged_prefix
+        means = []
+        for day in range(start, end):
+            window_start = max(day + 1 - window, 0)
+            num_logged = logged_prefix[day + 1] - logged_prefix[window_start]
+            means.append((prefix[day + 1] - prefix[window_start]) / num_logged if num_logged else None)
+        return means
+
+    def get_rolling_extremes(self, value_name, window, start=0, end=None, maximum=True):
+        """Get the highest or lowest value of the logged days in the window of days ending on each day of a range.
+
+        A deque holds the days of the window whose values could still be an extreme of a later window, in day order
+        with their values decreasing (or increasing for minimums), so each day is added and removed at most once.
+
+        :param value_name: A key of store.VALUE_INDEX, such as 'protein' or 'cost'.
+        :param window: The number of days in each window.
+        :param start: The position of the first day in the range. Default is the first day of the series.
+        :param end: The position after the last day in the range. Default is the end of the series.
+        :param maximum: True to get the highest values, or False to get the lowest. Default is True.
+
+        :returns: A list of extremes, one for each day of the range. The extreme is None where no day of the window was
+            logged.
+        """
+        start, end = self.clip(start, len(self.series) if end is None else end)
+        values = self.series.get_column(value_name)
+        logged = self.series.logged
+        sign = 1 if maximum else -1
+        candidates = collections.deque()
+        extremes = []
+        for day in range(max(start + 1 - window, 0), end):
+            if logged[day]:
+                while candidates and sign * values[candidates[-1]] <= sign * values[day]:
+                    candidates.pop()
+                candidates.append(day)
+            if candidates and candidates[0] <= day - window:
+                candidates.popleft()
+            if day >= start:
+                extremes.append(values[candidates[0]] if candidates else None)
+        return extremes
+
+
+def get_monthly_sums(stats, value_name):
+    """Group the days of a daily series by calendar month, and total a value over each month. Each month's total is
+    taken from the prefix sums of the series, so the grouping costs O(1) per month.
+
+    :param stats: A SeriesStats object of the daily series.
+    :param value_name: A key of store.VALUE_INDEX, such as 'protein' or 'cost'.
+
+    :returns: A list of [year, month, total, number of logged days] lists, one for each month of the series in
+        order. The first and last months may be partial.
+    """
+    series = stats.series
+    months = []
+    day = 0
+    while day < len(series):
+        date = series.get_date(day)
+        next_month = (date.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+        end = min(series.get_day(next_month), len(series))
+        months.append([date.year, date.month, stats.get_sum(value_name, day, end), stats.get_num_logged(day, end)])
+        day = end
+    return months
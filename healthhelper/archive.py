@@ -0,0 +1,238 @@
+"""Packed yearly archives of log files for the Health Helper application.
+
+A completed year of log files can be packed into a single archive file in the log files directory, such as
+'log files/2020.hhlog', replacing the year's directory of daily csv files. The archive holds the contents of each
+daily log file, one after another, followed by an index of the position of each day in the file:
+
+HHARCHIVE 1
+<contents of 2020/06 - June/12.csv><contents of 2020/06 - June/13.csv>...
+{"2020-06-12": [12, 310, "06 - June/12.csv"], "2020-06-13": [322, 128, "06 - June/13.csv"], ...}
+00000000000000000450
+
+The last line is the position of the index. An archived day is read by looking up its position in the index and
+reading only that part of the file, so archived days can be read through their usual log file pathname.
+"""
+# Standard library imports
+import os
+import json
+import shutil
+import datetime
+
+# Local imports
+from healthhelper import data
+
+# File name suffix of an archive.
+ARCHIVE_SUFFIX = '.hhlog'
+
+# First line of every archive.
+MAGIC = b'HHARCHIVE 1\n'
+
+# Width of the last line of an archive, which holds the position of the index.
+FOOTER_WIDTH = 21
+
+# Indexes read by get_index(), keyed by archive path. Each value is [version, index].
+_indexes = {}
+
+
+def get_archive_path(log_dir, year):
+    """Get the pathname of the archive of one year of log files.
+
+    :param log_dir: A string of the log files directory pathname.
+    :param year: An integer or string of the year.
+
+    :returns: A string of the archive pathname.
+    """
+    return os.path.join(log_dir, f'{year}{ARCHIVE_SUFFIX}')
+
+
+def get_archived_years(log_dir):
+    """Get the years that have been archived in the log files directory.
+
+    :param log_dir: A string of the log files directory pathname.
+
+    :returns: A sorted list of integer years.
+    """
+    if not os.path.isdir(log_dir):
+        return []
+    years = []
+    for filename in os.listdir(log_dir):
+        year = filename[:-len(ARCHIVE_SUFFIX)]
+        if filename.endswith(ARCHIVE_SUFFIX) and year.isdigit():
+            years.append(int(year))
+    return sorted(years)
+
+
+def get_index(archive_path):
+    """Get the index of an archive. The index is cached until the archive changes.
+
+    :param archive_path: A string of the archive pathname.
+
+    :returns: A dictionary mapping ISO dates to [position, length, path_in_year_directory] lists, or None if the
+        archive doesn't exist.
+    """
+    try:
+        stat = os.stat(archive_path)
+    except OSError:
+        return None
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _indexes.get(archive_path)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    with open(archive_path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{archive_path} is not a log archive')
+        f.seek(-FOOTER_WIDTH, os.SEEK_END)
+        index_pos = int(f.read(FOOTER_WIDTH))
+        f.seek(index_pos)
+        index = json.loads(f.read(stat.st_size - FOOTER_WIDTH - index_pos))
+    _indexes[archive_path] = [version, index]
+    return index
+
+
+def split_log_path(path):
+    """Split a log file pathname, such as 'log files/2020/06 - June/12.csv', into the log files directory and date.
+
+    :param path: A string of the log file pathname.
+
+    :returns: A list of the log files directory pathname and a datetime.date object, or None if the pathname doesn't
+        name a log file.
+    """
+    month_dir, filename = os.path.split(path)
+    year_dir, month_name = os.path.split(month_dir)
+    log_dir, year = os.path.split(year_dir)
+    try:
+        return [log_dir, datetime.date(int(year), int(month_name[0:2]), int(filename[0:2]))]
+    except ValueError:
+        return None
+
+
+def read_archived_day(path):
+    """Read an archived log file.
+
+    :param path: A string of the log file pathname, as it was before its year was archived.
+
+    :returns: A string of the contents of the log file, or None if the day isn't archived.
+    """
+    split_path = split_log_path(path)
+    if split_path is None:
+        return None
+    log_dir, date = split_path
+    archive_path = get_archive_path(log_dir, date.year)
+    index = get_index(archive_path)
+    if not index or date.isoformat() not in index:
+        return None
+
+    position, length = index[date.isoformat()][:2]
+    with open(archive_path, 'rb') as f:
+        f.seek(position)
+        return f.read(length).decode('utf-8')
+
+
+def get_archived_log_paths(log_dir, year=None, month=None):
+    """Get the pathnames of all archived log files, as they were before their years were archived.
+
+    :param log_dir: A string of the log files directory pathname.
+    :param year: An integer year. If given, only the archive of that year is read. Default is None.
+    :param month: An integer month. If given with a year, only the logs of that month are included. Default is None.
+
+    :returns: A sorted list of log file pathnames.
+    """
+    paths = []
+    prefix = '' if year is None or month is None else f'{year:04}-{month:02}-'
+    for archived_year in get_archived_years(log_dir) if year is None else [year]:
+        index = get_index(get_archive_path(log_dir, archived_year)) or {}
+        for date, [position, length, year_path] in index.items():
+            if date.startswith(prefix):
+                paths.append(os.path.join(log_dir, str(archived_year), *year_path.split('/')))
+    paths.sort()
+    return paths
+
+
+def pack_year(log_dir, year):
+    """Pack the log files of a completed year into an archive, then delete the year's directory. If the year has
+    already been archived, new log files for the year are added to the archive, replacing archived days.
+
+    :param log_dir: A string of the log files directory pathname.
+    :param year: An integer year. It must be earlier than the current year.
+
+    :returns: The number of days in the archive.
+    """
+    year = int(year)
+    if year >= datetime.date.today().year:
+        raise ValueError(f'{year} is not a completed year')
+    year_dir = os.path.join(log_dir, str(year))
+    archive_path = get_archive_path(log_dir, year)
+
+    # [year_path, contents] for each day, keyed by ISO date.
+    days = {}
+    index = get_index(archive_path)
+    if index:
+        with open(archive_path, 'rb') as f:
+            for date, (position, length, year_path) in index.items():
+                f.seek(position)
+                days[date] = [year_path, f.read(length)]
+    if os.path.isdir(year_dir):
+        for month_name in sorted(os.listdir(year_dir)):
+            month_dir = os.path.join(year_dir, month_name)
+            if not os.path.isdir(month_dir):
+                continue
+            for filename in sorted(os.listdir(month_dir)):
+                if not filename.endswith('.csv') or filename.startswith('.'):
+                    continue
+                date = datetime.date(year, int(month_name[0:2]), int(filename[0:2]))
+                with open(os.path.join(month_dir, filename), 'rb') as f:
+                    days[date.isoformat()] = [f'{month_name}/{filename}', f.read()]
+    if not days:
+        raise ValueError(f'There are no log files for {year}')
+
+    with data.replace_file(archive_path, binary=True) as f:
+        f.write(MAGIC)
+        new_index = {}
+        for date in sorted(days):
+            year_path, contents = days[date]
+            new_index[date] = [f.tell(), len(contents), year_path]
+            f.write(contents)
+        index_pos = f.tell()
+        f.write(json.dumps(new_index).encode('utf-8') + b'\n')
+        f.write(f'{index_pos:0{FOOTER_WIDTH - 1}d}\n'.encode('utf-8'))
+
+    if os.path.isdir(year_dir):
+        shutil.rmtree(year_dir)
+    return len(days)
+
+
+def unpack_year(log_dir, year):
+    """Unpack an archive back into a directory of daily log files, then delete the archive. Existing log files for
+    the year are not overwritten.
+
+    :param log_dir: A string of the log files directory pathname.
+    :param year: An integer year.
+
+    :returns: The number of log files written.
+    """
+    archive_path = get_archive_path(log_dir, year)
+    index = get_index(archive_path)
+    if index is None:
+        raise ValueError(f'{year} has not been archived')
+
+    num_written = 0
+    written_dirs = set()
+    with open(archive_path, 'rb') as f:
+        for position, length, year_path in index.values():
+            path = os.path.join(log_dir, str(year), *year_path.split('/'))
+            if os.path.exists(path):
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            f.seek(position)
+            # A log file left partially written would not be overwritten by unpacking the year again.
+            with data.replace_file(path, binary=True, sync_dir=False) as log_file:
+                log_file.write(f.read(length))
+            written_dirs.add(os.path.dirname(path))
+            num_written += 1
+    # Every log file is on disk before the archive is deleted.
+    if written_dirs:
+        data.sync_dirs(written_dirs | {os.path.join(log_dir, str(year))})
+    os.remove(archive_path)
+    _indexes.pop(archive_path, None)
+    return num_written
@@ -0,0 +1,255 @@
+"""Memory-mapped binary log store for the Health Helper application.
+
+For analysis across many years of logs, the csv log files can be exported into one binary file of fixed-width
+records, in date order. Each record holds one log entry:
+
+    date        uint32   the date's proleptic Gregorian ordinal
+    food id     uint32   position of the entry name in the store's list of food names
+    amount      float32  the amount given when the entry was logged
+    unit code   uint16   position of the amount's unit in the store's list of units, followed by 2 padding bytes
+    servings    float32  the number of servings
+    values      16 x float32, calories through protein followed by cost. Blank values are NaN.
+
+Every field is 4 bytes wide (counting the unit code's padding), so the mapped file can be viewed as a flat array of
+21 float32 or uint32 fields per record. A value column is a strided memoryview of that array, so a decade of logs can
+be summed without creating a Python object per record.
+
+The food names, units, and the position of each day's records are kept in a JSON sidecar file next to the store,
+along with the SHA-1 hash of the store it describes, so a sidecar left beside another store is never used.
+The store is kept in sync with the csv logs by sync_log_store(), which copies the records of unchanged days from the
+previous store and only parses the log files that have changed.
+"""
+# Standard library imports
+import os
+import ast
+import json
+import math
+import hashlib
+import mmap
+import bisect
+import struct
+import datetime
+
+# Local imports
+from healthhelper import data
+from healthhelper import store
+from healthhelper import archive
+
+# Layout of one record. See the module docstring. The views of a mapped store use the machine's byte order, which is
+# little-endian on every platform the application supports.
+RECORD_FORMAT = '<IIfHxxf16f'
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+# Number of 4-byte fields in a record, and the position of each field that isn't a value.
+FIELDS_PER_RECORD = RECORD_SIZE // 4
+DATE_FIELD = 0
+FOOD_FIELD = 1
+AMOUNT_FIELD = 2
+UNIT_FIELD = 3
+SERVINGS_FIELD = 4
+FIRST_VALUE_FIELD = 5
+
+# Units every store starts with. Other units are added to a store's list of units as they are found.
+DEFAULT_UNITS = ['Serving(s)', 'item(s)'] + list(data.UNIT_CONVERSIONS)
+
+
+def get_sidecar_path(path):
+    """Get the pathname of the JSON sidecar file of a binary log store."""
+    return path + '.json'
+
+
+class BinaryLogStore:
+    """Read-only view of a binary log store through a memory map."""
+
+    def __init__(self, path):
+        """Constructor.
+
+        :param path: A string of the binary log store pathname.
+        """
+        self.path = path
+        with open(get_sidecar_path(path)) as f:
+            sidecar = json.load(f)
+        self.foods = sidecar['foods']
+        self.units = sidecar['units']
+        # {log path relative to the log files directory: [mtime_ns, size, first record, number of records]}
+        self.days = sidecar['days']
+
+        self._file = open(path, 'rb')
+        if os.fstat(self._file.fileno()).st_size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.buffer = memoryview(self._map)
+        else:
+            # An empty file can't be memory mapped.
+            self._map = None
+            self.buffer = memoryview(b'')
+        self.floats = self.buffer.cast('f')
+        self.ints = self.buffer.cast('I')
+        self.dates = self.ints[DATE_FIELD::FIELDS_PER_RECORD]
+        # The sidecar and store are replaced one after the other, so a crash in between leaves them out of step, even
+        # if the new store has as many records as the old one.
+        self.is_consistent = sidecar.get('sha1') == hashlib.sha1(self.buffer).hexdigest()
+
+    def __len__(self):
+        return len(self.buffer) // RECORD_SIZE
+
+    def close(self):
+        """Release the memory map and close the file."""
+        for view in (self.dates, self.ints, self.floats, self.buffer):
+            view.release()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get_record_range(self, start_date=None, end_date=None):
+        """Get the positions of the records in a range of dates.
+
+        :param start_date: A datetime.date object of the first day in the range. Default is the first record.
+        :param end_date: A datetime.date object of the last day in the range. Default is the last record.
+
+        :returns: A list of the position of the first record in the range and the position after the last.
+        """
+        start = 0 if start_date is None else bisect.bisect_left(self.dates, start_date.toordinal())
+        end = len(self) if end_date is None else bisect.bisect_right(self.dates, end_date.toordinal())
+        return [start, max(start, end)]
+
+    def get_column(self, value_name, start=0, end=None):
+        """Get a zero-copy view of one value of a range of records.
+
+        :param value_name: A string of the value name, such as 'calories' or 'cost'.
+        :param start: The position of the first record. Default is 0.
+        :param end: The position after the last record. Default is the number of records.
+
+        :returns: A memoryview of float32 values.
+        """
+        end = len(self) if end is None else end
+        field = FIRST_VALUE_FIELD + store.VALUE_INDEX[value_name]
+        return self.floats[start * FIELDS_PER_RECORD + field:end * FIELDS_PER_RECORD:FIELDS_PER_RECORD]
+
+    def sum_values(self, start_date=None, end_date=None):
+        """Sum every value of the records in a range of dates. Blank values are ignored.
+
+        :param start_date: A datetime.date object of the first day in the range. Default is the first record.
+        :param end_date: A datetime.date object of the last day in the range. Default is the last record.
+
+        :returns: A list of 16 float sums, calories through protein followed by cost.
+        """
+        start, end = self.get_record_range(start_date, end_date)
+        totals = []
+        for value_name in store.VALUE_INDEX:
+            column = self.get_column(value_name, start, end)
+            # NaN is the only value that isn't equal to itself.
+            totals.append(math.fsum(val for val in column if val == val))
+            column.release()
+        return totals
+
+    def get_record(self, position):
+        """Decode one record.
+
+        :param position: The position of the record.
+
+        :returns: A list of the date, food name, amount, unit, number of servings, and a list of the 16 values.
+        """
+        fields = struct.unpack_from(RECORD_FORMAT, self.buffer, position * RECORD_SIZE)
+        date, food_id, amount, unit_code, servings = fields[:5]
+        return [datetime.date.fromordinal(date), self.foods[food_id], amount, self.units[unit_code], servings,
+                list(fields[5:])]
+
+
+def pack_log_entry(date, entry, foods, food_ids, units, unit_codes):
+    """Pack one log entry into a record. New food names and units are added to the given lists.
+
+    :param date: A datetime.date object of the log date.
+    :param entry: A list of strings describing one log entry.
+    :param foods: A list of the store's food names.
+    :param food_ids: A dictionary mapping each food name to its position in foods.
+    :param units: A list of the store's units.
+    :param unit_codes: A dictionary mapping each unit to its position in units.
+
+    :returns: A bytes object of the record.
+    """
+    name = entry[0]
+    if name not in food_ids:
+        food_ids[name] = len(foods)
+        foods.append(name)
+    amount, unit = ast.literal_eval(entry[1])
+    if unit not in unit_codes:
+        unit_codes[unit] = len(units)
+        units.append(unit)
+    values = [store.to_float(val) for val in entry[3:3 + store.NUM_VALUES]]
+    return struct.pack(RECORD_FORMAT, date.toordinal(), food_ids[name], store.to_float(amount), unit_codes[unit],
+                       store.to_float(entry[2]), *values)
+
+
+def sync_log_store(log_dir, path):
+    """Bring a binary log store up to date with the log files, including archived logs. The records of days whose
+    log files haven't changed are copied from the previous store, and only changed log files are parsed. The store
+    is replaced atomically.
+
+    :param log_dir: A string of the log files directory pathname.
+    :param path: A string of the binary log store pathname. It is created if it doesn't exist.
+
+    :returns: A list of the number of log files parsed and the number copied from the previous store.
+    """
+    old_store = None
+    if os.path.exists(path) and os.path.exists(get_sidecar_path(path)):
+        old_store = BinaryLogStore(path)
+        if not old_store.is_consistent:
+            old_store.close()
+            old_store = None
+    if old_store is not None:
+        foods, units, old_days = list(old_store.foods), list(old_store.units), old_store.days
+    else:
+        foods, units, old_days = [], list(DEFAULT_UNITS), {}
+    food_ids = {name: i for i, name in enumerate(foods)}
+    unit_codes = {unit: i for i, unit in enumerate(units)}
+
+    log_paths = data.get_log_file_paths(log_dir, include_archived=True)
+
+    days = {}
+    num_parsed = num_copied = 0
+    position = 0
+    digest = hashlib.sha1()
+    try:
+        with data.replace_file(path, binary=True, sync_dir=False) as f:
+            for log_path in log_paths:
+                # Archived logs are versioned by their archive file.
+                version_path = log_path
+                if not os.path.exists(log_path):
+                    version_path = archive.get_archive_path(log_dir, data.get_log_date(log_path).year)
+                stat = os.stat(version_path)
+                key = os.path.relpath(log_path, log_dir).replace(os.sep, '/')
+                old_day = old_days.get(key)
+                if old_day and old_day[:2] == [stat.st_mtime_ns, stat.st_size]:
+                    start, count = old_day[2:]
+                    with old_store.buffer[start * RECORD_SIZE:(start + count) * RECORD_SIZE] as records:
+                        f.write(records)
+                        digest.update(records)
+                    num_copied += 1
+                else:
+                    date = data.get_log_date(log_path)
+                    count = 0
+                    for entry in data.get_entries(log_path, return_all=True):
+                        record = pack_log_entry(date, entry, foods, food_ids, units, unit_codes)
+                        f.write(record)
+                        digest.update(record)
+                        count += 1
+                    num_parsed += 1
+                days[key] = [stat.st_mtime_ns, stat.st_size, position, count]
+                position += count
+            # The old store maps the file that is about to be replaced.
+            if old_store is not None:
+                old_store.close()
+    except BaseException:
+        if old_store is not None:
+            old_store.close()
+        raise
+    with data.replace_file(get_sidecar_path(path), sync_dir=False) as f:
+        json.dump({'foods': foods, 'units': units, 'days': days, 'sha1': digest.hexdigest()}, f)
+    data.sync_dirs([os.path.dirname(path) or '.'])
+    return [num_parsed, num_copied]
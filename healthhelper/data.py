@@ -1,11 +1,92 @@
 """Data gathering and manipulation module for the Health Helper application."""
 # Standard library imports
 import os
+import sys
 import csv
+import io
 import ast
+import json
+import math
+import atexit
+import hashlib
+import logging
+import decimal
+import datetime
+import tempfile
+import types
+import functools
+import threading
+import contextlib
+import collections
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+try:
+    import fcntl
+except ImportError:
+    # File locks are only taken on platforms that have fcntl.
+    fcntl = None
 
 # Local imports
 from PyQt5.QtWidgets import QDesktopWidget
+from healthhelper import archive
+
+logger = logging.getLogger(__name__)
+
+# Units of measurement that can be converted into each other. Each unit maps to its base unit (grams for weight,
+# milliliters for volume) and the amount of the base unit in one of the unit. 'item(s)' has no conversion.
+UNIT_CONVERSIONS = {
+    'mg': ['g', 0.001],
+    'g': ['g', 1.0],
+    'kg': ['g', 1000.0],
+    'oz': ['g', 28.349523125],
+    'lbs': ['g', 453.59237],
+    'mL': ['mL', 1.0],
+    'L': ['mL', 1000.0],
+    'tsp': ['mL', 4.92892159375],
+    'tbsp': ['mL', 14.78676478125],
+    'cup': ['mL', 236.5882365],
+    'pint': ['mL', 473.176473],
+    'quart': ['mL', 946.352946],
+    'gallon': ['mL', 3785.411784],
+}
+
+# Lock files are kept together in a directory of the user's own, so the data directories only hold data files. The
+# directory is only readable by the user, and each user has their own. See file_lock().
+LOCK_DIR = os.path.join(os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir(),
+                        f"healthhelper-locks-{os.getuid() if hasattr(os, 'getuid') else ''}")
+
+# Number of times a read is retried when the file changes while it is read, before the file is locked.
+READ_ATTEMPTS = 3
+
+# Memory, in bytes, that the rows kept by the row cache may take. See RowCache.
+ROW_CACHE_BUDGET = 4 * 1024 * 1024
+
+# Number of serving size strings whose unit serving sizes are kept by get_unit_serving_sizes().
+SERVING_SIZES_CACHE_SIZE = 1024
+
+# Seconds that the write buffer waits after the last change before writing the changed files. See WriteBuffer.
+WRITE_DELAY = 1.0
+
+# Listings of the log files directory and its year and month directories, read by list_log_dir() and keyed by
+# directory pathname. Each value is [version, names].
+_log_dir_listings = {}
+
+# Index of the id cell of food dictionary and log rows. A log entry has the id of the FD entry it was made from.
+ID_INDEX = 19
+
+# Log and food dictionary values are summed as integer numbers of hundredths.
+FIXED_PLACES = 2
+FIXED_SCALE = 10 ** FIXED_PLACES
+
+# CONVERSION_MATRIX[from_unit][to_unit] is the amount of to_unit in one from_unit, for every pair of units sharing
+# a base unit.
+CONVERSION_MATRIX = {}
+for _from_unit, (_from_base, _from_factor) in UNIT_CONVERSIONS.items():
+    CONVERSION_MATRIX[_from_unit] = {}
+    for _to_unit, (_to_base, _to_factor) in UNIT_CONVERSIONS.items():
+        if _from_base == _to_base:
+            CONVERSION_MATRIX[_from_unit][_to_unit] = 1.0 if _from_unit == _to_unit else _from_factor / _to_factor
 
 
 def get_win_size():
@@ -45,6 +126,16 @@ def get_table_entry_names(table):
     return [all_entry_names, checked_entry_names, unchecked_entry_names]
 
 
+def get_checked_rows(table):
+    """Get the positions of the checked rows in a table widget.
+
+    :param table: A QTableWidget object, with each row representing one food dictionary or log entry.
+
+    :returns: A list of row indexes.
+    """
+    return [row_index for row_index in range(table.rowCount()) if table.item(row_index, 0).checkState() == 2]
+
+
 def get_edit_log_amounts(table, checked=False):
     """Get the user-input amounts from the table used to add or edit log entries.
 
@@ -70,8 +161,654 @@ def get_edit_log_amounts(table, checked=False):
     return input_amounts
 
 
+def get_lock_path(path):
+    """Get the pathname of the lock file of a food dictionary, log, or recipes file.
+
+    :param path: A string of the file pathname.
+
+    :returns: A string of the lock file pathname.
+    """
+    key = hashlib.sha1(os.path.realpath(path).encode('utf-8')).hexdigest()
+    return f'{LOCK_DIR}{os.sep}{key}.lock'
+
+
+# The locks held by each thread, as {lock file pathname: [lock file descriptor, depth, shared]}. See file_lock().
+_held_locks = threading.local()
+
+# Whether the lock directory has been created and checked by this process.
+_lock_dir_made = False
+
+
+def forget_held_locks():
+    """Forget the locks inherited by a forked child process. The child shares the parent's lock files, so it mustn't
+    treat their locks as its own, and closes its copies of them.
+    """
+    for fd, depth, shared in getattr(_held_locks, 'locks', {}).values():
+        os.close(fd)
+    _held_locks.locks = {}
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=forget_held_locks)
+
+
+@contextlib.contextmanager
+def file_lock(path, shared=False):
+    """Lock a food dictionary, log, or recipes file against other processes and threads for the duration of a with
+    block. Writers hold an exclusive lock from the time they read the file until it has been replaced, so that changes
+    made by another process in between aren't lost. The lock is advisory, so it only excludes processes that also use
+    file_lock(). On platforms without fcntl, no lock is taken.
+
+    The lock is reentrant within a thread: a thread that already holds the file's lock, shared or exclusive, may lock
+    it again, such as when a writer that holds the exclusive lock reads the file, and the lock is released when the
+    outermost with block ends. A thread that holds a shared lock can't take the exclusive lock, since two threads
+    upgrading at once would wait on each other forever. Each thread takes its own lock, so other threads of the same
+    process are excluded as other processes are.
+
+    :param path: A string of the file pathname. The file doesn't need to exist.
+    :param shared: If True, a shared lock is taken, which only excludes exclusive locks. Default is False.
+
+    :raises RuntimeError: If the thread holds a shared lock on the file and asks for an exclusive one.
+    """
+    if fcntl is None:
+        yield
+        return
+    lock_path = get_lock_path(path)
+    if not hasattr(_held_locks, 'locks'):
+        _held_locks.locks = {}
+    held = _held_locks.locks.get(lock_path)
+    if held is not None:
+        if held[2] and not shared:
+            raise RuntimeError(f'an exclusive lock on {path} was asked for while a shared lock on it is held')
+        held[1] += 1
+        try:
+            yield
+        finally:
+            held[1] -= 1
+        return
+
+    fd = acquire_lock_file(lock_path, shared)
+    _held_locks.locks[lock_path] = [fd, 1, shared]
+    try:
+        yield
+    finally:
+        del _held_locks.locks[lock_path]
+        release_lock_file(lock_path, fd)
+
+
+def make_lock_dir():
+    """Create the lock directory, readable only by the user, if it doesn't exist.
+
+    :raises PermissionError: If the directory belongs to another user or can be read by other users, since they could
+        then hold the user's locks.
+    """
+    try:
+        os.mkdir(LOCK_DIR, 0o700)
+    except FileExistsError:
+        pass
+    stat = os.lstat(LOCK_DIR)
+    if not os.path.isdir(LOCK_DIR) or os.path.islink(LOCK_DIR) or stat.st_uid != os.getuid() \
+            or stat.st_mode & 0o077:
+        raise PermissionError(f'the lock directory {LOCK_DIR} must be a directory of the user, only accessible to them')
+
+
+def acquire_lock_file(lock_path, shared):
+    """Open and lock a lock file, creating it if it doesn't exist.
+
+    The last holder of a lock file removes it when it releases it (see release_lock_file()). Another process may have
+    opened the file just before it was removed, and then locks a file that no longer has the name, so once the lock is
+    taken, it is checked that the file still has the name, and if not, the new file of the name is locked instead.
+
+    :param lock_path: A string of the lock file pathname.
+    :param shared: If True, a shared lock is taken, otherwise an exclusive one.
+
+    :returns: The descriptor of the locked file.
+    """
+    global _lock_dir_made
+    if not _lock_dir_made:
+        make_lock_dir()
+        _lock_dir_made = True
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        except FileNotFoundError:
+            # The directory was removed, such as by a cleaner of the temporary directory.
+            make_lock_dir()
+            continue
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            opened = os.fstat(fd)
+            try:
+                named = os.stat(lock_path)
+            except FileNotFoundError:
+                named = None
+        except BaseException:
+            os.close(fd)
+            raise
+        if named is not None and (named.st_dev, named.st_ino) == (opened.st_dev, opened.st_ino):
+            return fd
+        os.close(fd)
+
+
+def release_lock_file(lock_path, fd):
+    """Release the lock on a lock file. If no other thread or process holds the lock, the file is removed while it is
+    still locked, so lock files don't pile up for files that are no longer locked. Any that wait for the lock then
+    lock a new file of the same name, as described in acquire_lock_file().
+
+    :param lock_path: A string of the lock file pathname.
+    :param fd: The descriptor of the locked file, from acquire_lock_file().
+    """
+    try:
+        # A shared lock is converted to an exclusive one, which fails straight away if another holder has the file.
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        pass
+    else:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(lock_path)
+    finally:
+        # Closing the file releases the lock.
+        os.close(fd)
+
+
+def get_file_version(path):
+    """Get a value that changes whenever a file is replaced or modified, including by a change that is waiting in the
+    write buffer.
+
+    :param path: A string of the file pathname.
+
+    :returns: A tuple of the file's inode, size, and modification time, a ('pending', generation) tuple if the file
+        has a change in the write buffer, or None if the file doesn't exist.
+    """
+    version = write_buffer.get_version(path)
+    return get_disk_version(path) if version is None else version
+
+
+def get_disk_version(path):
+    """Get a value that changes whenever a file is replaced or modified on disk. Changes in the write buffer are
+    ignored.
+
+    :param path: A string of the file pathname.
+
+    :returns: A tuple of the file's inode, size, and modification time, or None if the file doesn't exist.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def get_rows_size(rows):
+    """Estimate the memory taken by a list of rows of strings, in bytes."""
+    return sys.getsizeof(rows) + sum(sys.getsizeof(row) + sum(map(sys.getsizeof, row)) for row in rows)
+
+
+class RowCache:
+    """A least recently used cache of the rows read by read_rows(), keyed by file pathname. A log day that is shown,
+    edited and shown again is parsed once rather than each time a window reads it.
+
+    Each file's rows are kept with the version of the file they were read from, and are only used while the file
+    still has that version, so changes made by other processes are seen. Files replaced by write_entries() are also
+    dropped straight away. When the rows kept take more memory than the budget, the least recently used files are
+    dropped. The Food Dictionary is usually larger than the budget, and is kept by store.FoodDictStore instead.
+    """
+
+    def __init__(self, budget):
+        """Constructor.
+
+        :param budget: The memory, in bytes, that the cached rows may take.
+        """
+        self.budget = budget
+        self.files = collections.OrderedDict()  # {path: [version, rows, size]}, least recently used first.
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        # The cache is used by the GUI thread, the write buffer's timer thread and the server's worker threads. The
+        # lock is reentrant, since put() invalidates and evicts while it holds it.
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.files)
+
+    def get(self, path, version):
+        """Return a new copy of the cached rows of a file, or None if they aren't cached for this version of it."""
+        with self.lock:
+            cached = self.files.get(path)
+            if cached is None or cached[0] != version:
+                self.misses += 1
+                return None
+            self.files.move_to_end(path)
+            self.hits += 1
+            rows = cached[1]
+        return [list(row) for row in rows]
+
+    def put(self, path, version, rows):
+        """Cache a copy of the rows of a file, read from the given version of it. Rows that take more memory than the
+        whole budget aren't cached.
+        """
+        rows = [tuple(row) for row in rows]
+        size = get_rows_size(rows)
+        with self.lock:
+            self.invalidate(path)
+            if size <= self.budget:
+                self.files[path] = [version, rows, size]
+                self.size += size
+                self.evict()
+
+    def invalidate(self, path):
+        """Drop the cached rows of a file, if any."""
+        with self.lock:
+            cached = self.files.pop(path, None)
+            if cached is not None:
+                self.size -= cached[2]
+
+    def resize(self, budget):
+        """Change the memory budget, dropping the least recently used files until the cache fits it."""
+        with self.lock:
+            self.budget = budget
+            self.evict()
+
+    def evict(self):
+        """Drop the least recently used files until the cached rows fit the budget."""
+        with self.lock:
+            while self.size > self.budget:
+                path, cached = self.files.popitem(last=False)
+                self.size -= cached[2]
+
+    def clear(self):
+        """Drop every cached file and reset the hit and miss counters."""
+        with self.lock:
+            self.files.clear()
+            self.size = self.hits = self.misses = 0
+
+
+# The row cache of the process.
+row_cache = RowCache(ROW_CACHE_BUDGET)
+
+
+def get_rows_cost(rows):
+    """Sum the cost column of the rows of a log, in hundredths. Rows without a cost count as 0."""
+    return sum(to_fixed(row[18]) for row in rows if len(row) > 18)
+
+
+class MonthlySpend:
+    """Running totals of the spending of each month, from the cost column of its logs, so that the spending of a month
+    so far is known without reading the month's logs each time it is shown.
+
+    A month is read in full the first time its total is asked for by get_month_spend(). After that, each write of one
+    of its logs by write_entries() or the write buffer adjusts the total by the change in that day's cost. The version
+    of the month's directory is kept with the total. Writing or deleting a log changes the version of its directory,
+    so a log changed by another process is noticed, and the month is read again the next time its total is asked for.
+    """
+
+    def __init__(self):
+        """Constructor."""
+        # {month directory: [directory version, total, {log path: cost}]}, with amounts in hundredths.
+        self.months = {}
+
+    def get_total(self, month_dir):
+        """Return the spending of a month in hundredths, or None if the month hasn't been read, or has been changed by
+        another process since.
+        """
+        month = self.months.get(month_dir)
+        if month is None or month[0] != get_disk_version(month_dir):
+            return None
+        return month[1]
+
+    def set_month(self, month_dir, version, costs):
+        """Keep the total of a month read from its logs.
+
+        :param month_dir: A string of the month's log directory pathname.
+        :param version: The version of the directory, from get_disk_version(), from before the logs were read.
+        :param costs: A dictionary mapping the pathname of each log of the month to its cost in hundredths.
+        """
+        self.months[month_dir] = [version, sum(costs.values()), costs]
+
+    def get_dir_version(self, path):
+        """Return the version of the directory of a log whose month is kept, or None if its month isn't kept."""
+        month_dir = os.path.dirname(path)
+        return get_disk_version(month_dir) if month_dir in self.months else None
+
+    def update(self, path, rows, dir_version=None):
+        """Adjust the total of a log's month for a change to the log. Changes to other files are ignored.
+
+        :param path: A string of the file pathname.
+        :param rows: A list of the new rows of the log, or None if the log was deleted.
+        :param dir_version: The version of the log's directory from just before the change was made on disk, from
+            get_dir_version(). If the month was up to date with it, the month is kept up to date with the new version
+            of the directory. Default is None, for a change that isn't on disk yet, such as one in the write buffer.
+        """
+        month_dir = os.path.dirname(path)
+        month = self.months.get(month_dir)
+        if month is None:
+            return
+        cost = get_rows_cost(rows) if rows else 0
+        month[1] += cost - month[2].get(path, 0)
+        month[2][path] = cost
+        if dir_version is not None and month[0] == dir_version:
+            month[0] = get_disk_version(month_dir)
+
+
+# The monthly spending totals of the process.
+month_spend = MonthlySpend()
+
+
+class WriteBuffer:
+    """Changes to food dictionary and log files that are waiting to be written, so that a rapid sequence of changes
+    to a file is written once.
+
+    Once the buffer is started, write() keeps the new rows of a file in memory and returns straight away. A
+    background thread writes every changed file once no change has been made for the buffer's delay, and when the
+    process exits. Readers in this process see the buffered rows through read_rows(), get_file_version(),
+    file_exists() and get_log_file_paths(), so a change is seen as soon as it is made. Deleting a file isn't
+    buffered.
+
+    Each change is also appended to a recovery journal before write() returns. The journal is flushed to the
+    operating system but not synced, so a change survives the application crashing or being killed, and start()
+    writes it the next time the application starts. The files are synced when they are written, by write_entries(),
+    and the journal is deleted once every change in it has been written.
+
+    A file is written under its lock. If another process changed it after the first buffered change, the two sets of
+    changes are merged by merge_rows(). Where both changed the same row, the other process's change, which is already
+    in the file, is kept, and the row is reported in conflicts rather than overwritten.
+
+    Until the buffer is started, such as in the command line tools and the server, write() writes straight away.
+    """
+
+    def __init__(self):
+        """Constructor."""
+        self.journal_path = None
+        self.delay = WRITE_DELAY
+        # {path: [base_version, base_rows, rows, version]}: the disk version and rows of the file before its first
+        # buffered change, the buffered rows, and the ('pending', generation) version of the buffered rows.
+        self.files = {}
+        self.generation = 0
+        self.lock = threading.RLock()
+        self.timer = None
+        self.num_changes = 0
+        self.num_writes = 0
+        # [path, names] lists of the rows whose buffered change wasn't written, because another process had changed
+        # them too. See pop_conflicts().
+        self.conflicts = []
+
+    def __len__(self):
+        return len(self.files)
+
+    def start(self, journal_path, delay=WRITE_DELAY):
+        """Start buffering changes. Changes left in the recovery journal by an earlier process are written first, and
+        every buffered change is written when this process exits.
+
+        :param journal_path: A string of the recovery journal pathname.
+        :param delay: Seconds to wait after the last change before writing the changed files. Default is WRITE_DELAY.
+        """
+        self.journal_path = journal_path
+        self.delay = delay
+        self.recover()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Write every buffered change, then stop buffering."""
+        self.flush()
+        self.journal_path = None
+
+    def write(self, path, rows):
+        """Replace the rows of a food dictionary or log file. The caller should hold the file's lock while it reads
+        and changes the rows, as for write_entries(). The directory of the file is created when it is written.
+
+        :param path: A string of the file pathname.
+        :param rows: A list of lists of values. Values that aren't strings are converted, as they are by csv.writer.
+        """
+        rows = [['' if val is None else str(val) for val in row] for row in rows]
+        if self.journal_path is None:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            write_entries(path, rows)
+            self.num_changes += 1
+            self.num_writes += 1
+            return
+        month_spend.update(path, rows)
+        with self.lock:
+            record = {'path': path, 'rows': rows}
+            pending = self.files.get(path)
+            if pending is None:
+                base_version = get_disk_version(path)
+                pending = [None if base_version is None else list(base_version), read_file_rows(path) or [], None,
+                           None]
+                record['base'] = pending[:2]
+            self.generation += 1
+            pending[2:] = [rows, ('pending', self.generation)]
+            self.append_record(record)
+            self.files[path] = pending
+            self.num_changes += 1
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.delay, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def remove(self, path):
+        """Delete a food dictionary or log file straight away, dropping any buffered change to it. The caller should
+        hold the file's lock.
+        """
+        with self.lock:
+            if self.files.pop(path, None) is not None:
+                self.append_record({'path': path, 'rows': None})
+        dir_version = month_spend.get_dir_version(path)
+        if os.path.exists(path):
+            os.remove(path)
+        month_spend.update(path, None, dir_version)
+
+    def get(self, path):
+        """Get the buffered rows of a file.
+
+        :returns: A list of the version of the buffered rows and a new copy of the rows, or None if the file has no
+            buffered change.
+        """
+        with self.lock:
+            pending = self.files.get(path)
+            return None if pending is None else [pending[3], [list(row) for row in pending[2]]]
+
+    def get_version(self, path):
+        """Return the ('pending', generation) version of the buffered rows of a file, or None if it has none."""
+        with self.lock:
+            pending = self.files.get(path)
+            return None if pending is None else pending[3]
+
+    def get_paths(self, directory):
+        """Return a list of the pathnames of the files in a directory, or its subdirectories, that have buffered
+        changes.
+        """
+        prefix = os.path.join(directory, '')
+        with self.lock:
+            return [path for path in self.files if path.startswith(prefix)]
+
+    def flush(self):
+        """Write every buffered change, each file once. Called by the background thread after the delay, and by
+        anything that needs the changes on disk straight away, such as before other processes read the files.
+        """
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            paths = list(self.files)
+        written_dirs = set()
+        for path in paths:
+            # The file's lock is taken before the buffer's, in the same order as write() is called in.
+            with file_lock(path):
+                with self.lock:
+                    pending = self.files.get(path)
+                if pending is None:
+                    continue
+                base_version, base_rows, rows, version = pending
+                disk_version = get_disk_version(path)
+                if (None if disk_version is None else list(disk_version)) != base_version:
+                    rows, conflicts = merge_rows(base_rows, rows, read_file_rows(path) or [])
+                    if conflicts:
+                        logger.warning('Not writing the changes to %s in %s, which another process also changed',
+                                       ', '.join(conflicts), path)
+                        with self.lock:
+                            self.conflicts.append([path, conflicts])
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                write_entries(path, rows, sync_dir=False)
+                written_dirs.add(os.path.dirname(path) or '.')
+                with self.lock:
+                    self.num_writes += 1
+                    if self.files.get(path) is pending and pending[3] == version:
+                        del self.files[path]
+        # The directories are synced once for the batch, before the journal of the changes is deleted.
+        sync_dirs(written_dirs)
+        with self.lock:
+            if not self.files and self.journal_path is not None and os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+
+    def pop_conflicts(self):
+        """Return and forget the conflicts found by flush(), as a list of [path, names] lists of the rows whose
+        buffered change wasn't written because another process had changed them too.
+        """
+        with self.lock:
+            conflicts, self.conflicts = self.conflicts, []
+        return conflicts
+
+    def recover(self):
+        """Write the changes left in the recovery journal by a process that exited before writing them."""
+        try:
+            with open(self.journal_path) as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        with self.lock:
+            for line in lines:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A partially written last line, left by a crash.
+                    continue
+                path = record['path']
+                if record['rows'] is None:
+                    self.files.pop(path, None)
+                    continue
+                if 'base' in record:
+                    self.files[path] = record['base'] + [None, None]
+                if path in self.files:
+                    self.generation += 1
+                    self.files[path][2:] = [record['rows'], ('pending', self.generation)]
+        self.flush()
+
+    def append_record(self, record):
+        """Append a record of a change to the recovery journal, and flush it to the operating system."""
+        os.makedirs(os.path.dirname(self.journal_path) or '.', exist_ok=True)
+        with open(self.journal_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+# The write buffer of the process.
+write_buffer = WriteBuffer()
+
+
+def read_rows(path):
+    """Read every row of a food dictionary or log file. A change to the file that is waiting in the write buffer is
+    read from the buffer. Otherwise the file is read by read_file_rows().
+
+    :param path: A string of the food dictionary or log file pathname.
+
+    :returns: A list of the rows of the file, or None if the file doesn't exist. A new copy is returned each time,
+        which the caller may change.
+    """
+    pending = write_buffer.get(path)
+    if pending is not None:
+        return pending[1]
+    return read_file_rows(path)
+
+
+def read_file_rows(path):
+    """Read every row of a food dictionary or log file from disk. The file is read without a lock, and read again if it
+    changed while it was read. If it keeps changing, it is read under a shared lock.
+
+    :param path: A string of the food dictionary or log file pathname.
+
+    :returns: A list of the rows of the file, or None if the file doesn't exist. The rows are kept in the row cache,
+        and a new copy is returned each time, which the caller may change.
+    """
+    for _ in range(READ_ATTEMPTS):
+        version = get_disk_version(path)
+        if version is None:
+            return None
+        rows = row_cache.get(path, version)
+        if rows is not None:
+            return rows
+        try:
+            with open(path) as f:
+                rows = list(csv.reader(f))
+        except FileNotFoundError:
+            # The file was deleted after it was checked.
+            continue
+        if get_disk_version(path) == version:
+            row_cache.put(path, version, rows)
+            return rows
+    # A writer that holds the file's exclusive lock reads under it, since file_lock() is reentrant.
+    with file_lock(path, shared=True):
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return list(csv.reader(f))
+
+
+def merge_rows(base_rows, our_rows, their_rows):
+    """Merge the changes that two writers made to the same version of a food dictionary or log file. Rows are matched
+    by name, which is unique within a file. A row that only one writer added, changed or removed takes that writer's
+    change, as does a row that both changed the same way. If both writers changed a row in different ways, their
+    change, which is already in the file, is kept, and the row is a conflict.
+
+    :param base_rows: A list of the rows of the file that both writers started from.
+    :param our_rows: A list of the rows written by us.
+    :param their_rows: A list of the rows written by the other writer.
+
+    :returns: A list of the merged rows and a list of the names of the conflicting rows. The merged rows are our rows
+        in our order, followed by the rows that only they added or that we removed in conflict. If both writers'
+        rows are sorted, as the Food Dictionary's are, the merged rows are sorted too. If the names of any of the
+        lists aren't unique, the rows can't be matched, so their rows are kept and every row that we changed is a
+        conflict.
+    """
+    def index(rows):
+        return {row[0] if row else '': row for row in rows}
+
+    base, ours, theirs = index(base_rows), index(our_rows), index(their_rows)
+    if len(base) != len(base_rows) or len(ours) != len(our_rows) or len(theirs) != len(their_rows):
+        changed = {row[0] if row else '' for row in our_rows if row not in base_rows}
+        changed.update(row[0] if row else '' for row in base_rows if row not in our_rows)
+        return [their_rows, sorted(changed)]
+    merged = []
+    conflicts = []
+    for name, row in ours.items():
+        if name in base and row == base[name]:
+            # Unchanged by us, so their change, if any, is kept. A row they removed stays removed.
+            if name in theirs:
+                merged.append(theirs[name])
+        elif theirs.get(name) == row or theirs.get(name) == base.get(name):
+            # Changed the same way by both, or only by us.
+            merged.append(row)
+        else:
+            # Changed by both, or changed by one and removed by the other.
+            conflicts.append(name)
+            if name in theirs:
+                merged.append(theirs[name])
+    for name, row in theirs.items():
+        if name in ours:
+            continue
+        if name not in base:
+            merged.append(row)
+        elif row != base[name]:
+            # Removed by us, but changed by them.
+            conflicts.append(name)
+            merged.append(row)
+    if our_rows == sorted(our_rows) and their_rows == sorted(their_rows):
+        merged.sort()
+    return [merged, conflicts]
+
+
 def get_entries(path, entry_names=None, match=True, return_all=False):
-    """Get a specified set of entries from the food dictionary or a log file.
+    """Get a specified set of entries from the food dictionary or a log file. Log files in an archived year are
+    read from the year's archive.
 
     :param path: A string of the food dictionary or log file pathname.
     :param entry_names: A list of entry names. Default is None.
@@ -83,28 +820,31 @@ def get_entries(path, entry_names=None, match=True, return_all=False):
         returned entries corresponds to the order of names in entry_names.
     """
     entries = []
-    if not os.path.exists(path):
-        return 'file not found'
+    reader = read_rows(path)
+    if reader is None:
+        contents = archive.read_archived_day(path)
+        if contents is None:
+            return 'file not found'
+        reader = list(csv.reader(io.StringIO(contents, newline='')))
 
-    with open(path) as f:
-        reader = list(csv.reader(f))
-        if return_all:
-            return reader
-        elif not entry_names:
-            return []
-        else:
-            if match:
-                for name in entry_names:
-                    for row in reader:
-                        if row[0] == name:
-                            entries.append(row)
-            else:
+    if return_all:
+        return reader
+    elif not entry_names:
+        return []
+    else:
+        if match:
+            for name in entry_names:
                 for row in reader:
-                    if row[0] in entry_names:
-                        continue
-                    else:
+                    if row[0] == name:
                         entries.append(row)
-            return entries
+        else:
+            entry_names = set(entry_names)
+            for row in reader:
+                if row[0] in entry_names:
+                    continue
+                else:
+                    entries.append(row)
+        return entries
 
 
 def get_file_entry_names(path):
@@ -122,6 +862,36 @@ def get_file_entry_names(path):
     return entry_names
 
 
+def get_row_id(row):
+    """Return the integer id of a food dictionary or log row, or None if the row has no id."""
+    if len(row) > ID_INDEX and row[ID_INDEX].isdigit():
+        return int(row[ID_INDEX])
+    return None
+
+
+def set_row_id(row, entry_id):
+    """Set the id of a food dictionary or log row in place, adding the id cell if the row doesn't have one."""
+    if len(row) <= ID_INDEX:
+        row.extend([''] * (ID_INDEX + 1 - len(row)))
+    row[ID_INDEX] = str(entry_id)
+
+
+def is_entry_row(row, entry_name, entry_id=None):
+    """Check whether a log row was made from a food dictionary entry. A row with an id is matched by its id, and a
+    row without one by its name.
+
+    :param row: A list of strings describing one log entry.
+    :param entry_name: A string of the FD entry's name, or its previous name if it was renamed.
+    :param entry_id: The integer id of the FD entry, or None if it has no id. Default is None.
+
+    :returns: True if the row was made from the entry.
+    """
+    row_id = get_row_id(row)
+    if row_id is not None and entry_id is not None:
+        return row_id == entry_id
+    return row[0] == entry_name
+
+
 def select_all_entries(table):
     """Select all entries in a table widget.
 
@@ -140,25 +910,206 @@ def unselect_all_entries(table):
         table.item(row_index, 0).setCheckState(0)
 
 
+def get_sort_keys(column, numeric=True):
+    """Convert a column of table values into sort keys, once, so that a table can be sorted again without parsing.
+
+    :param column: A list of strings, one for each entry.
+    :param numeric: If True, the values are numbers. If False, the values are sorted as text, ignoring case.
+        Default is True.
+
+    :returns: An array('d') of the values, with blank or invalid values as NaN, or a list of strings if numeric is
+        False.
+    """
+    if not numeric:
+        return [val.casefold() for val in column]
+    keys = array('d')
+    for val in column:
+        try:
+            keys.append(float(val))
+        except ValueError:
+            keys.append(math.nan)
+    return keys
+
+
+def get_fixed_sort_keys(fixed_column, column):
+    """Get sort keys from a column of values that has already been parsed into hundredths, such as a column returned
+    by parse_log_entries(), so that the values aren't parsed again.
+
+    :param fixed_column: An array('q') of values in hundredths, with blank values as 0.
+    :param column: A list of the strings the values were parsed from, which are only checked for blanks.
+
+    :returns: An array('d') of the values in hundredths, with blank values as NaN, as returned by get_sort_keys().
+    """
+    return array('d', [fixed if val else math.nan for fixed, val in zip(fixed_column, column)])
+
+
+def get_sort_order(keys, descending=False):
+    """Get the order of the entries when sorted by one column. The sort is stable, and entries without a value are
+    placed last in either direction.
+
+    :param keys: Sort keys returned by get_sort_keys() or get_fixed_sort_keys().
+    :param descending: If True, the largest values are placed first. Default is False.
+
+    :returns: A list of entry indexes in sorted order.
+    """
+    # NaN is the only value that isn't equal to itself.
+    order = [i for i in range(len(keys)) if keys[i] == keys[i]]
+    blanks = [i for i in range(len(keys)) if keys[i] != keys[i]]
+    order.sort(key=keys.__getitem__, reverse=descending)
+    return order + blanks
+
+
+def reorder_table_rows(table, row_order):
+    """Rearrange the rows of a table widget. The existing items are moved, so check states are kept.
+
+    :param table: A QTableWidget object, with each row representing one food dictionary or log entry.
+    :param row_order: A list of the current row indexes, in the order they are to be displayed.
+    """
+    table.blockSignals(True)
+    rows = [[table.takeItem(row_index, col) for col in range(table.columnCount())] for row_index in row_order]
+    for row_index, items in enumerate(rows):
+        for col, item in enumerate(items):
+            table.setItem(row_index, col, item)
+    table.blockSignals(False)
+    table.viewport().update()
+
+
+def to_fixed(val):
+    """Convert a value from the food dictionary or a log file into an integer number of hundredths, so that values
+    can be summed exactly. Values with more than two decimal places are rounded half to even.
+
+    :param val: A string of a number, an int, a float, or an empty string. Blank values are 0.
+
+    :returns: An integer. For example, '12.5' becomes 1250.
+    """
+    if not val:
+        return 0
+    if not isinstance(val, str):
+        val = str(val)
+    whole, dot, frac = val.partition('.')
+    digits = whole[1:] if whole[:1] == '-' else whole
+    if len(frac) <= FIXED_PLACES and (digits.isdigit() or (not digits and frac)) and (frac.isdigit() or not frac):
+        fixed = int(digits or 0) * FIXED_SCALE + int(frac.ljust(FIXED_PLACES, '0'))
+        return -fixed if whole[:1] == '-' else fixed
+    # Other forms, such as '1e-05' or '0.125', are rare enough to go through decimal.
+    return int(decimal.Decimal(val).scaleb(FIXED_PLACES).quantize(1, rounding=decimal.ROUND_HALF_EVEN))
+
+
+def from_fixed(fixed):
+    """Convert an integer number of hundredths into an int if it is a whole number, or a float otherwise.
+
+    :param fixed: An integer number of hundredths.
+
+    :returns: An int or float. For example, 1250 becomes 12.5.
+    """
+    if fixed % FIXED_SCALE == 0:
+        return fixed // FIXED_SCALE
+    return fixed / FIXED_SCALE
+
+
+def format_fixed(fixed, pad=False):
+    """Format an integer number of hundredths for display.
+
+    :param fixed: An integer number of hundredths.
+    :param pad: If True, two decimal places are always shown, as for a cost. If False, trailing zeros and a trailing
+        decimal point are dropped. Default is False.
+
+    :returns: A string. For example, 1250 becomes '12.5', or '12.50' if pad is True.
+    """
+    sign = '-' if fixed < 0 else ''
+    whole, frac = divmod(abs(fixed), FIXED_SCALE)
+    frac_str = f'{frac:0{FIXED_PLACES}d}'
+    if not pad:
+        frac_str = frac_str.rstrip('0')
+    return f'{sign}{whole}.{frac_str}' if frac_str else f'{sign}{whole}'
+
+
+def sum_fixed_values(values_list):
+    """Sum the values in the entry info list by index in integer arithmetic. The first item of every list in
+    values_list is summed, and so on.
+
+    :param values_list: A list of lists. Each list consists of values describing one log entry.
+
+    :returns: A list of the summed totals as integer numbers of hundredths.
+    """
+    return [sum(map(to_fixed, values)) for values in zip(*values_list)]
+
+
+def parse_log_entries(log_entries):
+    """Parse the entries of a log file once into separate columns, with the values held as a numeric matrix.
+
+    :param log_entries: A list of lists. Each list consists of strings describing one log entry.
+
+    :returns: A list of four items: a list of the entry names, a list of the [amount, unit] strings, a list of the
+        numbers of servings as strings, and a list of 16 array('q') columns of values in hundredths, from calories
+        to cost. Row i of each column belongs to entry i. Blank values are 0.
+    """
+    names = [entry[0] for entry in log_entries]
+    amounts = [entry[1] for entry in log_entries]
+    servings = [entry[2] for entry in log_entries]
+    value_columns = [array('q', map(to_fixed, column)) for column in zip(*(entry[3:19] for entry in log_entries))]
+    if not value_columns:
+        value_columns = [array('q') for i in range(16)]
+    return [names, amounts, servings, value_columns]
+
+
+def sum_columns(value_columns, rows=None):
+    """Sum columns of values in hundredths, such as those returned by parse_log_entries().
+
+    :param value_columns: A list of array('q') columns.
+    :param rows: A list of the row indexes to sum. Default is None, which sums every row.
+
+    :returns: A list of the column totals in hundredths.
+    """
+    if rows is None:
+        return [sum(column) for column in value_columns]
+    return [sum(column[row] for row in rows) for column in value_columns]
+
+
 def sum_shared_values(values_list):
     """Sum the values in the entry info list by index. The first item of every list in values_list is summed, and
-    so on. If a float representing a sum can be converted into a whole number integer, do so.
+    so on. The sums are exact to two decimal places, and whole numbers are given without a decimal point.
 
     :param values_list: A list of lists. Each list consists of strings representing the info of one log entry.
 
     :returns: A list of the summed totals as strings.
     """
-    totals = []
-    for values in zip(*values_list):  # values is a list of info corresponding to one entry.
-        sum_ = 0
-        for val in values:
-            if not val:
-                val = 0
-            sum_ += float(val)
-        if int(sum_) == float(sum_):
-            sum_ = int(sum_)
-        totals.append(str(round(sum_, 2)))
-    return totals
+    return [format_fixed(total) for total in sum_fixed_values(values_list)]
+
+
+@functools.lru_cache(maxsize=SERVING_SIZES_CACHE_SIZE)
+def get_serving_size_options(serv_size_options):
+    """Parse the serving size options of a food dictionary entry.
+
+    :param serv_size_options: A string of the FD entry's serving size dictionary, {unit1: amount1, ...}.
+
+    :returns: A tuple of (unit, amount) string pairs, in the order they were given.
+    """
+    return tuple(ast.literal_eval(serv_size_options).items())
+
+
+@functools.lru_cache(maxsize=SERVING_SIZES_CACHE_SIZE)
+def get_unit_serving_sizes(serv_size_options):
+    """Get the size of one serving in every unit that an amount of a food dictionary entry can be given in.
+
+    :param serv_size_options: A string of the FD entry's serving size dictionary, {unit1: amount1, ...}.
+
+    :returns: A read-only mapping of each unit to the size of one serving in that unit. 'Serving(s)' maps to 1. The
+        serving size options are included as given, followed by every unit that can be converted into one of them.
+        For example, "{'g': '56'}" results in {'Serving(s)': 1.0, 'g': 56.0, 'mg': 56000.0, 'kg': 0.056, ...}. The
+        same mapping is shared by every caller with the same string, so it can't be changed.
+    """
+    serving_sizes = {'Serving(s)': 1.0}
+    options = get_serving_size_options(serv_size_options)
+    for unit, amount in options:
+        serving_sizes[unit] = float(amount)
+
+    for unit, amount in options:
+        for other_unit, factor in CONVERSION_MATRIX.get(unit, {}).items():
+            # A unit that is given as a serving size option takes precedence over a converted one.
+            if other_unit not in serving_sizes:
+                serving_sizes[other_unit] = float(amount) * factor
+    return types.MappingProxyType(serving_sizes)
 
 
 def calculate_entry_info(entries_to_modify, user_input_amounts, tally=False, edit=False):
@@ -200,17 +1151,15 @@ def calculate_entry_info(entries_to_modify, user_input_amounts, tally=False, edi
                     return 'no amount given (log add)'
             else:
                 try:
-                    float(input_amount)
+                    if not math.isfinite(float(input_amount)):
+                        return 'invalid amount'
                 except ValueError:
                     return 'invalid amount'
 
-        if input_unit == 'Serving(s)':
-            num_of_servings = float(input_amount)
-        else:
-            # Dictionary of serving sizes, units.
-            serv_size_options = ast.literal_eval(entries_to_modify[entry_num][1])
-            serv_size = serv_size_options[input_unit]
-            num_of_servings = float(input_amount) / float(serv_size)
+        # The size of one serving in the input unit, which may be a serving size option or a unit convertible
+        # into one of the options.
+        serv_size = get_unit_serving_sizes(entries_to_modify[entry_num][1])[input_unit]
+        num_of_servings = float(input_amount) / serv_size
 
         edited_entry = [entries_to_modify[entry_num][0], [input_amount, input_unit]]
 
@@ -218,19 +1167,402 @@ def calculate_entry_info(entries_to_modify, user_input_amounts, tally=False, edi
         # multiplied by the number of servings.
         del entries_to_modify[entry_num][17]
 
-        for val in entries_to_modify[entry_num][2:]:
+        servings_decimal = decimal.Decimal(num_of_servings)
+        for val in entries_to_modify[entry_num][2:18]:
             # Ranges from calories to cost per serving.
             if not val:
                 edited_entry.append(val)
                 continue
-            total_val = round(float(val) * num_of_servings, 2)
-            # Drop the decimal if possible.
-            if total_val == int(total_val):
-                total_val = int(total_val)
-            edited_entry.append(total_val)
+            # Multiply exactly, then round to hundredths once.
+            total_val = (decimal.Decimal(val) * servings_decimal).scaleb(FIXED_PLACES)
+            edited_entry.append(from_fixed(int(total_val.quantize(1, rounding=decimal.ROUND_HALF_EVEN))))
 
         if num_of_servings == int(num_of_servings):
             num_of_servings = int(num_of_servings)
         edited_entry.insert(2, round(num_of_servings, 2))
+        # The log entry keeps the id of its FD entry, if it has one.
+        edited_entry.extend(entries_to_modify[entry_num][18:19])
         calculated_entries.append(edited_entry)
     return calculated_entries
+
+
+@contextlib.contextmanager
+def replace_file(path, binary=False, sync=True, sync_dir=True):
+    """Replace a file with the contents written in a with block. The block is given a temporary file in the same
+    directory to write to. When the block finishes, the temporary file is synced and then replaces the file, so if the
+    process is killed or the system crashes at any point, the file has either its old contents or its new ones. If
+    the block raises an exception, the temporary file is deleted and the file is left unchanged.
+
+    :param path: A string of the file pathname. The file doesn't need to exist, but its directory does.
+    :param binary: If True, the temporary file is opened in binary mode. Otherwise it is opened in text mode, without
+        newline translation, as csv.writer expects. Default is False.
+    :param sync: If False, the contents aren't synced before the file is replaced, for files that can be rebuilt,
+        such as caches. Default is True.
+    :param sync_dir: If False, the directory isn't synced after the file is replaced, so a crash soon after may
+        undo the replacement. Callers that replace many files pass False and call sync_dirs() once for the batch.
+        Default is True.
+    """
+    dir_name = os.path.dirname(path) or '.'
+    fd, temp_path = tempfile.mkstemp(dir=dir_name, prefix='.tmp-', suffix=os.path.splitext(path)[1])
+    try:
+        with os.fdopen(fd, 'wb' if binary else 'w', newline=None if binary else '') as f:
+            yield f
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    if sync and sync_dir:
+        sync_dirs([dir_name])
+
+
+def sync_dirs(dir_names):
+    """Sync directories, so that files created, replaced or deleted in them stay that way after a system crash. Each
+    directory is synced once, however many times it is listed. Directories can't be synced on Windows, where the
+    replacement of a file is already durable once it returns.
+
+    :param dir_names: An iterable of directory pathnames.
+    """
+    if os.name == 'nt':
+        return
+    for dir_name in set(dir_names):
+        fd = os.open(dir_name, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def write_entries(path, entries, sync_dir=True):
+    """Overwrite a food dictionary or log file with the given entries. The file is replaced by replace_file(), so it
+    is never left partially written.
+
+    :param path: A string of the food dictionary or log file pathname.
+    :param entries: A list of lists. Each list consists of info describing one FD or log entry.
+    :param sync_dir: If False, the file's directory isn't synced. See replace_file(). Default is True.
+    """
+    dir_version = month_spend.get_dir_version(path)
+    with replace_file(path, sync_dir=sync_dir) as f:
+        csv.writer(f).writerows(entries)
+    row_cache.invalidate(path)
+    month_spend.update(path, entries, dir_version)
+
+
+def modify_entries(path, modify):
+    """Change the entries of a food dictionary or log file while holding its lock, so that changes made by other
+    processes at the same time are not lost.
+
+    :param path: A string of the food dictionary or log file pathname.
+    :param modify: A function that is given the current list of entries, or an empty list if the file doesn't exist,
+        and returns the list of entries to write. If it returns None, the file is left unchanged.
+
+    :returns: A list of the entries before the change, or 'file not found' if the file didn't exist.
+    """
+    with file_lock(path):
+        old_entries = get_entries(path, return_all=True)
+        new_entries = modify([] if old_entries == 'file not found' else [list(entry) for entry in old_entries])
+        if new_entries is not None:
+            write_entries(path, new_entries)
+    return old_entries
+
+
+def get_log_file_paths(log_dir, include_archived=False):
+    """Get the pathnames of all log files in the log files directory.
+
+    :param log_dir: A string of the log files directory pathname.
+    :param include_archived: If True, the pathnames of the log files in archived years are included, as they were
+        before their years were archived. A log file that exists alongside an archived copy is listed once.
+        Default is False.
+
+    :returns: A sorted list of log file pathnames. Since the directories are named by year and month, the list is in
+        chronological order.
+    """
+    all_pathnames = []
+    for dirpath, dirnames, filenames in os.walk(log_dir):
+        for filename in filenames:
+            if filename.endswith('.csv') and not filename.startswith('.'):
+                all_pathnames.append(os.path.join(dirpath, filename))
+    # Logs created by a change in the write buffer aren't on disk yet.
+    pending_pathnames = write_buffer.get_paths(log_dir)
+    if pending_pathnames:
+        all_pathnames = list(set(all_pathnames).union(pending_pathnames))
+    if include_archived:
+        archived_pathnames = archive.get_archived_log_paths(log_dir)
+        if archived_pathnames:
+            all_pathnames = list(set(all_pathnames).union(archived_pathnames))
+    all_pathnames.sort()
+    return all_pathnames
+
+
+def list_log_dir(dir_path):
+    """List the log files directory, or one of its year or month directories. The listing is cached until the
+    directory changes, so listing it again only checks the directory.
+
+    :param dir_path: A string of the directory pathname.
+
+    :returns: A list of the directory's version, as from get_disk_version(), and a sorted list of the names in it.
+        The version is None and the list is empty if the directory doesn't exist.
+    """
+    version = get_disk_version(dir_path)
+    cached = _log_dir_listings.get(dir_path)
+    if cached is None or cached[0] != version:
+        try:
+            names = sorted(os.listdir(dir_path)) if version is not None else []
+        except OSError:
+            names = []
+        cached = [version, names]
+        _log_dir_listings[dir_path] = cached
+    return cached
+
+
+def get_log_years(log_dir):
+    """Get the years that have logs, including archived years and logs waiting in the write buffer.
+
+    :param log_dir: A string of the log files directory pathname.
+
+    :returns: A sorted list of integer years.
+    """
+    years = set()
+    for name in list_log_dir(log_dir)[1]:
+        year = name[:-len(archive.ARCHIVE_SUFFIX)] if name.endswith(archive.ARCHIVE_SUFFIX) else name
+        if year.isdigit():
+            years.add(int(year))
+    years.update(get_log_date(path).year for path in write_buffer.get_paths(log_dir))
+    return sorted(years)
+
+
+def get_log_versions(log_dir, year, month=None):
+    """Get the logs of a year or month, including archived logs and logs waiting in the write buffer, with a version
+    of each log that changes whenever the log does. This is the date index of the logs: it's read from the cached
+    listings of the year and month directories, so only the directories are checked, not each log file. A log file
+    on disk is versioned by its month directory, which changes whenever one of its files is replaced, and the app only
+    ever replaces log files (see replace_file()).
+
+    :param log_dir: A string of the log files directory pathname.
+    :param year: An integer year.
+    :param month: An integer month. If given, only the logs of that month are included. Default is None.
+
+    :returns: A list of [log file pathname, version] lists, sorted by pathname.
+    """
+    year_dir = os.path.join(log_dir, str(year))
+    if month is None:
+        month_dirs = [os.path.join(year_dir, name) for name in list_log_dir(year_dir)[1]]
+    else:
+        month_dirs = [os.path.dirname(get_log_path(log_dir, datetime.date(year, month, 1)))]
+
+    versions = {}
+    for month_dir in month_dirs:
+        month_version, names = list_log_dir(month_dir)
+        for name in names:
+            if name.endswith('.csv') and not name.startswith('.'):
+                versions[os.path.join(month_dir, name)] = ('dir', month_version)
+    archived_paths = archive.get_archived_log_paths(log_dir, year, month)
+    if archived_paths:
+        archive_version = ('archive', get_disk_version(archive.get_archive_path(log_dir, year)))
+        for path in archived_paths:
+            versions.setdefault(path, archive_version)
+    for month_dir in [year_dir] if month is None else month_dirs:
+        for path in write_buffer.get_paths(month_dir):
+            versions[path] = write_buffer.get_version(path) or get_file_version(path)
+    return sorted([path, version] for path, version in versions.items())
+
+
+def log_exists(path):
+    """Check whether a log file exists, either as a csv file or in the archive of its year.
+
+    :param path: A string of the log file pathname.
+
+    :returns: True if the log file exists.
+    """
+    return file_exists(path) or is_archived_log(path)
+
+
+def file_exists(path):
+    """Check whether a food dictionary or log file exists, either on disk or as a change in the write buffer.
+
+    :param path: A string of the file pathname.
+
+    :returns: True if the file exists.
+    """
+    return write_buffer.get_version(path) is not None or os.path.exists(path)
+
+
+def is_archived_log(path):
+    """Check whether a log file is read from the archive of its year. A csv file for the same day takes precedence
+    over the archived copy.
+
+    :param path: A string of the log file pathname.
+
+    :returns: True if the log file only exists in an archive.
+    """
+    return not file_exists(path) and archive.read_archived_day(path) is not None
+
+
+def get_range_totals(log_dir, start_date, end_date):
+    """Sum the nutrition and cost of every log entry in a range of dates, including archived log files.
+
+    :param log_dir: A string of the log files directory pathname.
+    :param start_date: A datetime.date object of the first day in the range.
+    :param end_date: A datetime.date object of the last day in the range.
+
+    :returns: A list of the number of days with a log file, and a list of the summed totals as strings, from
+        calories to cost. The totals list is empty if there are no log entries in the range.
+    """
+    num_days = 0
+    values_list = []
+    for path in get_log_file_paths(log_dir, include_archived=True):
+        if start_date <= get_log_date(path) <= end_date:
+            num_days += 1
+            values_list.extend(entry[3:19] for entry in get_entries(path, return_all=True))
+    return [num_days, sum_shared_values(values_list)]
+
+
+def get_log_path(log_dir, date):
+    """Get the pathname of the log file for a date, such as 'log files/2020/06 - June/12.csv'.
+
+    :param log_dir: A string of the log files directory pathname.
+    :param date: A datetime.date object.
+
+    :returns: A string of the log file pathname.
+    """
+    return os.path.join(log_dir, str(date.year), date.strftime('%m - %B'), date.strftime('%d') + '.csv')
+
+
+def get_month_spend(log_dir, date):
+    """Get the spending of the month of a date, from the cost column of its logs, including archived logs and changes
+    waiting in the write buffer. The total is kept by month_spend and updated by each log write, so the month's logs
+    are only read the first time, and again after another process changes them.
+
+    :param log_dir: A string of the log files directory pathname.
+    :param date: A datetime.date object of any day of the month.
+
+    :returns: An integer total in hundredths.
+    """
+    month_dir = os.path.dirname(get_log_path(log_dir, date))
+    total = month_spend.get_total(month_dir)
+    if total is None:
+        version = get_disk_version(month_dir)
+        costs = {}
+        # Only the month's directory is listed, and its year's archive index read.
+        for path, log_version in get_log_versions(log_dir, date.year, date.month):
+            entries = get_entries(path, return_all=True)
+            costs[path] = get_rows_cost(entries) if entries != 'file not found' else 0
+        month_spend.set_month(month_dir, version, costs)
+        total = month_spend.months[month_dir][1]
+    return total
+
+
+def get_log_date(path):
+    """Get the date of a log file from its pathname, such as 'log files/2020/06 - June/12.csv'.
+
+    :param path: A string of the log file pathname.
+
+    :returns: A datetime.date object.
+    """
+    path_info = path.split(os.sep)
+    year = int(path_info[-3])
+    # Convert month into an integer, ex: 01 becomes 1.
+    month = int(path_info[-2][0:2])
+    day = int(path_info[-1][0:2])
+    return datetime.date(year, month, day)
+
+
+def find_logs_with_entry(log_dir, entry_name, entry_id=None):
+    """Find every log file that contains an entry made from the given food dictionary entry.
+
+    :param log_dir: A string of the log files directory pathname.
+    :param entry_name: A string of the entry name to look up.
+    :param entry_id: The integer id of the FD entry, which log entries with an id are matched by. Default is None.
+
+    :returns: A sorted list of the pathnames of the log files in which the entry is used.
+    """
+    used_in = []
+    for path in get_log_file_paths(log_dir):
+        if any(is_entry_row(row, entry_name, entry_id) for row in get_entries(path, return_all=True)):
+            used_in.append(path)
+    return used_in
+
+
+def recompute_log_entries(path, fd_entry, old_name=None, changed_logs=None):
+    """Recalculate every entry in a log file that is based on the given food dictionary entry, using the amount and
+    unit stored with each log entry. The log file is rewritten once if any entry changed.
+
+    :param path: A string of the log file pathname.
+    :param fd_entry: A list of strings describing the food dictionary entry, as it is stored in the FD file.
+    :param old_name: A string of the entry's previous name if it was renamed. Default is None, in which case log
+        entries are matched by the name in fd_entry. Log entries with an id are matched by the id in fd_entry
+        instead, see is_entry_row().
+    :param changed_logs: A list to which [path, old_entries, new_entries] is appended if the log file is rewritten,
+        so the change can be recorded for undo. Default is None.
+
+    :returns: A list of two integers: the number of log entries updated, and the number of log entries skipped
+        because their stored unit is no longer one of the FD entry's serving size options.
+    """
+    match_name = old_name or fd_entry[0]
+    entry_id = get_row_id(fd_entry)
+    # Hold the log's lock from the read to the write, so entries added to the log in between aren't lost.
+    with file_lock(path):
+        log_entries = get_entries(path, return_all=True)
+        if log_entries == 'file not found':
+            return [0, 0]
+
+        old_entries = [list(entry) for entry in log_entries]
+        num_updated = 0
+        num_skipped = 0
+        for entry_num in range(len(log_entries)):
+            if not is_entry_row(log_entries[entry_num], match_name, entry_id):
+                continue
+            amount = ast.literal_eval(log_entries[entry_num][1])  # [amount, unit]
+            try:
+                # calculate_entry_info() modifies the entries passed to it, so give it a copy.
+                calculated_entry = calculate_entry_info([list(fd_entry)], [amount], tally=True)[0]
+            except KeyError:
+                # The unit used in the log has been removed from the FD entry's serving size options.
+                num_skipped += 1
+                continue
+            log_entries[entry_num] = calculated_entry
+            num_updated += 1
+
+        if num_updated:
+            write_entries(path, log_entries)
+            if changed_logs is not None:
+                changed_logs.append([path, old_entries, log_entries])
+    return [num_updated, num_skipped]
+
+
+def propagate_fd_entry(log_dir, fd_entry, old_name=None, max_workers=None, changed_logs=None):
+    """Apply the current information of a food dictionary entry to every log entry based on it. The affected logs
+    are found with find_logs_with_entry(), then recalculated in parallel across a pool of worker threads. Threads
+    rather than processes, since this is called from the app, and forking a process that has Qt's threads, the
+    write buffer's timer and locks held by other threads can deadlock the children.
+
+    :param log_dir: A string of the log files directory pathname.
+    :param fd_entry: A list describing the food dictionary entry. Non-string values, such as the serving size
+        dictionary, are converted to the strings that are stored in the FD file.
+    :param old_name: A string of the entry's previous name if it was renamed. Default is None.
+    :param max_workers: The maximum number of worker threads. Default is None, which uses ThreadPoolExecutor's
+        default.
+    :param changed_logs: A list to which [path, old_entries, new_entries] is appended for each log file that is
+        rewritten, in order of path, so the changes can be recorded for undo. Default is None.
+
+    :returns: A dictionary that maps each affected log file pathname to [num_updated, num_skipped].
+    """
+    fd_entry = [val if isinstance(val, str) else str(val) for val in fd_entry]
+    # The workers write the logs directly, so changes waiting in the write buffer are written first.
+    write_buffer.flush()
+    affected_paths = find_logs_with_entry(log_dir, old_name or fd_entry[0], get_row_id(fd_entry))
+    if not affected_paths:
+        return {}
+    if len(affected_paths) == 1:
+        # Not worth starting a process pool for.
+        return {affected_paths[0]: recompute_log_entries(affected_paths[0], fd_entry, old_name, changed_logs)}
+
+    changes = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = dict(zip(affected_paths, executor.map(recompute_log_entries, affected_paths, repeat(fd_entry),
+                                                        repeat(old_name), repeat(changes))))
+    if changed_logs is not None:
+        changed_logs.extend(sorted(changes))
+    return results
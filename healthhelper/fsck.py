@@ -0,0 +1,336 @@
+"""Integrity checks of the Food Dictionary and log files for the Health Helper application.
+
+Every row of the Food Dictionary and of each log file is checked for problems that break the application when the
+row is displayed or edited:
+
+- 'bad row': a row that can't be used, such as one without a name or with an unreadable serving size dictionary or
+  [amount, unit] list.
+- 'short row' and 'long row': a row with too few or too many cells.
+- 'non-numeric': a value or id cell that isn't a number.
+- 'duplicate': a second row with the same name as an earlier row of the file.
+- 'orphan': a log entry whose Food Dictionary entry or recipe doesn't exist, by id or by name, so it can't be edited.
+
+Log files are checked in parallel across worker processes. Problems that can be fixed without guessing are repaired
+on request: short rows are padded with blank values, blank cells past the end of a row are dropped, stray spaces and
+thousands separators are removed from numbers, and exact copies of a row are removed. Rows that still have a problem
+can be quarantined: they are moved out of the data file into a file of the same name in a quarantine directory, from
+which they can be restored by hand. Archived log files are checked, but only changed once their year is unarchived.
+"""
+# Standard library imports
+import os
+import csv
+import ast
+import decimal
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+# Local imports
+from healthhelper import data
+
+# Number of cells in a Food Dictionary row: name, serving sizes, 15 nutrition values, cost info, and cost per serving.
+# Rows may also have an id cell, see data.ID_INDEX.
+FD_ROW_LENGTH = 19
+
+# Number of cells in a log row: name, [amount, unit], number of servings, 15 nutrition values, and cost. Rows may also
+# have the id cell of their FD entry.
+LOG_ROW_LENGTH = 19
+
+# Number of log files given to a worker process at a time.
+CHUNK_SIZE = 64
+
+
+def parse_number(val):
+    """Read a cell that should hold a number.
+
+    :param val: A string.
+
+    :returns: The cell as an integer number of hundredths, or None if it isn't a finite number in plain form.
+    """
+    if val != val.strip():
+        return None
+    try:
+        return data.to_fixed(val)
+    except (decimal.InvalidOperation, ValueError):
+        return None
+
+
+def clean_number(val):
+    """Remove stray spaces and thousands separators from a number cell.
+
+    :param val: A string.
+
+    :returns: The cleaned string, or None if the cell is still not a number once cleaned.
+    """
+    cleaned = val.strip().replace(',', '')
+    return cleaned if cleaned and parse_number(cleaned) is not None else None
+
+
+def check_length(row, length, min_length):
+    """Check the number of cells in a row, which may also have an id cell.
+
+    :param row: A list of strings.
+    :param length: The number of cells a row should have without its id cell.
+    :param min_length: The number of cells a row needs to be repaired by padding it with blank values.
+
+    :returns: A list of the row fixed to the right length, or None if it can't be fixed, and a list of problems.
+        Each problem is a list of the kind, a message, and whether the repaired row fixes it.
+    """
+    if len(row) in [length, length + 1]:
+        return [list(row), []]
+    if len(row) < length:
+        if len(row) < min_length:
+            return [None, [['bad row', f'only {len(row)} of {length} cells', False]]]
+        return [list(row) + [''] * (length - len(row)), [['short row', f'{len(row)} of {length} cells', True]]]
+    if any(cell.strip() for cell in row[length + 1:]):
+        return [None, [['long row', f'{len(row)} cells instead of {length}', False]]]
+    return [list(row[:length + 1]), [['long row', f'{len(row)} cells instead of {length}', True]]]
+
+
+def check_id(row, problems):
+    """Check the id cell of a row, if it has one. An id that isn't a number is repaired by removing it, so the row is
+    joined by name instead.
+
+    :param row: A list of strings, which is changed in place.
+    :param problems: The list of problems, which is extended.
+    """
+    if len(row) > data.ID_INDEX and row[data.ID_INDEX] and not row[data.ID_INDEX].isdigit():
+        problems.append(['non-numeric', f'id is {row[data.ID_INDEX]!r}', True])
+        del row[data.ID_INDEX:]
+
+
+def check_values(row, start, end, problems):
+    """Check the value cells of a row, cleaning them where possible.
+
+    :param row: A list of strings, which is changed in place.
+    :param start: The index of the first value cell.
+    :param end: The index after the last value cell.
+    :param problems: The list of problems, which is extended.
+    """
+    for index in range(start, end):
+        if not row[index] or parse_number(row[index]) is not None:
+            continue
+        cleaned = clean_number(row[index])
+        problems.append(['non-numeric', f'cell {index + 1} is {row[index]!r}', cleaned is not None])
+        if cleaned is not None:
+            row[index] = cleaned
+
+
+def literal(val):
+    """Evaluate a cell that holds a Python literal, or return None if it can't be read."""
+    try:
+        return ast.literal_eval(val)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return None
+
+
+def check_fd_row(row):
+    """Check one row of the Food Dictionary.
+
+    :param row: A list of strings.
+
+    :returns: A list of the repaired row, or None if the row can't be repaired, and a list of problems. Each problem
+        is a list of the kind, a message, and whether the repaired row fixes it.
+    """
+    if not row or not row[0].strip():
+        return [None, [['bad row', 'no name', False]]]
+    fixed, problems = check_length(row, FD_ROW_LENGTH, 2)
+    if fixed is None:
+        return [None, problems]
+
+    serving_sizes = literal(fixed[1])
+    if (not isinstance(serving_sizes, dict) or not serving_sizes
+            or not all(isinstance(size, str) and parse_number(size) for size in serving_sizes.values())):
+        problems.append(['bad row', f'serving sizes are {fixed[1]!r}', False])
+    check_values(fixed, 2, 17, problems)
+    if fixed[17]:
+        cost_info = literal(fixed[17])  # [total cost, servings per container]
+        if (not isinstance(cost_info, list) or len(cost_info) != 2
+                or not all(isinstance(val, str) and parse_number(val) is not None for val in cost_info)):
+            problems.append(['bad row', f'cost is {fixed[17]!r}', False])
+    check_values(fixed, 18, 19, problems)
+    check_id(fixed, problems)
+    return [fixed if all(fixable for kind, message, fixable in problems) else None, problems]
+
+
+def check_log_row(row, known_names, known_ids=frozenset()):
+    """Check one row of a log file.
+
+    :param row: A list of strings.
+    :param known_names: A set of the names of the Food Dictionary entries and recipes.
+    :param known_ids: A set of the ids of the Food Dictionary entries. Default is an empty set.
+
+    :returns: A list of the repaired row, or None if the row can't be repaired, and a list of problems. Each problem
+        is a list of the kind, a message, and whether the repaired row fixes it.
+    """
+    if not row or not row[0].strip():
+        return [None, [['bad row', 'no name', False]]]
+    fixed, problems = check_length(row, LOG_ROW_LENGTH, 3)
+    if fixed is None:
+        return [None, problems]
+
+    amount = literal(fixed[1])  # [amount, unit]
+    if (not isinstance(amount, list) or len(amount) != 2 or not all(isinstance(val, str) for val in amount)
+            or parse_number(amount[0]) is None):
+        problems.append(['bad row', f'amount is {fixed[1]!r}', False])
+    if not isinstance(literal(fixed[2]), (int, float)):
+        problems.append(['bad row', f'number of servings is {fixed[2]!r}', False])
+    check_values(fixed, 3, 19, problems)
+    check_id(fixed, problems)
+    if data.get_row_id(fixed) not in known_ids and fixed[0] not in known_names:
+        problems.append(['orphan', f"'{fixed[0]}' is not in the Food Dictionary or the recipes", False])
+    return [fixed if all(fixable for kind, message, fixable in problems) else None, problems]
+
+
+def check_rows(rows, check_row):
+    """Check the rows of a file, including for names used by more than one row.
+
+    :param rows: A list of lists of strings.
+    :param check_row: A function that checks one row, such as check_fd_row().
+
+    :returns: A list of the checked rows. Each is a list of the row, the repaired row or None, and its problems. An
+        exact copy of an earlier row has a repaired row of None and a fixable 'duplicate' problem.
+    """
+    checked = []
+    first_rows = {}
+    for row in rows:
+        fixed, problems = check_row(row)
+        name = row[0].strip() if row else ''
+        if name in first_rows:
+            # Only an exact copy can be repaired, by removing it.
+            problems.append(['duplicate', f"'{name}' is also in an earlier row", first_rows[name] == row])
+            fixed = None
+        elif name:
+            first_rows[name] = row
+        checked.append([row, fixed, problems])
+    return checked
+
+
+def check_file(path, check_row, repair=False, quarantine_path=None):
+    """Check a Food Dictionary or log file, and repair or quarantine its problem rows.
+
+    :param path: A string of the file pathname.
+    :param check_row: A function that checks one row, such as check_fd_row().
+    :param repair: If True, rows with only fixable problems are repaired, and exact copies of a row are removed.
+        Default is False.
+    :param quarantine_path: A string of the pathname of the file to move rows with remaining problems to, or None to
+        leave them in place. Default is None.
+
+    :returns: A list of problems. Each problem is a list of the file pathname, the row number counting from 1, the
+        kind of problem, a message, and the action taken: 'repaired', 'quarantined', 'archived' if the file couldn't
+        be changed because it is archived, or ''.
+    """
+    archived = data.is_archived_log(path)
+    change = (repair or quarantine_path) and not archived
+    problems = []
+
+    def modify(rows):
+        new_rows = []
+        quarantined = []
+        for row_num, (row, fixed, row_problems) in enumerate(check_rows(rows, check_row), 1):
+            if not row_problems:
+                new_rows.append(row)
+                continue
+            fixable = all(fixable for kind, message, fixable in row_problems)
+            if change and repair and fixable:
+                action = 'repaired'
+                if fixed is not None:
+                    new_rows.append(fixed)
+            elif change and quarantine_path:
+                action = 'quarantined'
+                quarantined.append(row)
+            else:
+                action = 'archived' if archived and (repair or quarantine_path) else ''
+                new_rows.append(row)
+            for kind, message, fixable in row_problems:
+                problems.append([path, row_num, kind, message, action])
+
+        if quarantined:
+            os.makedirs(os.path.dirname(quarantine_path), exist_ok=True)
+            with open(quarantine_path, 'a', newline='') as f:
+                csv.writer(f).writerows(quarantined)
+        return new_rows if new_rows != rows else None
+
+    try:
+        if not change:
+            rows = data.get_entries(path, return_all=True)
+            if rows != 'file not found':
+                modify(rows)
+        else:
+            # Hold the file's lock from the read to the write, so no change made in between is lost.
+            with data.file_lock(path):
+                rows = data.get_entries(path, return_all=True)
+                if rows != 'file not found':
+                    new_rows = modify(rows)
+                    if new_rows:
+                        data.write_entries(path, new_rows)
+                    elif new_rows is not None:
+                        os.remove(path)
+    except (csv.Error, UnicodeDecodeError) as e:
+        problems.append([path, 0, 'bad row', f'the file can\'t be read: {e}', ''])
+    return problems
+
+
+def check_log_file(path, known_names, known_ids, repair=False, log_dir=None, quarantine_dir=None):
+    """Check a log file. See check_file().
+
+    :param path: A string of the log file pathname.
+    :param known_names: A set of the names of the Food Dictionary entries and recipes.
+    :param known_ids: A set of the ids of the Food Dictionary entries.
+    :param repair: If True, fixable problems are repaired. Default is False.
+    :param log_dir: A string of the log files directory pathname, which is needed to quarantine rows. Default is None.
+    :param quarantine_dir: A string of the quarantine directory pathname, or None to leave problem rows in place.
+        Default is None.
+
+    :returns: A list of problems, as returned by check_file().
+    """
+    quarantine_path = None
+    if quarantine_dir:
+        quarantine_path = os.path.join(quarantine_dir, os.path.basename(log_dir), os.path.relpath(path, log_dir))
+    return check_file(path, lambda row: check_log_row(row, known_names, known_ids), repair, quarantine_path)
+
+
+def check_data(fd_path, log_dir, recipes_path, repair=False, quarantine_dir=None, max_workers=None):
+    """Check the Food Dictionary and every log file, including archived log files.
+
+    :param fd_path: A string of the food dictionary file pathname.
+    :param log_dir: A string of the log files directory pathname.
+    :param recipes_path: A string of the recipes file pathname.
+    :param repair: If True, fixable problems are repaired. Default is False.
+    :param quarantine_dir: A string of the directory pathname that rows with remaining problems are moved to, or None
+        to leave them in place. Default is None.
+    :param max_workers: The maximum number of worker processes. Default is None, which uses the number of CPUs.
+
+    :returns: A list of the number of log files checked and a list of problems, as returned by check_file(). The
+        Food Dictionary's problems come first, then each log file's in date order.
+    """
+    fd_quarantine_path = os.path.join(quarantine_dir, os.path.basename(fd_path)) if quarantine_dir else None
+    problems = check_file(fd_path, check_fd_row, repair, fd_quarantine_path)
+
+    # Orphans are found against the Food Dictionary as it is after any repairs.
+    known_names = set()
+    known_ids = set()
+    for path in [fd_path, recipes_path]:
+        rows = data.get_entries(path, return_all=True)
+        if rows != 'file not found':
+            known_names.update(row[0] for row in rows if row)
+            known_ids.update(data.get_row_id(row) for row in rows if path == fd_path)
+    known_ids.discard(None)
+
+    log_paths = data.get_log_file_paths(log_dir, include_archived=True)
+    args = [repeat(known_names), repeat(known_ids), repeat(repair), repeat(log_dir), repeat(quarantine_dir)]
+    if len(log_paths) <= CHUNK_SIZE or max_workers == 1:
+        # Not worth starting a process pool for.
+        results = map(check_log_file, log_paths, *args)
+        for log_problems in results:
+            problems.extend(log_problems)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for log_problems in executor.map(check_log_file, log_paths, *args, chunksize=CHUNK_SIZE):
+                problems.extend(log_problems)
+    return [len(log_paths), problems]
+
+
+def format_problem(problem):
+    """Format a problem for display, such as "files/food_dictionary.csv:3: non-numeric: cell 4 is 'x' (repaired)"."""
+    path, row_num, kind, message, action = problem
+    return f'{path}:{row_num}: {kind}: {message}' + (f' ({action})' if action else '')
@@ -0,0 +1,242 @@
+"""Daily nutrition and budget goals for the Health Helper application.
+
+Goals are kept in a csv file with one row per goal: the value name, then the daily minimum and the daily maximum,
+either of which may be blank. For example, a calorie range, a sodium cap, a protein floor, and a spending cap:
+
+calories,1800,2200
+sodium,,2300
+protein,120,
+cost,,15
+monthly budget,,300
+
+The last row is a monthly grocery budget, a maximum for the spending of each calendar month. Limits are held as
+integer numbers of hundredths, the same as the log totals summed by data.sum_columns(), so progress is calculated
+straight from the totals vector of a log.
+
+Streaks are calculated from a summary of each day, the totals of its log, from analytics.get_day_totals().
+
+The spending of a month is kept as a running total by data.get_month_spend(), so it is shown against the monthly
+budget without reading the month's logs again.
+"""
+# Standard library imports
+import os
+import decimal
+import calendar
+import datetime
+
+# Local imports
+from healthhelper import data
+from healthhelper import store
+from healthhelper import analytics
+
+# Names of the values that goals can be set for, in log column order.
+GOAL_NAMES = list(store.VALUE_INDEX)
+
+# Name of the monthly budget row of the goals file.
+MONTHLY_BUDGET_NAME = 'monthly budget'
+
+# Units of the values, for display. Values not listed are in grams.
+VALUE_UNITS = {'calories': '', 'cholesterol': 'mg', 'sodium': 'mg', 'cost': '$'}
+
+
+def get_goal_label(value_name):
+    """Get the display label of a value, such as 'Sodium (mg)'."""
+    unit = VALUE_UNITS.get(value_name, 'g')
+    return f'{value_name.capitalize()} ({unit})' if unit else value_name.capitalize()
+
+
+def load_goals(path):
+    """Read the goals file.
+
+    :param path: A string of the goals file pathname.
+
+    :returns: A dictionary mapping value names to [minimum, maximum] lists in hundredths. Either limit may be None.
+        Values without a goal are left out, and rows that can't be read are skipped. The dictionary is empty if the
+        file doesn't exist.
+    """
+    rows = data.get_entries(path, return_all=True)
+    if rows == 'file not found':
+        return {}
+    goals = {}
+    for row in rows:
+        try:
+            name, minimum, maximum = row
+            if name in store.VALUE_INDEX and (minimum or maximum):
+                goals[name] = [data.to_fixed(minimum) if minimum else None,
+                               data.to_fixed(maximum) if maximum else None]
+        except (ValueError, decimal.InvalidOperation):
+            continue
+    return goals
+
+
+def load_monthly_budget(path):
+    """Read the monthly budget from the goals file.
+
+    :param path: A string of the goals file pathname.
+
+    :returns: An integer budget in hundredths, or None if no budget is set or its row can't be read.
+    """
+    rows = data.get_entries(path, [MONTHLY_BUDGET_NAME])
+    if rows == 'file not found' or not rows or len(rows[0]) != 3 or not rows[0][2]:
+        return None
+    try:
+        return data.to_fixed(rows[0][2])
+    except (ValueError, decimal.InvalidOperation):
+        return None
+
+
+def write_goals(path, goals, monthly_budget=None):
+    """Write the goals file. The file is deleted if there are no goals and no budget.
+
+    :param path: A string of the goals file pathname.
+    :param goals: A dictionary of goals, as returned by load_goals().
+    :param monthly_budget: An integer monthly budget in hundredths, or None for no budget. Default is None.
+    """
+    rows = []
+    for name in GOAL_NAMES:
+        if name in goals:
+            minimum, maximum = goals[name]
+            rows.append([name, '' if minimum is None else data.format_fixed(minimum),
+                         '' if maximum is None else data.format_fixed(maximum)])
+    if monthly_budget is not None:
+        rows.append([MONTHLY_BUDGET_NAME, '', data.format_fixed(monthly_budget)])
+    with data.file_lock(path):
+        if rows:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data.write_entries(path, rows)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+def meets_goal(total, goal):
+    """Check whether a total is within the limits of a goal.
+
+    :param total: An integer total in hundredths.
+    :param goal: A [minimum, maximum] list in hundredths. Either limit may be None.
+
+    :returns: True if the goal is met.
+    """
+    minimum, maximum = goal
+    return (minimum is None or total >= minimum) and (maximum is None or total <= maximum)
+
+
+def get_progress(totals, goals):
+    """Get the progress of a day's totals toward the goals, for display beside the totals.
+
+    The progress is the total as a percentage of the goal's maximum, or of its minimum if it has no maximum, or while
+    the total is below the minimum. The remaining amount is what is left to reach the minimum, or else what is left
+    before the maximum is passed, which is negative once the total is over the maximum.
+
+    :param totals: A list of 16 integer totals in hundredths, calories through cost.
+    :param goals: A dictionary of goals, as returned by load_goals().
+
+    :returns: A dictionary mapping the index of each value with a goal to a list of the progress text, the remaining
+        text, and whether the goal is met.
+    """
+    progress = {}
+    for name, (minimum, maximum) in goals.items():
+        index = store.VALUE_INDEX[name]
+        total = totals[index]
+        pad = name == 'cost'
+        if minimum is not None and (total < minimum or maximum is None):
+            target = minimum
+            remaining = max(minimum - total, 0)
+        else:
+            target = maximum
+            remaining = maximum - total
+        percent = f'{round(100 * total / target)}%' if target else '-'
+        progress[index] = [f'{percent}\nof {data.format_fixed(target, pad)}', data.format_fixed(remaining, pad),
+                           meets_goal(total, [minimum, maximum])]
+    return progress
+
+
+def get_remaining(totals, goals):
+    """Get what is left of each goal for the rest of a day: the amount left to reach the minimum, or for a goal
+    without a minimum, the amount left before the maximum is passed.
+
+    :param totals: A list of 16 integer totals in hundredths, calories through cost.
+    :param goals: A dictionary of goals, as returned by load_goals().
+
+    :returns: A dictionary mapping the value name of each goal with an amount left to the amount, as a float in the
+        units of the value. Goals already reached or passed are left out.
+    """
+    remaining = {}
+    for name, (minimum, maximum) in goals.items():
+        limit = maximum if minimum is None else minimum
+        left = limit - totals[store.VALUE_INDEX[name]]
+        if left > 0:
+            remaining[name] = left / 100
+    return remaining
+
+
+def get_streaks(log_dir, goals, end_date=None):
+    """Count the consecutive days on which each goal was met. A day without a log ends a streak.
+
+    :param log_dir: A string of the log files directory pathname.
+    :param goals: A dictionary of goals, as returned by load_goals().
+    :param end_date: A datetime.date object of the last day counted. The current streak may end on this day or the
+        day before, which may not have been logged yet. Default is today.
+
+    :returns: A dictionary mapping each value name with a goal, and None for all goals at once, to a list of the
+        current streak and the longest streak in days.
+    """
+    end_date = end_date or datetime.date.today()
+    # [current run, longest run] for each goal, and for all goals at once.
+    runs = {name: [0, 0] for name in [*goals, None]}
+    prev_date = None
+    for path in data.get_log_file_paths(log_dir, include_archived=True):
+        date = data.get_log_date(path)
+        if date > end_date:
+            break
+        totals = analytics.get_day_totals(path)
+        consecutive = prev_date is not None and (date - prev_date).days == 1
+        all_met = True
+        for name, goal in goals.items():
+            met = meets_goal(totals[store.VALUE_INDEX[name]], goal)
+            all_met = all_met and met
+            update_run(runs[name], met, consecutive)
+        update_run(runs[None], all_met and bool(goals), consecutive)
+        prev_date = date
+
+    # A streak is only current if it reaches the end date or the day before.
+    is_current = prev_date is not None and (end_date - prev_date).days <= 1
+    return {name: [run[0] if is_current else 0, run[1]] for name, run in runs.items()}
+
+
+def update_run(run, met, consecutive):
+    """Extend or end a [current run, longest run] list of streak lengths with one more day."""
+    if not met:
+        run[0] = 0
+    else:
+        run[0] = run[0] + 1 if consecutive else 1
+        run[1] = max(run[1], run[0])
+
+
+def get_budget_status(spend, budget, year, month, today=None):
+    """Get the spending of a month against the monthly budget.
+
+    The burn rate is the spending per day of the month so far, and the projection is what the whole month will cost
+    if the rest of it is spent at the same rate. For a past month, the whole month has passed, so the projection is
+    what was spent.
+
+    :param spend: An integer of the month's spending in hundredths, as from data.get_month_spend().
+    :param budget: An integer monthly budget in hundredths, or None if no budget is set.
+    :param year: The integer year of the month.
+    :param month: The integer month, 1 through 12.
+    :param today: A datetime.date object of the current day. Default is today.
+
+    :returns: A dictionary with the 'spend', 'budget', 'remaining', 'burn rate' and 'projected' amounts in hundredths.
+        The remaining amount is negative once the budget is passed, and None if there is no budget. The burn rate and
+        the projection are None for a month that hasn't started.
+    """
+    today = today or datetime.date.today()
+    num_days = calendar.monthrange(year, month)[1]
+    if (year, month) < (today.year, today.month):
+        days_passed = num_days
+    elif (year, month) == (today.year, today.month):
+        days_passed = today.day
+    else:
+        days_passed = 0
+    burn_rate = round(spend / days_passed) if days_passed else None
+    return {'spend': spend, 'budget': budget, 'remaining': None if budget is None else budget - spend,
+            'burn rate': burn_rate, 'projected': round(spend * num_days / days_passed) if days_passed else None}
@@ -10,21 +10,27 @@ grocery spending.
 """
 # Standard library imports
 import os
-import csv
 import datetime
 import ast
+import math
+import decimal
 import bisect
-import copy
+from array import array
 
 # Third party imports
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QIntValidator, QDoubleValidator
-from PyQt5.QtWidgets import (QMainWindow, QDialog, QWidget, QLineEdit, QPushButton, QLabel, QComboBox,
+from PyQt5.QtCore import Qt, QDate, QPointF, QRectF, pyqtSignal
+from PyQt5.QtGui import QIntValidator, QDoubleValidator, QPainter, QPen, QColor, QPolygonF, QKeySequence
+from PyQt5.QtWidgets import (QMainWindow, QDialog, QWidget, QLineEdit, QPushButton, QLabel, QComboBox, QCheckBox,
                              QSizePolicy, QTableWidget, QTableWidgetItem, QHeaderView, QGridLayout, QSpacerItem,
-                             QDesktopWidget, QHBoxLayout, QVBoxLayout, QFormLayout)
+                             QDesktopWidget, QHBoxLayout, QVBoxLayout, QFormLayout, QDateEdit, QShortcut)
 
 # Local imports
 from healthhelper import data
+from healthhelper import store
+from healthhelper import analytics
+from healthhelper import journal
+from healthhelper import goals
+from healthhelper import prices
 
 # Set up globals
 # Directory containing this file.
@@ -36,6 +42,32 @@ FD_PATH = os.path.join(FILE_DIR, '..', 'files', 'food_dictionary.csv')
 # Path to the log files directory.
 LOG_FILES_DIR = os.path.join(FILE_DIR, '..', 'files', 'log files')
 
+# Path to the recipes csv file.
+RECIPES_PATH = os.path.join(FILE_DIR, '..', 'files', 'recipes.csv')
+
+# Path to the daily goals csv file.
+GOALS_PATH = os.path.join(FILE_DIR, '..', 'files', 'goals.csv')
+
+# Path to the price history of the Food Dictionary entries.
+PRICE_HISTORY_PATH = os.path.join(FILE_DIR, '..', 'files', 'price_history.csv')
+
+# Path to the journal of changes to the Food Dictionary and log files, used to undo and redo them.
+JOURNAL_PATH = os.path.join(FILE_DIR, '..', 'files', 'journal.jsonl')
+
+# Path to the recovery journal of the changes to the Food Dictionary and log files that are waiting in the write
+# buffer, used to write them after a crash.
+PENDING_WRITES_PATH = os.path.join(FILE_DIR, '..', 'files', 'pending_writes.jsonl')
+
+
+def get_write_conflicts_win():
+    """Return a MessageWin telling the user about the changes in the write buffer that weren't written, because
+    another program had changed the same entries in the meantime, or None if there are none.
+    """
+    conflicts = data.write_buffer.pop_conflicts()
+    if not conflicts:
+        return None
+    return MessageWin('write conflict', ', '.join(name for path, names in conflicts for name in names))
+
 
 class LogWin(QMainWindow):
     """Allow the user to view or edit the contents of a log file, which uses the Food Dictionary as a source of
@@ -79,7 +111,12 @@ class LogWin(QMainWindow):
         # Example log file path for June 12, 2020: healthhelper/files/log files/2020/06 - June/12.csv
         self.log_file_path = os.path.join(LOG_FILES_DIR, self.year, self.month + ' - '
                                           + self.month_name, self.day + '.csv')
+        # Logs in an archived year are read from the archive and can't be changed.
+        self.archived = data.is_archived_log(self.log_file_path)
         self.init_ui()
+        self.conflicts_win = get_write_conflicts_win()
+        if self.conflicts_win is not None:
+            self.conflicts_win.show()
 
     def init_ui(self):
         """Set up UI. Include a widget that allows the user to change the log file by providing a valid date.
@@ -198,8 +235,27 @@ class LogWin(QMainWindow):
             blank_item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
             self.totals_table.setItem(1, i, blank_item)
 
+        # If the user has set daily goals, show the progress of the day's totals toward them in two more rows.
+        self.goals = goals.load_goals(GOALS_PATH)
+        if self.goals:
+            self.totals_table.setRowCount(4)
+            self.totals_table.setFixedHeight(224)
+            for row_index, title in [(2, 'Daily goal'), (3, 'Remaining')]:
+                self.totals_table.setRowHeight(row_index, 50)
+                title_item = QTableWidgetItem(title)
+                title_item.setTextAlignment(Qt.AlignCenter)
+                title_item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
+                self.totals_table.setItem(row_index, 0, title_item)
+            self.show_goal_progress([0] * len(goals.GOAL_NAMES))
+
+        # If the user has set a monthly budget, show the spending of the log's month against it.
+        self.budget_label = QLabel(self)
+        monthly_budget = goals.load_monthly_budget(GOALS_PATH)
+        if monthly_budget is not None:
+            self.show_budget_status(monthly_budget)
+
         # Alert the user if the log file doesn't exist.
-        if not os.path.exists(self.log_file_path):
+        if not data.log_exists(self.log_file_path):
             self.log_table.setRowCount(1)
             self.log_table.setColumnCount(1)
             no_log_item = QTableWidgetItem(f"There is no log file for {self.month_name} {int(self.day)}, {self.year}.")
@@ -212,7 +268,8 @@ class LogWin(QMainWindow):
             self.log_table.verticalHeader().setVisible(False)
         else:
             # Place one set of entry information into each row of the table.
-            self.log_entries = data.get_entries(self.log_file_path, return_all=True)  # [[entry1], [entry2], ...]]
+            # [[entry1], [entry2], ...]], with the current names of their Food Dictionary entries.
+            self.log_entries = store.get_log_entries(FD_PATH, self.log_file_path)
             self.log_table.setRowCount(len(self.log_entries))
             self.log_table.setColumnCount(len(self.col_labels))
 
@@ -236,13 +293,12 @@ class LogWin(QMainWindow):
                 serv_item.setTextAlignment(Qt.AlignCenter)
                 self.log_table.setItem(entry_num, 1, serv_item)
 
-                for i in range(3, len(entry)):
-                    # Ranges from number of servings had to the entry cost.
+                for i in range(3, min(len(entry), 19)):
+                    # Ranges from calories to the entry cost. The id of the entry's FD entry isn't shown.
                     if i == 18:
                         if entry[18]:
                             # If there is cost info, show 2 decimal places.
-                            cost = float(entry[i])
-                            val = QTableWidgetItem(f'{cost:.2f}')
+                            val = QTableWidgetItem(data.format_fixed(data.to_fixed(entry[i]), pad=True))
                         else:
                             val = QTableWidgetItem("")
                     else:
@@ -252,28 +308,41 @@ class LogWin(QMainWindow):
                     # Use i - 1 since the amount and number of servings were both placed into column 2.
                     self.log_table.setItem(entry_num, i - 1, val)
 
-            # For the totals table, create a deep copy of the log entries to delete values irrelevant to the tally.
-            # The original must remain intact for when the user selects an entry, resetting the subtotals.
-            self.log_entries_copy = copy.deepcopy(self.log_entries)
-            for entry in self.log_entries_copy:
-                # Delete the entry name, serving size options, and number of servings had for each entry.
-                del entry[:3]
-            grand_totals = data.sum_shared_values(self.log_entries_copy)
+            # Parse the values once into a matrix, from which the grand totals and subtotals are summed.
+            self.log_names, self.log_amounts, self.log_servings, self.log_values = \
+                data.parse_log_entries(self.log_entries)
+            grand_totals = data.sum_columns(self.log_values)
 
             for i in range(len(grand_totals)):
-                if i == 15:
-                    cost = float(grand_totals[i])
-                    val = QTableWidgetItem(f'{cost:.2f}')
-                else:
-                    val = QTableWidgetItem(grand_totals[i])
+                # Show 2 decimal places for the cost.
+                val = QTableWidgetItem(data.format_fixed(grand_totals[i], pad=(i == 15)))
                 val.setTextAlignment(Qt.AlignCenter)
                 val.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
                 self.totals_table.setItem(0, i + 1, val)  # i + 1 to skip over the row title cell.
+            self.show_goal_progress(grand_totals)
+
+            # Running subtotals of the checked entries, updated by the values of one entry each time an entry is
+            # checked or unchecked.
+            self.checked_entries = set()
+            self.subtotals = [0] * len(self.log_values)
 
             # If an entry is checked or unchecked, re-tally the subtotals.
             self.log_table.itemChanged.connect(self.selection_changed)
             log_h_header = self.log_table.horizontalHeader()
             self.log_table.setHorizontalHeaderLabels(self.col_labels)
+
+            # Click a column header to sort the entries by that column, or click it again to reverse the order.
+            # self.log_order[row] is the index of the entry displayed in each table row.
+            self.log_order = list(range(len(self.log_entries)))
+            # {column: sort keys}, taken from the parsed values once per load. Amounts are sorted by the number of
+            # servings. The amount and number of servings share column 1, so column 2 holds entry value 3, and so on.
+            self.log_sort_keys = {0: data.get_sort_keys(self.log_names, numeric=False),
+                                  1: data.get_sort_keys(self.log_servings)}
+            for value_index, value_column in enumerate(self.log_values):
+                self.log_sort_keys[value_index + 2] = data.get_fixed_sort_keys(
+                    value_column, [entry[value_index + 3] for entry in self.log_entries])
+            self.log_sort = None  # [column, descending]
+            log_h_header.sectionClicked.connect(self.sort_log)
             log_h_header.setSectionResizeMode(QHeaderView.ResizeToContents)
             log_h_header.setSectionResizeMode(0, QHeaderView.Stretch)
 
@@ -281,6 +350,16 @@ class LogWin(QMainWindow):
         self.goto_fd_btn = QPushButton('Go to Food Dictionary', self)
         self.goto_fd_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
 
+        # Add buttons that take the user to the daily goals, trend charts, calendar and food suggestion screens.
+        self.goals_btn = QPushButton('Daily goals', self)
+        self.goals_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.trends_btn = QPushButton('Trends', self)
+        self.trends_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.calendar_btn = QPushButton('Calendar', self)
+        self.calendar_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.suggest_btn = QPushButton('Suggest foods', self)
+        self.suggest_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+
         # Add buttons that add or remove entries from the log.
         self.add_entries_btn = QPushButton('Add entries to log', self)
         self.add_entries_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
@@ -301,6 +380,12 @@ class LogWin(QMainWindow):
         self.edit_entries_btn = QPushButton('Edit selected entries', self)
         self.edit_entries_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
 
+        # Add buttons that undo or redo the most recent change to a log or the Food Dictionary.
+        self.undo_btn = QPushButton('Undo', self)
+        self.undo_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.redo_btn = QPushButton('Redo', self)
+        self.redo_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+
         self.help_btn.clicked.connect(self.help_info)
         self.change_log_btn.clicked.connect(self.change_date)
         self.prev_log_btn.clicked.connect(self.goto_prev_log)
@@ -311,7 +396,17 @@ class LogWin(QMainWindow):
         self.delete_log_btn.clicked.connect(self.confirm_delete_log)
         self.remove_entries_btn.clicked.connect(self.remove_entries)
         self.edit_entries_btn.clicked.connect(self.edit_entries)
+        self.undo_btn.clicked.connect(self.undo_change)
+        self.redo_btn.clicked.connect(self.redo_change)
         self.goto_fd_btn.clicked.connect(self.goto_fd_win)
+        self.goals_btn.clicked.connect(self.goto_goals_win)
+        self.trends_btn.clicked.connect(self.goto_trends_win)
+        self.calendar_btn.clicked.connect(self.goto_calendar_win)
+        self.suggest_btn.clicked.connect(self.goto_suggest_win)
+
+        # A hidden shortcut shows how well the row cache is working.
+        self.debug_shortcut = QShortcut(QKeySequence('Ctrl+Shift+D'), self)
+        self.debug_shortcut.activated.connect(self.debug_info)
 
         layout = QGridLayout()
 
@@ -326,6 +421,12 @@ class LogWin(QMainWindow):
         spacer3 = QSpacerItem(20, 10, QSizePolicy.Expanding, QSizePolicy.Minimum)
         layout.addWidget(self.help_btn, 0, 0)
         layout.addWidget(self.goto_fd_btn, 0, 1)
+        goals_layout = QHBoxLayout()
+        goals_layout.addWidget(self.goals_btn)
+        goals_layout.addWidget(self.trends_btn)
+        goals_layout.addWidget(self.calendar_btn)
+        goals_layout.addWidget(self.suggest_btn)
+        layout.addLayout(goals_layout, 0, 2)
         layout.addWidget(self.log_date_w, 0, 3, 1, 2, alignment=Qt.AlignCenter)
         layout.addWidget(self.change_log_btn, 0, 5, alignment=Qt.AlignLeft)
         layout.addWidget(self.prev_log_btn, 0, 7, alignment=Qt.AlignRight)
@@ -334,12 +435,17 @@ class LogWin(QMainWindow):
         layout.addWidget(self.log_table, 1, 0, 1, 9)
         layout.addItem(spacer1, 2, 0, 1, 9)
         layout.addWidget(self.totals_table, 3, 0, 1, 9)
-        layout.addItem(spacer2, 4, 0, 1, 9)
+        if self.budget_label.text():
+            layout.addWidget(self.budget_label, 4, 0, 1, 9)
+        else:
+            layout.addItem(spacer2, 4, 0, 1, 9)
 
         layout.addWidget(self.select_all_btn, 5, 0)
         layout.addWidget(self.unselect_all_btn, 5, 1)
         layout.addWidget(self.delete_log_btn, 5, 3, alignment=Qt.AlignRight)
         layout.addWidget(self.remove_entries_btn, 5, 4, alignment=Qt.AlignRight)
+        layout.addWidget(self.undo_btn, 5, 5, alignment=Qt.AlignRight)
+        layout.addWidget(self.redo_btn, 5, 6, alignment=Qt.AlignLeft)
         layout.addWidget(self.edit_entries_btn, 5, 7)
         layout.addWidget(self.add_entries_btn, 5, 8)
         layout.addItem(spacer3, 6, 0, 1, 9)
@@ -430,7 +536,13 @@ class LogWin(QMainWindow):
                       "selected entries' button.\n\n"
                       "- You can quickly remove entries from the log by selecting them and clicking the 'Remove "
                       "selected entries' button. You can also delete the log altogether with the 'Delete log' "
-                      "button.", self)
+                      "button.\n\n"
+                      "- Click the 'Undo' button to undo the most recent change to a log or the Food Dictionary, "
+                      "and the 'Redo' button to redo it.\n\n"
+                      "- Click the 'Daily goals' button to set daily limits for any nutrient or for spending. The "
+                      "progress toward each goal is shown below the totals, and the goals screen shows how many "
+                      "days in a row each goal has been met.\n\n"
+                      "- Click the 'Trends' button to chart any nutrient or spending over a range of days.", self)
         info.setWordWrap(True)
         info.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
 
@@ -469,6 +581,34 @@ class LogWin(QMainWindow):
             ''')
         self.dlg.show()
 
+    def debug_info(self):
+        """Show a dialog box with the hit and miss counts and memory use of the row cache of parsed files, and the
+        number of changes and writes of the write buffer.
+        """
+        cache = data.row_cache
+        lookups = cache.hits + cache.misses
+        hit_rate = f'{100 * cache.hits / lookups:.0f}%' if lookups else '-'
+        buffer = data.write_buffer
+        info = QLabel(f'Row cache: {len(cache)} file(s), {cache.size / 1024:.0f} of {cache.budget / 1024:.0f} KB\n'
+                      f'Hits: {cache.hits}\n'
+                      f'Misses: {cache.misses}\n'
+                      f'Hit rate: {hit_rate}\n\n'
+                      f'Write buffer: {len(buffer)} file(s) waiting\n'
+                      f'Changes: {buffer.num_changes}\n'
+                      f'Writes: {buffer.num_writes}', self)
+
+        self.ok_btn = QPushButton('Ok', self)
+        self.ok_btn.setFixedSize(75, 27)
+        self.ok_btn.clicked.connect(self.close_win)
+
+        self.dlg = QDialog(self)
+        self.dlg.setWindowTitle('Debug')
+        debug_layout = QVBoxLayout()
+        self.dlg.setLayout(debug_layout)
+        debug_layout.addWidget(info)
+        debug_layout.addWidget(self.ok_btn, alignment=Qt.AlignRight)
+        self.dlg.show()
+
     def change_date(self):
         """Use the date information provided by the user to change the log file that is to be viewed or edited.
         Give an error message if insufficient or invalid date information is provided.
@@ -513,16 +653,11 @@ class LogWin(QMainWindow):
         create a datetime object from the pathname, then display the contents of that date's log file. If there are
         no previous files, alert the user.
         """
-        all_pathnames = []
-        for dirpath, dirnames, filenames in os.walk(LOG_FILES_DIR):
-            for filename in filenames:
-                current_file_path = os.path.join(dirpath, filename)
-                all_pathnames.append(current_file_path)
-        all_pathnames.sort()
+        all_pathnames = data.get_log_file_paths(LOG_FILES_DIR, include_archived=True)
 
         # If the file corresponding to the currently selected date doesn't exist, use the position that the file
         # would have in the directory to find the previous available file that exists.
-        if not os.path.exists(self.log_file_path):
+        if not data.log_exists(self.log_file_path):
             bisect.insort(all_pathnames, self.log_file_path)
         prev_file_index = all_pathnames.index(self.log_file_path) - 1
         if prev_file_index == -1:
@@ -530,14 +665,8 @@ class LogWin(QMainWindow):
             self.mess_win.show()
             return
 
-        # Extract date information from the log file's path name to create a date object.
         prev_file_path = all_pathnames[prev_file_index]
-        prev_file_info = prev_file_path.split(os.sep)
-        year = int(prev_file_info[-3])
-        # Convert month into an integer, ex: 01 becomes 1.
-        month = int(prev_file_info[-2][0:2])
-        day = int(prev_file_info[-1][0:2])
-        prev_date = datetime.date(year, month, day)
+        prev_date = data.get_log_date(prev_file_path)
 
         current_geo = self.geometry()
         self.prev_log_win = LogWin(prev_date, current_geo)
@@ -549,16 +678,11 @@ class LogWin(QMainWindow):
         create a datetime object from the pathname, then display the contents of that date's log file. If there are
         no more files, alert the user.
         """
-        all_pathnames = []
-        for dirpath, dirnames, filenames in os.walk(LOG_FILES_DIR):
-            for filename in filenames:
-                current_file_path = os.path.join(dirpath, filename)
-                all_pathnames.append(current_file_path)
-        all_pathnames.sort()
+        all_pathnames = data.get_log_file_paths(LOG_FILES_DIR, include_archived=True)
 
         # If the file corresponding to the currently selected date doesn't exist, use the position that the file
         # would have in the directory to find the next available file that exists.
-        if not os.path.exists(self.log_file_path):
+        if not data.log_exists(self.log_file_path):
             bisect.insort(all_pathnames, self.log_file_path)
         next_file_index = all_pathnames.index(self.log_file_path) + 1
         try:
@@ -568,13 +692,7 @@ class LogWin(QMainWindow):
             self.mess_win.show()
             return
 
-        # Extract date information from the log file's path name to create a date object.
-        next_file_info = next_file_path.split(os.sep)
-        year = int(next_file_info[-3])
-        # Convert month into an integer, ex: 01 becomes 1.
-        month = int(next_file_info[-2][0:2])
-        day = int(next_file_info[-1][0:2])
-        next_date = datetime.date(year, month, day)
+        next_date = data.get_log_date(next_file_path)
 
         current_geo = self.geometry()
         self.next_log_win = LogWin(next_date, current_geo)
@@ -587,7 +705,12 @@ class LogWin(QMainWindow):
         user for confirmation before deleting the log. Once complete, take the user to the log window to view the
         updated log.
         """
-        if not os.path.exists(self.log_file_path):
+        if self.archived:
+            self.mess_win = MessageWin('archived log')
+            self.mess_win.show()
+            return
+
+        if not data.file_exists(self.log_file_path):
             self.mess_win = MessageWin('log file not found')
             self.mess_win.show()
             return
@@ -602,10 +725,15 @@ class LogWin(QMainWindow):
                 # All entries are selected for removal.
                 self.confirm_delete_log()
             else:
-                entries_to_keep = data.get_entries(self.log_file_path, unchecked_entry_names, match=True)
-                with open(self.log_file_path, 'w', newline='') as f:
-                    writer = csv.writer(f)
-                    writer.writerows(entries_to_keep)
+                with data.file_lock(self.log_file_path):
+                    # Read the log again under the lock, so entries added by another writer since it was loaded
+                    # are kept.
+                    old_entries = data.get_entries(self.log_file_path, return_all=True)
+                    entries_to_keep = store.get_log_entries(FD_PATH, self.log_file_path, checked_entry_names,
+                                                            match=False)
+                    data.write_buffer.write(self.log_file_path, entries_to_keep)
+                journal.load_journal(JOURNAL_PATH).record('Remove log entries', self.log_file_path, old_entries,
+                                                          entries_to_keep)
 
                 current_geo = self.geometry()
                 self.log_win = LogWin(self.date, current_geo)
@@ -614,56 +742,122 @@ class LogWin(QMainWindow):
 
     def select_all(self):
         """Select all entries in the log display widget."""
-        if not os.path.exists(self.log_file_path):
+        if not data.log_exists(self.log_file_path):
             return
         data.select_all_entries(self.log_table)
 
     def unselect_all(self):
         """Unselect all entries in the log display widget."""
-        if not os.path.exists(self.log_file_path):
+        if not data.log_exists(self.log_file_path):
             return
         data.unselect_all_entries(self.log_table)
 
-    def selection_changed(self):
-        """Gather the names of the selected log entries, calculate the entry totals, and display the subtotals as the
-        second row of the totals table widget. Update the subtotals each time the user selects or deselects an entry.
+    def selection_changed(self, item):
+        """Update the subtotals of the selected log entries when the user selects or deselects an entry, and display
+        them as the second row of the totals table widget. Only the values of the changed entry are added to or
+        subtracted from the running subtotals, from the matrix parsed when the log was loaded.
+
+        :param item: The QTableWidgetItem that changed.
         """
-        checked_entry_names = data.get_table_entry_names(self.log_table)[1]
+        if item.column() != 0:
+            return
+        # The table rows may be sorted, so convert the row into an entry index.
+        entry_index = self.log_order[item.row()]
+        checked = item.checkState() == Qt.Checked
+        if checked == (entry_index in self.checked_entries):
+            return
+        if checked:
+            self.checked_entries.add(entry_index)
+        else:
+            self.checked_entries.remove(entry_index)
+        sign = 1 if checked else -1
+        for i in range(len(self.subtotals)):
+            self.subtotals[i] += sign * self.log_values[i][entry_index]
 
         # Leave the table widget row blank if there are no selected entries to tally. There isn't a way to clear the
         # contents of only one row, so an empty string will be placed into each cell instead.
-        if not checked_entry_names:
+        if not self.checked_entries:
             for i in range(1, self.totals_table.columnCount()):  # Start at index 1 to skip over row title cell.
                 blank_item = QTableWidgetItem('')
                 self.totals_table.setItem(1, i, blank_item)
             return
-        selected_log_entries = data.get_entries(self.log_file_path, checked_entry_names)
-
-        # Remove entry name, serving size options, and number of servings since they are irrelevant to the tally.
-        for entry in selected_log_entries:
-            del entry[:3]
-        totals = data.sum_shared_values(selected_log_entries)
 
-        for i in range(len(totals)):
-            if i == 15:
-                cost = float(totals[i])
-                val = QTableWidgetItem(f'{cost:.2f}')
-            else:
-                val = QTableWidgetItem(totals[i])
+        for i in range(len(self.subtotals)):
+            # Show 2 decimal places for the cost.
+            val = QTableWidgetItem(data.format_fixed(self.subtotals[i], pad=(i == 15)))
             val.setTextAlignment(Qt.AlignCenter)
             val.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
             self.totals_table.setItem(1, i + 1, val)  # i + 1 to skip over row title cell.
 
+    def show_goal_progress(self, totals):
+        """Display the progress of the day's totals toward the daily goals in the last two rows of the totals table
+        widget. Values without a goal are left blank.
+
+        :param totals: A list of 16 integer totals in hundredths, calories through cost.
+        """
+        if not self.goals:
+            return
+        progress = goals.get_progress(totals, self.goals)
+        for i in range(len(totals)):
+            progress_text, remaining_text, met = progress.get(i, ['', '', True])
+            for row_index, text in [(2, progress_text), (3, remaining_text)]:
+                val = QTableWidgetItem(text)
+                val.setTextAlignment(Qt.AlignCenter)
+                val.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
+                if not met:
+                    val.setForeground(Qt.red)
+                self.totals_table.setItem(row_index, i + 1, val)  # i + 1 to skip over row title cell.
+
+    def show_budget_status(self, monthly_budget):
+        """Display the spending of the log's month so far against the monthly budget, the daily burn rate, and the
+        projected spending of the whole month. The label is red if the month is projected to go over budget.
+
+        :param monthly_budget: An integer monthly budget in hundredths.
+        """
+        spend = data.get_month_spend(LOG_FILES_DIR, self.date)
+        status = goals.get_budget_status(spend, monthly_budget, self.date.year, self.date.month)
+        text = (f"{self.month_name} spending: ${data.format_fixed(spend, pad=True)} of "
+                f"${data.format_fixed(monthly_budget, pad=True)} budget, ")
+        if status['remaining'] >= 0:
+            text += f"${data.format_fixed(status['remaining'], pad=True)} left."
+        else:
+            text += f"${data.format_fixed(-status['remaining'], pad=True)} over."
+        if status['burn rate'] is not None:
+            text += (f" ${data.format_fixed(status['burn rate'], pad=True)} a day, projected "
+                     f"${data.format_fixed(status['projected'], pad=True)} for the month.")
+        self.budget_label.setText(text)
+        if status['projected'] is not None and status['projected'] > monthly_budget:
+            self.budget_label.setStyleSheet('color: red;')
+
+    def sort_log(self, column):
+        """Sort the log entries by a column of the log table. Sorting by the same column again reverses the order.
+
+        :param column: An integer index of the clicked column.
+        """
+        descending = self.log_sort == [column, False]
+        self.log_sort = [column, descending]
+        new_order = data.get_sort_order(self.log_sort_keys[column], descending)
+
+        current_rows = {entry_index: row_index for row_index, entry_index in enumerate(self.log_order)}
+        data.reorder_table_rows(self.log_table, [current_rows[entry_index] for entry_index in new_order])
+        self.log_order = new_order
+        log_h_header = self.log_table.horizontalHeader()
+        log_h_header.setSortIndicatorShown(True)
+        log_h_header.setSortIndicator(column, Qt.DescendingOrder if descending else Qt.AscendingOrder)
+
     def confirm_delete_log(self):
         """Display a dialog box that asks user for confirmation to delete the currently selected log."""
-        if not os.path.exists(self.log_file_path):
+        if self.archived:
+            self.mess_win = MessageWin('archived log')
+            self.mess_win.show()
+        elif not data.file_exists(self.log_file_path):
             self.mess_win = MessageWin('log file not found')
             self.mess_win.show()
         else:
             self.dlg = QDialog(self)
             self.dlg.setFixedWidth(350)
             message = QLabel(f"Are you sure you want to delete the log for {self.month_name} {self.day}, {self.year}?"
-                             f" This can't be undone.", self)
+                             f" You can undo this with the 'Undo' button.", self)
             message.setWordWrap(True)
             self.yes_btn = QPushButton("Yes", self)
             self.yes_btn.setFixedSize(85, 27)
@@ -704,7 +898,10 @@ class LogWin(QMainWindow):
 
     def delete_log(self):
         """Delete the currently selected log file."""
-        os.remove(self.log_file_path)
+        with data.file_lock(self.log_file_path):
+            old_entries = data.get_entries(self.log_file_path, return_all=True)
+            data.write_buffer.remove(self.log_file_path)
+        journal.load_journal(JOURNAL_PATH).record('Delete log', self.log_file_path, old_entries, None)
         # Close the dialog box.
         self.close_win()
         current_geo = self.geometry()
@@ -718,18 +915,23 @@ class LogWin(QMainWindow):
         entry from which a log entry is based on. Check the selected entry names against current Food Dictionary
         entry names, and inform the user if a particular entry no longer exists, and therefore can't be edited.
         """
+        if self.archived:
+            self.mess_win = MessageWin('archived log')
+            self.mess_win.show()
+            return
+
         checked_entry_names = data.get_table_entry_names(self.log_table)[1]
         if not checked_entry_names:
             self.mess_win = MessageWin('no log entries selected to edit')
             self.mess_win.show()
             return
 
-        if not os.path.exists(FD_PATH):
+        if not data.file_exists(FD_PATH):
             self.mess_win = MessageWin('fd file not found (log window edit)')
             self.mess_win.show()
             return
 
-        fd_entry_names = data.get_file_entry_names(FD_PATH)
+        fd_entry_names = store.get_loggable_names(FD_PATH, RECIPES_PATH)
         for name in checked_entry_names:
             if name not in fd_entry_names:
                 self.mess_win = MessageWin('fd entry no longer exists', entry_name=name)
@@ -745,7 +947,12 @@ class LogWin(QMainWindow):
         """Display the contents of the Food Dictionary and allow the user to select entries to add to a log. If the
         Food Dictionary file doesn't exist, tell the user to add entries first.
         """
-        if not os.path.exists(FD_PATH):
+        if self.archived:
+            self.mess_win = MessageWin('archived log')
+            self.mess_win.show()
+            return
+
+        if not data.file_exists(FD_PATH):
             self.mess_win = MessageWin('fd file not found (log window)')
             self.mess_win.show()
             return
@@ -756,9 +963,38 @@ class LogWin(QMainWindow):
         self.close()
 
     def close_win(self):
-        """Close the 'help' dialog or the 'delete confirmation' dialog."""
+        """Close the 'help' dialog, the 'debug' dialog, or the 'delete confirmation' dialog."""
         self.dlg.close()
 
+    def undo_change(self):
+        """Undo the most recent change to a log or the Food Dictionary, then show the changed file."""
+        self.show_changed_file(journal.load_journal(JOURNAL_PATH).undo(), 'nothing to undo')
+
+    def redo_change(self):
+        """Redo the most recently undone change to a log or the Food Dictionary, then show the changed file."""
+        self.show_changed_file(journal.load_journal(JOURNAL_PATH).redo(), 'nothing to redo')
+
+    def show_changed_file(self, change, empty_key):
+        """Take the user to the log window for the log changed by an undo or redo, or to the Food Dictionary window
+        if the Food Dictionary was changed. If there was nothing to undo or redo, or the change could not be applied,
+        alert the user.
+
+        :param change: A journal change, None, or a string that determines an error message.
+        :param empty_key: A string that determines the error message if change is None.
+        """
+        if change is None or isinstance(change, str):
+            self.mess_win = MessageWin(change or empty_key)
+            self.mess_win.show()
+            return
+
+        current_geo = self.geometry()
+        if change['path'] == os.path.abspath(FD_PATH):
+            self.changed_win = FoodDictWin(current_geo)
+        else:
+            self.changed_win = LogWin(data.get_log_date(change['path']), current_geo)
+        self.changed_win.show()
+        self.close()
+
     def goto_fd_win(self):
         """Take the user to the Food Dictionary window."""
         current_geo = self.geometry()
@@ -766,6 +1002,34 @@ class LogWin(QMainWindow):
         self.fd_win.show()
         self.close()
 
+    def goto_goals_win(self):
+        """Take the user to the daily goals window."""
+        current_geo = self.geometry()
+        self.goals_win = GoalsWin(self.date, current_geo)
+        self.goals_win.show()
+        self.close()
+
+    def goto_trends_win(self):
+        """Take the user to the trend charts window."""
+        current_geo = self.geometry()
+        self.trends_win = TrendsWin(self.date, current_geo)
+        self.trends_win.show()
+        self.close()
+
+    def goto_calendar_win(self):
+        """Take the user to the calendar window."""
+        current_geo = self.geometry()
+        self.calendar_win = CalendarWin(self.date, current_geo)
+        self.calendar_win.show()
+        self.close()
+
+    def goto_suggest_win(self):
+        """Take the user to the food suggestion window."""
+        current_geo = self.geometry()
+        self.suggest_win = SuggestWin(self.date, current_geo)
+        self.suggest_win.show()
+        self.close()
+
 
 class EditLogWin(QDialog):
     """Allow the user to add entries or to edit existing entries in a log file."""
@@ -884,30 +1148,19 @@ class EditLogWin(QDialog):
         # self.edit_entry_names. Otherwise, they will be all entries in the FD.
         if self.edit:
             table_entry_names = self.edit_entry_names
-            old_entries = data.get_entries(self.log_file_path, self.edit_entry_names, match=True)
+            old_entries = store.get_log_entries(FD_PATH, self.log_file_path, self.edit_entry_names, match=True)
             old_amounts = []  # [[amount1, unit1], [amount2, unit2], ...]
             for entry in old_entries:
                 amount = ast.literal_eval(entry[1])  # [amount, unit]
                 old_amounts.append(amount)
 
-            # Get the serving size options of the entries to be edited from the FD.
-            # The order of the entries matches the order of appearance of the edit entry names.
-            old_entry_fd_matches = data.get_entries(FD_PATH, self.edit_entry_names, match=True)
-
-            # List of dictionaries containing the serving size options for each entry to edit.
-            self.serv_options = []
-            for entry in old_entry_fd_matches:
-                serv_dict = ast.literal_eval(entry[1])
-                self.serv_options.append(serv_dict)
         else:
-            table_entry_names = data.get_file_entry_names(FD_PATH)
-            fd_entries = data.get_entries(FD_PATH, return_all=True)
-
-            # List of dictionaries containing serving size options for each FD entry.
-            self.serv_options = []
-            for entry in fd_entries:
-                serv_dict = ast.literal_eval(entry[1])
-                self.serv_options.append(serv_dict)
+            # All FD entries, followed by all recipes.
+            table_entry_names = store.get_loggable_names(FD_PATH, RECIPES_PATH)
+
+        # List of lists containing every unit that an amount of each entry can be given in, including the units
+        # convertible into one of the entry's serving size options.
+        self.unit_options = [store.get_unit_options(FD_PATH, name) for name in table_entry_names]
         self.edit_table.setRowCount(len(table_entry_names))
 
         # Set up the log edit table.
@@ -943,11 +1196,7 @@ class EditLogWin(QDialog):
             # QComboBox for the possible units of measurement.
             combobox = QComboBox()
             combobox.setFixedSize(90, 27)
-
-            unit_options = []
-            for key in self.serv_options[i].keys():
-                unit_options.append(key)
-            combobox.addItems(['Serving(s)', *unit_options])
+            combobox.addItems(self.unit_options[i])
 
             unit_w = QWidget()
             unit_layout = QHBoxLayout()
@@ -1073,19 +1322,16 @@ class EditLogWin(QDialog):
                 self.totals_table.setItem(0, i, blank_item)
             return
 
-        unmodified_entries = data.get_entries(FD_PATH, checked_entry_names, match=True)
+        unmodified_entries = store.get_loggable_rows(FD_PATH, RECIPES_PATH, checked_entry_names)
         calculated_entries = data.calculate_entry_info(unmodified_entries, checked_entry_amounts, tally=True)
 
         # Remove entry name, serving size options, and number of servings since they are irrelevant to the tally.
         for entry in calculated_entries:
             del entry[:3]
-        summed_values = data.sum_shared_values(calculated_entries)
+        summed_values = data.sum_fixed_values(calculated_entries)
         for i in range(len(summed_values)):
-            if i == 15:
-                cost = float(summed_values[i])
-                val = QTableWidgetItem(f'{cost:.2f}')
-            else:
-                val = QTableWidgetItem(summed_values[i])
+            # Show 2 decimal places for the cost.
+            val = QTableWidgetItem(data.format_fixed(summed_values[i], pad=(i == 15)))
             val.setTextAlignment(Qt.AlignCenter)
             val.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
             self.totals_table.setItem(0, i + 1, val)  # i + 1 to skip over row title cell.
@@ -1102,15 +1348,15 @@ class EditLogWin(QDialog):
             self.mess_win.show()
             return
 
-        if os.path.exists(self.log_file_path):
-            current_log_entry_names = data.get_file_entry_names(self.log_file_path)
+        if data.file_exists(self.log_file_path):
+            current_log_entry_names = [entry[0] for entry in store.get_log_entries(FD_PATH, self.log_file_path)]
             for name in new_entry_names:
                 if name in current_log_entry_names:
                     self.mess_win = MessageWin('duplicate log entry', entry_name=name)
                     self.mess_win.show()
                     return
 
-        new_entries = data.get_entries(FD_PATH, new_entry_names, match=True)
+        new_entries = store.get_loggable_rows(FD_PATH, RECIPES_PATH, new_entry_names)
         new_entry_amounts = data.get_edit_log_amounts(self.edit_table, checked=True)  # [[amount1, unit1], ...]
         calculated_entries = data.calculate_entry_info(new_entries, new_entry_amounts, tally=False)
         if calculated_entries == 'no amount given (log add)':
@@ -1126,10 +1372,25 @@ class EditLogWin(QDialog):
         if not os.path.exists(os.path.dirname(self.log_file_path)):
             os.makedirs(os.path.dirname(self.log_file_path))
 
-        with open(self.log_file_path, 'a', newline='') as f:
-            writer = csv.writer(f)
-            for entry in calculated_entries:
-                writer.writerow(entry)
+        with data.file_lock(self.log_file_path):
+            # Another writer may have added the same entries since the check above, so check again under the lock.
+            old_entries = data.get_entries(self.log_file_path, return_all=True)
+            if old_entries != 'file not found':
+                for entry in store.load_fd_store(FD_PATH).resolve_log_rows(old_entries):
+                    if entry[0] in new_entry_names:
+                        self.mess_win = MessageWin('duplicate log entry', entry_name=entry[0])
+                        self.mess_win.show()
+                        return
+
+            data.write_buffer.write(self.log_file_path,
+                                    (old_entries if old_entries != 'file not found' else []) + calculated_entries)
+
+        if old_entries == 'file not found':
+            journal.load_journal(JOURNAL_PATH).record('Add log entries', self.log_file_path, None,
+                                                      calculated_entries)
+        else:
+            journal.load_journal(JOURNAL_PATH).record('Add log entries', self.log_file_path, old_entries,
+                                                      old_entries + calculated_entries)
 
         current_geo = self.geometry()
         self.log_win = LogWin(self.date, current_geo)
@@ -1142,9 +1403,7 @@ class EditLogWin(QDialog):
         input, prompt them to try again. Once completed, take the user to the log window to view the updated log.
         """
         edit_entry_names = data.get_table_entry_names(self.edit_table)[0]
-        entries_to_write = data.get_entries(self.log_file_path, edit_entry_names, match=False)
-
-        unmodified_entries = data.get_entries(FD_PATH, edit_entry_names, match=True)
+        unmodified_entries = store.get_loggable_rows(FD_PATH, RECIPES_PATH, edit_entry_names)
         edit_entry_amounts = data.get_edit_log_amounts(self.edit_table, checked=False)  # [[amount1, unit1], ...]
 
         calculated_entries = data.calculate_entry_info(unmodified_entries, edit_entry_amounts, edit=True)
@@ -1158,12 +1417,16 @@ class EditLogWin(QDialog):
             self.mess_win.show()
             return
 
-        for entry in calculated_entries:
-            entries_to_write.append(entry)
+        with data.file_lock(self.log_file_path):
+            # Read the other entries under the lock, so changes made to them by another writer are kept.
+            old_entries = data.get_entries(self.log_file_path, return_all=True)
+            entries_to_write = store.get_log_entries(FD_PATH, self.log_file_path, edit_entry_names, match=False)
+            for entry in calculated_entries:
+                entries_to_write.append(entry)
 
-        with open(self.log_file_path, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerows(entries_to_write)
+            data.write_buffer.write(self.log_file_path, entries_to_write)
+        journal.load_journal(JOURNAL_PATH).record('Edit log entries', self.log_file_path, old_entries,
+                                                  entries_to_write)
 
         current_geo = self.geometry()
         self.log_win = LogWin(self.date, current_geo)
@@ -1206,6 +1469,9 @@ class FoodDictWin(QDialog):
         super().__init__()
         self.geo = geo
         self.init_ui()
+        self.conflicts_win = get_write_conflicts_win()
+        if self.conflicts_win is not None:
+            self.conflicts_win.show()
 
     def init_ui(self):
         """Setup UI. Include a table that displays the contents of the Food Dictionary. Include buttons to allow the
@@ -1259,6 +1525,18 @@ class FoodDictWin(QDialog):
         self.goto_log_win_btn = QPushButton('Go to logs', self)
         self.goto_log_win_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
         self.goto_log_win_btn.clicked.connect(self.goto_log_win)
+        self.cost_analytics_btn = QPushButton('Cost analytics', self)
+        self.cost_analytics_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.cost_analytics_btn.clicked.connect(self.goto_cost_analytics_win)
+        self.recipes_btn = QPushButton('Recipes', self)
+        self.recipes_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.recipes_btn.clicked.connect(self.goto_recipes_win)
+        self.undo_btn = QPushButton('Undo', self)
+        self.undo_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.undo_btn.clicked.connect(self.undo_change)
+        self.redo_btn = QPushButton('Redo', self)
+        self.redo_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.redo_btn.clicked.connect(self.redo_change)
 
         self.main_layout = QVBoxLayout()
         self.setLayout(self.main_layout)
@@ -1271,13 +1549,21 @@ class FoodDictWin(QDialog):
         self.btn_layout.addWidget(self.edit_entry_btn)
         self.btn_layout.addWidget(self.add_entry_btn)
 
-        self.main_layout.addWidget(self.goto_log_win_btn)
+        nav_layout = QHBoxLayout()
+        nav_layout.addWidget(self.goto_log_win_btn)
+        nav_layout.addWidget(self.cost_analytics_btn)
+        nav_layout.addWidget(self.recipes_btn)
+        nav_layout.addStretch()
+        nav_layout.addWidget(self.undo_btn)
+        nav_layout.addWidget(self.redo_btn)
+
+        self.main_layout.addLayout(nav_layout)
         self.main_layout.addWidget(description)
         self.main_layout.addWidget(self.fd_table)
         self.main_layout.addLayout(self.btn_layout)
         self.main_layout.setSpacing(15)
 
-        if not os.path.exists(FD_PATH):
+        if not data.file_exists(FD_PATH):
             # The FD doesn't exist, alert the user.
             self.fd_table.setRowCount(1)
             self.fd_table.setColumnCount(1)
@@ -1294,7 +1580,10 @@ class FoodDictWin(QDialog):
             fd_v_header.setVisible(False)
         else:
             # Display the FD's contents.
-            fd_entries = data.get_entries(FD_PATH, return_all=True)
+            # The store's parsed rows are shared with every other window, and are loaded from the FD's cache when
+            # it is up to date.
+            fd_store = store.load_fd_store(FD_PATH)
+            fd_entries = fd_store.rows
 
             col_labels = ['Name', 'Serving\nSize', 'Calories', 'Total\nFat\n(g)', 'Sat.\nFat\n(g)', 'Trans\nFat\n(g)',
                           'Poly.\nFat\n(g)', 'Mono.\nFat\n(g)', 'Chol.\n(mg)', 'Sodium\n(mg)', 'Total\nCarbs\n(g)',
@@ -1302,6 +1591,7 @@ class FoodDictWin(QDialog):
                           'Total\nSugars\n(g)', 'Added\nSugars\n(g)', 'Protein\n(g)', 'Cost\n($)']
             self.fd_table.setRowCount(len(fd_entries))
             self.fd_table.setColumnCount(len(col_labels))
+            unit_costs = fd_store.get_column('cost')
 
             for entry_num in range(len(fd_entries)):
                 self.fd_table.setRowHeight(entry_num, 50)
@@ -1311,34 +1601,26 @@ class FoodDictWin(QDialog):
                 name_checkbox.setCheckState(Qt.Unchecked)
                 self.fd_table.setItem(entry_num, 0, name_checkbox)
 
-                serv_options_dict = ast.literal_eval(entry[1])  # {amount1: unit1, amount2: unit2, ...}
-                serv_options_list = []  # [[amount1, unit1], [amount2, unit2], ...]
-                for unit in serv_options_dict.keys():
-                    amount = serv_options_dict[unit]
-                    serv_options_list.append([amount, unit])
-                serv_label = QTableWidgetItem(f'{serv_options_list[0][0]} {serv_options_list[0][1]}')
+                # One line for each serving size option, in the order they were given.
+                serv_label = QTableWidgetItem('\n'.join(f'{amount} {unit}'
+                                                         for unit, amount in fd_store.serving_options[entry_num]))
                 # Disallow editing of the values.
                 serv_label.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
-
-                # Go through the rest of the serving sizes, if any, and append their values to serv_label.
-                for i in range(1, len(serv_options_list)):
-                    serv_label.setText(serv_label.text() + f'\n{serv_options_list[i][0]} {serv_options_list[i][1]}')
                 serv_label.setTextAlignment(Qt.AlignCenter)
                 self.fd_table.setItem(entry_num, 1, serv_label)
 
-                for i in range(2, len(entry[:-2])):  # Up to index -2 since cost will be handled separately.
+                for i in range(2, 17):  # Calories to protein, since cost will be handled separately.
                     val = QTableWidgetItem(entry[i])
                     val.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
                     val.setTextAlignment(Qt.AlignCenter)
                     self.fd_table.setItem(entry_num, i, val)
 
-                cost_info = entry[17]
-                if not cost_info:
+                container = fd_store.containers[entry_num]
+                if container is None:
                     cost_item = QTableWidgetItem("")
                 else:
-                    total_cost = ast.literal_eval(cost_info)[0]
-                    serv_per_container = ast.literal_eval(cost_info)[1]
-                    unit_cost = round(float(entry[18]), 2)
+                    total_cost, serv_per_container = container
+                    unit_cost = round(unit_costs[entry_num], 2)
                     cost_item = QTableWidgetItem(f"{serv_per_container} serving(s): ${total_cost}\n"
                                                  f"1 serving: ${unit_cost:.2f} ")
                 cost_item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
@@ -1348,6 +1630,19 @@ class FoodDictWin(QDialog):
             self.fd_table.setHorizontalHeaderLabels(col_labels)
             fd_h_header.setSectionResizeMode(QHeaderView.ResizeToContents)
             fd_h_header.setSectionResizeMode(0, QHeaderView.Stretch)
+
+            # Click a column header to sort the entries by that column, or click it again to reverse the order.
+            # self.fd_order[row] is the index of the entry displayed in each table row.
+            self.fd_order = list(range(len(fd_entries)))
+            # {column: sort keys}, taken from the store's parsed columns once per load. Serving sizes are sorted by
+            # the text of the first serving size option, and costs by the cost per serving.
+            self.fd_sort_keys = {0: data.get_sort_keys(fd_store.names, numeric=False),
+                                 1: data.get_sort_keys([f'{options[0][1]} {options[0][0]}'
+                                                        for options in fd_store.serving_options], numeric=False)}
+            for value_name, value_index in store.VALUE_INDEX.items():
+                self.fd_sort_keys[value_index + 2] = fd_store.get_column(value_name)
+            self.fd_sort = None  # [column, descending]
+            fd_h_header.sectionClicked.connect(self.sort_fd)
         self.setStyleSheet('''
             QDialog {
                 background-color: rgb(0, 0, 30);
@@ -1414,6 +1709,54 @@ class FoodDictWin(QDialog):
         self.log_win.show()
         self.close()
 
+    def goto_cost_analytics_win(self):
+        """Take the user to the cost analytics window. If the Food Dictionary doesn't exist, alert the user."""
+        if not data.file_exists(FD_PATH):
+            self.mess_win = MessageWin('fd file not found (fd window)')
+            self.mess_win.show()
+            return
+
+        current_geo = self.geometry()
+        self.cost_analytics_win = CostAnalyticsWin(current_geo)
+        self.cost_analytics_win.show()
+        self.close()
+
+    def goto_recipes_win(self):
+        """Take the user to the recipes window."""
+        current_geo = self.geometry()
+        self.recipes_win = RecipesWin(current_geo)
+        self.recipes_win.show()
+        self.close()
+
+    def undo_change(self):
+        """Undo the most recent change to the Food Dictionary or a log, then show the changed file."""
+        self.show_changed_file(journal.load_journal(JOURNAL_PATH).undo(), 'nothing to undo')
+
+    def redo_change(self):
+        """Redo the most recently undone change to the Food Dictionary or a log, then show the changed file."""
+        self.show_changed_file(journal.load_journal(JOURNAL_PATH).redo(), 'nothing to redo')
+
+    def show_changed_file(self, change, empty_key):
+        """Reload the Food Dictionary window if the Food Dictionary was changed by an undo or redo, or take the user
+        to the log window for the changed log. If there was nothing to undo or redo, or the change could not be
+        applied, alert the user.
+
+        :param change: A journal change, None, or a string that determines an error message.
+        :param empty_key: A string that determines the error message if change is None.
+        """
+        if change is None or isinstance(change, str):
+            self.mess_win = MessageWin(change or empty_key)
+            self.mess_win.show()
+            return
+
+        current_geo = self.geometry()
+        if change['path'] == os.path.abspath(FD_PATH):
+            self.changed_win = FoodDictWin(current_geo)
+        else:
+            self.changed_win = LogWin(data.get_log_date(change['path']), current_geo)
+        self.changed_win.show()
+        self.close()
+
     def add_entry_to_fd(self):
         """Allow the user to add an entry to the Food Dictionary file."""
         self.add_to_fd_win = EditFoodDictWin()
@@ -1422,7 +1765,7 @@ class FoodDictWin(QDialog):
 
     def remove_entries_confirmation(self):
         """Display a dialog box that asks the user for confirmation to delete the selected Food Dictionary entries."""
-        if not os.path.exists(FD_PATH):
+        if not data.file_exists(FD_PATH):
             self.mess_win = MessageWin('fd file not found (fd window)')
             self.mess_win.show()
             return
@@ -1440,7 +1783,7 @@ class FoodDictWin(QDialog):
                 self.dlg = QDialog(self)
                 self.dlg.setFixedWidth(350)
                 message = QLabel("Are you sure you want to delete the selected entries from the Food Dictionary? "
-                                 "This can't be undone.", self)
+                                 "You can undo this with the 'Undo' button.", self)
                 message.setWordWrap(True)
                 self.yes_btn = QPushButton("Yes", self)
                 self.yes_btn.setFixedSize(85, 27)
@@ -1486,16 +1829,19 @@ class FoodDictWin(QDialog):
         with those entries, removing the checked entries. If there are no selected entries, prompt the user to select
         at least one.
         """
-        if not os.path.exists(FD_PATH):
+        if not data.file_exists(FD_PATH):
             self.mess_win = MessageWin('fd file not found (fd window)')
             self.mess_win.show()
             return
 
-        unchecked_entry_names = data.get_table_entry_names(self.fd_table)[2]
-        entries_to_keep = data.get_entries(FD_PATH, unchecked_entry_names, match=True)
-        with open(FD_PATH, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerows(entries_to_keep)
+        checked_entry_names = data.get_table_entry_names(self.fd_table)[1]
+        with data.file_lock(FD_PATH):
+            # Read the Food Dictionary again under the lock, so entries added by another writer are kept.
+            old_entries = data.get_entries(FD_PATH, return_all=True)
+            entries_to_keep = data.get_entries(FD_PATH, checked_entry_names, match=False)
+            data.write_buffer.write(FD_PATH, entries_to_keep)
+        journal.load_journal(JOURNAL_PATH).record('Remove Food Dictionary entries', FD_PATH, old_entries,
+                                                  entries_to_keep)
 
         self.close_win()
         current_geo = self.geometry()
@@ -1503,15 +1849,32 @@ class FoodDictWin(QDialog):
         self.fd_win.show()
         self.close()
 
+    def sort_fd(self, column):
+        """Sort the Food Dictionary entries by a column of the FD table. Sorting by the same column again reverses
+        the order.
+
+        :param column: An integer index of the clicked column.
+        """
+        descending = self.fd_sort == [column, False]
+        self.fd_sort = [column, descending]
+        new_order = data.get_sort_order(self.fd_sort_keys[column], descending)
+
+        current_rows = {entry_index: row_index for row_index, entry_index in enumerate(self.fd_order)}
+        data.reorder_table_rows(self.fd_table, [current_rows[entry_index] for entry_index in new_order])
+        self.fd_order = new_order
+        fd_h_header = self.fd_table.horizontalHeader()
+        fd_h_header.setSortIndicatorShown(True)
+        fd_h_header.setSortIndicator(column, Qt.DescendingOrder if descending else Qt.AscendingOrder)
+
     def select_all(self):
         """Select all entries in the Food Dictionary table widget."""
-        if not os.path.exists(FD_PATH):
+        if not data.file_exists(FD_PATH):
             return
         data.select_all_entries(self.fd_table)
 
     def unselect_all(self):
         """Unselect all entries in the Food Dictionary table widget."""
-        if not os.path.exists(FD_PATH):
+        if not data.file_exists(FD_PATH):
             return
         data.unselect_all_entries(self.fd_table)
 
@@ -1519,7 +1882,7 @@ class FoodDictWin(QDialog):
         """Get the name of the selected entry in the Food Dictionary table, then pass it to EditFoodDictWin to be
         edited. If multiple entries or none are selected, prompt the user to select only one and try again.
         """
-        if not os.path.exists(FD_PATH):
+        if not data.file_exists(FD_PATH):
             self.mess_win = MessageWin('fd file not found (fd window)')
             self.mess_win.show()
             return
@@ -1536,14 +1899,14 @@ class FoodDictWin(QDialog):
 
     def confirm_delete_fd(self):
         """Display a dialog box that asks user for confirmation to delete the Food Dictionary file."""
-        if not os.path.exists(FD_PATH):
+        if not data.file_exists(FD_PATH):
             self.mess_win = MessageWin('fd file not found (fd window)')
             self.mess_win.show()
         else:
             self.dlg = QDialog(self)
             self.dlg.setFixedWidth(350)
-            message = QLabel("Are you sure you want to delete all entries from the Food Dictionary? This can't be "
-                             "undone.", self)
+            message = QLabel("Are you sure you want to delete all entries from the Food Dictionary? You can undo "
+                             "this with the 'Undo' button.", self)
             message.setWordWrap(True)
             self.yes_btn = QPushButton("Yes", self)
             self.yes_btn.setFixedSize(85, 27)
@@ -1586,7 +1949,10 @@ class FoodDictWin(QDialog):
 
     def delete_fd(self):
         """Delete the Food Dictionary file and take the user to the Food Dictionary view screen."""
-        os.remove(FD_PATH)
+        with data.file_lock(FD_PATH):
+            old_entries = data.get_entries(FD_PATH, return_all=True)
+            data.write_buffer.remove(FD_PATH)
+        journal.load_journal(JOURNAL_PATH).record('Delete Food Dictionary', FD_PATH, old_entries, None)
         self.close_win()
         current_geo = self.geometry()
         self.fd_win = FoodDictWin(current_geo)
@@ -1754,6 +2120,11 @@ class EditFoodDictWin(QDialog):
         btn_layout = QHBoxLayout()
         btn_w.setLayout(btn_layout)
 
+        # When editing, the user may choose to apply the changes to the log entries based on this entry.
+        self.propagate_checkbox = QCheckBox('Apply changes to existing logs', self)
+        self.propagate_checkbox.setVisible(bool(self.edit_entry_name))
+
+        btn_layout.addWidget(self.propagate_checkbox)
         btn_layout.addWidget(self.back_to_fd_win_btn)
         btn_layout.addWidget(self.done_btn)
         btn_w.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
@@ -1765,23 +2136,18 @@ class EditFoodDictWin(QDialog):
         # If there is a string assigned to self.edit_entry_name, place that entry's current info into the input fields
         # so that the user knows what was originally input. Otherwise, all fields are left blank for the new entry.
         if self.edit_entry_name:
-            with open(FD_PATH) as f:
-                reader = csv.reader(f)
-                for entry in reader:
-                    if entry[0] == self.edit_entry_name:
-                        prev_data = entry
-                        break
+            fd_store = store.load_fd_store(FD_PATH)
+            prev_data = fd_store.get_row(self.edit_entry_name)
             self.name_w = self.info1_layout.itemAt(1).widget()
             self.name_w.setText(self.edit_entry_name)
             self.name_w.setCursorPosition(0)
 
-            serv_size_options = ast.literal_eval(prev_data[1])  # {amount1: unit1, amount2: unit2, ...}
             # Index of the items of the QFormLayout, corresponding to each QHBoxLayout with a QLineEdit.
             item_index = 3
 
-            for key in serv_size_options.keys():
-                self.info1_layout.itemAt(item_index).itemAt(0).widget().setText(serv_size_options[key])
-                self.info1_layout.itemAt(item_index).itemAt(1).widget().setCurrentText(key)
+            for unit, amount in fd_store.serving_options[fd_store.index[self.edit_entry_name]]:
+                self.info1_layout.itemAt(item_index).itemAt(0).widget().setText(amount)
+                self.info1_layout.itemAt(item_index).itemAt(1).widget().setCurrentText(unit)
                 item_index += 1
             self.info1_layout.itemAt(7).widget().setText(prev_data[2])
 
@@ -1834,6 +2200,9 @@ class EditFoodDictWin(QDialog):
                 border: 1px solid gray;
                 border-radius: 5px;
             }
+            QCheckBox {
+                color: white;
+            }
             ''')
 
     def goto_fd_win(self):
@@ -1856,20 +2225,12 @@ class EditFoodDictWin(QDialog):
             return
 
         # Duplicate entry names are not allowed.
-        if os.path.exists(FD_PATH):
-            with open(FD_PATH) as f:
-                reader = list(csv.reader(f))
-            for line in reader:
-                if entry_name == line[0]:
-                    if self.edit_entry_name and entry_name == self.edit_entry_name:
-                        # The user is editing an entry and didn't alter the entry name.
-                        pass
-                    else:
-                        # Either the user is editing an entry, but the name was changed and matches
-                        # another existing entry, or a completely new entry name matches an existing entry.
-                        self.err_win = MessageWin('duplicate fd entry')
-                        self.err_win.show()
-                        return
+        # Either the user is editing an entry, but the name was changed and matches another existing entry, or a
+        # completely new entry name matches an existing entry.
+        if entry_name != self.edit_entry_name and entry_name in store.load_fd_store(FD_PATH):
+            self.err_win = MessageWin('duplicate fd entry')
+            self.err_win.show()
+            return
 
         entry.append(entry_name)
         serv_size_options = {}  # {amount1: unit1, amount2: unit2, ...}
@@ -1945,92 +2306,1810 @@ class EditFoodDictWin(QDialog):
             # Add empty strings if there was no input.
             entry.extend(["", ""])
 
-        if self.edit_entry_name:
-            # All current entries except the one that is being edited.
-            entries_to_write = data.get_entries(FD_PATH, self.edit_entry_name, match=False)
-        else:
-            entries_to_write = data.get_entries(FD_PATH, return_all=True)
-
-        if entries_to_write == "file not found":
-            os.makedirs(os.path.dirname(FD_PATH), exist_ok=True)
-            # Place new entry in a list by itself so that writerows() will accept it.
-            entries_to_write = [entry, ]
-        else:
-            entries_to_write.append(entry)
-            entries_to_write.sort()
+        with data.file_lock(FD_PATH):
+            # Another writer may have added an entry with the same name since the check above, so check again
+            # under the lock.
+            old_entries = data.get_entries(FD_PATH, return_all=True)
+            if old_entries != "file not found" and entry_name != self.edit_entry_name and \
+                    entry_name in [old_entry[0] for old_entry in old_entries]:
+                self.err_win = MessageWin('duplicate fd entry')
+                self.err_win.show()
+                return
 
-        with open(FD_PATH, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerows(entries_to_write)
+            if old_entries == "file not found":
+                os.makedirs(os.path.dirname(FD_PATH), exist_ok=True)
+                entries_to_write = [entry]
+            else:
+                # All current entries except the one that is being edited. An edited entry keeps its id, so log
+                # entries made from it follow it if it is renamed.
+                entries_to_write = [list(old_entry) for old_entry in old_entries
+                                    if not self.edit_entry_name or old_entry[0] != self.edit_entry_name]
+                for old_entry in old_entries:
+                    if self.edit_entry_name and old_entry[0] == self.edit_entry_name and \
+                            data.get_row_id(old_entry) is not None:
+                        data.set_row_id(entry, data.get_row_id(old_entry))
+                entries_to_write.append(entry)
+                entries_to_write.sort()
+            # A new entry, and any entry written before ids were added, is given an id.
+            store.assign_ids(entries_to_write)
+
+            data.write_buffer.write(FD_PATH, entries_to_write)
+        prices.record_price_changes(PRICE_HISTORY_PATH, [] if old_entries == 'file not found' else old_entries,
+                                    entries_to_write)
+        change_journal = journal.load_journal(JOURNAL_PATH)
+        change_id = change_journal.record('Edit Food Dictionary entry' if self.edit_entry_name
+                                          else 'Add Food Dictionary entry', FD_PATH,
+                                          None if old_entries == 'file not found' else old_entries, entries_to_write)
+
+        # Recalculate the log entries based on the edited entry, using their stored amounts. The changed logs are
+        # recorded with the edit, so undoing the edit puts them back too.
+        if self.edit_entry_name and self.propagate_checkbox.isChecked():
+            changed_logs = []
+            data.propagate_fd_entry(LOG_FILES_DIR, entry, old_name=self.edit_entry_name, changed_logs=changed_logs)
+            for path, old_log_entries, new_log_entries in changed_logs:
+                change_journal.record('Edit Food Dictionary entry', path, old_log_entries, new_log_entries,
+                                      group=change_id)
 
         self.fd_win = FoodDictWin()
         self.fd_win.show()
         self.close()
 
 
-class MessageWin(QDialog):
-    """Display a dialog box with an error message determined by the 'key'."""
+class CostAnalyticsWin(QDialog):
+    """Rank the Food Dictionary entries by how much of a nutrient they provide per dollar, such as grams of protein
+    per dollar. Entries without cost info are left out. The user may limit the number of entries shown and filter
+    the entries by their cost per serving.
+    """
 
-    def __init__(self, key, entry_name=None):
+    def __init__(self, geo=None):
         """Constructor.
 
-        :param key: A string that determines which error message is shown to the user.
-        :param entry_name: A string of an entry name. Default is None.
+        :param geo: A QRect() object containing the dimensions and position of the previous window. The current
+            window's dimensions and position are set equal to this value. Default is None.
         """
         super().__init__()
-        self.w = 350
-        self.key = key
-        self.entry_name = entry_name
+        self.geo = geo
         self.init_ui()
 
     def init_ui(self):
-        """Set up UI. Include the error message and an 'ok' button for each dialog."""
-        self.setFixedWidth(self.w)
-        title = "Input Error"
+        """Set up UI. Include input widgets for the metric, the number of entries to show, and the maximum cost per
+        serving, and a table that displays the ranking.
+        """
+        self.setWindowTitle('Food Dictionary Cost Analytics')
+        self.setWindowFlags(Qt.WindowMaximizeButtonHint | Qt.WindowMinimizeButtonHint | Qt.WindowCloseButtonHint)
+        if self.geo:
+            self.setGeometry(self.geo)
+        else:
+            self.w, self.h = data.get_win_size()
+            self.resize(self.w, self.h)
 
-        if self.key == "no name":
-            message = "Please provide a name for the entry."
+        description = QLabel("Choose a measure of cost efficiency to rank the Food Dictionary entries from best to "
+                             "worst value. Only entries with cost info are ranked.", self)
+        description.setWordWrap(True)
+        description.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
 
-        elif self.key == "invalid serving size amount":
-            message = "Please provide a valid serving size amount (10, 3.75, etc.)."
+        self.metric_combobox = QComboBox(self)
+        self.metric_combobox.setFixedSize(220, 27)
+        self.metric_combobox.addItems(list(analytics.COST_EFFICIENCY_METRICS))
+
+        int_validator = QIntValidator()
+        int_validator.setBottom(1)
+        self.top_k_textbox = QLineEdit('25', self)
+        self.top_k_textbox.setFixedSize(60, 27)
+        self.top_k_textbox.setValidator(int_validator)
+
+        double_validator = QDoubleValidator()
+        double_validator.setNotation(QDoubleValidator.StandardNotation)
+        double_validator.setBottom(0)
+        self.max_cost_textbox = QLineEdit(self)
+        self.max_cost_textbox.setFixedSize(60, 27)
+        self.max_cost_textbox.setValidator(double_validator)
+
+        options_layout = QHBoxLayout()
+        options_layout.addWidget(QLabel('Rank by:', self))
+        options_layout.addWidget(self.metric_combobox)
+        options_layout.addWidget(QLabel('Show top:', self))
+        options_layout.addWidget(self.top_k_textbox)
+        options_layout.addWidget(QLabel('Max cost per serving ($):', self))
+        options_layout.addWidget(self.max_cost_textbox)
+        options_layout.addStretch()
+
+        self.ranking_table = QTableWidget(self)
+        self.ranking_table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.ranking_table.setColumnCount(4)
+        self.ranking_table.verticalHeader().setVisible(False)
+
+        self.back_to_fd_win_btn = QPushButton('Back to Food Dictionary', self)
+        self.back_to_fd_win_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.back_to_fd_win_btn.clicked.connect(self.goto_fd_win)
+        self.prices_btn = QPushButton('Prices and spending', self)
+        self.prices_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.prices_btn.clicked.connect(self.goto_prices_win)
 
-        elif self.key == "blank serving":
-            message = 'Please provide a serving size. You may enter up to three, but only one is required.'
+        nav_layout = QHBoxLayout()
+        nav_layout.addWidget(self.back_to_fd_win_btn)
+        nav_layout.addWidget(self.prices_btn)
+        nav_layout.addStretch()
 
-        elif self.key == "invalid fd entry info":
-            message = 'Please either give a valid number for each field (10, 3.75, etc.), or leave the field blank.'
+        main_layout = QVBoxLayout()
+        self.setLayout(main_layout)
+        main_layout.addLayout(nav_layout)
+        main_layout.addWidget(description)
+        main_layout.addLayout(options_layout)
+        main_layout.addWidget(self.ranking_table)
+        main_layout.setSpacing(15)
 
-        elif self.key == "missing cost info":
-            message = "Please provide an amount for both fields in the cost section, or leave both fields blank."
+        self.update_ranking()
+        self.metric_combobox.currentIndexChanged.connect(self.update_ranking)
+        self.top_k_textbox.textEdited.connect(self.update_ranking)
+        self.max_cost_textbox.textEdited.connect(self.update_ranking)
 
-        elif self.key == 'no log entries selected to add':
-            message = "Please select at least one log entry to add."
+        self.setStyleSheet('''
+            QDialog {
+                background-color: rgb(0, 0, 30);
+            }
+            QWidget {
+                font: 14px;
+            }
+            QLabel {
+                color: white;
+            }
+            QHeaderView::section {
+                font: 14px;
+                font-weight: 500;
+                color: black;
+                background-color: rgb(60, 170, 60);
+                border-top: 0px solid black;
+                border-bottom: 1px solid black;
+                border-left: 0px solid black;
+                border-right: 1px solid black;
+            }
+            QTableView {
+                background-color: rgb(200, 200, 255);
+                selection-background-color: rgb(60, 60, 180);
+                selection-color: white;
+                gridline-color: black;
+                font: 14px;
+                font-weight: 500;
+            }
+            QPushButton {
+                color: rgb(255, 255, 255);
+                background-color: rgb(70, 70, 70);
+                border-width: 2px;
+                border-style: outset;
+                border-radius: 5px;
+                border-color: gray;
+                padding: 3px;
+            }
+            QLineEdit {
+                border: 1px solid gray;
+                border-radius: 5px;
+            }
+            QComboBox {
+                border: 1px solid gray;
+                border-radius: 5px;
+            }
+            ''')
 
-        elif self.key == "duplicate log entry":
-            message = (f"There is already an entry for '{self.entry_name}' in the log. Please edit the existing "
-                       f"entry instead of adding a new one.")
+    def update_ranking(self):
+        """Rank the Food Dictionary entries using the current input, then display the ranking in the table."""
+        metric = self.metric_combobox.currentText()
+        top_k_text = self.top_k_textbox.text()
+        top_k = int(top_k_text) if top_k_text else None
+        filters = {}
+        try:
+            max_cost = float(self.max_cost_textbox.text())
+        except ValueError:
+            # Ignore a blank or partially typed limit.
+            pass
+        else:
+            filters['cost'] = [None, max_cost]
+
+        fd_store = store.load_fd_store(FD_PATH)
+        ranking = analytics.get_cost_efficiency_table(fd_store, metric, top_k, filters)
+
+        value_label = analytics.COST_EFFICIENCY_METRICS[metric].capitalize()
+        self.ranking_table.setHorizontalHeaderLabels(['Name', metric, f'{value_label}\nper serving',
+                                                      'Cost per\nserving ($)'])
+        self.ranking_table.setRowCount(len(ranking))
+        for row_num in range(len(ranking)):
+            name, ratio, value, cost = ranking[row_num]
+            for col_num, text in enumerate([name, f'{ratio:.2f}', f'{value:g}', f'{cost:.2f}']):
+                item = QTableWidgetItem(text)
+                item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
+                if col_num:
+                    item.setTextAlignment(Qt.AlignCenter)
+                self.ranking_table.setItem(row_num, col_num, item)
+
+        h_header = self.ranking_table.horizontalHeader()
+        h_header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        h_header.setSectionResizeMode(0, QHeaderView.Stretch)
 
-        elif self.key == "duplicate fd entry":
-            message = ("The entry name you have given matches an existing one found in the Food Dictionary. Please "
-                       "enter a different name or edit the existing entry.")
+    def goto_fd_win(self):
+        """Take the user back to the Food Dictionary window."""
+        current_geo = self.geometry()
+        self.fd_win = FoodDictWin(current_geo)
+        self.fd_win.show()
+        self.close()
 
-        elif self.key == "no selected entries to remove":
-            message = "Please select at least one entry to remove."
+    def goto_prices_win(self):
+        """Take the user to the price history and spending window."""
+        current_geo = self.geometry()
+        self.prices_win = PricesWin(current_geo)
+        self.prices_win.show()
+        self.close()
 
-        elif self.key == "no amount given (log add)":
-            message = "Please provide an amount for each selected entry."
 
-        elif self.key == "no amount given (log edit)":
-            message = ("Please provide an amount for all entries in the table. All entries will be added to the "
-                       "log file regardless of whether or not they are checked.")
+class PricesWin(QDialog):
+    """Show how the cost per serving of the Food Dictionary entries changed over a range of dates, and the spending of
+    each month of the range taken from the logs.
+    """
 
-        elif self.key == "invalid amount":
-            message = "Please provide a valid number for the amounts."
+    def __init__(self, geo=None):
+        """Constructor.
 
-        elif self.key == 'fd entry no longer exists':
-            # When the user tries to edit a log entry whose Food Dictionary entry has been deleted.
-            message = (f"The entry for '{self.entry_name}' has been removed from the Food Dictionary some time after "
-                       f"the creation of this log. The log entry for '{self.entry_name}' is still tallied alongside "
+        :param geo: A QRect() object containing the dimensions and position of the previous window. The current
+            window's dimensions and position are set equal to this value. Default is None.
+        """
+        super().__init__()
+        self.geo = geo
+        self.init_ui()
+
+    def init_ui(self):
+        """Set up UI. Include inputs for the range of dates, a table of the price changes, and a table of the monthly
+        spending.
+        """
+        self.setWindowTitle('Prices and Spending')
+        self.setWindowFlags(Qt.WindowMaximizeButtonHint | Qt.WindowMinimizeButtonHint | Qt.WindowCloseButtonHint)
+        if self.geo:
+            self.setGeometry(self.geo)
+        else:
+            self.w, self.h = data.get_win_size()
+            self.resize(self.w, self.h)
+
+        description = QLabel("Choose a range of dates to see how the cost per serving of each food changed, and how "
+                             "much was spent each month. Prices are recorded whenever a cost is changed in the Food "
+                             "Dictionary, and spending is taken from the logs.", self)
+        description.setWordWrap(True)
+        description.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+
+        self.start_date_edit = QDateEdit(self)
+        self.end_date_edit = QDateEdit(self)
+        for date_edit in [self.start_date_edit, self.end_date_edit]:
+            date_edit.setDisplayFormat('MMM d, yyyy')
+            date_edit.setCalendarPopup(True)
+            date_edit.setFixedSize(140, 27)
+        # Show the last year by default.
+        end_date = datetime.date.today()
+        start_date = end_date.replace(day=1) - datetime.timedelta(days=335)
+        start_date = start_date.replace(day=1)
+        self.start_date_edit.setDate(QDate(start_date.year, start_date.month, start_date.day))
+        self.end_date_edit.setDate(QDate(end_date.year, end_date.month, end_date.day))
+
+        options_layout = QHBoxLayout()
+        options_layout.addWidget(QLabel('From:', self))
+        options_layout.addWidget(self.start_date_edit)
+        options_layout.addWidget(QLabel('To:', self))
+        options_layout.addWidget(self.end_date_edit)
+        options_layout.addStretch()
+
+        self.inflation_label = QLabel(self)
+        self.prices_table = QTableWidget(self)
+        self.prices_table.setColumnCount(4)
+        self.prices_table.setHorizontalHeaderLabels(['Name', 'Cost per serving\nat start ($)',
+                                                     'Cost per serving\nat end ($)', 'Change'])
+        self.spend_label = QLabel(self)
+        self.spend_table = QTableWidget(self)
+        self.spend_table.setColumnCount(4)
+        self.spend_table.setHorizontalHeaderLabels(['Month', 'Spending ($)', 'Logged days', 'Change'])
+        for table in [self.prices_table, self.spend_table]:
+            table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+            table.verticalHeader().setVisible(False)
+            h_header = table.horizontalHeader()
+            h_header.setSectionResizeMode(QHeaderView.ResizeToContents)
+            h_header.setSectionResizeMode(0, QHeaderView.Stretch)
+
+        tables_layout = QGridLayout()
+        tables_layout.addWidget(self.inflation_label, 0, 0)
+        tables_layout.addWidget(self.prices_table, 1, 0)
+        tables_layout.addWidget(self.spend_label, 0, 1)
+        tables_layout.addWidget(self.spend_table, 1, 1)
+
+        self.back_btn = QPushButton('Back to cost analytics', self)
+        self.back_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.back_btn.clicked.connect(self.goto_cost_analytics_win)
+
+        main_layout = QVBoxLayout()
+        self.setLayout(main_layout)
+        main_layout.addWidget(self.back_btn)
+        main_layout.addWidget(description)
+        main_layout.addLayout(options_layout)
+        main_layout.addLayout(tables_layout)
+        main_layout.setSpacing(15)
+
+        self.update_tables()
+        self.start_date_edit.dateChanged.connect(self.update_tables)
+        self.end_date_edit.dateChanged.connect(self.update_tables)
+
+        self.setStyleSheet('''
+            QDialog {
+                background-color: rgb(0, 0, 30);
+            }
+            QWidget {
+                font: 14px;
+            }
+            QLabel {
+                color: white;
+            }
+            QHeaderView::section {
+                font: 14px;
+                font-weight: 500;
+                color: black;
+                background-color: rgb(60, 170, 60);
+                border-top: 0px solid black;
+                border-bottom: 1px solid black;
+                border-left: 0px solid black;
+                border-right: 1px solid black;
+            }
+            QTableView {
+                background-color: rgb(200, 200, 255);
+                selection-background-color: rgb(60, 60, 180);
+                selection-color: white;
+                gridline-color: black;
+                font: 14px;
+                font-weight: 500;
+            }
+            QPushButton {
+                color: rgb(255, 255, 255);
+                background-color: rgb(70, 70, 70);
+                border-width: 2px;
+                border-style: outset;
+                border-radius: 5px;
+                border-color: gray;
+                padding: 3px;
+            }
+            QDateEdit {
+                border: 1px solid gray;
+                border-radius: 5px;
+            }
+            ''')
+
+    def update_tables(self):
+        """Calculate the price changes and monthly spending of the chosen range of dates, then display them."""
+        start_date = self.start_date_edit.date().toPyDate()
+        end_date = self.end_date_edit.date().toPyDate()
+
+        changes = prices.get_price_changes(prices.load_price_history(PRICE_HISTORY_PATH), start_date, end_date)
+        index = prices.get_price_index(changes)
+        self.inflation_label.setText('Price changes' if index is None else
+                                     f'Price changes: {index:+.1f}% across {len(changes)} food(s)')
+        self.fill_table(self.prices_table, [[name, f'{start_price:.3f}', f'{end_price:.3f}', f'{percent:+.1f}%']
+                                            for name, start_price, end_price, percent in changes])
+
+        months = prices.get_monthly_spend(LOG_FILES_DIR, start_date, end_date) if start_date <= end_date else []
+        total_spend = math.fsum(month[2] for month in months)
+        self.spend_label.setText(f'Monthly spending: ${total_spend:.2f} in total')
+        self.fill_table(self.spend_table, [[datetime.date(year, month, 1).strftime('%b %Y'), f'{spend:.2f}',
+                                            str(num_logged), '' if change is None else f'{change:+.1f}%']
+                                           for year, month, spend, num_logged, change in months])
+
+    @staticmethod
+    def fill_table(table, rows):
+        """Display rows of text in a read-only table. Every column but the first is centered."""
+        table.setRowCount(len(rows))
+        for row_num, row in enumerate(rows):
+            for col_num, text in enumerate(row):
+                item = QTableWidgetItem(text)
+                item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
+                if col_num:
+                    item.setTextAlignment(Qt.AlignCenter)
+                table.setItem(row_num, col_num, item)
+
+    def goto_cost_analytics_win(self):
+        """Take the user back to the cost analytics window."""
+        current_geo = self.geometry()
+        self.cost_analytics_win = CostAnalyticsWin(current_geo)
+        self.cost_analytics_win.show()
+        self.close()
+
+
+class RecipesWin(QDialog):
+    """Allow the user to view, add, edit, or remove recipes. A recipe is made of Food Dictionary entries and other
+    recipes, and can be added to a log like any Food Dictionary entry. Its nutrition and cost per serving are
+    calculated from its ingredients, so they stay up to date as the Food Dictionary is edited.
+    """
+
+    def __init__(self, geo=None):
+        """Constructor.
+
+        :param geo: A QRect() object containing the dimensions and position of the previous window. The current
+            window's dimensions and position are set equal to this value. Default is None.
+        """
+        super().__init__()
+        self.geo = geo
+        self.init_ui()
+
+    def init_ui(self):
+        """Set up UI. Include a table that displays each recipe's ingredients and per-serving totals, along with
+        buttons to add, edit, or remove recipes.
+        """
+        self.setWindowTitle('View or Edit Recipes')
+        self.setWindowFlags(Qt.WindowMaximizeButtonHint | Qt.WindowMinimizeButtonHint | Qt.WindowCloseButtonHint)
+        if self.geo:
+            self.setGeometry(self.geo)
+        else:
+            self.w, self.h = data.get_win_size()
+            self.resize(self.w, self.h)
+
+        description = QLabel("Below are your recipes. Each recipe is made of Food Dictionary entries or other "
+                             "recipes, and can be added to a log by the serving. The nutrition and cost of one serving "
+                             "are calculated from the ingredients.", self)
+        description.setWordWrap(True)
+        description.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+
+        self.recipe_table = QTableWidget(self)
+        self.recipe_table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.recipe_table.verticalHeader().setVisible(False)
+
+        self.back_to_fd_win_btn = QPushButton('Back to Food Dictionary', self)
+        self.back_to_fd_win_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.back_to_fd_win_btn.clicked.connect(self.goto_fd_win)
+        self.add_recipe_btn = QPushButton('Add a recipe', self)
+        self.add_recipe_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.add_recipe_btn.setDefault(True)
+        self.add_recipe_btn.clicked.connect(self.add_recipe)
+        self.edit_recipe_btn = QPushButton('Edit selected recipe', self)
+        self.edit_recipe_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.edit_recipe_btn.clicked.connect(self.edit_recipe)
+        self.remove_recipes_btn = QPushButton('Delete selected recipes', self)
+        self.remove_recipes_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.remove_recipes_btn.clicked.connect(self.remove_recipes)
+
+        btn_layout = QHBoxLayout()
+        btn_layout.addWidget(self.remove_recipes_btn)
+        btn_layout.addWidget(self.edit_recipe_btn)
+        btn_layout.addWidget(self.add_recipe_btn)
+
+        main_layout = QVBoxLayout()
+        self.setLayout(main_layout)
+        main_layout.addWidget(self.back_to_fd_win_btn)
+        main_layout.addWidget(description)
+        main_layout.addWidget(self.recipe_table)
+        main_layout.addLayout(btn_layout)
+        main_layout.setSpacing(15)
+
+        book = store.load_recipe_book(RECIPES_PATH, FD_PATH)
+        col_labels = ['Name', 'Servings', 'Ingredients', 'Calories\nper serving', 'Protein (g)\nper serving',
+                      'Cost ($)\nper serving']
+        self.recipe_table.setColumnCount(len(col_labels))
+        self.recipe_table.setHorizontalHeaderLabels(col_labels)
+        self.recipe_table.setRowCount(len(book.names))
+        for row_num in range(len(book.names)):
+            name = book.names[row_num]
+            name_checkbox = QTableWidgetItem(name)
+            name_checkbox.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
+            name_checkbox.setCheckState(Qt.Unchecked)
+            self.recipe_table.setItem(row_num, 0, name_checkbox)
+
+            ingredients_text = '\n'.join(f'{amount} {unit} {ingredient_name}'
+                                         for ingredient_name, amount, unit in book.ingredients[name])
+            try:
+                vector = book.get_vector(name)
+                per_serving = [store.to_str(vector[store.VALUE_INDEX[value_name]])
+                               for value_name in ['calories', 'protein', 'cost']]
+                if per_serving[2]:
+                    per_serving[2] = f'{float(per_serving[2]):.2f}'
+            except (KeyError, store.RecipeCycleError):
+                # An ingredient has been removed from the Food Dictionary or changed its serving sizes.
+                per_serving = ['Missing ingredient', '', '']
+
+            texts = [store.to_str(book.servings[name]), ingredients_text, *per_serving]
+            for col_num in range(1, len(col_labels)):
+                item = QTableWidgetItem(texts[col_num - 1])
+                item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
+                item.setTextAlignment(Qt.AlignCenter)
+                self.recipe_table.setItem(row_num, col_num, item)
+        self.recipe_table.resizeRowsToContents()
+        h_header = self.recipe_table.horizontalHeader()
+        h_header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        h_header.setSectionResizeMode(0, QHeaderView.Stretch)
+
+        self.setStyleSheet('''
+            QDialog {
+                background-color: rgb(0, 0, 30);
+            }
+            QWidget {
+                font: 14px;
+            }
+            QLabel {
+                color: white;
+            }
+            QHeaderView::section {
+                font: 14px;
+                font-weight: 500;
+                color: black;
+                background-color: rgb(60, 170, 60);
+                border-top: 0px solid black;
+                border-bottom: 1px solid black;
+                border-left: 0px solid black;
+                border-right: 1px solid black;
+            }
+            QTableView {
+                background-color: rgb(200, 200, 255);
+                selection-background-color: rgb(60, 60, 180);
+                selection-color: white;
+                gridline-color: black;
+                font: 14px;
+                font-weight: 500;
+            }
+            QPushButton {
+                color: rgb(255, 255, 255);
+                background-color: rgb(70, 70, 70);
+                border-width: 2px;
+                border-style: outset;
+                border-radius: 5px;
+                border-color: gray;
+                padding: 3px;
+            }
+            ''')
+
+    def add_recipe(self):
+        """Allow the user to add a recipe."""
+        if not data.file_exists(FD_PATH):
+            self.mess_win = MessageWin('fd file not found (fd window)')
+            self.mess_win.show()
+            return
+
+        self.edit_recipe_win = EditRecipeWin(geo=self.geometry())
+        self.edit_recipe_win.show()
+        self.close()
+
+    def edit_recipe(self):
+        """Pass the name of the selected recipe to EditRecipeWin. If multiple recipes or none are selected, prompt the
+        user to select only one and try again.
+        """
+        checked_names = data.get_table_entry_names(self.recipe_table)[1]
+        if len(checked_names) != 1:
+            self.mess_win = MessageWin('no single recipe selected')
+            self.mess_win.show()
+            return
+
+        self.edit_recipe_win = EditRecipeWin(checked_names[0], self.geometry())
+        self.edit_recipe_win.show()
+        self.close()
+
+    def remove_recipes(self):
+        """Remove the selected recipes from the recipes file, then display the updated recipes. If other recipes use a
+        selected recipe as an ingredient, tell the user to remove it from those recipes first.
+        """
+        all_names, checked_names, unchecked_names = data.get_table_entry_names(self.recipe_table)
+        if not checked_names:
+            self.mess_win = MessageWin('no selected entries to remove')
+            self.mess_win.show()
+            return
+
+        book = store.load_recipe_book(RECIPES_PATH, FD_PATH)
+        for name in checked_names:
+            for dependent_name in book.dependents.get(name, ()):
+                if dependent_name in unchecked_names:
+                    self.mess_win = MessageWin('recipe in use', entry_name=name)
+                    self.mess_win.show()
+                    return
+
+        with data.file_lock(RECIPES_PATH):
+            data.write_entries(RECIPES_PATH, data.get_entries(RECIPES_PATH, checked_names, match=False))
+        self.recipes_win = RecipesWin(self.geometry())
+        self.recipes_win.show()
+        self.close()
+
+    def goto_fd_win(self):
+        """Take the user back to the Food Dictionary window."""
+        current_geo = self.geometry()
+        self.fd_win = FoodDictWin(current_geo)
+        self.fd_win.show()
+        self.close()
+
+
+class EditRecipeWin(QDialog):
+    """Allow the user to add a recipe or to edit an existing one. The ingredients are chosen from the Food Dictionary
+    entries and the other recipes, each with an amount and unit.
+    """
+
+    def __init__(self, edit_recipe_name=None, geo=None):
+        """Constructor.
+
+        :param edit_recipe_name: A string of the name of the recipe to be edited. Default is None, in which case a
+            new recipe is added.
+        :param geo: A QRect() object containing the dimensions and position of the previous window. The current
+            window's dimensions and position are set equal to this value. Default is None.
+        """
+        super().__init__()
+        self.edit_recipe_name = edit_recipe_name
+        self.geo = geo
+        self.init_ui()
+
+    def init_ui(self):
+        """Set up UI. Include input fields for the recipe name and number of servings, and a table of ingredient
+        options with amount and unit input widgets.
+        """
+        if self.edit_recipe_name:
+            self.setWindowTitle('Edit a Recipe')
+        else:
+            self.setWindowTitle('Add a Recipe')
+        self.setWindowFlags(Qt.WindowMaximizeButtonHint | Qt.WindowMinimizeButtonHint | Qt.WindowCloseButtonHint)
+        if self.geo:
+            self.setGeometry(self.geo)
+        else:
+            self.w, self.h = data.get_win_size()
+            self.resize(self.w, self.h)
+
+        description = QLabel("Give the recipe a name and the number of servings it makes. Then select its "
+                             "ingredients, providing the amount of each along with its unit of measurement, and click "
+                             "'Save recipe'.", self)
+        description.setWordWrap(True)
+        description.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+
+        validator = QDoubleValidator()
+        validator.setNotation(QDoubleValidator.StandardNotation)
+        validator.setBottom(0)
+
+        self.name_textbox = QLineEdit(self)
+        self.name_textbox.setFixedSize(200, 27)
+        self.servings_textbox = QLineEdit(self)
+        self.servings_textbox.setFixedSize(60, 27)
+        self.servings_textbox.setValidator(validator)
+        info_layout = QHBoxLayout()
+        info_layout.addWidget(QLabel('Name', self))
+        info_layout.addWidget(self.name_textbox)
+        info_layout.addWidget(QLabel('Servings', self))
+        info_layout.addWidget(self.servings_textbox)
+        info_layout.addStretch()
+
+        book = store.load_recipe_book(RECIPES_PATH, FD_PATH)
+        old_ingredients = {}  # {ingredient_name: [amount, unit]}
+        if self.edit_recipe_name:
+            self.name_textbox.setText(self.edit_recipe_name)
+            self.servings_textbox.setText(store.to_str(book.servings[self.edit_recipe_name]))
+            for ingredient_name, amount, unit in book.ingredients[self.edit_recipe_name]:
+                old_ingredients[ingredient_name] = [amount, unit]
+
+        # Every FD entry and recipe may be an ingredient, except for the recipe being edited.
+        ingredient_names = [name for name in store.get_loggable_names(FD_PATH, RECIPES_PATH)
+                            if name != self.edit_recipe_name]
+        self.ingredient_table = QTableWidget(self)
+        self.ingredient_table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.ingredient_table.setColumnCount(3)
+        self.ingredient_table.setHorizontalHeaderLabels(['Name', 'Amount', 'Weight/Volume'])
+        self.ingredient_table.setRowCount(len(ingredient_names))
+        for i in range(len(ingredient_names)):
+            self.ingredient_table.setRowHeight(i, 40)
+            name_checkbox = QTableWidgetItem(ingredient_names[i])
+            name_checkbox.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
+            name_checkbox.setCheckState(Qt.Checked if ingredient_names[i] in old_ingredients else Qt.Unchecked)
+            self.ingredient_table.setItem(i, 0, name_checkbox)
+
+            # As in EditLogWin, the input widgets are placed in a layout to center them vertically within the cell.
+            amount_textbox = QLineEdit(self)
+            amount_textbox.setValidator(validator)
+            amount_textbox.setFixedSize(50, 27)
+            amount_textbox.setAlignment(Qt.AlignCenter)
+            amount_w = QWidget()
+            amount_layout = QHBoxLayout()
+            amount_w.setLayout(amount_layout)
+            amount_layout.addWidget(amount_textbox)
+            self.ingredient_table.setCellWidget(i, 1, amount_w)
+
+            combobox = QComboBox()
+            combobox.setFixedSize(90, 27)
+            combobox.addItems(store.get_unit_options(FD_PATH, ingredient_names[i]))
+            unit_w = QWidget()
+            unit_layout = QHBoxLayout()
+            unit_w.setLayout(unit_layout)
+            unit_layout.addWidget(combobox)
+            self.ingredient_table.setCellWidget(i, 2, unit_w)
+
+            if ingredient_names[i] in old_ingredients:
+                amount_textbox.setText(old_ingredients[ingredient_names[i]][0])
+                combobox.setCurrentText(old_ingredients[ingredient_names[i]][1])
+
+        h_header = self.ingredient_table.horizontalHeader()
+        h_header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        h_header.setSectionResizeMode(0, QHeaderView.Stretch)
+
+        self.back_to_recipes_win_btn = QPushButton('Cancel', self)
+        self.back_to_recipes_win_btn.setFixedSize(100, 27)
+        self.back_to_recipes_win_btn.clicked.connect(self.goto_recipes_win)
+        self.save_btn = QPushButton('Save recipe', self)
+        self.save_btn.setFixedSize(100, 27)
+        self.save_btn.setDefault(True)
+        self.save_btn.clicked.connect(self.save_recipe)
+        btn_layout = QHBoxLayout()
+        btn_layout.addStretch()
+        btn_layout.addWidget(self.back_to_recipes_win_btn)
+        btn_layout.addWidget(self.save_btn)
+
+        main_layout = QVBoxLayout()
+        self.setLayout(main_layout)
+        main_layout.addWidget(description)
+        main_layout.addLayout(info_layout)
+        main_layout.addWidget(self.ingredient_table)
+        main_layout.addLayout(btn_layout)
+
+        self.setStyleSheet('''
+            QDialog {
+                background-color: rgb(0, 0, 30);
+            }
+            QWidget {
+                font: 14px;
+            }
+            QLabel {
+                color: white;
+            }
+            QHeaderView::section {
+                font: 14px;
+                font-weight: 500;
+                color: black;
+                background-color: rgb(60, 170, 60);
+                border-top: 0px solid black;
+                border-bottom: 1px solid black;
+                border-left: 0px solid black;
+                border-right: 1px solid black;
+            }
+            QTableView {
+                background-color: rgb(200, 200, 255);
+                gridline-color: black;
+                font: 14px;
+                font-weight: 500;
+            }
+            QPushButton {
+                color: rgb(255, 255, 255);
+                background-color: rgb(70, 70, 70);
+                border-width: 2px;
+                border-style: outset;
+                border-radius: 5px;
+                border-color: gray;
+                padding: 3px;
+            }
+            QLineEdit {
+                border: 1px solid gray;
+                border-radius: 5px;
+            }
+            QComboBox {
+                border: 1px solid gray;
+                border-radius: 5px;
+            }
+            ''')
+
+    def save_recipe(self):
+        """Validate the user's input and write the recipe to the recipes file, replacing the original recipe if it is
+        being edited. If the input is invalid or insufficient, or if the recipe would contain itself through one of
+        its ingredients, display an error message. Once complete, take the user back to the recipes window.
+        """
+        name = self.name_textbox.text()
+        if not name:
+            self.mess_win = MessageWin('no name')
+            self.mess_win.show()
+            return
+
+        book = store.load_recipe_book(RECIPES_PATH, FD_PATH)
+        if name != self.edit_recipe_name and (name in book or name in store.load_fd_store(FD_PATH)):
+            self.mess_win = MessageWin('duplicate recipe')
+            self.mess_win.show()
+            return
+
+        try:
+            servings = float(self.servings_textbox.text())
+        except ValueError:
+            servings = 0
+        if servings <= 0:
+            self.mess_win = MessageWin('invalid recipe servings')
+            self.mess_win.show()
+            return
+
+        ingredient_names = data.get_table_entry_names(self.ingredient_table)[1]
+        if not ingredient_names:
+            self.mess_win = MessageWin('no recipe ingredients')
+            self.mess_win.show()
+            return
+
+        amounts = data.get_edit_log_amounts(self.ingredient_table, checked=True)  # [[amount1, unit1], ...]
+        for amount, unit in amounts:
+            try:
+                float(amount)
+            except ValueError:
+                self.mess_win = MessageWin('invalid amount')
+                self.mess_win.show()
+                return
+        ingredients = [[ingredient_names[i], *amounts[i]] for i in range(len(ingredient_names))]
+
+        # The recipe can't be an ingredient of any of its ingredients.
+        if book.find_cycle(name, ingredients) or (self.edit_recipe_name and name != self.edit_recipe_name
+                                                  and book.find_cycle(self.edit_recipe_name, ingredients)):
+            self.mess_win = MessageWin('recipe cycle')
+            self.mess_win.show()
+            return
+
+        with data.file_lock(RECIPES_PATH):
+            entries_to_write = data.get_entries(RECIPES_PATH, [self.edit_recipe_name or name], match=False)
+            if entries_to_write == 'file not found':
+                os.makedirs(os.path.dirname(RECIPES_PATH), exist_ok=True)
+                entries_to_write = []
+            if self.edit_recipe_name and name != self.edit_recipe_name:
+                # Other recipes that use the recipe as an ingredient refer to it by its new name.
+                for entry in entries_to_write:
+                    entry[1] = str([[name if ingredient[0] == self.edit_recipe_name else ingredient[0],
+                                     *ingredient[1:]] for ingredient in ast.literal_eval(entry[1])])
+            entries_to_write.append([name, str(ingredients), store.to_str(servings)])
+            entries_to_write.sort()
+            data.write_entries(RECIPES_PATH, entries_to_write)
+
+        self.goto_recipes_win()
+
+    def goto_recipes_win(self):
+        """Take the user to the recipes window."""
+        self.recipes_win = RecipesWin(self.geometry())
+        self.recipes_win.show()
+        self.close()
+
+
+class GoalsWin(QDialog):
+    """Allow the user to set a daily minimum, maximum, or both for any nutrient or for spending, and show how many
+    days in a row each goal has been met.
+    """
+
+    def __init__(self, date, geo=None):
+        """Constructor.
+
+        :param date: A datetime.date object of the log to return to.
+        :param geo: A QRect() object containing the dimensions and position of the previous window. The current
+            window's dimensions and position are set equal to this value. Default is None.
+        """
+        super().__init__()
+        self.date = date
+        self.geo = geo
+        self.init_ui()
+
+    def init_ui(self):
+        """Set up UI. Include a table with a minimum and maximum input for each value, alongside the current and
+        longest streaks of days on which the goal was met.
+        """
+        self.setWindowTitle('Daily Goals')
+        self.setWindowFlags(Qt.WindowMaximizeButtonHint | Qt.WindowMinimizeButtonHint | Qt.WindowCloseButtonHint)
+        if self.geo:
+            self.setGeometry(self.geo)
+        else:
+            self.w, self.h = data.get_win_size()
+            self.resize(self.w, self.h)
+
+        description = QLabel("Set a daily minimum, maximum, or both for any nutrient or for spending, then click "
+                             "'Save goals'. Leave both blank for no goal. A streak is the number of logged days in a "
+                             "row on which the goal was met. A monthly budget is shown against the spending of each "
+                             "month in the log window.", self)
+        description.setWordWrap(True)
+        description.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+
+        self.goals_table = QTableWidget(self)
+        self.goals_table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.goals_table.setRowCount(len(goals.GOAL_NAMES))
+        self.goals_table.setColumnCount(5)
+        self.goals_table.setHorizontalHeaderLabels(['Name', 'Daily\nminimum', 'Daily\nmaximum', 'Current\nstreak',
+                                                    'Longest\nstreak'])
+        self.goals_table.verticalHeader().setVisible(False)
+
+        self.all_goals_label = QLabel(self)
+
+        double_validator = QDoubleValidator()
+        double_validator.setNotation(QDoubleValidator.StandardNotation)
+        double_validator.setBottom(0)
+        self.budget_textbox = QLineEdit(self)
+        self.budget_textbox.setFixedSize(100, 27)
+        self.budget_textbox.setValidator(double_validator)
+        monthly_budget = goals.load_monthly_budget(GOALS_PATH)
+        if monthly_budget is not None:
+            self.budget_textbox.setText(data.format_fixed(monthly_budget, pad=True))
+
+        self.save_btn = QPushButton('Save goals', self)
+        self.save_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.save_btn.clicked.connect(self.save_goals)
+        self.back_to_log_win_btn = QPushButton('Back to logs', self)
+        self.back_to_log_win_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.back_to_log_win_btn.clicked.connect(self.goto_log_win)
+
+        btn_layout = QHBoxLayout()
+        btn_layout.addWidget(self.all_goals_label)
+        btn_layout.addStretch()
+        btn_layout.addWidget(QLabel('Monthly budget ($):', self))
+        btn_layout.addWidget(self.budget_textbox)
+        btn_layout.addWidget(self.save_btn)
+
+        main_layout = QVBoxLayout()
+        self.setLayout(main_layout)
+        main_layout.addWidget(self.back_to_log_win_btn)
+        main_layout.addWidget(description)
+        main_layout.addWidget(self.goals_table)
+        main_layout.addLayout(btn_layout)
+        main_layout.setSpacing(15)
+
+        current_goals = goals.load_goals(GOALS_PATH)
+        for row_index, name in enumerate(goals.GOAL_NAMES):
+            name_item = QTableWidgetItem(goals.get_goal_label(name))
+            name_item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
+            self.goals_table.setItem(row_index, 0, name_item)
+            for col_index, limit in enumerate(current_goals.get(name, [None, None]), 1):
+                # The limits are edited in place.
+                limit_item = QTableWidgetItem('' if limit is None else data.format_fixed(limit, pad=(name == 'cost')))
+                limit_item.setTextAlignment(Qt.AlignCenter)
+                self.goals_table.setItem(row_index, col_index, limit_item)
+        self.show_streaks(current_goals)
+
+        h_header = self.goals_table.horizontalHeader()
+        h_header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        h_header.setSectionResizeMode(0, QHeaderView.Stretch)
+
+        self.setStyleSheet('''
+            QDialog {
+                background-color: rgb(0, 0, 30);
+            }
+            QWidget {
+                font: 14px;
+            }
+            QLabel {
+                color: white;
+            }
+            QHeaderView::section {
+                font: 14px;
+                font-weight: 500;
+                color: white;
+                background-color: rgb(90, 90, 180);
+                border-top: 0px solid black;
+                border-bottom: 1px solid black;
+                border-left: 0px solid black;
+                border-right: 1px solid black;
+            }
+            QTableView {
+                background-color: rgb(200, 200, 255);
+                selection-background-color: rgb(60, 180, 60);
+                selection-color: black;
+                gridline-color: black;
+                font: 14px;
+                font-weight: 500;
+            }
+            QPushButton {
+                color: rgb(255, 255, 255);
+                background-color: rgb(70, 70, 70);
+                border-width: 2px;
+                border-style: outset;
+                border-radius: 5px;
+                border-color: gray;
+                padding: 3px;
+            }
+            ''')
+
+    def show_streaks(self, current_goals):
+        """Display the current and longest streak of each goal, and of all goals at once.
+
+        :param current_goals: A dictionary of goals, as returned by goals.load_goals().
+        """
+        streaks = goals.get_streaks(LOG_FILES_DIR, current_goals)
+        for row_index, name in enumerate(goals.GOAL_NAMES):
+            for col_index, days in enumerate(streaks.get(name, ['', '']), 3):
+                streak_item = QTableWidgetItem(str(days))
+                streak_item.setTextAlignment(Qt.AlignCenter)
+                streak_item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
+                self.goals_table.setItem(row_index, col_index, streak_item)
+        if current_goals:
+            current, longest = streaks[None]
+            self.all_goals_label.setText(f'All goals met: {current} day(s) in a row, {longest} at most.')
+        else:
+            self.all_goals_label.setText('')
+
+    def save_goals(self):
+        """Save the goals from the table and the monthly budget. If a limit or the budget isn't a valid number, or a
+        minimum is above its maximum, alert the user.
+        """
+        new_goals = {}
+        for row_index, name in enumerate(goals.GOAL_NAMES):
+            limits = []
+            for col_index in (1, 2):
+                text = self.goals_table.item(row_index, col_index).text().strip()
+                try:
+                    limits.append(data.to_fixed(text) if text else None)
+                except decimal.InvalidOperation:
+                    limits.append('invalid')
+            if 'invalid' in limits or any(limit is not None and limit < 0 for limit in limits) or \
+                    (None not in limits and limits[0] > limits[1]):
+                self.mess_win = MessageWin('invalid goal', entry_name=goals.get_goal_label(name))
+                self.mess_win.show()
+                return
+            if limits != [None, None]:
+                new_goals[name] = limits
+
+        budget_text = self.budget_textbox.text().strip()
+        try:
+            monthly_budget = data.to_fixed(budget_text) if budget_text else None
+        except decimal.InvalidOperation:
+            monthly_budget = -1
+        if monthly_budget is not None and monthly_budget < 0:
+            self.mess_win = MessageWin('invalid goal', entry_name='Monthly budget')
+            self.mess_win.show()
+            return
+
+        goals.write_goals(GOALS_PATH, new_goals, monthly_budget)
+        self.show_streaks(new_goals)
+
+    def goto_log_win(self):
+        """Take the user back to the log window."""
+        current_geo = self.geometry()
+        self.log_win = LogWin(self.date, current_geo)
+        self.log_win.show()
+        self.close()
+
+
+class TrendChart(QWidget):
+    """Line chart of one value of a daily series. Drag the chart to pan, and scroll to zoom.
+
+    The series is downsampled to the width of the chart before it is drawn, so a chart of years of days draws about
+    two points per pixel column no matter how many days are shown. A rolling average may be drawn over the daily
+    totals, and the mean of the visible days is shown above them.
+    """
+
+    # Space around the plot for the axis labels, in pixels.
+    MARGINS = [70, 15, 20, 35]  # left, top, right, bottom
+
+    def __init__(self, parent=None):
+        """Constructor.
+
+        :param parent: The parent widget. Default is None.
+        """
+        super().__init__(parent)
+        self.series = None
+        self.stats = None
+        self.value_name = 'calories'
+        self.average_window = 0
+        self.averages = array('d')
+        self.averaged = array('b')  # 1 for each day with a rolling average.
+        self.view_start = 0
+        self.view_end = 0
+        self.drag_x = None
+        self.points = []  # The [day, value] points drawn by the last paint.
+        self.setMinimumSize(400, 250)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+
+    def set_series(self, stats, value_name):
+        """Chart one value of a daily series.
+
+        :param stats: An analytics.SeriesStats object of the daily series.
+        :param value_name: A key of store.VALUE_INDEX, such as 'protein' or 'cost'.
+        """
+        self.stats = stats
+        self.series = stats.series
+        self.value_name = value_name
+        self.set_average_window(self.average_window)
+
+    def set_average_window(self, window):
+        """Draw the rolling average of the charted value over the given number of days, or no average if 0."""
+        self.average_window = window
+        means = self.stats.get_rolling_means(self.value_name, window) if window else []
+        self.averages = array('d', [0.0 if mean is None else mean for mean in means])
+        self.averaged = array('b', [mean is not None for mean in means])
+        self.update()
+
+    def set_view(self, start, end):
+        """Show a range of days of the series. The range is kept within the series and is at least one week long.
+
+        :param start: The position of the first day shown. It may be fractional.
+        :param end: The position after the last day shown. It may be fractional.
+        """
+        if self.series is None:
+            return
+        span = min(max(end - start, 7), max(len(self.series), 7))
+        start = min(max(start, 0), max(len(self.series) - span, 0))
+        self.view_start, self.view_end = start, start + span
+        self.update()
+
+    def plot_width(self):
+        """Return the width of the plot area in pixels."""
+        return max(self.width() - self.MARGINS[0] - self.MARGINS[2], 1)
+
+    def paintEvent(self, event):
+        """Draw the axes and the downsampled line of the visible days."""
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(self.rect(), QColor(200, 200, 255))
+        if self.series is None:
+            painter.end()
+            return
+        left, top, right, bottom = self.MARGINS
+        width = self.plot_width()
+        height = max(self.height() - top - bottom, 1)
+
+        view_start, view_end = int(self.view_start), math.ceil(self.view_end)
+        self.points = analytics.downsample_min_max(self.series.get_column(self.value_name), self.series.logged,
+                                                   view_start, view_end, width)
+        average_points = analytics.downsample_min_max(self.averages, self.averaged, view_start, view_end, width)
+        y_max = max([value for day, value in self.points] + [0]) * 1.1 or 1
+        y_min = min([value for day, value in self.points] + [0])
+        span = self.view_end - self.view_start or 1
+
+        # Axes, with labels for the top and bottom of the value axis and the first and last dates.
+        painter.setPen(QPen(Qt.black, 1))
+        painter.drawLine(left, top, left, top + height)
+        painter.drawLine(left, top + height, left + width, top + height)
+        painter.drawText(0, top - 5, left - 8, 20, Qt.AlignRight, data.format_fixed(round(y_max * 100)))
+        painter.drawText(0, top + height - 10, left - 8, 20, Qt.AlignRight, data.format_fixed(round(y_min * 100)))
+        if len(self.series):
+            first_date = self.series.get_date(int(self.view_start))
+            last_date = self.series.get_date(max(math.ceil(self.view_end) - 1, 0))
+            painter.drawText(left, top + height + 5, 120, 20, Qt.AlignLeft, first_date.strftime('%b %d, %Y'))
+            painter.drawText(left + width - 120, top + height + 5, 120, 20, Qt.AlignRight,
+                             last_date.strftime('%b %d, %Y'))
+        mean = self.stats.get_mean(self.value_name, view_start, view_end)
+        if mean is not None:
+            num_logged = self.stats.get_num_logged(view_start, view_end)
+            painter.drawText(left + 10, top, width - 20, 20, Qt.AlignRight,
+                             f'Mean of {data.format_fixed(round(mean * 100))} over {num_logged} logged day(s)')
+
+        for points, color in [[self.points, QColor(60, 60, 180)], [average_points, QColor(220, 110, 0)]]:
+            polygon = QPolygonF([QPointF(left + (day + 0.5 - self.view_start) / span * width,
+                                         top + height - (value - y_min) / (y_max - y_min) * height)
+                                 for day, value in points])
+            painter.setPen(QPen(color, 2))
+            painter.drawPolyline(polygon)
+        painter.end()
+
+    def mousePressEvent(self, event):
+        self.drag_x = event.x()
+
+    def mouseMoveEvent(self, event):
+        """Pan the chart by the distance the mouse was dragged."""
+        if self.drag_x is None:
+            return
+        days_per_pixel = (self.view_end - self.view_start) / self.plot_width()
+        shift = (self.drag_x - event.x()) * days_per_pixel
+        self.drag_x = event.x()
+        self.set_view(self.view_start + shift, self.view_end + shift)
+
+    def mouseReleaseEvent(self, event):
+        self.drag_x = None
+
+    def wheelEvent(self, event):
+        """Zoom in or out around the mouse position."""
+        factor = 0.8 if event.angleDelta().y() > 0 else 1.25
+        fraction = min(max((event.x() - self.MARGINS[0]) / self.plot_width(), 0), 1)
+        span = self.view_end - self.view_start
+        anchor = self.view_start + fraction * span
+        self.set_view(anchor - fraction * span * factor, anchor + (1 - fraction) * span * factor)
+
+
+class TrendsWin(QDialog):
+    """Chart the daily totals of any nutrient or of spending over a range of days."""
+
+    def __init__(self, date, geo=None):
+        """Constructor.
+
+        :param date: A datetime.date object of the log to return to.
+        :param geo: A QRect() object containing the dimensions and position of the previous window. The current
+            window's dimensions and position are set equal to this value. Default is None.
+        """
+        super().__init__()
+        self.date = date
+        self.geo = geo
+        self.init_ui()
+
+    def init_ui(self):
+        """Set up UI. Include inputs for the charted value and the range of dates, and the chart itself."""
+        self.setWindowTitle('Trends')
+        self.setWindowFlags(Qt.WindowMaximizeButtonHint | Qt.WindowMinimizeButtonHint | Qt.WindowCloseButtonHint)
+        if self.geo:
+            self.setGeometry(self.geo)
+        else:
+            self.w, self.h = data.get_win_size()
+            self.resize(self.w, self.h)
+
+        description = QLabel("Choose a value and a range of dates to chart the daily totals. Drag the chart to move "
+                             "through time, and scroll to zoom in or out. Days without a log are skipped, "
+                             "and averages are per logged day.", self)
+        description.setWordWrap(True)
+        description.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+
+        self.value_combobox = QComboBox(self)
+        self.value_combobox.setFixedSize(220, 27)
+        for name in goals.GOAL_NAMES:
+            self.value_combobox.addItem(goals.get_goal_label(name), name)
+
+        # Every day from the first log to the later of the last log and the chosen date is loaded once.
+        self.series = analytics.get_daily_series(LOG_FILES_DIR)
+        if not len(self.series) or self.series.get_date(len(self.series) - 1) < self.date:
+            start_date = min(self.series.start_date or self.date, self.date)
+            self.series = analytics.get_daily_series(LOG_FILES_DIR, start_date, self.date)
+        self.stats = analytics.SeriesStats(self.series)
+
+        self.average_combobox = QComboBox(self)
+        self.average_combobox.setFixedSize(160, 27)
+        for label, window in [['No average', 0], ['7-day average', 7], ['30-day average', 30]]:
+            self.average_combobox.addItem(label, window)
+
+        self.start_date_edit = QDateEdit(self)
+        self.end_date_edit = QDateEdit(self)
+        for date_edit in [self.start_date_edit, self.end_date_edit]:
+            date_edit.setDisplayFormat('MMM d, yyyy')
+            date_edit.setCalendarPopup(True)
+            date_edit.setFixedSize(140, 27)
+        # Show the 90 days up to the chosen date by default.
+        end_date = self.date
+        start_date = max(end_date - datetime.timedelta(days=89), self.series.start_date)
+        self.start_date_edit.setDate(QDate(start_date.year, start_date.month, start_date.day))
+        self.end_date_edit.setDate(QDate(end_date.year, end_date.month, end_date.day))
+
+        options_layout = QHBoxLayout()
+        options_layout.addWidget(QLabel('Chart:', self))
+        options_layout.addWidget(self.value_combobox)
+        options_layout.addWidget(QLabel('From:', self))
+        options_layout.addWidget(self.start_date_edit)
+        options_layout.addWidget(QLabel('To:', self))
+        options_layout.addWidget(self.end_date_edit)
+        options_layout.addWidget(self.average_combobox)
+        options_layout.addStretch()
+
+        self.chart = TrendChart(self)
+        self.chart.set_series(self.stats, self.value_combobox.currentData())
+
+        self.back_to_log_win_btn = QPushButton('Back to logs', self)
+        self.back_to_log_win_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.back_to_log_win_btn.clicked.connect(self.goto_log_win)
+
+        main_layout = QVBoxLayout()
+        self.setLayout(main_layout)
+        main_layout.addWidget(self.back_to_log_win_btn)
+        main_layout.addWidget(description)
+        main_layout.addLayout(options_layout)
+        main_layout.addWidget(self.chart)
+        main_layout.setSpacing(15)
+
+        self.update_range()
+        self.value_combobox.currentIndexChanged.connect(self.update_value)
+        self.average_combobox.currentIndexChanged.connect(self.update_average)
+        self.start_date_edit.dateChanged.connect(self.update_range)
+        self.end_date_edit.dateChanged.connect(self.update_range)
+
+        self.setStyleSheet('''
+            QDialog {
+                background-color: rgb(0, 0, 30);
+            }
+            QWidget {
+                font: 14px;
+            }
+            QLabel {
+                color: white;
+            }
+            QPushButton {
+                color: rgb(255, 255, 255);
+                background-color: rgb(70, 70, 70);
+                border-width: 2px;
+                border-style: outset;
+                border-radius: 5px;
+                border-color: gray;
+                padding: 3px;
+            }
+            QComboBox, QDateEdit {
+                border: 1px solid gray;
+                border-radius: 5px;
+            }
+            ''')
+
+    def update_value(self):
+        """Chart the chosen value."""
+        self.chart.set_series(self.stats, self.value_combobox.currentData())
+
+    def update_average(self):
+        """Draw the chosen rolling average."""
+        self.chart.set_average_window(self.average_combobox.currentData())
+
+    def update_range(self):
+        """Show the chosen range of dates in the chart."""
+        start_date = self.start_date_edit.date().toPyDate()
+        end_date = self.end_date_edit.date().toPyDate()
+        self.chart.set_view(self.series.get_day(start_date), self.series.get_day(end_date) + 1)
+
+    def goto_log_win(self):
+        """Take the user back to the log window."""
+        current_geo = self.geometry()
+        self.log_win = LogWin(self.date, current_geo)
+        self.log_win.show()
+        self.close()
+
+
+class CalendarHeatmap(QWidget):
+    """Calendar of one year, one column per week and one row per weekday, with each logged day shaded by one of its
+    totals. Days without a log are grey. Click a day to open its log.
+
+    The days are drawn from a daily series of the year, so drawing a year doesn't look up any log file.
+    """
+
+    # Space around the days for the month and weekday labels, in pixels.
+    MARGINS = [40, 25, 10, 10]  # left, top, right, bottom
+
+    # Colors of days without a log, and of logged days with a total of zero and with the highest total of the year.
+    EMPTY_COLOR = QColor(225, 225, 225)
+    LOW_COLOR = QColor(200, 215, 255)
+    HIGH_COLOR = QColor(20, 40, 160)
+
+    # Emitted with the datetime.date object of a day when it is clicked.
+    date_clicked = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        """Constructor.
+
+        :param parent: The parent widget. Default is None.
+        """
+        super().__init__(parent)
+        self.series = None
+        self.value_name = 'calories'
+        self.max_value = 0
+        self.setMinimumSize(600, 170)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.setMouseTracking(True)
+
+    def set_series(self, series, value_name):
+        """Shade the days of a year by one value.
+
+        :param series: An analytics.DailySeries object starting on January 1st of the year.
+        :param value_name: A key of store.VALUE_INDEX, such as 'calories' or 'cost'.
+        """
+        self.series = series
+        self.value_name = value_name
+        column = series.get_column(value_name)
+        self.max_value = max([value for value, logged in zip(column, series.logged) if logged] + [0])
+        self.update()
+
+    def cell_size(self):
+        """Return the width and height of a day's square in pixels."""
+        left, top, right, bottom = self.MARGINS
+        return max(min((self.width() - left - right) / 54, (self.height() - top - bottom) / 7), 1)
+
+    def get_cell(self, day):
+        """Return the [column, row] of a day of the series: its week of the year and its weekday."""
+        return [(day + self.series.start_date.weekday()) // 7, self.series.get_date(day).weekday()]
+
+    def get_day_at(self, x, y):
+        """Return the day of the series under a point of the widget, or None if there is no day there."""
+        if self.series is None:
+            return None
+        size = self.cell_size()
+        column = math.floor((x - self.MARGINS[0]) / size)
+        row = math.floor((y - self.MARGINS[1]) / size)
+        if not 0 <= row < 7:
+            return None
+        day = column * 7 + row - self.series.start_date.weekday()
+        return day if 0 <= day < len(self.series) else None
+
+    def get_color(self, day):
+        """Return the QColor of a day: grey if it has no log, and darker the higher its total."""
+        if not self.series.logged[day]:
+            return self.EMPTY_COLOR
+        fraction = self.series.get_column(self.value_name)[day] / self.max_value if self.max_value > 0 else 1
+        fraction = min(max(fraction, 0), 1)
+        return QColor(*[round(low + (high - low) * fraction) for low, high in
+                        zip(self.LOW_COLOR.getRgb()[:3], self.HIGH_COLOR.getRgb()[:3])])
+
+    def paintEvent(self, event):
+        """Draw the month and weekday labels and a square for every day of the year."""
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(255, 255, 255))
+        if self.series is None:
+            painter.end()
+            return
+        left, top = self.MARGINS[:2]
+        size = self.cell_size()
+        painter.setPen(QPen(Qt.black, 1))
+        for row, weekday in [[0, 'Mon'], [2, 'Wed'], [4, 'Fri']]:
+            painter.drawText(QRectF(0, top + row * size, left - 5, size), Qt.AlignRight | Qt.AlignVCenter, weekday)
+        for day in range(len(self.series)):
+            date = self.series.get_date(day)
+            column, row = self.get_cell(day)
+            if date.day == 1:
+                painter.setPen(QPen(Qt.black, 1))
+                painter.drawText(QRectF(left + column * size, 0, 4 * size, top), Qt.AlignLeft | Qt.AlignVCenter,
+                                 date.strftime('%b'))
+            painter.fillRect(QRectF(left + column * size + 1, top + row * size + 1, size - 2, size - 2),
+                             self.get_color(day))
+        painter.end()
+
+    def mouseMoveEvent(self, event):
+        """Show the date and total of the day under the mouse."""
+        day = self.get_day_at(event.x(), event.y())
+        if day is None:
+            self.setToolTip('')
+            return
+        text = self.series.get_date(day).strftime('%b %d, %Y')
+        if self.series.logged[day]:
+            value = round(self.series.get_column(self.value_name)[day] * data.FIXED_SCALE)
+            text += f': {data.format_fixed(value, self.value_name == "cost")}'
+        self.setToolTip(text)
+
+    def mouseReleaseEvent(self, event):
+        """Open the log of the clicked day."""
+        day = self.get_day_at(event.x(), event.y())
+        if event.button() == Qt.LeftButton and day is not None:
+            self.date_clicked.emit(self.series.get_date(day))
+
+
+class CalendarWin(QDialog):
+    """Show which days of a year have a log, shaded by their calories, spending or any other total, and open the log
+    of any day.
+    """
+
+    def __init__(self, date, geo=None):
+        """Constructor.
+
+        :param date: A datetime.date object of the log to return to. Its year is shown first.
+        :param geo: A QRect() object containing the dimensions and position of the previous window. The current
+            window's dimensions and position are set equal to this value. Default is None.
+        """
+        super().__init__()
+        self.date = date
+        self.year = date.year
+        self.geo = geo
+        self.init_ui()
+
+    def init_ui(self):
+        """Set up UI. Include inputs for the year and the shaded value, and the calendar itself."""
+        self.setWindowTitle('Calendar')
+        self.setWindowFlags(Qt.WindowMaximizeButtonHint | Qt.WindowMinimizeButtonHint | Qt.WindowCloseButtonHint)
+        if self.geo:
+            self.setGeometry(self.geo)
+        else:
+            self.w, self.h = data.get_win_size()
+            self.resize(self.w, self.h)
+
+        description = QLabel("Days with a log are shaded by the chosen total, darker for higher totals. Days without "
+                             "a log are grey. Click a day to open its log.", self)
+        description.setWordWrap(True)
+        description.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+
+        self.value_combobox = QComboBox(self)
+        self.value_combobox.setFixedSize(220, 27)
+        for name in goals.GOAL_NAMES:
+            self.value_combobox.addItem(goals.get_goal_label(name), name)
+
+        self.prev_year_btn = QPushButton('<', self)
+        self.prev_year_btn.setFixedSize(30, 27)
+        self.year_label = QLabel(self)
+        self.next_year_btn = QPushButton('>', self)
+        self.next_year_btn.setFixedSize(30, 27)
+        self.summary_label = QLabel(self)
+
+        options_layout = QHBoxLayout()
+        options_layout.addWidget(self.prev_year_btn)
+        options_layout.addWidget(self.year_label)
+        options_layout.addWidget(self.next_year_btn)
+        options_layout.addWidget(QLabel('Shade by:', self))
+        options_layout.addWidget(self.value_combobox)
+        options_layout.addWidget(self.summary_label)
+        options_layout.addStretch()
+
+        self.heatmap = CalendarHeatmap(self)
+        self.heatmap.date_clicked.connect(self.goto_log_win)
+
+        self.back_to_log_win_btn = QPushButton('Back to logs', self)
+        self.back_to_log_win_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.back_to_log_win_btn.clicked.connect(lambda: self.goto_log_win(self.date))
+
+        main_layout = QVBoxLayout()
+        self.setLayout(main_layout)
+        main_layout.addWidget(self.back_to_log_win_btn)
+        main_layout.addWidget(description)
+        main_layout.addLayout(options_layout)
+        main_layout.addWidget(self.heatmap)
+        main_layout.addStretch()
+        main_layout.setSpacing(15)
+
+        self.update_year()
+        self.prev_year_btn.clicked.connect(lambda: self.change_year(-1))
+        self.next_year_btn.clicked.connect(lambda: self.change_year(1))
+        self.value_combobox.currentIndexChanged.connect(self.update_value)
+
+        self.setStyleSheet('''
+            QDialog {
+                background-color: rgb(0, 0, 30);
+            }
+            QWidget {
+                font: 14px;
+            }
+            QLabel {
+                color: white;
+            }
+            QPushButton {
+                color: rgb(255, 255, 255);
+                background-color: rgb(70, 70, 70);
+                border-width: 2px;
+                border-style: outset;
+                border-radius: 5px;
+                border-color: gray;
+                padding: 3px;
+            }
+            QComboBox {
+                border: 1px solid gray;
+                border-radius: 5px;
+            }
+            ''')
+
+    def change_year(self, step):
+        """Show the previous year if step is -1, or the next year if it is 1."""
+        self.year += step
+        self.update_year()
+
+    def update_year(self):
+        """Load the daily totals of the shown year. The year's logs are found in the cached date index of its
+        directories, and each day's totals are cached until its log changes, so only days changed since they were last
+        shown are read.
+        """
+        self.series = analytics.get_daily_series(LOG_FILES_DIR, datetime.date(self.year, 1, 1),
+                                                 datetime.date(self.year, 12, 31))
+        self.year_label.setText(str(self.year))
+        self.summary_label.setText(f'{sum(self.series.logged)} logged day(s)')
+        self.update_value()
+
+    def update_value(self):
+        """Shade the days by the chosen value."""
+        self.heatmap.set_series(self.series, self.value_combobox.currentData())
+
+    def goto_log_win(self, date):
+        """Take the user to the log window of a date."""
+        current_geo = self.geometry()
+        self.log_win = LogWin(date, current_geo)
+        self.log_win.show()
+        self.close()
+
+
+class SuggestWin(QDialog):
+    """Suggest Food Dictionary entries, alone or in pairs, with amounts that come closest to what is left of the
+    day's goals, such as the protein and calories left, within a cost.
+    """
+
+    def __init__(self, date, geo=None):
+        """Constructor.
+
+        :param date: A datetime.date object of the log whose totals are subtracted from the goals, and to return to.
+        :param geo: A QRect() object containing the dimensions and position of the previous window. The current
+            window's dimensions and position are set equal to this value. Default is None.
+        """
+        super().__init__()
+        self.date = date
+        self.geo = geo
+        self.init_ui()
+
+    def init_ui(self):
+        """Set up UI. Include an input for each target amount and for the cost limit, filled in with what is left of
+        the day's goals, and a table of the suggestions.
+        """
+        self.setWindowTitle('Food Suggestions')
+        self.setWindowFlags(Qt.WindowMaximizeButtonHint | Qt.WindowMinimizeButtonHint | Qt.WindowCloseButtonHint)
+        if self.geo:
+            self.setGeometry(self.geo)
+        else:
+            self.w, self.h = data.get_win_size()
+            self.resize(self.w, self.h)
+
+        description = QLabel("Enter the amounts you'd like to eat for the rest of the day, and the most you'd like to "
+                             "spend. The amounts start as what is left of your daily goals after the day's log. Leave "
+                             "an amount blank to ignore it. Suggestions are single Food Dictionary entries or pairs "
+                             "of them, closest first.", self)
+        description.setWordWrap(True)
+        description.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+
+        totals = analytics.get_day_totals(data.get_log_path(LOG_FILES_DIR, self.date))
+        remaining = goals.get_remaining(totals, goals.load_goals(GOALS_PATH))
+
+        double_validator = QDoubleValidator()
+        double_validator.setNotation(QDoubleValidator.StandardNotation)
+        double_validator.setBottom(0)
+        options_layout = QHBoxLayout()
+        self.target_textboxes = {}
+        for name in [*analytics.SUGGESTION_VALUES, 'cost']:
+            textbox = QLineEdit(self)
+            textbox.setFixedSize(70, 27)
+            textbox.setValidator(double_validator)
+            if name in remaining:
+                textbox.setText(f'{remaining[name]:.2f}' if name == 'cost' else f'{remaining[name]:g}')
+            textbox.textEdited.connect(self.update_suggestions)
+            label = 'Max cost ($)' if name == 'cost' else goals.get_goal_label(name)
+            options_layout.addWidget(QLabel(f'{label}:', self))
+            options_layout.addWidget(textbox)
+            self.target_textboxes[name] = textbox
+        options_layout.addStretch()
+
+        self.suggestions_table = QTableWidget(self)
+        self.suggestions_table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.suggestions_table.verticalHeader().setVisible(False)
+        self.summary_label = QLabel(self)
+
+        self.back_to_log_win_btn = QPushButton('Back to logs', self)
+        self.back_to_log_win_btn.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.back_to_log_win_btn.clicked.connect(self.goto_log_win)
+
+        main_layout = QVBoxLayout()
+        self.setLayout(main_layout)
+        main_layout.addWidget(self.back_to_log_win_btn)
+        main_layout.addWidget(description)
+        main_layout.addLayout(options_layout)
+        main_layout.addWidget(self.summary_label)
+        main_layout.addWidget(self.suggestions_table)
+        main_layout.setSpacing(15)
+
+        self.update_suggestions()
+
+        self.setStyleSheet('''
+            QDialog {
+                background-color: rgb(0, 0, 30);
+            }
+            QWidget {
+                font: 14px;
+            }
+            QLabel {
+                color: white;
+            }
+            QHeaderView::section {
+                font: 14px;
+                font-weight: 500;
+                color: black;
+                background-color: rgb(60, 170, 60);
+                border-top: 0px solid black;
+                border-bottom: 1px solid black;
+                border-left: 0px solid black;
+                border-right: 1px solid black;
+            }
+            QTableView {
+                background-color: rgb(200, 200, 255);
+                selection-background-color: rgb(60, 60, 180);
+                selection-color: white;
+                gridline-color: black;
+                font: 14px;
+                font-weight: 500;
+            }
+            QPushButton {
+                color: rgb(255, 255, 255);
+                background-color: rgb(70, 70, 70);
+                border-width: 2px;
+                border-style: outset;
+                border-radius: 5px;
+                border-color: gray;
+                padding: 3px;
+            }
+            QLineEdit {
+                border: 1px solid gray;
+                border-radius: 5px;
+            }
+            ''')
+
+    def update_suggestions(self):
+        """Suggest foods for the current input, then display the suggestions in the table."""
+        targets = {}
+        max_cost = None
+        for name, textbox in self.target_textboxes.items():
+            try:
+                amount = float(textbox.text())
+            except ValueError:
+                # Ignore a blank or partially typed amount.
+                continue
+            if name == 'cost':
+                max_cost = amount
+            else:
+                targets[name] = amount
+
+        fd_store = store.load_fd_store(FD_PATH)
+        suggestions = analytics.suggest_foods(fd_store, targets, max_cost)
+        if not any(amount > 0 for amount in targets.values()):
+            self.summary_label.setText('Enter an amount to get suggestions.')
+        elif not suggestions:
+            self.summary_label.setText('No Food Dictionary entries have these values within the cost.')
+        else:
+            self.summary_label.setText('')
+
+        value_names = [name for name in targets if targets[name] > 0]
+        self.suggestions_table.setColumnCount(len(value_names) + 3)
+        self.suggestions_table.setHorizontalHeaderLabels(['Suggestion', *map(goals.get_goal_label, value_names),
+                                                          'Cost ($)', 'Off by'])
+        self.suggestions_table.setRowCount(len(suggestions))
+        for row_num, (entries, amounts, cost, distance) in enumerate(suggestions):
+            texts = ['\n'.join(self.describe_amount(fd_store, name, servings) for name, servings in entries)]
+            texts += [f'{amounts[name]:.4g}' for name in value_names]
+            texts += ['-' if math.isnan(cost) else f'{cost:.2f}', f'{distance:.0%}']
+            for col_num, text in enumerate(texts):
+                item = QTableWidgetItem(text)
+                item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
+                if col_num:
+                    item.setTextAlignment(Qt.AlignCenter)
+                self.suggestions_table.setItem(row_num, col_num, item)
+        self.suggestions_table.resizeRowsToContents()
+
+        h_header = self.suggestions_table.horizontalHeader()
+        h_header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        h_header.setSectionResizeMode(0, QHeaderView.Stretch)
+
+    @staticmethod
+    def describe_amount(fd_store, name, servings):
+        """Describe an amount of a Food Dictionary entry, such as '1.5 serving(s) of oats (60 g)'. The amount is also
+        given in the entry's first serving size unit, if it has one.
+        """
+        units = fd_store.unit_options(name)
+        text = f'{servings:g} serving(s) of {name}'
+        if len(units) > 1:
+            size = servings * fd_store.serving_sizes[fd_store.index[name]][units[1]]
+            text += f' ({size:g} {units[1]})'
+        return text
+
+    def goto_log_win(self):
+        """Take the user back to the log window."""
+        current_geo = self.geometry()
+        self.log_win = LogWin(self.date, current_geo)
+        self.log_win.show()
+        self.close()
+
+
+class MessageWin(QDialog):
+    """Display a dialog box with an error message determined by the 'key'."""
+
+    def __init__(self, key, entry_name=None):
+        """Constructor.
+
+        :param key: A string that determines which error message is shown to the user.
+        :param entry_name: A string of an entry name. Default is None.
+        """
+        super().__init__()
+        self.w = 350
+        self.key = key
+        self.entry_name = entry_name
+        self.init_ui()
+
+    def init_ui(self):
+        """Set up UI. Include the error message and an 'ok' button for each dialog."""
+        self.setFixedWidth(self.w)
+        title = "Input Error"
+
+        if self.key == "no name":
+            message = "Please provide a name for the entry."
+
+        elif self.key == "invalid serving size amount":
+            message = "Please provide a valid serving size amount (10, 3.75, etc.)."
+
+        elif self.key == "blank serving":
+            message = 'Please provide a serving size. You may enter up to three, but only one is required.'
+
+        elif self.key == "invalid fd entry info":
+            message = 'Please either give a valid number for each field (10, 3.75, etc.), or leave the field blank.'
+
+        elif self.key == "missing cost info":
+            message = "Please provide an amount for both fields in the cost section, or leave both fields blank."
+
+        elif self.key == 'no log entries selected to add':
+            message = "Please select at least one log entry to add."
+
+        elif self.key == "duplicate log entry":
+            message = (f"There is already an entry for '{self.entry_name}' in the log. Please edit the existing "
+                       f"entry instead of adding a new one.")
+
+        elif self.key == "duplicate fd entry":
+            message = ("The entry name you have given matches an existing one found in the Food Dictionary. Please "
+                       "enter a different name or edit the existing entry.")
+
+        elif self.key == "no selected entries to remove":
+            message = "Please select at least one entry to remove."
+
+        elif self.key == "no amount given (log add)":
+            message = "Please provide an amount for each selected entry."
+
+        elif self.key == "no amount given (log edit)":
+            message = ("Please provide an amount for all entries in the table. All entries will be added to the "
+                       "log file regardless of whether or not they are checked.")
+
+        elif self.key == "invalid amount":
+            message = "Please provide a valid number for the amounts."
+
+        elif self.key == 'fd entry no longer exists':
+            # When the user tries to edit a log entry whose Food Dictionary entry has been deleted.
+            message = (f"The entry for '{self.entry_name}' has been removed from the Food Dictionary some time after "
+                       f"the creation of this log. The log entry for '{self.entry_name}' is still tallied alongside "
                        f"the other entries, but it can't be edited without a matching Food Dictionary entry.")
 
         elif self.key == "no log entries selected to edit":
@@ -2039,6 +4118,54 @@ class MessageWin(QDialog):
         elif self.key == "no single fd entry selected":
             message = "Please select a single entry to edit."
 
+        elif self.key == "no single recipe selected":
+            message = "Please select a single recipe to edit."
+
+        elif self.key == "duplicate recipe":
+            message = ("The recipe name you have given matches an existing recipe or Food Dictionary entry. Please "
+                       "enter a different name.")
+
+        elif self.key == "invalid recipe servings":
+            message = "Please provide the number of servings the recipe makes (4, 2.5, etc.)."
+
+        elif self.key == "no recipe ingredients":
+            message = "Please select at least one ingredient, providing an amount for each."
+
+        elif self.key == "recipe cycle":
+            message = ("A recipe can't be one of its own ingredients, including through the ingredients of another "
+                       "recipe. Please unselect the recipes that use this one.")
+
+        elif self.key == "recipe in use":
+            message = (f"The recipe '{self.entry_name}' is an ingredient of another recipe. Please remove it from "
+                       f"that recipe first, or delete both at once.")
+
+        elif self.key == "archived log":
+            title = "Archived Log"
+            message = ("This log is in an archived year and can't be changed. Unpack the year with "
+                       "'healthhelper unarchive <year>' to change it.")
+
+        elif self.key == "invalid goal":
+            message = (f"Please give a valid daily minimum and maximum for '{self.entry_name}' (2000, 12.5, etc.), "
+                       f"or leave them blank. The minimum can't be more than the maximum.")
+
+        elif self.key == "nothing to undo":
+            title = "Undo"
+            message = "There are no changes to undo."
+
+        elif self.key == "nothing to redo":
+            title = "Redo"
+            message = "There are no undone changes to redo."
+
+        elif self.key == "undo conflict":
+            title = "Undo"
+            message = ("The file has been changed outside of Health Helper since this change was made, so it can't "
+                       "be undone or redone.")
+
+        elif self.key == "write conflict":
+            title = "Changes Not Saved"
+            message = (f"Your changes to {self.entry_name} weren't saved, because another program changed the same "
+                       f"entries before they were written. The other program's changes were kept.")
+
         elif self.key == "blank date":
             message = "Please provide a date for the log you want to view or edit."
 
@@ -0,0 +1,225 @@
+"""Undo and redo journal for the Health Helper application.
+
+Every change to the Food Dictionary or a log file is recorded in an append-only journal file as a row-level diff:
+the rows removed from the file and the rows added to it, each with its position. Undoing a change removes the added
+rows and puts the removed rows back, and redoing it does the opposite, so neither needs a copy of the whole file.
+
+The journal file has one JSON object per line. A change is recorded as:
+
+{"id": 3, "label": "Remove log entries", "path": "...", "existed": true, "exists": true,
+ "removed": [[1, ["chocolate", "['3', 'item(s)']", "3", ...]]], "added": []}
+
+A change that follows from another, such as a log recalculated from an edited Food Dictionary entry, also has the
+id of the first change of its group, as "group": 2. The changes of a group are undone and redone together.
+
+Undoing or redoing change 3 is recorded as {"undo": 3} or {"redo": 3}. The undo and redo stacks are rebuilt by
+replaying the file, and the file is compacted once it grows past a size cap.
+"""
+# Standard library imports
+import os
+import json
+import difflib
+from collections import deque
+
+# Local imports
+from healthhelper import data
+
+# Journals loaded by load_journal(), keyed by path.
+_journals = {}
+
+
+class Journal:
+    """Undo and redo stacks of the changes made to the Food Dictionary and log files, backed by a journal file."""
+
+    def __init__(self, path, max_changes=100, max_bytes=2000000):
+        """Constructor.
+
+        :param path: A string of the journal file pathname.
+        :param max_changes: The number of changes that can be undone. Older changes are forgotten. Default is 100.
+        :param max_bytes: The size of the journal file, in bytes, above which it is compacted to the changes that can
+            still be undone or redone. Default is 2,000,000.
+        """
+        self.path = path
+        self.max_changes = max_changes
+        self.max_bytes = max_bytes
+        self.undo_stack = deque(maxlen=max_changes)
+        self.redo_stack = deque(maxlen=max_changes)
+        self.next_id = 1
+        self.load()
+
+    def load(self):
+        """Rebuild the undo and redo stacks by replaying the journal file."""
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A partially written last line, left by a crash.
+                    continue
+                if 'undo' in record:
+                    if self.undo_stack and self.undo_stack[-1]['id'] == record['undo']:
+                        self.redo_stack.append(self.undo_stack.pop())
+                elif 'redo' in record:
+                    if self.redo_stack and self.redo_stack[-1]['id'] == record['redo']:
+                        self.undo_stack.append(self.redo_stack.pop())
+                else:
+                    self.undo_stack.append(record)
+                    self.redo_stack.clear()
+                    self.next_id = record['id'] + 1
+
+    def record(self, label, path, old_entries, new_entries, group=None):
+        """Record a change to a Food Dictionary or log file. Recording a change clears the redo stack.
+
+        :param label: A string describing the change to the user, such as 'Remove log entries'.
+        :param path: A string of the changed file's pathname.
+        :param old_entries: A list of the file's entries before the change, or None if the file didn't exist.
+        :param new_entries: A list of the file's entries after the change, or None if the file was deleted.
+        :param group: The id of the change that this change follows from, which must be the most recent change.
+            They are undone and redone together. Default is None.
+
+        :returns: The integer id of the change.
+        """
+        old_rows = [[str(val) for val in entry] for entry in old_entries or []]
+        new_rows = [[str(val) for val in entry] for entry in new_entries or []]
+        removed, added = get_row_diff(old_rows, new_rows)
+        change = {'id': self.next_id, 'label': label, 'path': os.path.abspath(path),
+                  'existed': old_entries is not None, 'exists': new_entries is not None,
+                  'removed': removed, 'added': added}
+        if group is not None:
+            change['group'] = group
+        self.next_id += 1
+        self.undo_stack.append(change)
+        self.redo_stack.clear()
+        self._append(change)
+        return change['id']
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo(self):
+        """Undo the most recent change that hasn't been undone, along with the rest of its group.
+
+        :returns: The change that was undone, the first of its group, a string that determines an error message if a
+            file has been modified in a way that prevents the change from being undone, or None if there is nothing to
+            undo. The changes of the group undone before a conflict stay undone.
+        """
+        if not self.undo_stack:
+            return None
+        group = get_group(self.undo_stack[-1])
+        while self.undo_stack and get_group(self.undo_stack[-1]) == group:
+            change = self.undo_stack[-1]
+            if not apply_row_diff(change['path'], change['added'], change['removed'], change['existed']):
+                return 'undo conflict'
+            self.redo_stack.append(self.undo_stack.pop())
+            self._append({'undo': change['id']})
+        return change
+
+    def redo(self):
+        """Redo the most recently undone change, along with the rest of its group.
+
+        :returns: The change that was redone, the first of its group, a string that determines an error message if a
+            file has been modified in a way that prevents the change from being redone, or None if there is nothing
+            to redo. The changes of the group redone before a conflict stay redone.
+        """
+        if not self.redo_stack:
+            return None
+        first_change = self.redo_stack[-1]
+        while self.redo_stack and get_group(self.redo_stack[-1]) == get_group(first_change):
+            change = self.redo_stack[-1]
+            if not apply_row_diff(change['path'], change['removed'], change['added'], change['exists']):
+                return 'undo conflict'
+            self.undo_stack.append(self.redo_stack.pop())
+            self._append({'redo': change['id']})
+        return first_change
+
+    def _append(self, record):
+        """Append a record to the journal file, then compact the file if it has grown past the size cap."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        if os.path.getsize(self.path) > self.max_bytes:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the journal file with only the changes that can still be undone or redone."""
+        # Replaying the undo stack followed by the redo stack, undoing the latter in reverse, restores both stacks.
+        lines = [json.dumps(change) for change in self.undo_stack]
+        lines.extend(json.dumps(change) for change in reversed(self.redo_stack))
+        lines.extend(json.dumps({'undo': change['id']}) for change in self.redo_stack)
+        with data.replace_file(self.path) as f:
+            f.write(''.join(line + '\n' for line in lines))
+
+
+def get_group(change):
+    """Return the id of the first change of the group a recorded change belongs to."""
+    return change.get('group', change['id'])
+
+
+def get_row_diff(old_rows, new_rows):
+    """Get the rows removed from and added to a file.
+
+    :param old_rows: A list of the file's rows before the change. Each row is a list of strings.
+    :param new_rows: A list of the file's rows after the change.
+
+    :returns: A list of two lists: the removed rows as [position_in_old_rows, row] lists, and the added rows as
+        [position_in_new_rows, row] lists, both in ascending order of position.
+    """
+    matcher = difflib.SequenceMatcher(None, [tuple(row) for row in old_rows], [tuple(row) for row in new_rows],
+                                      autojunk=False)
+    removed = []
+    added = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag in ('replace', 'delete'):
+            removed.extend([i, old_rows[i]] for i in range(i1, i2))
+        if tag in ('replace', 'insert'):
+            added.extend([j, new_rows[j]] for j in range(j1, j2))
+    return [removed, added]
+
+
+def apply_row_diff(path, rows_to_remove, rows_to_insert, keep_file):
+    """Remove and insert rows in a file, as recorded by get_row_diff().
+
+    :param path: A string of the file pathname.
+    :param rows_to_remove: A list of [position, row] lists in ascending order of position, relative to the current
+        contents of the file.
+    :param rows_to_insert: A list of [position, row] lists in ascending order of position, relative to the resulting
+        contents of the file.
+    :param keep_file: If False, the file is deleted instead of being written.
+
+    :returns: True if the diff was applied, or False if the current contents of the file don't match the rows to be
+        removed.
+    """
+    with data.file_lock(path):
+        rows = data.get_entries(path, return_all=True)
+        if rows == 'file not found':
+            rows = []
+        for position, row in rows_to_remove:
+            if position >= len(rows) or rows[position] != row:
+                return False
+
+        for position, row in reversed(rows_to_remove):
+            del rows[position]
+        for position, row in rows_to_insert:
+            rows.insert(position, row)
+
+        if keep_file:
+            data.write_buffer.write(path, rows)
+        else:
+            data.write_buffer.remove(path)
+    return True
+
+
+def load_journal(path):
+    """Return the Journal for the journal file. The same Journal is returned for every call with the same path."""
+    journal = _journals.get(path)
+    if journal is None:
+        journal = _journals[path] = Journal(path)
+    return journal
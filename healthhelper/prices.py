@@ -0,0 +1,192 @@
+"""Food price history and spending analytics for the Health Helper application.
+
+The Food Dictionary only keeps the current cost of each entry, so every change to an entry's cost is also appended to
+a price history csv file. Each row holds the date of the change, the entry's id and name, the total cost, and the
+number of servings the cost is for. For example, oats getting more expensive:
+
+,3,oats,4.49,25
+2020-03-01,3,oats,4.99,25
+2021-01-15,3,oats,5.29,25
+
+The first row has no date. It holds the cost an entry had before its first recorded change, which is in effect from
+before the history began. Rows are only ever appended, and an entry's rows are found by its id, so its history
+follows it when it is renamed.
+
+The inflation of a food's price between two dates is the change in its cost per serving. Food Dictionary entries
+aren't grouped into categories, so the inflation of any set of foods, such as every food with a price history, is
+the geometric mean of the foods' price ratios (a Jevons price index).
+
+Monthly spending is taken from the costs stored in the logs, which keep the cost of the day they were logged. The
+daily series of the logs is grouped by month by analytics.get_monthly_sums().
+"""
+# Standard library imports
+import os
+import csv
+import ast
+import math
+import datetime
+
+# Local imports
+from healthhelper import data
+from healthhelper import analytics
+
+# Position of the [total cost, servings] list in a Food Dictionary row.
+COST_INFO_INDEX = 17
+
+
+def get_price_key(entry_id, name):
+    """Get the key of a food's price history: its id, or its name if it has no id."""
+    return ('id', entry_id) if entry_id is not None else ('name', name)
+
+
+def parse_cost_info(row):
+    """Get the cost info of a Food Dictionary row.
+
+    :param row: A list describing one FD entry. The cost info may be a list or the string it is stored as.
+
+    :returns: A list of the total cost and the number of servings as strings, or None if the row has no cost info.
+    """
+    if len(row) <= COST_INFO_INDEX or not row[COST_INFO_INDEX]:
+        return None
+    cost_info = row[COST_INFO_INDEX]
+    if isinstance(cost_info, str):
+        try:
+            cost_info = ast.literal_eval(cost_info)
+        except (ValueError, SyntaxError):
+            return None
+    return [str(val) for val in cost_info]
+
+
+def load_price_history(path):
+    """Read the price history file.
+
+    :param path: A string of the price history file pathname.
+
+    :returns: A dictionary mapping the key of each food, from get_price_key(), to a list of its [date, name, cost
+        per serving] prices in date order. The date of the cost in effect before the first change is None. Rows that
+        can't be read are skipped. The dictionary is empty if the file doesn't exist.
+    """
+    rows = data.get_entries(path, return_all=True)
+    if rows == 'file not found':
+        return {}
+    history = {}
+    for row in rows:
+        try:
+            date_text, id_text, name, total_cost, servings = row
+            date = datetime.date.fromisoformat(date_text) if date_text else None
+            cost_per_serving = float(total_cost) / float(servings)
+        except (ValueError, ZeroDivisionError):
+            continue
+        key = get_price_key(int(id_text) if id_text.isdigit() else None, name)
+        history.setdefault(key, []).append([date, name, cost_per_serving])
+    for prices in history.values():
+        # Undated prices come first, and prices of the same day stay in the order they were recorded.
+        prices.sort(key=lambda price: price[0] or datetime.date.min)
+    return history
+
+
+def record_price_changes(path, old_rows, new_rows, date=None):
+    """Append the costs of the Food Dictionary entries whose cost was changed or added to the price history file.
+    Entries are matched by id, or by name if they have no id. The first time an entry's cost is changed, the cost it
+    had before is recorded too, without a date.
+
+    :param path: A string of the price history file pathname.
+    :param old_rows: A list of the Food Dictionary rows before the change.
+    :param new_rows: A list of the Food Dictionary rows after the change.
+    :param date: A datetime.date object of the change. Default is today.
+
+    :returns: The number of rows appended.
+    """
+    date = date or datetime.date.today()
+    old_costs = {}
+    for row in old_rows:
+        old_costs[get_price_key(data.get_row_id(row), row[0])] = parse_cost_info(row)
+        old_costs[get_price_key(None, row[0])] = parse_cost_info(row)
+    records = []
+    history = None
+    for row in new_rows:
+        cost_info = parse_cost_info(row)
+        entry_id = data.get_row_id(row)
+        key = get_price_key(entry_id, row[0])
+        old_cost_info = old_costs[key] if key in old_costs else old_costs.get(get_price_key(None, row[0]))
+        if cost_info is None or cost_info == old_cost_info:
+            continue
+        id_text = '' if entry_id is None else str(entry_id)
+        if old_cost_info is not None:
+            history = load_price_history(path) if history is None else history
+            if key not in history:
+                records.append(['', id_text, row[0], *old_cost_info])
+        records.append([date.isoformat(), id_text, row[0], *cost_info])
+
+    if records:
+        with data.file_lock(path):
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'a', newline='') as f:
+                csv.writer(f).writerows(records)
+    return len(records)
+
+
+def get_price_at(prices, date):
+    """Get the cost per serving in effect on a date from a food's list of prices, or None if it had no price yet."""
+    price = None
+    for price_date, name, cost_per_serving in prices:
+        if price_date is not None and price_date > date:
+            break
+        price = cost_per_serving
+    return price
+
+
+def get_price_changes(history, start_date, end_date):
+    """Get the change in the cost per serving of each food between two dates.
+
+    :param history: A dictionary of price histories, as returned by load_price_history().
+    :param start_date: A datetime.date object of the first date.
+    :param end_date: A datetime.date object of the last date.
+
+    :returns: A list of [name, start price, end price, percent change] lists, for each food that had a price on
+        both dates and whose price changed in between, from the largest increase to the largest decrease. The name is
+        the latest one recorded.
+    """
+    changes = []
+    for prices in history.values():
+        start_price = get_price_at(prices, start_date)
+        end_price = get_price_at(prices, end_date)
+        if not start_price or end_price is None or start_price == end_price:
+            continue
+        changes.append([prices[-1][1], start_price, end_price, 100 * (end_price / start_price - 1)])
+    changes.sort(key=lambda change: (-change[3], change[0]))
+    return changes
+
+
+def get_price_index(changes):
+    """Get the inflation of a set of foods as one percent change, the geometric mean of the price ratios of the foods
+    (a Jevons price index).
+
+    :param changes: A list of price changes, as returned by get_price_changes().
+
+    :returns: The percent change, or None if there are no changes.
+    """
+    ratios = [end_price / start_price for name, start_price, end_price, percent in changes if end_price > 0]
+    if not ratios:
+        return None
+    return 100 * (math.exp(math.fsum(map(math.log, ratios)) / len(ratios)) - 1)
+
+
+def get_monthly_spend(log_dir, start_date=None, end_date=None):
+    """Get the spending of each month from the costs in the logs, including archived logs.
+
+    :param log_dir: A string of the log files directory pathname.
+    :param start_date: A datetime.date object of the first day. Default is the date of the first log.
+    :param end_date: A datetime.date object of the last day. Default is the date of the last log.
+
+    :returns: A list of [year, month, spend, number of logged days, percent change from the month before] lists, one
+        for each month in order. The change is None for the first month, and after a month with no spending.
+    """
+    stats = analytics.SeriesStats(analytics.get_daily_series(log_dir, start_date, end_date))
+    months = []
+    prev_spend = None
+    for year, month, spend, num_logged in analytics.get_monthly_sums(stats, 'cost'):
+        change = 100 * (spend / prev_spend - 1) if prev_spend else None
+        months.append([year, month, spend, num_logged, change])
+        prev_spend = spend
+    return months
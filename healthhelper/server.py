@@ -0,0 +1,520 @@
+"""Local JSON API server for the Health Helper application.
+
+'healthhelper serve' exposes the Food Dictionary and the logs to other programs, such as meal planning scripts, over
+HTTP. Every request and response body is JSON. Dates are given as YYYY-MM-DD, and names are percent-encoded:
+
+    GET     /fd                     every Food Dictionary entry
+    GET     /fd/<name>              one Food Dictionary entry
+    GET     /logs                   the dates of every log, optionally limited by ?start=<date>&end=<date>
+    GET     /logs/<date>            the entries of a log and their totals
+    GET     /logs/<date>/<name>     one log entry
+    POST    /logs/<date>            add entries: {"entries": [{"name": ..., "amount": ..., "unit": ...}, ...]}
+    PUT     /logs/<date>/<name>     change the amount of an entry: {"amount": ..., "unit": ...}
+    DELETE  /logs/<date>/<name>     remove an entry. The log file is deleted along with its last entry.
+    GET     /totals?start=<date>&end=<date>     the totals of every log in a range of dates
+
+Logs are read from an in-memory cache that is indexed by entry name and reloaded whenever the log file changes, so
+changes made in the app are always seen. The Food Dictionary is read from the store in store.py.
+
+Changes are never written by the request handlers. They are queued for a single writer task, which applies every
+change queued for a file in one read-modify-write while holding the file's lock (see data.file_lock()), so the server
+doesn't race the app or itself, and a burst of changes to the same log is written once. Reads, and the work of
+calculating new entries, also run in worker threads, so a slow request such as the totals of several years doesn't hold
+up other clients.
+"""
+# Standard library imports
+import os
+import ast
+import copy
+import json
+import asyncio
+import logging
+import threading
+import datetime
+from http import HTTPStatus
+from urllib.parse import urlsplit, unquote, parse_qs
+
+# Local imports
+from healthhelper import data
+from healthhelper import store
+
+# Names of the 16 log values, calories through protein followed by cost.
+VALUE_NAMES = list(store.VALUE_INDEX)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8725
+
+# The largest request body that is read, in bytes.
+MAX_BODY_SIZE = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPError(Exception):
+    """Raised to respond to a request with an error status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def fd_entry_to_json(row):
+    """Convert a Food Dictionary row into a JSON object.
+
+    :param row: A list of strings describing one FD entry, as it is stored in the FD file.
+
+    :returns: A dictionary of the entry id, name, serving sizes by unit, nutrition values, cost, and cost per serving.
+        The id is null for an entry written before ids were added.
+    """
+    return {'id': data.get_row_id(row),
+            'name': row[0],
+            'serving_sizes': ast.literal_eval(row[1]),
+            'values': dict(zip(VALUE_NAMES[:15], row[2:17])),
+            'cost': ast.literal_eval(row[17]) if row[17] else None,
+            'cost_per_serving': row[18]}
+
+
+def log_entry_to_json(row):
+    """Convert a log row into a JSON object.
+
+    :param row: A list of strings describing one log entry, as it is stored in a log file.
+
+    :returns: A dictionary of the id of the entry's Food Dictionary entry, the entry name, amount, unit, number of
+        servings, and values. The id is null for an entry made from a recipe or written before ids were added.
+    """
+    amount, unit = ast.literal_eval(row[1])
+    return {'fd_id': data.get_row_id(row), 'name': row[0], 'amount': amount, 'unit': unit, 'servings': row[2],
+            'values': dict(zip(VALUE_NAMES, row[3:19]))}
+
+
+def parse_date(date_str):
+    """Convert a YYYY-MM-DD string from a request into a datetime.date object."""
+    try:
+        return datetime.date.fromisoformat(date_str)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f'invalid date: {date_str}')
+
+
+class LogCache:
+    """Log entries kept in memory and indexed by entry name. The entries are joined to the Food Dictionary, so each has
+    the current name of its FD entry. A log is read again whenever its file or the Food Dictionary changes.
+    """
+
+    def __init__(self, fd_path):
+        """Constructor.
+
+        :param fd_path: A string of the Food Dictionary file pathname.
+        """
+        self.fd_path = fd_path
+        self.logs = {}  # {path: [version, entries, {entry_name: position}]}
+
+    def get(self, path):
+        """Get the entries of a log.
+
+        :param path: A string of the log file pathname.
+
+        :returns: A list of entries and a dictionary of the position of each entry by name, or None if the log
+            doesn't exist.
+        """
+        version = self.get_version(path)
+        cached = self.logs.get(path)
+        if cached and version is not None and cached[0] == version:
+            return cached[1:]
+
+        entries = store.get_log_entries(self.fd_path, path)
+        if entries == 'file not found':
+            self.logs.pop(path, None)
+            return None
+        if version is not None:
+            # Archived logs aren't cached, since the archive keeps its own index.
+            self.set(path, version, entries)
+        return [entries, {entry[0]: position for position, entry in enumerate(entries)}]
+
+    def get_version(self, path):
+        """Return a version of a log that changes whenever the log file or the Food Dictionary is modified, or None
+        if the log file doesn't exist.
+        """
+        version = data.get_file_version(path)
+        if version is None:
+            return None
+        # Each load of the Food Dictionary store is a new generation.
+        return [version, len(store.load_fd_store(self.fd_path).changes)]
+
+    def set(self, path, version, entries):
+        """Cache the entries of a log.
+
+        :param path: A string of the log file pathname.
+        :param version: The version of the log from get_version(), or None if the log file was deleted.
+        :param entries: A list of the log entries, joined to the Food Dictionary.
+        """
+        if version is None:
+            self.logs.pop(path, None)
+        else:
+            self.logs[path] = [version, entries, {entry[0]: position for position, entry in enumerate(entries)}]
+
+
+class DataServer:
+    """HTTP server of the Food Dictionary and the logs."""
+
+    def __init__(self, fd_path, log_dir, recipes_path):
+        """Constructor.
+
+        :param fd_path: A string of the Food Dictionary file pathname.
+        :param log_dir: A string of the log files directory pathname.
+        :param recipes_path: A string of the recipes file pathname.
+        """
+        self.fd_path = fd_path
+        self.log_dir = log_dir
+        self.recipes_path = recipes_path
+        self.log_cache = LogCache(fd_path)
+        # The Food Dictionary store is reloaded in place when its file changes, so the worker threads take turns
+        # using it.
+        self.fd_lock = threading.Lock()
+        self.server = None
+        self.changes = None  # Queue of [path, change function, future]
+        self.writer_task = None
+        self.num_writes = 0
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Start listening for requests and start the writer task.
+
+        :param host: A string of the host to listen on. Default is the local host only.
+        :param port: An integer port. If 0, a free port is chosen.
+
+        :returns: The integer port the server is listening on.
+        """
+        self.changes = asyncio.Queue()
+        self.writer_task = asyncio.ensure_future(self.write_changes())
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """Stop listening for requests and stop the writer task."""
+        self.server.close()
+        await self.server.wait_closed()
+        self.writer_task.cancel()
+        try:
+            await self.writer_task
+        except asyncio.CancelledError:
+            pass
+
+    async def handle_connection(self, reader, writer):
+        """Respond to each request on a connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                keep_alive = True
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                    headers = {}
+                    while True:
+                        line = await reader.readline()
+                        if line in (b'\r\n', b'\n', b''):
+                            break
+                        key, _, value = line.decode('latin-1').partition(':')
+                        headers[key.strip().lower()] = value.strip()
+                    length = int(headers.get('content-length', 0))
+                    if length < 0:
+                        raise ValueError(f'negative Content-Length: {length}')
+                    if length > MAX_BODY_SIZE:
+                        raise HTTPError(413, 'the request body is too large')
+                    body = await reader.readexactly(length) if length else b''
+                    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                    status, response = await self.handle_request(method, target, body)
+                except (ValueError, asyncio.IncompleteReadError):
+                    status, response = 400, {'error': 'bad request'}
+                    keep_alive = False
+                except HTTPError as e:
+                    # The body wasn't read, so the connection can't be used again.
+                    status, response = e.status, {'error': e.message}
+                    keep_alive = False
+                except Exception:
+                    logger.exception('Error handling request %r', request_line)
+                    status, response = 500, {'error': 'internal server error'}
+                    keep_alive = False
+
+                payload = json.dumps(response).encode('utf-8')
+                writer.write(f'HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n'
+                             f'Content-Type: application/json\r\n'
+                             f'Content-Length: {len(payload)}\r\n'
+                             f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode('latin-1')
+                             + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, method, target, body):
+        """Route a request to its handler.
+
+        :param method: A string of the HTTP method.
+        :param target: A string of the request target, such as '/logs/2020-06-12'.
+        :param body: The bytes of the request body.
+
+        :returns: A list of the integer response status and the JSON response object.
+        """
+        split_target = urlsplit(target)
+        parts = [unquote(part) for part in split_target.path.strip('/').split('/')]
+        query = {key: values[0] for key, values in parse_qs(split_target.query).items()}
+        try:
+            request = json.loads(body) if body else {}
+        except ValueError:
+            return [400, {'error': 'the request body is not valid JSON'}]
+
+        try:
+            if parts[0] == 'fd' and len(parts) <= 2 and method == 'GET':
+                return [200, await self.read(self.get_fd, *parts[1:2])]
+            if parts[0] == 'logs' and len(parts) == 1 and method == 'GET':
+                return [200, await self.read(self.get_log_dates, query.get('start'), query.get('end'))]
+            if parts[0] == 'logs' and len(parts) == 2:
+                if method == 'GET':
+                    return [200, await self.read(self.get_log, parse_date(parts[1]))]
+                if method == 'POST':
+                    return [201, await self.add_log_entries(parse_date(parts[1]), request.get('entries'))]
+            if parts[0] == 'logs' and len(parts) == 3:
+                if method == 'GET':
+                    return [200, await self.read(self.get_log_entry, parse_date(parts[1]), parts[2])]
+                if method == 'PUT':
+                    return [200, await self.edit_log_entry(parse_date(parts[1]), parts[2], request.get('amount'),
+                                                           request.get('unit'))]
+                if method == 'DELETE':
+                    return [200, await self.remove_log_entry(parse_date(parts[1]), parts[2])]
+            if parts[0] == 'totals' and method == 'GET':
+                return [200, await self.read(self.get_totals, parse_date(query.get('start')),
+                                             parse_date(query.get('end')))]
+        except HTTPError as e:
+            return [e.status, {'error': e.message}]
+        except Exception:
+            # Such as a malformed row in a stored file. The client gets a response rather than a dropped connection.
+            logger.exception('Error handling %s %s', method, target)
+            return [500, {'error': 'internal server error'}]
+        return [404, {'error': f'no such resource: {method} {split_target.path}'}]
+
+    async def read(self, handler, *args):
+        """Call a handler that reads files in a worker thread, so the event loop goes on serving other clients.
+
+        :param handler: A method that returns a response object.
+        :param args: The arguments of the handler.
+
+        :returns: The response object.
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, handler, *args)
+
+    def get_fd(self, name=None):
+        """Get every Food Dictionary entry, or the entry with the given name."""
+        with self.fd_lock:
+            fd_store = store.load_fd_store(self.fd_path)
+            if name is None:
+                return {'entries': [fd_entry_to_json(row) for row in fd_store.rows]}
+            row = fd_store.get_row(name)
+        if row is None:
+            raise HTTPError(404, f'no Food Dictionary entry named {name}')
+        return fd_entry_to_json(row)
+
+    def get_log_dates(self, start=None, end=None):
+        """Get the dates of every log, including archived logs, in an optional range of dates."""
+        start_date = parse_date(start) if start else datetime.date.min
+        end_date = parse_date(end) if end else datetime.date.max
+        dates = [data.get_log_date(path) for path in data.get_log_file_paths(self.log_dir, include_archived=True)]
+        return {'dates': [date.isoformat() for date in dates if start_date <= date <= end_date]}
+
+    def get_log(self, date):
+        """Get the entries of a log and their totals."""
+        with self.fd_lock:
+            log = self.log_cache.get(data.get_log_path(self.log_dir, date))
+        if log is None:
+            raise HTTPError(404, f'there is no log for {date.isoformat()}')
+        entries = log[0]
+        value_columns = data.parse_log_entries(entries)[3]
+        totals = [data.format_fixed(total, pad=(i == 15))
+                  for i, total in enumerate(data.sum_columns(value_columns))]
+        return {'date': date.isoformat(), 'entries': [log_entry_to_json(entry) for entry in entries],
+                'totals': dict(zip(VALUE_NAMES, totals))}
+
+    def get_log_entry(self, date, name):
+        """Get one entry of a log."""
+        with self.fd_lock:
+            log = self.log_cache.get(data.get_log_path(self.log_dir, date))
+        if log is None or name not in log[1]:
+            raise HTTPError(404, f'{name} is not in the log for {date.isoformat()}')
+        return log_entry_to_json(log[0][log[1][name]])
+
+    def get_totals(self, start_date, end_date):
+        """Get the totals of every log in a range of dates."""
+        num_days, totals = data.get_range_totals(self.log_dir, start_date, end_date)
+        return {'start': start_date.isoformat(), 'end': end_date.isoformat(), 'days': num_days,
+                'totals': dict(zip(VALUE_NAMES, totals)) if totals else {}}
+
+    def calculate_entries(self, amounts):
+        """Calculate new log entries from Food Dictionary entries and recipes. Runs in a worker thread.
+
+        :param amounts: A list of {"name": ..., "amount": ..., "unit": ...} objects from a request.
+
+        :returns: A list of calculated log entries, as they are stored in a log file.
+        """
+        if not isinstance(amounts, list) or not amounts or not all(isinstance(amount, dict) for amount in amounts):
+            raise HTTPError(400, 'no entries given')
+        names = [amount.get('name') for amount in amounts]
+        if len(set(names)) != len(names):
+            raise HTTPError(400, 'an entry is given more than once')
+        with self.fd_lock:
+            rows = store.get_loggable_rows(self.fd_path, self.recipes_path, names)
+        if len(rows) != len(names):
+            missing = [name for name in names if name not in [row[0] for row in rows]]
+            raise HTTPError(404, f'no Food Dictionary entry or recipe named {missing[0]}')
+
+        input_amounts = [[str(amount.get('amount', '')), amount.get('unit', 'Serving(s)')] for amount in amounts]
+        try:
+            calculated_entries = data.calculate_entry_info(rows, input_amounts, tally=False)
+        except KeyError as e:
+            raise HTTPError(400, f'invalid unit: {e.args[0]}')
+        if calculated_entries == 'no amount given (log add)':
+            raise HTTPError(400, 'no amount given')
+        if calculated_entries == 'invalid amount':
+            raise HTTPError(400, 'invalid amount')
+        # Store every value as the string the csv file holds.
+        return [[str(val) for val in entry] for entry in calculated_entries]
+
+    async def change_log(self, date, change):
+        """Queue a change to a log for the writer task and wait until it is written.
+
+        :param date: A datetime.date object of the log date.
+        :param change: A function that is given the list of log entries and changes it in place. It returns the
+            response object, or raises HTTPError to leave the log unchanged.
+
+        :returns: The response object returned by the change function.
+        """
+        path = data.get_log_path(self.log_dir, date)
+        if data.is_archived_log(path):
+            raise HTTPError(409, f'the log for {date.isoformat()} is archived and can\'t be changed')
+        future = asyncio.get_running_loop().create_future()
+        await self.changes.put([path, change, future])
+        return await future
+
+    async def add_log_entries(self, date, amounts):
+        """Add entries to a log. The log is created if it doesn't exist."""
+        new_entries = await self.read(self.calculate_entries, amounts)
+
+        def change(entries):
+            for entry in entries:
+                if entry[0] in [new_entry[0] for new_entry in new_entries]:
+                    raise HTTPError(409, f'{entry[0]} is already in the log')
+            entries.extend(new_entries)
+            return {'entries': [log_entry_to_json(entry) for entry in new_entries]}
+        return await self.change_log(date, change)
+
+    async def edit_log_entry(self, date, name, amount, unit):
+        """Change the amount of a log entry. The entry keeps its position in the log."""
+        new_entry = (await self.read(self.calculate_entries, [{'name': name, 'amount': amount, 'unit': unit}]))[0]
+
+        def change(entries):
+            for position, entry in enumerate(entries):
+                if entry[0] == name:
+                    entries[position] = new_entry
+                    return log_entry_to_json(new_entry)
+            raise HTTPError(404, f'{name} is not in the log')
+        return await self.change_log(date, change)
+
+    async def remove_log_entry(self, date, name):
+        """Remove an entry from a log."""
+        def change(entries):
+            for position, entry in enumerate(entries):
+                if entry[0] == name:
+                    del entries[position]
+                    return {'removed': name}
+            raise HTTPError(404, f'{name} is not in the log')
+        return await self.change_log(date, change)
+
+    async def write_changes(self):
+        """Writer task. Wait for queued changes, then apply every queued change to each file with one write."""
+        loop = asyncio.get_running_loop()
+        while True:
+            queued = [await self.changes.get()]
+            # Let the handlers of requests that have already arrived queue their changes too.
+            await asyncio.sleep(0)
+            while not self.changes.empty():
+                queued.append(self.changes.get_nowait())
+
+            changes_by_path = {}
+            for path, change, future in queued:
+                changes_by_path.setdefault(path, []).append([change, future])
+            fd_snapshot = await loop.run_in_executor(None, self.get_fd_snapshot)
+            for path, path_changes in changes_by_path.items():
+                try:
+                    results, version, entries = await loop.run_in_executor(
+                        None, self.apply_changes, path, [change for change, future in path_changes], *fd_snapshot)
+                except Exception as e:
+                    for change, future in path_changes:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                self.log_cache.set(path, version, entries)
+                for (change, future), result in zip(path_changes, results):
+                    if future.done():
+                        continue
+                    if isinstance(result, HTTPError):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+
+    def get_fd_snapshot(self):
+        """Return a copy of the Food Dictionary store, which the worker thread applying changes joins the logs to,
+        and the number of times the store had been loaded. The copy isn't changed when the store is loaded again by
+        another thread. Runs in a worker thread.
+        """
+        with self.fd_lock:
+            fd_store = store.load_fd_store(self.fd_path)
+            return [copy.copy(fd_store), len(fd_store.changes)]
+
+    def apply_changes(self, path, changes, fd_store, fd_generation):
+        """Apply changes to a log file while holding its lock. Runs in a worker thread.
+
+        :param path: A string of the log file pathname.
+        :param changes: A list of change functions, as given to change_log().
+        :param fd_store: A copy of the FoodDictStore that the log entries are joined to.
+        :param fd_generation: The number of times the store had been loaded when it was copied.
+
+        :returns: A list of the result of each change, either its response object or the HTTPError it raised, the
+            new version of the log as from LogCache.get_version(), and the list of its entries.
+        """
+        with data.file_lock(path):
+            entries = data.get_entries(path, return_all=True)
+            existed = entries != 'file not found'
+            entries = fd_store.resolve_log_rows(entries) if existed else []
+            results = []
+            changed = False
+            for change in changes:
+                try:
+                    results.append(change(entries))
+                    changed = True
+                except HTTPError as e:
+                    results.append(e)
+
+            if changed and entries:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                data.write_entries(path, entries)
+                self.num_writes += 1
+            elif changed and existed:
+                # The last entry was removed. The file is deleted the way the app deletes it, dropping any change to
+                # it waiting in the write buffer.
+                data.write_buffer.remove(path)
+                self.num_writes += 1
+            version = data.get_file_version(path)
+            return [results, None if version is None else [version, fd_generation], entries]
+
+
+async def serve(fd_path, log_dir, recipes_path, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Run the server until it is interrupted."""
+    data_server = DataServer(fd_path, log_dir, recipes_path)
+    port = await data_server.start(host, port)
+    print(f'Serving Health Helper data on http://{host}:{port}/')
+    try:
+        await data_server.server.serve_forever()
+    finally:
+        await data_server.close()
@@ -0,0 +1,588 @@
+"""In-memory store of the Food Dictionary for the Health Helper application.
+
+The Food Dictionary csv file stores every value as a string, with the serving size options kept as a dictionary
+literal. The store parses the file once and precomputes, for each entry, a vector of its per-serving values as
+floats and the size of one serving in every unit that an amount of the entry can be given in. Calculating the values
+of any amount of an entry in any compatible unit is then one division and one multiplication per value.
+
+Each Food Dictionary entry has a stable integer id in the cell after its cost per serving, and a log entry made from
+it keeps the id in the cell after its cost. The store indexes the entries by name and by id, so a log entry is joined
+to its FD entry by id, and renaming an FD entry doesn't require rewriting the logs: the names of log entries are
+refreshed from the FD when the logs are read. Rows written before ids were added have no id cell. An FD entry is
+given an id the next time the FD is written, and a log entry is linked to its FD entry by name the next time its
+log is written.
+
+Parsing a large Food Dictionary takes most of the time it takes to open a window, so once a store has parsed the
+file, it pickles its parsed lists, arrays and indexes into a binary cache file next to the FD. The cache is keyed by
+the size, modification time and SHA-1 hash of the FD's contents, and a later store loads it in place of parsing the
+FD if the key still matches. The FD remains the only source of truth: a cache that is missing, stale, unreadable or
+of another format is ignored and rewritten.
+"""
+# Standard library imports
+import io
+import ast
+import csv
+import math
+import pickle
+import hashlib
+from array import array
+
+# Local imports
+from healthhelper import data
+
+# Number of per-serving values in a vector: calories through protein, followed by the cost per serving.
+NUM_VALUES = 16
+
+# Index of each per-serving value in a vector, by the name used for it throughout the application.
+VALUE_INDEX = {'calories': 0, 'total fat': 1, 'saturated fat': 2, 'trans fat': 3, 'polyunsaturated fat': 4,
+               'monounsaturated fat': 5, 'cholesterol': 6, 'sodium': 7, 'total carbohydrate': 8, 'dietary fiber': 9,
+               'soluble fiber': 10, 'insoluble fiber': 11, 'total sugars': 12, 'added sugars': 13, 'protein': 14,
+               'cost': 15}
+
+# Format of the Food Dictionary cache file. Increase it whenever the cached attributes of FoodDictStore change, so
+# caches written by an older version are ignored.
+CACHE_FORMAT = 2
+
+# Food Dictionaries with fewer entries than this are parsed in a few milliseconds, so they aren't cached.
+CACHE_MIN_ENTRIES = 1000
+
+# Attributes of a FoodDictStore that are saved in its cache as they are. The rows and vectors are packed first.
+CACHED_ATTRIBUTES = ['names', 'serving_sizes', 'serving_options', 'containers', 'index', 'ids', 'id_index',
+                     'columns']
+
+# Stores loaded by load_fd_store(), keyed by path.
+_stores = {}
+
+# Recipe books loaded by load_recipe_book(), keyed by the recipes file path.
+_recipe_books = {}
+
+
+def to_float(val):
+    """Convert a string value from the FD or a log file into a float. Blank values become NaN.
+
+    :param val: A string of a number, or an empty string.
+
+    :returns: A float.
+    """
+    return float(val) if val else math.nan
+
+
+def to_str(val):
+    """Convert a float into the string stored in the FD or a log file. NaN becomes a blank value, and the decimal is
+    dropped if possible.
+
+    :param val: A float.
+
+    :returns: A string.
+    """
+    if math.isnan(val):
+        return ''
+    val = round(val, 3)
+    if val == int(val):
+        val = int(val)
+    return str(val)
+
+
+def get_cache_path(path):
+    """Get the pathname of the binary cache file of a Food Dictionary."""
+    return path + '.cache'
+
+
+def read_file(path):
+    """Read the contents of a file in one read, along with its version.
+
+    :param path: A string of the file pathname.
+
+    :returns: A list of the file's version, from data.get_file_version(), and its contents as bytes. The contents are
+        None if the file doesn't exist or was changed while it was read.
+    """
+    version = data.get_file_version(path)
+    try:
+        with open(path, 'rb') as f:
+            contents = f.read()
+    except FileNotFoundError:
+        return [version, None]
+    return [version, contents if data.get_file_version(path) == version else None]
+
+
+def assign_ids(rows):
+    """Give each Food Dictionary row without an id the next unused id, in place. Ids are never reused while an entry
+    with the id exists, and an entry keeps its id when it is edited or renamed.
+
+    :param rows: A list of FD rows, as written to the FD file.
+
+    :returns: The list of rows.
+    """
+    next_id = max((data.get_row_id(row) or 0 for row in rows), default=0) + 1
+    for row in rows:
+        if data.get_row_id(row) is None:
+            data.set_row_id(row, next_id)
+            next_id += 1
+    return rows
+
+
+class RecipeCycleError(ValueError):
+    """Raised when a recipe contains itself as an ingredient, directly or through other recipes."""
+
+
+class FoodDictStore:
+    """Parsed contents of the Food Dictionary file.
+
+    For each entry, in file order, the store keeps the original row of strings, a vector of the per-serving values
+    as floats (see VALUE_INDEX), and a dictionary of serving sizes by unit from data.get_unit_serving_sizes(). Blank
+    values are NaN in the vectors. The same values are also kept by column, one array per value, for calculations
+    over the whole Food Dictionary. The serving size options and the container's total cost and servings are kept
+    parsed for display, so a loaded store is shown without evaluating the literals in the rows.
+    """
+
+    def __init__(self, path):
+        """Constructor.
+
+        :param path: A string of the Food Dictionary file pathname.
+        """
+        self.path = path
+        self.names = []
+        self.rows = []
+        self.vectors = []
+        self.serving_sizes = []
+        self.serving_options = []  # A tuple of the (unit, amount) serving size options of each entry, as given.
+        self.containers = []  # The [total_cost, servings] of each entry's container, or None if it has no cost.
+        self.index = {}  # {entry_name: position}
+        self.ids = []  # The id of each entry, or None for an entry written before ids were added.
+        self.id_index = {}  # {entry_id: position}
+        self.columns = []
+        self.derived = {}  # Arrays calculated from the columns, such as cost ratios. Cleared on load.
+        self.changes = []  # A set of the changed entry names for each load. The index of a set is its generation.
+        self.version = None
+        self.load()
+
+    def load(self):
+        """Read the Food Dictionary file and precompute the vector and serving sizes of each entry. If the file's
+        cache is up to date, the precomputed values are loaded from it instead. If the file doesn't exist, the store
+        is empty.
+        """
+        old_rows = dict(zip(self.names, self.rows))
+        pending = data.write_buffer.get(self.path)
+        if pending is not None:
+            # A change that hasn't been written yet is read from the write buffer. It isn't cached.
+            self.version, rows = pending
+            self.set_rows(rows)
+        else:
+            self.version, contents = read_file(self.path)
+            cache_key = None if contents is None else [list(self.version), hashlib.sha1(contents).hexdigest()]
+            if cache_key is None or not self.load_cache(cache_key):
+                if contents is not None:
+                    # Decoded the same way as data.read_rows() reads the file.
+                    rows = list(csv.reader(io.TextIOWrapper(io.BytesIO(contents))))
+                else:
+                    # The file doesn't exist or is being changed.
+                    rows = data.get_entries(self.path, return_all=True)
+                    rows = [] if rows == 'file not found' else rows
+                self.set_rows(rows)
+                if cache_key is not None and len(rows) >= CACHE_MIN_ENTRIES:
+                    self.write_cache(cache_key)
+        self.derived = {}
+
+        # Record the names of the entries that were added, removed, or edited since the previous load.
+        new_rows = dict(zip(self.names, self.rows))
+        self.changes.append({name for name in old_rows.keys() | new_rows.keys()
+                             if old_rows.get(name) != new_rows.get(name)})
+
+    def set_rows(self, rows):
+        """Replace every entry in the store with the Food Dictionary rows."""
+        self.names, self.rows, self.vectors, self.serving_sizes, self.index = [], [], [], [], {}
+        self.serving_options, self.containers = [], []
+        self.ids, self.id_index = [], {}
+        self.columns = [array('d') for _ in range(NUM_VALUES)]
+        for row in rows:
+            self.add_row(row)
+
+    def load_cache(self, cache_key):
+        """Load the entries from the cache file, if it was written for the current contents of the Food Dictionary.
+
+        :param cache_key: A list of the FD's version, from data.get_file_version(), and the SHA-1 hash of its contents.
+
+        :returns: True if the entries were loaded.
+        """
+        try:
+            with open(get_cache_path(self.path), 'rb') as f:
+                cache = pickle.load(f)
+        except Exception:
+            # The cache is missing, or truncated or corrupted, which can make unpickling fail in many ways. It is
+            # rewritten after the FD is parsed.
+            return False
+        if not isinstance(cache, dict) or cache.get('format') != CACHE_FORMAT or cache.get('key') != cache_key:
+            return False
+        for name in CACHED_ATTRIBUTES:
+            setattr(self, name, cache[name])
+        self.rows = cache['rows']
+        vectors = cache['vectors']
+        self.vectors = [vectors[start:start + NUM_VALUES] for start in range(0, len(vectors), NUM_VALUES)]
+        return True
+
+    def write_cache(self, cache_key):
+        """Write the entries to the cache file. The cache is written to a temporary file, which then replaces the old
+        cache, so a reader never sees a partial cache. If the cache can't be written, it is skipped.
+
+        :param cache_key: A list of the FD's version, from data.get_file_version(), and the SHA-1 hash of its contents.
+        """
+        cache = {name: getattr(self, name) for name in CACHED_ATTRIBUTES}
+        # Equal cells, such as blank values, are pickled once and shared by every row when the cache is loaded, and
+        # the vectors are pickled as one flat array rather than an array per entry.
+        cells = {}
+        cache['rows'] = [[cells.setdefault(cell, cell) for cell in row] for row in self.rows]
+        cache['vectors'] = array('d')
+        for vector in self.vectors:
+            cache['vectors'].extend(vector)
+        cache.update(format=CACHE_FORMAT, key=cache_key)
+        # The cache is rebuilt if it is lost, so it isn't synced.
+        try:
+            with data.replace_file(get_cache_path(self.path), binary=True, sync=False) as f:
+                pickle.dump(cache, f, pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            pass
+
+    def add_row(self, row):
+        """Add one Food Dictionary row to the store.
+
+        :param row: A list of strings describing one FD entry, as it is stored in the FD file.
+        """
+        self.index[row[0]] = len(self.names)
+        entry_id = data.get_row_id(row)
+        if entry_id is not None:
+            self.id_index[entry_id] = len(self.names)
+        self.ids.append(entry_id)
+        self.names.append(row[0])
+        self.rows.append(row)
+        # Calories to protein, then the cost per serving. The [total_cost, servings] list at index 17 is skipped.
+        vector = array('d', [to_float(val) for val in row[2:17]] + [to_float(row[18])])
+        self.vectors.append(vector)
+        for column, val in zip(self.columns, vector):
+            column.append(val)
+        self.derived.clear()
+        # A dictionary of the store's own, which can be pickled into the cache.
+        self.serving_sizes.append(dict(data.get_unit_serving_sizes(row[1])))
+        self.serving_options.append(data.get_serving_size_options(row[1]))
+        self.containers.append(ast.literal_eval(row[17]) if row[17] else None)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def get_row(self, name):
+        """Return the FD row of strings for the entry name, or None if there is no such entry."""
+        position = self.index.get(name)
+        return None if position is None else self.rows[position]
+
+    def get_id(self, name):
+        """Return the id of the entry name, or None if there is no such entry or it has no id."""
+        position = self.index.get(name)
+        return None if position is None else self.ids[position]
+
+    def get_row_by_id(self, entry_id):
+        """Return the FD row of strings for the entry id, or None if there is no such entry."""
+        position = self.id_index.get(entry_id)
+        return None if position is None else self.rows[position]
+
+    def resolve_log_rows(self, rows):
+        """Join log rows to their Food Dictionary entries. A row with the id of an FD entry is given the entry's
+        current name, so the entry may have been renamed since the row was written. A row without an id, or with the
+        id of an entry that was removed, is linked by name to the FD entry of that name, if it has an id.
+
+        :param rows: A list of log rows. The rows aren't changed.
+
+        :returns: A list of new rows.
+        """
+        resolved = []
+        for row in rows:
+            row = list(row)
+            position = self.id_index.get(data.get_row_id(row))
+            if position is not None:
+                row[0] = self.names[position]
+            elif len(row) >= data.ID_INDEX and self.get_id(row[0]) is not None:
+                data.set_row_id(row, self.get_id(row[0]))
+            resolved.append(row)
+        return resolved
+
+    def unit_options(self, name):
+        """Return a list of every unit that an amount of the entry can be given in, starting with 'Serving(s)'."""
+        return list(self.serving_sizes[self.index[name]])
+
+    def get_servings(self, name, amount, unit):
+        """Return the number of servings in an amount of the entry.
+
+        :param name: A string of the entry name.
+        :param amount: A number or a string of a number.
+        :param unit: A string of a unit returned by unit_options().
+        """
+        return float(amount) / self.serving_sizes[self.index[name]][unit]
+
+    def get_column(self, value_name):
+        """Return the array of one per-serving value for every entry, in store order.
+
+        :param value_name: A key of VALUE_INDEX, such as 'protein' or 'cost'.
+        """
+        return self.columns[VALUE_INDEX[value_name]]
+
+    def calculate(self, name, amount, unit):
+        """Return a list of the 16 values (calories to cost) of an amount of the entry. Blank values are NaN."""
+        servings = self.get_servings(name, amount, unit)
+        return [val * servings for val in self.vectors[self.index[name]]]
+
+
+def load_fd_store(path):
+    """Return a FoodDictStore for the Food Dictionary file. The store is reused until the file is modified.
+
+    :param path: A string of the Food Dictionary file pathname.
+    """
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = FoodDictStore(path)
+    elif store.version != data.get_file_version(path):
+        store.load()
+    return store
+
+
+class RecipeBook:
+    """Recipes made of Food Dictionary entries and other recipes. The recipes file is a csv file with one recipe
+    per row. For example:
+
+    oatmeal,"[['oats', '80', 'g'], ['peanut butter', '2', 'tbsp']]",2
+
+    The above recipe makes two servings out of 80 grams of oats and two tablespoons of peanut butter. An ingredient
+    that is another recipe is measured in servings of that recipe.
+
+    The per-serving vector of a recipe is calculated by flattening its ingredients down to Food Dictionary entries.
+    The result is memoized until one of the recipe's ingredients changes, at which point only the recipes that
+    depend on it, directly or through other recipes, are calculated again.
+    """
+
+    def __init__(self, path, fd_store):
+        """Constructor.
+
+        :param path: A string of the recipes file pathname.
+        :param fd_store: The FoodDictStore that the ingredients are taken from.
+        """
+        self.path = path
+        self.fd_store = fd_store
+        self.names = []
+        self.ingredients = {}  # {recipe_name: [[ingredient_name, amount, unit], ...]}
+        self.servings = {}  # {recipe_name: number of servings the recipe makes}
+        self.dependents = {}  # {ingredient_name: set of the recipe names that use it directly}
+        self.vectors = {}  # {recipe_name: per-serving vector}
+        self.version = None
+        self.fd_generation = len(fd_store.changes)
+        self.load()
+
+    def load(self):
+        """Read the recipes file. Memoized vectors are kept for the recipes that haven't changed. If the file
+        doesn't exist, there are no recipes.
+        """
+        old_recipes = {name: [self.ingredients[name], self.servings[name]] for name in self.names}
+        self.names, self.ingredients, self.servings, self.dependents = [], {}, {}, {}
+        self.version = data.get_file_version(self.path)
+        rows = data.get_entries(self.path, return_all=True)
+        if rows != 'file not found':
+            for row in rows:
+                self.add_recipe(row[0], ast.literal_eval(row[1]), row[2])
+
+        new_recipes = {name: [self.ingredients[name], self.servings[name]] for name in self.names}
+        changed_names = [name for name in old_recipes.keys() | new_recipes.keys()
+                         if old_recipes.get(name) != new_recipes.get(name)]
+        self.invalidate(*changed_names)
+
+    def add_recipe(self, name, ingredients, servings):
+        """Add one recipe to the book.
+
+        :param name: A string of the recipe name.
+        :param ingredients: A list of [ingredient_name, amount, unit] lists.
+        :param servings: A number or a string of a number of servings that the recipe makes.
+        """
+        self.names.append(name)
+        self.ingredients[name] = [list(ingredient) for ingredient in ingredients]
+        self.servings[name] = float(servings)
+        for ingredient_name, amount, unit in ingredients:
+            self.dependents.setdefault(ingredient_name, set()).add(name)
+
+    def __contains__(self, name):
+        return name in self.ingredients
+
+    def invalidate(self, *names):
+        """Forget the memoized vectors of the recipes that use any of the given recipe or FD entry names, directly
+        or through other recipes, as well as those of the named recipes themselves.
+        """
+        to_visit = list(names)
+        visited = set()
+        while to_visit:
+            name = to_visit.pop()
+            if name in visited:
+                continue
+            visited.add(name)
+            self.vectors.pop(name, None)
+            to_visit.extend(self.dependents.get(name, ()))
+
+    def sync(self):
+        """Reload the recipes or invalidate the affected recipes if the recipes file or the FD has changed."""
+        if self.version != data.get_file_version(self.path):
+            self.load()
+        if self.fd_generation != len(self.fd_store.changes):
+            for changed_names in self.fd_store.changes[self.fd_generation:]:
+                self.invalidate(*changed_names)
+            self.fd_generation = len(self.fd_store.changes)
+
+    def find_cycle(self, name, ingredients):
+        """Check whether a recipe with the given ingredients would contain itself.
+
+        :param name: A string of the recipe name.
+        :param ingredients: A list of [ingredient_name, amount, unit] lists.
+
+        :returns: A list of the recipe names forming the cycle, starting and ending with name, or None if there
+            is no cycle.
+        """
+        def visit(ingredient_names, path):
+            for ingredient_name in ingredient_names:
+                if ingredient_name == name:
+                    return path + [name]
+                if ingredient_name in self.ingredients and ingredient_name not in path:
+                    cycle = visit([ing[0] for ing in self.ingredients[ingredient_name]], path + [ingredient_name])
+                    if cycle:
+                        return cycle
+            return None
+
+        return visit([ing[0] for ing in ingredients], [name])
+
+    def get_vector(self, name):
+        """Return the per-serving vector (calories to cost) of a recipe. A value is blank (NaN) only if it is blank
+        for every ingredient.
+
+        :param name: A string of the recipe name.
+
+        :raises RecipeCycleError: If the recipe contains itself.
+        :raises KeyError: If an ingredient is neither a recipe nor a Food Dictionary entry, or its unit can't be
+            converted into one of the entry's serving sizes.
+        """
+        self.sync()
+        return self._flatten(name, [])
+
+    def _flatten(self, name, path):
+        """Calculate the per-serving vector of a recipe, keeping the names of the recipes being calculated in
+        path to detect cycles.
+        """
+        vector = self.vectors.get(name)
+        if vector is not None:
+            return vector
+        if name in path:
+            raise RecipeCycleError(' -> '.join(path + [name]))
+
+        totals = [math.nan] * NUM_VALUES
+        for ingredient_name, amount, unit in self.ingredients[name]:
+            if ingredient_name in self.ingredients:
+                ingredient_vector = self._flatten(ingredient_name, path + [name])
+                num_of_servings = float(amount)
+            else:
+                ingredient_vector = self.fd_store.vectors[self.fd_store.index[ingredient_name]]
+                num_of_servings = self.fd_store.get_servings(ingredient_name, amount, unit)
+            for i in range(NUM_VALUES):
+                if not math.isnan(ingredient_vector[i]):
+                    total = 0 if math.isnan(totals[i]) else totals[i]
+                    totals[i] = total + ingredient_vector[i] * num_of_servings
+
+        vector = self.vectors[name] = array('d', [total / self.servings[name] for total in totals])
+        return vector
+
+    def get_row(self, name):
+        """Return a row of strings describing one serving of the recipe, in the same format as a Food Dictionary
+        row. The recipe can then be logged like any other Food Dictionary entry, with 'Serving(s)' as its only
+        unit.
+        """
+        vector = self.get_vector(name)
+        return [name, '{}', *[to_str(val) for val in vector[:15]], '', to_str(vector[15])]
+
+
+def load_recipe_book(path, fd_path):
+    """Return a RecipeBook for the recipes file, using the Food Dictionary at fd_path for the ingredients. The book is
+    reused, and only updated when the recipes file or the Food Dictionary changes.
+
+    :param path: A string of the recipes file pathname.
+    :param fd_path: A string of the Food Dictionary file pathname.
+    """
+    fd_store = load_fd_store(fd_path)
+    book = _recipe_books.get(path)
+    if book is None or book.fd_store is not fd_store:
+        book = _recipe_books[path] = RecipeBook(path, fd_store)
+    else:
+        book.sync()
+    return book
+
+
+def get_loggable_names(fd_path, recipes_path):
+    """Return a list of the names of every Food Dictionary entry, followed by the names of every recipe. Recipes that
+    can't be calculated, such as those with an ingredient that was removed from the FD, are left out.
+    """
+    book = load_recipe_book(recipes_path, fd_path)
+    recipe_names = []
+    for name in book.names:
+        try:
+            book.get_vector(name)
+        except (KeyError, RecipeCycleError):
+            continue
+        recipe_names.append(name)
+    return load_fd_store(fd_path).names + recipe_names
+
+
+def get_loggable_rows(fd_path, recipes_path, names):
+    """Get the Food Dictionary rows for a set of FD entry or recipe names.
+
+    :param fd_path: A string of the Food Dictionary file pathname.
+    :param recipes_path: A string of the recipes file pathname.
+    :param names: A list of FD entry and recipe names.
+
+    :returns: A list of rows in the order of the names, each a new list that may be modified by the caller. Recipe
+        rows are made by RecipeBook.get_row(). Names that match neither are left out.
+    """
+    fd_store = load_fd_store(fd_path)
+    book = load_recipe_book(recipes_path, fd_path)
+    rows = []
+    for name in names:
+        if name in fd_store:
+            rows.append(list(fd_store.get_row(name)))
+        elif name in book:
+            rows.append(book.get_row(name))
+    return rows
+
+
+def get_log_entries(fd_path, path, entry_names=None, match=True):
+    """Get the entries of a log file, joined to the Food Dictionary by FoodDictStore.resolve_log_rows(), so each entry
+    has the current name of its FD entry.
+
+    :param fd_path: A string of the Food Dictionary file pathname.
+    :param path: A string of the log file pathname.
+    :param entry_names: A list of entry names. Default is None, which returns every entry.
+    :param match: If True, the entries with the names in entry_names are returned, in the order of the names. If
+        False, the entries without those names are returned, in log order. Default is True.
+
+    :returns: A list of log rows, or 'file not found' if the log doesn't exist.
+    """
+    rows = data.get_entries(path, return_all=True)
+    if rows == 'file not found':
+        return rows
+    rows = load_fd_store(fd_path).resolve_log_rows(rows)
+    if entry_names is None:
+        return rows
+    if not match:
+        names = set(entry_names)
+        return [row for row in rows if row[0] not in names]
+    rows_by_name = {}
+    for row in rows:
+        rows_by_name.setdefault(row[0], []).append(row)
+    return [row for name in entry_names for row in rows_by_name.get(name, [])]
+
+
+def get_unit_options(fd_path, name):
+    """Return a list of every unit that an amount of a Food Dictionary entry or recipe can be given in."""
+    fd_store = load_fd_store(fd_path)
+    if name in fd_store:
+        return fd_store.unit_options(name)
+    return ['Serving(s)']
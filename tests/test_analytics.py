@@ -0,0 +1,227 @@
+"""Test the analytics module."""
+import os
+import math
+import time
+import random
+import shutil
+import datetime
+import tempfile
+import itertools
+import unittest
+from unittest.mock import patch
+
+from PyQt5.QtWidgets import QApplication
+
+from healthhelper import analytics
+from healthhelper import data
+from healthhelper import goals
+from healthhelper import store
+import healthhelper.interface as interface
+
+# Directory containing this file
+this_dir = os.path.abspath(os.path.dirname(__file__))
+# Path to the test food dictionary file
+TEST_FD_PATH = os.path.join(this_dir, 'test_files', 'test_food_dictionary_file.csv')
+
+app = QApplication([])
+
+
+def make_fd_row(name, calories, protein, cost, fat=''):
+    """Make a Food Dictionary row with a 100 g serving and the given per-serving values."""
+    return [name, "{'g': '100'}", str(calories), str(fat)] + [''] * 12 + [str(protein), '', str(cost)]
+
+
+class TestCostEfficiency(unittest.TestCase):
+
+    def setUp(self):
+        self.fd_store = store.FoodDictStore(TEST_FD_PATH)
+
+    def test_value_per_dollar(self):
+        """Entries without the value or without cost info should be NaN."""
+        result = analytics.get_value_per_dollar(self.fd_store, 'protein')
+        self.assertEqual(result[0], 28)
+        for val in result[1:]:
+            self.assertTrue(math.isnan(val))
+
+    def test_ranking(self):
+        """Only entries with both values should be ranked, from best to worst value."""
+        self.fd_store.add_row(['rice', "{'cup': '1'}", '200', '', '', '', '', '', '', '', '', '', '', '', '', '',
+                               '4', "['3.00', '20']", '0.15'])
+        self.assertEqual(analytics.rank_cost_efficiency(self.fd_store, 'calories'),
+                         [['rice', 200 / 0.15], ['cereal', 800]])
+        self.assertEqual(analytics.rank_cost_efficiency(self.fd_store, 'calories', top_k=1),
+                         [['rice', 200 / 0.15]])
+
+    def test_filters(self):
+        """Entries outside of the per-serving limits should be left out."""
+        self.fd_store.add_row(['rice', "{'cup': '1'}", '200', '', '', '', '', '', '', '', '', '', '', '', '', '',
+                               '4', "['3.00', '20']", '0.15'])
+        result = analytics.rank_cost_efficiency(self.fd_store, 'calories', filters={'cost': [0.2, None]})
+        self.assertEqual(result, [['cereal', 800]])
+        result = analytics.rank_cost_efficiency(self.fd_store, 'calories', filters={'protein': [5, None]})
+        self.assertEqual(result, [['cereal', 800]])
+
+    def test_large_fd(self):
+        """Ranking a 50,000 entry Food Dictionary should stay interactive."""
+        fd_store = store.FoodDictStore('nonexistent_path')
+        for num in range(50000):
+            fd_store.add_row([f'food {num}', "{'g': '100'}", str(num % 500), '', '', '', '', '', '', '', '', '',
+                              '', '', '', '', str(num % 30), "['5.00', '10']", str(0.1 + num % 7)])
+        start = time.perf_counter()
+        analytics.rank_cost_efficiency(fd_store, 'protein', top_k=25, filters={'cost': [None, 5]})
+        analytics.rank_cost_efficiency(fd_store, 'protein', top_k=25, filters={'cost': [None, 3]})
+        self.assertLess(time.perf_counter() - start, 1)
+
+
+class TestSuggestFoods(unittest.TestCase):
+
+    def setUp(self):
+        self.fd_store = store.FoodDictStore('nonexistent_path')
+        for row in [make_fd_row('rice', 200, 4, 0.15), make_fd_row('chicken', 165, 31, 1.5),
+                    make_fd_row('tofu', 80, 8, 0.5), make_fd_row('chips', 500, '', 0.8),
+                    make_fd_row('beans', 120, 8, '')]:
+            self.fd_store.add_row(row)
+
+    def test_single(self):
+        """An entry that can reach the targets alone should be suggested first, in the amount that reaches them."""
+        entries, amounts, cost, distance = analytics.suggest_foods(self.fd_store, {'protein': 62})[0]
+        self.assertEqual([entries, amounts, cost, distance], [[['chicken', 2]], {'protein': 62}, 3, 0])
+        # Entries without a target value are left out.
+        suggestions = analytics.suggest_foods(self.fd_store, {'protein': 62, 'calories': 0}, top_k=100)
+        self.assertNotIn('chips', [name for entries, *info in suggestions for name, servings in entries])
+        self.assertEqual(analytics.suggest_foods(self.fd_store, {'protein': 0}), [])
+
+    def test_pair(self):
+        """Two entries that make up for each other's gaps should be suggested together."""
+        suggestions = analytics.suggest_foods(self.fd_store, {'calories': 730, 'protein': 70})
+        self.assertEqual(suggestions[0], [[['rice', 2], ['chicken', 2]], {'calories': 730, 'protein': 70}, 3.3, 0])
+        self.assertEqual([info[3] for info in suggestions], sorted(info[3] for info in suggestions))
+
+    def test_cost_limit(self):
+        """Suggestions should cost no more than the limit, and entries without cost info should be left out."""
+        suggestions = analytics.suggest_foods(self.fd_store, {'calories': 730, 'protein': 70}, max_cost=2)
+        self.assertTrue(suggestions)
+        for entries, amounts, cost, distance in suggestions:
+            self.assertLessEqual(cost, 2)
+            self.assertNotIn('beans', [name for name, servings in entries])
+        self.assertGreater(suggestions[0][3], 0)
+        suggestion = analytics.suggest_foods(self.fd_store, {'protein': 16, 'calories': 240})[0]
+        self.assertEqual(suggestion[0], [['beans', 2]])
+        self.assertTrue(math.isnan(suggestion[2]))
+
+    def test_closest(self):
+        """The closest single entry should match a search of every amount of every entry."""
+        random.seed(1)
+        fd_store = store.FoodDictStore('nonexistent_path')
+        for num in range(30):
+            fd_store.add_row(make_fd_row(f'food {num}', random.randint(20, 600), random.randint(0, 40),
+                                         round(random.uniform(0.1, 5), 2), random.randint(0, 30)))
+        targets = {'calories': 700, 'protein': 45, 'total fat': 20}
+
+        def get_distance(entries):
+            return math.sqrt(sum(((sum(servings * fd_store.vectors[fd_store.index[name]][store.VALUE_INDEX[value]]
+                                       for name, servings in entries) - amount) / amount) ** 2
+                                 for value, amount in targets.items()) / len(targets))
+
+        amounts = [step * analytics.SUGGESTION_STEP for step in range(1, 17)]
+        closest = min(get_distance([[name, servings]]) for name, servings in itertools.product(fd_store.names, amounts)
+                      if servings * fd_store.vectors[fd_store.index[name]][15] <= 6)
+        suggestions = analytics.suggest_foods(fd_store, targets, max_cost=6, top_k=100)
+        self.assertAlmostEqual(min(distance for entries, amounts, cost, distance in suggestions
+                                   if len(entries) == 1), closest)
+        for entries, amounts, cost, distance in suggestions:
+            self.assertAlmostEqual(get_distance(entries), distance)
+
+    def test_large_fd(self):
+        """Suggesting foods from a 20,000 entry Food Dictionary should stay interactive."""
+        fd_store = store.FoodDictStore('nonexistent_path')
+        for num in range(20000):
+            fd_store.add_row(make_fd_row(f'food {num}', 20 + num % 580, num % 41, 0.1 + num % 7, num % 31))
+        targets = {'calories': 600, 'protein': 40, 'total fat': 20}
+        # The first call builds the store's TargetMatrix, which later calls reuse.
+        analytics.suggest_foods(fd_store, targets, max_cost=5)
+        times = []
+        for num in range(3):
+            start = time.perf_counter()
+            analytics.suggest_foods(fd_store, dict(targets, protein=30 + num), max_cost=5)
+            times.append(time.perf_counter() - start)
+        # Well under the 100 ms an interactive suggestion may take.
+        self.assertLess(min(times), 0.07)
+
+    def test_cached_matrix(self):
+        """The TargetMatrix of a set of target values should be reused until the Food Dictionary changes."""
+        analytics.suggest_foods(self.fd_store, {'protein': 62})
+        matrix = analytics.get_target_matrix(self.fd_store, ('protein',))
+        analytics.suggest_foods(self.fd_store, {'protein': 30}, max_cost=2)
+        self.assertIs(analytics.get_target_matrix(self.fd_store, ('protein',)), matrix)
+        self.fd_store.add_row(make_fd_row('egg', 70, 6, 0.25))
+        self.assertIsNot(analytics.get_target_matrix(self.fd_store, ('protein',)), matrix)
+        self.assertIn('egg', [entries[0][0] for entries, amounts, cost, distance in
+                              analytics.suggest_foods(self.fd_store, {'protein': 6})])
+
+
+@patch('healthhelper.interface.FD_PATH', TEST_FD_PATH)
+class TestSuggestWin(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.goals_path = os.path.join(self.temp_dir, 'goals.csv')
+        self.log_dir = os.path.join(self.temp_dir, 'log files')
+        self.date = datetime.date(2020, 5, 1)
+        goals.write_goals(self.goals_path, {'protein': [5000, None], 'cost': [None, 1000]})
+        path = data.get_log_path(self.log_dir, self.date)
+        os.makedirs(os.path.dirname(path))
+        data.write_entries(path, [['cereal', "['60', 'g']", '1', '200'] + [''] * 13 + ['36', '2.5']])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_suggestions_table(self):
+        """The targets should start as what is left of the goals, and the table should update when they change."""
+        with patch('healthhelper.interface.GOALS_PATH', self.goals_path), \
+                patch('healthhelper.interface.LOG_FILES_DIR', self.log_dir):
+            win = interface.SuggestWin(self.date)
+        self.assertEqual(win.target_textboxes['protein'].text(), '14')
+        self.assertEqual(win.target_textboxes['cost'].text(), '7.50')
+        self.assertEqual(win.target_textboxes['calories'].text(), '')
+        self.assertEqual(win.suggestions_table.rowCount(), 1)
+        self.assertEqual(win.suggestions_table.item(0, 0).text(), '2 serving(s) of cereal (120 g)')
+        self.assertEqual(win.suggestions_table.item(0, 3).text(), '0%')
+
+        win.target_textboxes['cost'].setText('0.05')
+        win.update_suggestions()
+        self.assertEqual(win.suggestions_table.rowCount(), 0)
+        win.target_textboxes['protein'].setText('')
+        win.update_suggestions()
+        self.assertEqual(win.summary_label.text(), 'Enter an amount to get suggestions.')
+
+    def test_log_to_suggest_win(self):
+        log_win = interface.LogWin()
+        with patch.object(interface, 'SuggestWin') as suggest_win_mock:
+            log_win.suggest_btn.click()
+            suggest_win_mock.assert_called()
+
+
+@patch('healthhelper.interface.FD_PATH', TEST_FD_PATH)
+class TestCostAnalyticsWin(unittest.TestCase):
+
+    def test_ranking_table(self):
+        """The table should show the ranked entries, and update when the input changes."""
+        win = interface.CostAnalyticsWin()
+        self.assertEqual(win.ranking_table.rowCount(), 1)
+        self.assertEqual(win.ranking_table.item(0, 0).text(), 'cereal')
+        self.assertEqual(win.ranking_table.item(0, 1).text(), '28.00')
+
+        win.max_cost_textbox.setText('0.1')
+        win.update_ranking()
+        self.assertEqual(win.ranking_table.rowCount(), 0)
+
+    def test_back_to_fd_win(self):
+        win = interface.CostAnalyticsWin()
+        with patch.object(interface, 'FoodDictWin') as fd_win_mock:
+            win.back_to_fd_win_btn.click()
+            fd_win_mock.assert_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+"""Test the packed yearly log archives."""
+import io
+import os
+import shutil
+import datetime
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from PyQt5.QtTest import QTest
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+
+import healthhelper.interface as interface
+from healthhelper import archive
+from healthhelper import data
+from healthhelper.__main__ import main
+
+# Directory containing this file
+this_dir = os.path.abspath(os.path.dirname(__file__))
+# Path to the test log files directory.
+TEST_LOG_FILE_DIR = os.path.join(this_dir, 'test_files', 'other_test_log_files')
+
+app = QApplication([])
+
+
+class TestArchive(unittest.TestCase):
+
+    def setUp(self):
+        """Copy the test log files into a temporary log files directory and add a log for the next year."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_dir = os.path.join(self.temp_dir, 'log files')
+        shutil.copytree(TEST_LOG_FILE_DIR, self.log_dir)
+        self.june_path = os.path.join(self.log_dir, '2020', '06 - June', '30.csv')
+        self.july_path = os.path.join(self.log_dir, '2020', '07 - July', '01.csv')
+        self.next_year_path = os.path.join(self.log_dir, '2021', '01 - January', '05.csv')
+        os.makedirs(os.path.dirname(self.next_year_path))
+        data.write_entries(self.next_year_path, [['rice', "['1', 'cup']", '1'] + ['1'] * 16])
+        self.june_entries = data.get_entries(self.june_path, return_all=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_pack_and_unpack(self):
+        """Archived days should be read through their usual pathnames, and unpacking should restore the files."""
+        with open(self.july_path, 'rb') as f:
+            july_contents = f.read()
+
+        self.assertEqual(archive.pack_year(self.log_dir, 2020), 2)
+        self.assertFalse(os.path.exists(os.path.join(self.log_dir, '2020')))
+        self.assertEqual(data.get_entries(self.june_path, return_all=True), self.june_entries)
+        self.assertEqual(data.get_entries(self.july_path, ['eggs'])[0][0], 'eggs')
+        self.assertTrue(data.is_archived_log(self.june_path))
+        self.assertFalse(data.log_exists(os.path.join(self.log_dir, '2020', '07 - July', '02.csv')))
+        self.assertEqual(data.get_log_file_paths(self.log_dir), [self.next_year_path])
+        self.assertEqual(data.get_log_file_paths(self.log_dir, include_archived=True),
+                         [self.june_path, self.july_path, self.next_year_path])
+
+        self.assertEqual(archive.unpack_year(self.log_dir, 2020), 2)
+        self.assertFalse(os.path.exists(archive.get_archive_path(self.log_dir, 2020)))
+        with open(self.july_path, 'rb') as f:
+            self.assertEqual(f.read(), july_contents)
+
+    def test_repack(self):
+        """Packing an archived year again should add new log files to the archive."""
+        archive.pack_year(self.log_dir, 2020)
+        new_path = os.path.join(self.log_dir, '2020', '12 - December', '31.csv')
+        os.makedirs(os.path.dirname(new_path))
+        data.write_entries(new_path, [['tea', "['1', 'cup']", '1'] + [''] * 16])
+        self.assertEqual(archive.pack_year(self.log_dir, 2020), 3)
+        self.assertEqual(data.get_entries(new_path, return_all=True)[0][0], 'tea')
+        self.assertEqual(data.get_entries(self.june_path, return_all=True), self.june_entries)
+
+    def test_pack_current_year(self):
+        """The current year can't be archived."""
+        with self.assertRaises(ValueError):
+            archive.pack_year(self.log_dir, datetime.date.today().year)
+
+    def test_range_totals(self):
+        """Range totals should include archived days."""
+        expected = data.get_range_totals(self.log_dir, datetime.date(2020, 1, 1), datetime.date(2021, 12, 31))
+        archive.pack_year(self.log_dir, 2020)
+        self.assertEqual(data.get_range_totals(self.log_dir, datetime.date(2020, 1, 1),
+                                               datetime.date(2021, 12, 31)), expected)
+        num_days, totals = data.get_range_totals(self.log_dir, datetime.date(2020, 7, 1), datetime.date(2020, 7, 1))
+        self.assertEqual(num_days, 1)
+        self.assertEqual(totals[0], '190')
+
+    def test_navigation(self):
+        """The log window should navigate to and display archived days, but not change them."""
+        archive.pack_year(self.log_dir, 2020)
+        with patch('healthhelper.interface.LOG_FILES_DIR', self.log_dir):
+            log_win = interface.LogWin(datetime.date(2021, 1, 5))
+            QTest.mouseClick(log_win.prev_log_btn, Qt.LeftButton)
+            archived_win = log_win.prev_log_win
+            self.assertEqual(archived_win.date, datetime.date(2020, 7, 1))
+            self.assertEqual(archived_win.log_table.item(0, 0).text(), 'bread')
+
+            with patch.object(interface, 'MessageWin') as message_win_mock:
+                QTest.mouseClick(archived_win.delete_log_btn, Qt.LeftButton)
+                message_win_mock.assert_called_with('archived log')
+
+            QTest.mouseClick(archived_win.prev_log_btn, Qt.LeftButton)
+            self.assertEqual(archived_win.prev_log_win.date, datetime.date(2020, 6, 30))
+
+    def test_command(self):
+        """The archive and unarchive commands should pack and unpack a year."""
+        with patch('healthhelper.interface.LOG_FILES_DIR', self.log_dir), redirect_stdout(io.StringIO()):
+            main(['archive', '2020'])
+            self.assertTrue(os.path.exists(archive.get_archive_path(self.log_dir, 2020)))
+            main(['unarchive', '2020'])
+            self.assertTrue(os.path.exists(self.june_path))
+            with self.assertRaises(SystemExit):
+                main(['unarchive', '2020'])
+
+
+if __name__ == '__main__':
+    unittest.main()
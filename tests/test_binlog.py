@@ -0,0 +1,124 @@
+"""Test the memory-mapped binary log store."""
+import io
+import os
+import math
+import shutil
+import datetime
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from healthhelper import archive
+from healthhelper import binlog
+from healthhelper import data
+from healthhelper.__main__ import main
+
+# Directory containing this file
+this_dir = os.path.abspath(os.path.dirname(__file__))
+# Path to the test log files directory.
+TEST_LOG_FILE_DIR = os.path.join(this_dir, 'test_files', 'other_test_log_files')
+
+
+class TestBinaryLogStore(unittest.TestCase):
+
+    def setUp(self):
+        """Copy the test log files into a temporary log files directory."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_dir = os.path.join(self.temp_dir, 'log files')
+        shutil.copytree(TEST_LOG_FILE_DIR, self.log_dir)
+        self.store_path = os.path.join(self.temp_dir, 'log_store.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def assert_totals_match(self, start_date, end_date):
+        """The store's totals should match the totals of the csv logs, to float32 precision."""
+        totals = data.get_range_totals(self.log_dir, start_date, end_date)[1]
+        with binlog.BinaryLogStore(self.store_path) as log_store:
+            for expected, actual in zip(totals, log_store.sum_values(start_date, end_date)):
+                self.assertTrue(math.isclose(float(expected), actual, rel_tol=1e-6), (expected, actual))
+
+    def test_export(self):
+        """Each log entry should be exported as one record, in date order."""
+        self.assertEqual(binlog.sync_log_store(self.log_dir, self.store_path), [2, 0])
+        with binlog.BinaryLogStore(self.store_path) as log_store:
+            self.assertEqual(len(log_store), 4)
+            date, name, amount, unit, servings, values = log_store.get_record(1)
+            self.assertEqual([date, name, amount, unit, servings], [datetime.date(2020, 6, 30), 'popcorn', 3.0,
+                                                                    'tbsp', 1.5])
+            self.assertEqual(values[0], 165)
+            self.assertTrue(math.isnan(values[4]))
+            self.assertEqual(log_store.get_record_range(datetime.date(2020, 7, 1)), [2, 4])
+        self.assert_totals_match(datetime.date(2020, 1, 1), datetime.date(2020, 12, 31))
+        self.assert_totals_match(datetime.date(2020, 7, 1), datetime.date(2020, 7, 1))
+
+    def test_sync(self):
+        """Only changed log files should be parsed again."""
+        binlog.sync_log_store(self.log_dir, self.store_path)
+        self.assertEqual(binlog.sync_log_store(self.log_dir, self.store_path), [0, 2])
+
+        july_path = os.path.join(self.log_dir, '2020', '07 - July', '01.csv')
+        entries = data.get_entries(july_path, return_all=True)
+        data.write_entries(july_path, entries[:1])
+        new_path = os.path.join(self.log_dir, '2020', '07 - July', '02.csv')
+        data.write_entries(new_path, [['rice', "['1', 'cup']", '1'] + ['1'] * 16])
+        self.assertEqual(binlog.sync_log_store(self.log_dir, self.store_path), [2, 1])
+        with binlog.BinaryLogStore(self.store_path) as log_store:
+            self.assertEqual(len(log_store), 4)
+            self.assertEqual(log_store.get_record(3)[1:4], ['rice', 1.0, 'cup'])
+        self.assert_totals_match(datetime.date(2020, 1, 1), datetime.date(2020, 12, 31))
+
+    def test_stale_sidecar(self):
+        """A store replaced without its sidecar should be rebuilt, even if it has as many records as before."""
+        binlog.sync_log_store(self.log_dir, self.store_path)
+        sidecar_path = binlog.get_sidecar_path(self.store_path)
+        with open(sidecar_path) as f:
+            old_sidecar = f.read()
+
+        # Move an entry from one day to the other, so the number of records stays the same.
+        june_path = os.path.join(self.log_dir, '2020', '06 - June', '30.csv')
+        july_path = os.path.join(self.log_dir, '2020', '07 - July', '01.csv')
+        june_entries = data.get_entries(june_path, return_all=True)
+        july_entries = data.get_entries(july_path, return_all=True)
+        data.write_entries(june_path, june_entries + july_entries[:1])
+        data.write_entries(july_path, july_entries[1:])
+        binlog.sync_log_store(self.log_dir, self.store_path)
+        # The process stopped after replacing the store, before replacing the sidecar.
+        with open(sidecar_path, 'w') as f:
+            f.write(old_sidecar)
+
+        with binlog.BinaryLogStore(self.store_path) as log_store:
+            self.assertFalse(log_store.is_consistent)
+        self.assertEqual(binlog.sync_log_store(self.log_dir, self.store_path), [2, 0])
+        with binlog.BinaryLogStore(self.store_path) as log_store:
+            self.assertTrue(log_store.is_consistent)
+        self.assert_totals_match(datetime.date(2020, 7, 1), datetime.date(2020, 7, 1))
+
+    def test_archived_logs(self):
+        """Archived logs should be exported, and copied until their archive changes."""
+        expected = data.get_range_totals(self.log_dir, datetime.date(2020, 1, 1), datetime.date(2020, 12, 31))
+        archive.pack_year(self.log_dir, 2020)
+        self.assertEqual(binlog.sync_log_store(self.log_dir, self.store_path), [2, 0])
+        self.assertEqual(binlog.sync_log_store(self.log_dir, self.store_path), [0, 2])
+        with binlog.BinaryLogStore(self.store_path) as log_store:
+            self.assertTrue(math.isclose(log_store.sum_values()[0], float(expected[1][0]), rel_tol=1e-6))
+
+    def test_empty(self):
+        """A store with no records should sum to zero."""
+        empty_dir = os.path.join(self.temp_dir, 'no logs')
+        binlog.sync_log_store(empty_dir, self.store_path)
+        with binlog.BinaryLogStore(self.store_path) as log_store:
+            self.assertEqual(len(log_store), 0)
+            self.assertEqual(log_store.sum_values(), [0.0] * 16)
+
+    def test_command(self):
+        """The export-binary command should create the store."""
+        with patch('healthhelper.interface.LOG_FILES_DIR', self.log_dir), redirect_stdout(io.StringIO()):
+            main(['export-binary', self.store_path])
+        with binlog.BinaryLogStore(self.store_path) as log_store:
+            self.assertEqual(len(log_store), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
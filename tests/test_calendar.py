@@ -0,0 +1,115 @@
+"""Test the calendar heatmap of the logged days."""
+import os
+import shutil
+import datetime
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from PyQt5.QtTest import QTest
+from PyQt5.QtCore import Qt, QPoint
+from PyQt5.QtWidgets import QApplication
+
+import healthhelper.interface as interface
+from healthhelper import archive
+from healthhelper import data
+from tests.utils import write_day
+
+app = QApplication([])
+
+
+class TestCalendarWin(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_dir = os.path.join(self.temp_dir, 'log files')
+        write_day(self.log_dir, datetime.date(2019, 12, 31), '1500', '4')
+        write_day(self.log_dir, datetime.date(2020, 1, 1), '1000', '2')
+        write_day(self.log_dir, datetime.date(2020, 3, 15), '2000', '8')
+        archive.pack_year(self.log_dir, 2019)
+        with patch('healthhelper.interface.LOG_FILES_DIR', self.log_dir):
+            self.calendar_win = interface.CalendarWin(datetime.date(2020, 6, 1))
+        self.heatmap = self.calendar_win.heatmap
+
+    def tearDown(self):
+        self.calendar_win.close()
+        shutil.rmtree(self.temp_dir)
+
+    def get_cell_center(self, date):
+        """Return the QPoint at the center of a date's square in the heatmap."""
+        column, row = self.heatmap.get_cell(self.heatmap.series.get_day(date))
+        size = self.heatmap.cell_size()
+        left, top = self.heatmap.MARGINS[:2]
+        return QPoint(int(left + (column + 0.5) * size), int(top + (row + 0.5) * size))
+
+    def test_heatmap(self):
+        """Logged days should be shaded by the chosen total, darkest for the highest, and other days grey."""
+        self.assertEqual(len(self.calendar_win.series), 366)
+        self.assertEqual(self.calendar_win.summary_label.text(), '2 logged day(s)')
+        self.assertEqual(self.heatmap.get_color(0).getRgb(), (110, 128, 208, 255))
+        self.assertEqual(self.heatmap.get_color(74), interface.CalendarHeatmap.HIGH_COLOR)
+        self.assertEqual(self.heatmap.get_color(1), interface.CalendarHeatmap.EMPTY_COLOR)
+
+        # January 1st 2020 was a Wednesday, and the first column starts on the Monday before it.
+        self.assertEqual(self.heatmap.get_cell(0), [0, 2])
+        self.assertEqual(self.heatmap.get_cell(5), [1, 0])
+        for date in [datetime.date(2020, 1, 1), datetime.date(2020, 3, 15), datetime.date(2020, 12, 31)]:
+            point = self.get_cell_center(date)
+            self.assertEqual(self.heatmap.get_day_at(point.x(), point.y()), self.heatmap.series.get_day(date))
+        self.assertIsNone(self.heatmap.get_day_at(self.heatmap.MARGINS[0] + 1, self.heatmap.MARGINS[1] + 1))
+
+        self.calendar_win.value_combobox.setCurrentIndex(self.calendar_win.value_combobox.count() - 1)
+        self.assertEqual([self.heatmap.value_name, self.heatmap.max_value], ['cost', 8])
+
+    def test_year(self):
+        """Changing the year should show its days, including archived days, without reading a log per day."""
+        with patch('healthhelper.interface.LOG_FILES_DIR', self.log_dir):
+            QTest.mouseClick(self.calendar_win.prev_year_btn, Qt.LeftButton)
+        self.assertEqual(self.calendar_win.year_label.text(), '2019')
+        self.assertEqual(len(self.calendar_win.series), 365)
+        self.assertEqual(list(self.heatmap.series.logged).index(1), 364)
+
+        # Drawing the year only uses the series.
+        self.calendar_win.show()
+        with patch('os.path.exists') as exists_mock, patch('healthhelper.data.get_entries') as get_entries_mock:
+            self.heatmap.grab()
+            exists_mock.assert_not_called()
+            get_entries_mock.assert_not_called()
+
+    def test_date_index(self):
+        """Changing the year should read the cached date index of the log directories, without walking the log files
+        directory or checking each log file, and still show logs written since.
+        """
+        with patch('healthhelper.interface.LOG_FILES_DIR', self.log_dir):
+            # Both years have been shown once, so their logs have been read.
+            self.calendar_win.change_year(-1)
+            self.calendar_win.change_year(1)
+            with patch('os.walk') as walk_mock, patch('os.stat', wraps=os.stat) as stat_mock:
+                for step in [-1, 1, -1, 1]:
+                    self.calendar_win.change_year(step)
+            walk_mock.assert_not_called()
+            self.assertEqual([call for call in stat_mock.call_args_list if call[0][0].endswith('.csv')], [])
+
+            write_day(self.log_dir, datetime.date(2020, 3, 16), '500', '1')
+            write_day(self.log_dir, datetime.date(2020, 3, 15), '3000', '8')
+            self.calendar_win.change_year(0)
+        self.assertEqual(self.calendar_win.summary_label.text(), '3 logged day(s)')
+        self.assertEqual(self.heatmap.max_value, 3000)
+
+    def test_click_day(self):
+        """Clicking a day should open its log."""
+        self.calendar_win.show()
+        with patch.object(interface, 'LogWin') as log_win_mock:
+            QTest.mouseClick(self.heatmap, Qt.LeftButton, pos=self.get_cell_center(datetime.date(2020, 3, 15)))
+            log_win_mock.assert_called_once()
+            self.assertEqual(log_win_mock.call_args[0][0], datetime.date(2020, 3, 15))
+
+    def test_log_to_calendar_win(self):
+        log_win = interface.LogWin()
+        with patch.object(interface, 'CalendarWin') as calendar_win_mock:
+            QTest.mouseClick(log_win.calendar_btn, Qt.LeftButton)
+            calendar_win_mock.assert_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
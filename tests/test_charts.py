@@ -0,0 +1,162 @@
+"""Test the daily series and the trend charts."""
+import os
+import shutil
+import datetime
+import tempfile
+import unittest
+from array import array
+from unittest.mock import patch
+
+from PyQt5.QtTest import QTest
+from PyQt5.QtCore import Qt, QEvent, QDate, QPoint, QPointF
+from PyQt5.QtGui import QMouseEvent, QWheelEvent
+from PyQt5.QtWidgets import QApplication
+
+import healthhelper.interface as interface
+from healthhelper import analytics
+from healthhelper import archive
+from healthhelper import data
+from tests.utils import write_day
+
+app = QApplication([])
+
+
+class TestDailySeries(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_dir = os.path.join(self.temp_dir, 'log files')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_daily_series(self):
+        """Every day of the range should be in the series, with days without a log marked as not logged."""
+        write_day(self.log_dir, datetime.date(2019, 12, 31), '1500', '4.5')
+        write_day(self.log_dir, datetime.date(2020, 1, 3), '2000', '6')
+        archive.pack_year(self.log_dir, 2019)
+        series = analytics.get_daily_series(self.log_dir)
+        self.assertEqual(len(series), 4)
+        self.assertEqual(list(series.logged), [1, 0, 0, 1])
+        self.assertEqual(list(series.get_column('calories')), [1500, 0, 0, 2000])
+        self.assertEqual(series.get_column('cost')[0], 4.5)
+        self.assertEqual(series.get_date(3), datetime.date(2020, 1, 3))
+
+        series = analytics.get_daily_series(self.log_dir, datetime.date(2020, 1, 1), datetime.date(2020, 1, 10))
+        self.assertEqual(len(series), 10)
+        self.assertEqual(series.get_day(datetime.date(2020, 1, 3)), 2)
+        self.assertEqual(len(analytics.get_daily_series(os.path.join(self.temp_dir, 'none'))), 0)
+
+    def test_downsample(self):
+        """Downsampling should return at most two points per bucket and keep the highest and lowest days."""
+        values = array('d', [(day % 7) * 100 for day in range(3650)])
+        values[1234] = 10000
+        logged = array('b', [1] * 3650)
+        logged[10] = 0
+        points = analytics.downsample_min_max(values, logged, 0, 3650, 300)
+        self.assertLessEqual(len(points), 600)
+        self.assertIn([1234, 10000], points)
+        self.assertEqual([day for day, value in points], sorted(day for day, value in points))
+
+        # Short ranges keep every logged day.
+        points = analytics.downsample_min_max(values, logged, 5, 15, 300)
+        self.assertEqual([day for day, value in points], [5, 6, 7, 8, 9, 11, 12, 13, 14])
+
+
+class TestSeriesStats(unittest.TestCase):
+
+    def setUp(self):
+        self.calories = [2000, 0, 1800, 2600, 1500, 0, 0, 2100, 1900, 2200]
+        logged = array('b', [calories > 0 for calories in self.calories])
+        columns = [array('d', [0.0]) * 10 for _ in range(16)]
+        columns[0] = array('d', self.calories)
+        self.stats = analytics.SeriesStats(analytics.DailySeries(datetime.date(2020, 1, 1), logged, columns))
+
+    def test_range(self):
+        """Sums and means of any range should match a direct sum of the range."""
+        self.assertEqual(self.stats.get_sum('calories', 2, 5), 5900)
+        self.assertEqual(self.stats.get_num_logged(0, 10), 7)
+        self.assertEqual(self.stats.get_mean('calories', 1, 5), 5900 / 3)
+        self.assertIsNone(self.stats.get_mean('calories', 5, 7))
+        self.assertEqual(self.stats.get_sum('calories', -5, 50), sum(self.calories))
+
+    def test_rolling(self):
+        """Rolling statistics should match a recalculation of each window."""
+        for window in [1, 3, 7, 20]:
+            windows = [[calories for calories in self.calories[max(day + 1 - window, 0):day + 1] if calories]
+                       for day in range(10)]
+            self.assertEqual(list(self.stats.get_rolling_sums('calories', window)), [sum(days) for days in windows])
+            self.assertEqual(self.stats.get_rolling_means('calories', window, 2, 9),
+                             [sum(days) / len(days) if days else None for days in windows[2:9]])
+            self.assertEqual(self.stats.get_rolling_extremes('calories', window, 3),
+                             [max(days) if days else None for days in windows[3:]])
+            self.assertEqual(self.stats.get_rolling_extremes('calories', window, maximum=False),
+                             [min(days) if days else None for days in windows])
+
+
+class TestTrendsWin(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_dir = os.path.join(self.temp_dir, 'log files')
+        date = datetime.date(2015, 1, 1)
+        while date <= datetime.date(2020, 12, 31):
+            write_day(self.log_dir, date, str(1800 + date.toordinal() % 500), '8')
+            date += datetime.timedelta(days=3)
+        self.date = datetime.date(2020, 12, 31)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_chart(self):
+        """The chart should draw at most two points per pixel column, and move with the chosen dates and drags."""
+        with patch('healthhelper.interface.LOG_FILES_DIR', self.log_dir):
+            trends_win = interface.TrendsWin(self.date)
+        trends_win.show()
+        chart = trends_win.chart
+        chart.grab()
+        self.assertEqual(chart.view_end - chart.view_start, 90)
+        self.assertEqual(len(chart.points), 30)
+
+        trends_win.start_date_edit.setDate(QDate(2015, 1, 1))
+        self.assertEqual(chart.view_start, 0)
+        chart.grab()
+        self.assertLessEqual(len(chart.points), 2 * chart.plot_width())
+        self.assertGreater(len(chart.points), chart.plot_width() // 2)
+
+        # Zoom in, then drag the chart to the left to move forward in time.
+        position = QPointF(chart.MARGINS[0], 100)
+        chart.wheelEvent(QWheelEvent(position, position, QPoint(), QPoint(0, 120), Qt.NoButton,
+                                     Qt.NoModifier, Qt.NoScrollPhase, False))
+        span = chart.view_end - chart.view_start
+        self.assertLess(span, len(trends_win.series))
+        QTest.mousePress(chart, Qt.LeftButton, pos=QPoint(300, 100))
+        QApplication.sendEvent(chart, QMouseEvent(QEvent.MouseMove, QPointF(200, 100), Qt.LeftButton, Qt.LeftButton,
+                                                  Qt.NoModifier))
+        QTest.mouseRelease(chart, Qt.LeftButton, pos=QPoint(200, 100))
+        self.assertGreater(chart.view_start, 0)
+        self.assertAlmostEqual(chart.view_end - chart.view_start, span)
+
+        # A 7-day average starts a week in, and is drawn over the daily totals.
+        trends_win.average_combobox.setCurrentIndex(1)
+        self.assertEqual(len(chart.averages), len(trends_win.series))
+        self.assertAlmostEqual(chart.averages[6], (trends_win.series.get_column('calories')[0]
+                                                   + trends_win.series.get_column('calories')[3]
+                                                   + trends_win.series.get_column('calories')[6]) / 3)
+
+        trends_win.value_combobox.setCurrentIndex(trends_win.value_combobox.count() - 1)
+        self.assertEqual(chart.value_name, 'cost')
+        chart.grab()
+        self.assertEqual({value for day, value in chart.points}, {8})
+        self.assertEqual(set(chart.averages), {8})
+        trends_win.close()
+
+    def test_log_to_trends_win(self):
+        log_win = interface.LogWin()
+        with patch.object(interface, 'TrendsWin') as trends_win_mock:
+            QTest.mouseClick(log_win.trends_btn, Qt.LeftButton)
+            trends_win_mock.assert_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
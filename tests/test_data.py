@@ -1,12 +1,23 @@
 """Test the data module."""
 import os
+import time
+import random
+import shutil
+import decimal
+import datetime
+import tempfile
 import unittest
+import threading
+import collections
+import multiprocessing
 from unittest.mock import patch
 
 from PyQt5.QtWidgets import QApplication
 
+from healthhelper import archive
 from healthhelper import data
 from healthhelper import interface
+from tests.utils import write_day
 
 # Directory containing this file
 this_dir = os.path.abspath(os.path.dirname(__file__))
@@ -203,6 +214,108 @@ class TestSumSharedValues(unittest.TestCase):
         self.assertEqual(result, ['12', '15', '18'])
 
 
+class TestFixedPoint(unittest.TestCase):
+
+    @staticmethod
+    def random_value(rand):
+        """Return a random value in one of the forms found in log files."""
+        form = rand.randrange(5)
+        if form == 0:
+            return ''
+        if form == 1:
+            return str(rand.randrange(-500, 5000))
+        if form == 2:
+            return f'{rand.randrange(0, 500000) / 10:.1f}'
+        return f'{rand.randrange(-50000, 500000) / 100:.2f}'
+
+    def test_conversion(self):
+        """Values should convert into hundredths and back without changing."""
+        for val, fixed in [('12.5', 1250), ('0.07', 7), ('-3.25', -325), ('.5', 50), ('40', 4000), ('', 0),
+                           (0.38, 38), (2, 200), ('0.125', 12), ('0.135', 14), ('1e-05', 0)]:
+            self.assertEqual(data.to_fixed(val), fixed)
+        self.assertEqual(data.format_fixed(1250), '12.5')
+        self.assertEqual(data.format_fixed(1250, pad=True), '12.50')
+        self.assertEqual(data.format_fixed(-7), '-0.07')
+        self.assertEqual(data.format_fixed(4000), '40')
+        self.assertEqual(data.from_fixed(38), 0.38)
+        self.assertEqual(data.from_fixed(4000), 40)
+
+    def test_matches_decimal(self):
+        """Random sums should match decimal arithmetic exactly."""
+        rand = random.Random(0)
+        for trial in range(50):
+            rows = [[self.random_value(rand) for col in range(16)] for row in range(rand.randrange(1, 200))]
+            for col, total in enumerate(data.sum_shared_values(rows)):
+                expected = sum(decimal.Decimal(row[col] or '0') for row in rows)
+                self.assertEqual(decimal.Decimal(total), expected)
+
+    def test_million_rows(self):
+        """A total over 1,000,000 rows should match decimal arithmetic exactly."""
+        rand = random.Random(1)
+        rows = [[self.random_value(rand)] for row in range(1000000)]
+        expected = sum(decimal.Decimal(row[0] or '0') for row in rows)
+        total = data.sum_fixed_values(rows)[0]
+        self.assertEqual(decimal.Decimal(total) / 100, expected)
+        self.assertEqual(decimal.Decimal(data.format_fixed(total)), expected)
+
+
+class TestSortTable(unittest.TestCase):
+
+    def test_sort_order(self):
+        """Entries should be sorted by their parsed values, with blank values last in either direction."""
+        keys = data.get_sort_keys(['10', '', '2.5', '10', '-1'])
+        self.assertEqual(data.get_sort_order(keys), [4, 2, 0, 3, 1])
+        self.assertEqual(data.get_sort_order(keys, descending=True), [0, 3, 2, 4, 1])
+        name_keys = data.get_sort_keys(['oats', 'Bread', 'apple'], numeric=False)
+        self.assertEqual(data.get_sort_order(name_keys), [2, 1, 0])
+
+    def test_fixed_sort_keys(self):
+        """Parsed values should sort like the strings they were parsed from, with blank values last."""
+        column = ['10', '', '2.5', '0', '-1']
+        keys = data.get_fixed_sort_keys(data.array('q', map(data.to_fixed, column)), column)
+        self.assertEqual(data.get_sort_order(keys), data.get_sort_order(data.get_sort_keys(column)))
+        self.assertEqual(data.get_sort_order(keys, descending=True), [0, 2, 3, 4, 1])
+
+    def test_reorder_table_rows(self):
+        """Rows should be moved along with their check states."""
+        table = interface.QTableWidget(50000, 2)
+        for row_index in range(table.rowCount()):
+            name_item = interface.QTableWidgetItem(str(row_index))
+            name_item.setCheckState(2 if row_index % 2 else 0)
+            table.setItem(row_index, 0, name_item)
+            table.setItem(row_index, 1, interface.QTableWidgetItem(str(-row_index)))
+        keys = data.get_sort_keys([str(-row_index) for row_index in range(table.rowCount())])
+        data.reorder_table_rows(table, data.get_sort_order(keys))
+        self.assertEqual(table.item(0, 0).text(), '49999')
+        self.assertEqual(table.item(0, 0).checkState(), 2)
+        self.assertEqual(table.item(49999, 1).text(), '0')
+
+
+class TestGetUnitServingSizes(unittest.TestCase):
+
+    def test_conversion(self):
+        """Serving size options should be kept as given, and convertible units should be added."""
+        result = data.get_unit_serving_sizes("{'g': '56', 'cup': '0.5'}")
+        self.assertEqual(list(result)[:3], ['Serving(s)', 'g', 'cup'])
+        self.assertEqual(result['g'], 56)
+        self.assertAlmostEqual(result['oz'], 56 / 28.349523125)
+        self.assertAlmostEqual(result['tbsp'], 8)
+        self.assertNotIn('item(s)', result)
+
+    def test_no_conversion(self):
+        """'item(s)' can't be converted into any other unit."""
+        result = data.get_unit_serving_sizes("{'item(s)': '2'}")
+        self.assertEqual(result, {'Serving(s)': 1, 'item(s)': 2})
+
+    def test_read_only(self):
+        """The cached serving sizes are shared, so a caller shouldn't be able to change them."""
+        result = data.get_unit_serving_sizes("{'g': '56'}")
+        with self.assertRaises(TypeError):
+            result['g'] = 1
+        self.assertEqual(data.get_unit_serving_sizes("{'g': '56'}")['g'], 56)
+        self.assertEqual(data.get_unit_serving_sizes.cache_info().maxsize, data.SERVING_SIZES_CACHE_SIZE)
+
+
 class TestCalculateEntryInfo(unittest.TestCase):
 
     def setUp(self):
@@ -262,6 +375,368 @@ class TestCalculateEntryInfo(unittest.TestCase):
 
         self.assertEqual(result, [expected_result1, expected_result2])
 
+    def test_converted_unit(self):
+        """An amount may be given in any unit that converts into one of the serving size options."""
+        result = data.calculate_entry_info([self.entry2], [['1', 'cup']], tally=False)
+        # 1 cup is 16 tbsp, and one serving is 2 tbsp.
+        self.assertEqual(result[0][2], 8)
+
+
+class TestPropagateFdEntry(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a log files directory containing two copies of the test log and one log without the edited entry."""
+        self.log_dir = tempfile.mkdtemp()
+        self.log_paths = []
+        for day in ['01.csv', '02.csv']:
+            month_dir = os.path.join(self.log_dir, '2020', '07 - July')
+            os.makedirs(month_dir, exist_ok=True)
+            self.log_paths.append(os.path.join(month_dir, day))
+            shutil.copy(TEST_LOG_PATH, self.log_paths[-1])
+        self.other_log_path = os.path.join(self.log_dir, '2020', '07 - July', '03.csv')
+        with open(self.other_log_path, 'w') as f:
+            f.write("peanut butter,\"['4', 'tbsp']\",2,,,,,,,,,,,,,,,,\n")
+
+        # The cereal entry with doubled calories and a new cost.
+        self.fd_entry = ['cereal', {'g': '60'}, '400', '1.5', '0', '0', '0', '0',
+                         '0', '10', '48', '8', '2', '6', '0', '0', '7', ['4.00', '8'], '0.5']
+
+    def tearDown(self):
+        shutil.rmtree(self.log_dir)
+
+    def test_find_logs_with_entry(self):
+        """Only the logs containing the entry should be found."""
+        self.assertEqual(data.find_logs_with_entry(self.log_dir, 'cereal'), self.log_paths)
+
+    def test_recompute(self):
+        """Matching log entries should be recalculated from their stored amounts. Other entries are left as-is."""
+        changed_logs = []
+        result = data.propagate_fd_entry(self.log_dir, self.fd_entry, max_workers=2, changed_logs=changed_logs)
+        self.assertEqual(result, {self.log_paths[0]: [1, 0], self.log_paths[1]: [1, 0]})
+        # The changes are given for undo, in order of path.
+        self.assertEqual([[path, old_entries] for path, old_entries, new_entries in changed_logs],
+                         [[path, data.get_entries(TEST_LOG_PATH, return_all=True)] for path in self.log_paths])
+        self.assertEqual([[[str(val) for val in entry] for entry in new_entries]
+                          for path, old_entries, new_entries in changed_logs],
+                         [data.get_entries(path, return_all=True) for path in self.log_paths])
+        expected_entry = ['cereal', "['1.5', 'Serving(s)']", '1.5', '600', '2.25', '0', '0', '0', '0',
+                          '0', '15', '72', '12', '3', '9', '0', '0', '10.5', '0.75']
+        for path in self.log_paths:
+            entries = data.get_entries(path, return_all=True)
+            self.assertEqual(entries[0], expected_entry)
+            self.assertEqual(entries[1:], data.get_entries(TEST_LOG_PATH, return_all=True)[1:])
+
+    def test_renamed_entry(self):
+        """If the FD entry was renamed, log entries with the old name should take the new name."""
+        self.fd_entry[0] = 'bran flakes'
+        data.propagate_fd_entry(self.log_dir, self.fd_entry, old_name='cereal', max_workers=2)
+        for path in self.log_paths:
+            self.assertEqual(data.get_file_entry_names(path), ['bran flakes', 'chocolate', 'peanut butter'])
+
+    def test_removed_unit(self):
+        """Log entries whose unit is no longer a serving size option should be skipped."""
+        fd_entry = ['peanut butter', {'g': '32'}, '190', '', '', '', '', '', '',
+                    '', '', '', '', '', '', '', '', '', '']
+        result = data.propagate_fd_entry(self.log_dir, fd_entry, max_workers=2)
+        for path in [*self.log_paths, self.other_log_path]:
+            self.assertEqual(result[path], [0, 1])
+        self.assertEqual(data.get_entries(self.other_log_path, return_all=True)[0][3], '')
+
+
+class TestRowCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.paths = [os.path.join(self.temp_dir, f'{day:02}.csv') for day in range(1, 4)]
+        for path in self.paths:
+            data.write_entries(path, [['rice', "['1', 'cup']", '1']])
+        self.cache = data.RowCache(data.ROW_CACHE_BUDGET)
+        self.cache_patcher = patch.object(data, 'row_cache', self.cache)
+        self.cache_patcher.start()
+
+    def tearDown(self):
+        self.cache_patcher.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def test_hits(self):
+        """A file should be parsed once, and each read should get its own copy of the rows."""
+        rows = data.get_entries(self.paths[0], return_all=True)
+        rows[0][0] = 'changed'
+        with patch('healthhelper.data.open') as open_mock:
+            self.assertEqual(data.get_entries(self.paths[0], return_all=True), [['rice', "['1', 'cup']", '1']])
+            open_mock.assert_not_called()
+        self.assertEqual([self.cache.hits, self.cache.misses], [1, 1])
+
+    def test_invalidation(self):
+        """Rows should be read again after the file is written, by write_entries() or by another process."""
+        data.get_entries(self.paths[0], return_all=True)
+        data.write_entries(self.paths[0], [['oats', "['1', 'cup']", '2']])
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(data.get_file_entry_names(self.paths[0]), ['oats'])
+
+        with open(self.paths[0], 'a') as f:
+            f.write("rice,\"['1', 'cup']\",1\n")
+        self.assertEqual(data.get_file_entry_names(self.paths[0]), ['oats', 'rice'])
+        os.remove(self.paths[0])
+        self.assertEqual(data.get_entries(self.paths[0], return_all=True), 'file not found')
+
+    def test_budget(self):
+        """The least recently used files should be dropped to keep the rows within the budget."""
+        for path in self.paths:
+            data.get_entries(path, return_all=True)
+        size = self.cache.size // 3
+        self.cache.resize(2 * size)
+        self.assertEqual(list(self.cache.files), self.paths[1:])
+        data.get_entries(self.paths[1], return_all=True)
+        data.get_entries(self.paths[0], return_all=True)
+        self.assertEqual(list(self.cache.files), [self.paths[1], self.paths[0]])
+        self.assertLessEqual(self.cache.size, self.cache.budget)
+
+        # Rows larger than the whole budget aren't kept.
+        self.cache.resize(size - 1)
+        data.get_entries(self.paths[2], return_all=True)
+        self.assertEqual([len(self.cache), self.cache.size], [0, 0])
+
+    def test_threads(self):
+        """Reads and invalidations from two threads at once should neither fail nor lose track of the size."""
+        class YieldingDict(collections.OrderedDict):
+            """An OrderedDict that lets other threads run after each lookup, so that they interleave."""
+            def get(self, *args):
+                value = super().get(*args)
+                time.sleep(0)
+                return value
+
+        self.cache.files = YieldingDict()
+        rows = [['rice', "['1', 'cup']", '1']]
+        errors = []
+        reading = threading.Event()
+        reading.set()
+
+        def read():
+            try:
+                for num in range(200):
+                    if self.cache.get(self.paths[0], 1) is None:
+                        self.cache.put(self.paths[0], 1, rows)
+            except Exception as error:
+                errors.append(error)
+            reading.clear()
+
+        def invalidate():
+            while reading.is_set():
+                self.cache.invalidate(self.paths[0])
+
+        threads = [threading.Thread(target=read), threading.Thread(target=invalidate)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.cache.size, sum(cached[2] for cached in self.cache.files.values()))
+
+
+class TestWriteBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_dir = os.path.join(self.temp_dir, 'log files')
+        self.path = data.get_log_path(self.log_dir, datetime.date(2020, 5, 1))
+        self.journal_path = os.path.join(self.temp_dir, 'pending_writes.jsonl')
+        self.buffer = data.WriteBuffer()
+        self.buffer_patcher = patch.object(data, 'write_buffer', self.buffer)
+        self.buffer_patcher.start()
+        # A long delay, so that the tests decide when the changes are written.
+        self.buffer.start(self.journal_path, delay=60)
+
+    def tearDown(self):
+        self.buffer.stop()
+        self.buffer_patcher.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def test_one_write(self):
+        """A sequence of changes should be seen straight away, and written to the file once."""
+        for num_servings in range(1, 6):
+            self.buffer.write(self.path, [['rice', "['1', 'cup']", num_servings]])
+        self.assertFalse(os.path.exists(self.path))
+        self.assertTrue(data.log_exists(self.path))
+        self.assertEqual(data.get_log_file_paths(self.log_dir), [self.path])
+        self.assertEqual(data.get_entries(self.path, return_all=True), [['rice', "['1', 'cup']", '5']])
+
+        self.buffer.flush()
+        self.assertEqual([self.buffer.num_changes, self.buffer.num_writes, len(self.buffer)], [5, 1, 0])
+        self.assertEqual(data.read_file_rows(self.path), [['rice', "['1', 'cup']", '5']])
+        self.assertFalse(os.path.exists(self.journal_path))
+
+    def test_remove(self):
+        """Removing a file should drop its buffered change and delete it straight away."""
+        self.buffer.write(self.path, [['rice', "['1', 'cup']", '1']])
+        self.buffer.flush()
+        self.buffer.write(self.path, [['rice', "['1', 'cup']", '2']])
+        self.buffer.remove(self.path)
+        self.assertFalse(data.log_exists(self.path))
+        self.buffer.flush()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_recover(self):
+        """Changes left in the journal by a process that didn't write them should be written on the next start."""
+        self.buffer.write(self.path, [['rice', "['1', 'cup']", '1']])
+        self.buffer.write(self.path, [['rice', "['1', 'cup']", '2']])
+        with open(self.journal_path, 'a') as f:
+            f.write('{"path": "partial')
+        self.buffer.files.clear()
+
+        data.WriteBuffer().start(self.journal_path)
+        self.assertEqual(data.read_file_rows(self.path), [['rice', "['1', 'cup']", '2']])
+        self.assertFalse(os.path.exists(self.journal_path))
+
+    def test_merge(self):
+        """Changes made to the file by another process after the first buffered change should be kept."""
+        os.makedirs(os.path.dirname(self.path))
+        data.write_entries(self.path, [['rice', "['1', 'cup']", '1'], ['oats', "['1', 'cup']", '1']])
+        self.buffer.write(self.path, [['rice', "['1', 'cup']", '2'], ['oats', "['1', 'cup']", '1']])
+        data.write_entries(self.path, [['rice', "['1', 'cup']", '1'], ['oats', "['1', 'cup']", '3'],
+                                       ['toast', "['1', 'slice']", '1']])
+        self.buffer.flush()
+        self.assertEqual(data.read_file_rows(self.path), [['rice', "['1', 'cup']", '2'], ['oats', "['1', 'cup']", '3'],
+                                                          ['toast', "['1', 'slice']", '1']])
+
+    def test_merge_rows(self):
+        """Each row should take the change of the writer that changed it. A row both changed should keep their
+        change and be a conflict.
+        """
+        base = [['a', '1'], ['b', '1'], ['c', '1'], ['d', '1'], ['g', '1']]
+        ours = [['b', '2'], ['a', '1'], ['c', '2'], ['e', '1'], ['g', '2']]
+        theirs = [['a', '3'], ['b', '3'], ['d', '1'], ['f', '1'], ['g', '2']]
+        self.assertEqual(data.merge_rows(base, ours, theirs), [[['b', '3'], ['a', '3'], ['e', '1'], ['g', '2'],
+                                                                ['f', '1']], ['b', 'c']])
+        # A row we removed and they changed is a conflict too.
+        self.assertEqual(data.merge_rows(base, base[1:], [['a', '3']] + base[1:]), [[['a', '3'], *base[1:]], ['a']])
+        # Rows with the same name can't be matched.
+        self.assertEqual(data.merge_rows(base, ours, theirs + [['a', '4']]),
+                         [theirs + [['a', '4']], ['b', 'c', 'd', 'e', 'g']])
+
+    def test_merge_sorted(self):
+        """Rows that both writers keep sorted, as the Food Dictionary's are, should stay sorted."""
+        base = [['b', '1'], ['d', '1']]
+        self.assertEqual(data.merge_rows(base, [['b', '1'], ['c', '1'], ['d', '1']], [['a', '1'], *base]),
+                         [[['a', '1'], ['b', '1'], ['c', '1'], ['d', '1']], []])
+
+    def test_merge_conflict(self):
+        """A buffered change to a row that another process also changed shouldn't overwrite it, and should be
+        reported.
+        """
+        os.makedirs(os.path.dirname(self.path))
+        data.write_entries(self.path, [['rice', "['1', 'cup']", '1']])
+        self.buffer.write(self.path, [['rice', "['1', 'cup']", '2']])
+        data.write_entries(self.path, [['rice', "['1', 'cup']", '3']])
+        with self.assertLogs('healthhelper.data', 'WARNING'):
+            self.buffer.flush()
+        self.assertEqual(data.read_file_rows(self.path), [['rice', "['1', 'cup']", '3']])
+        self.assertEqual(self.buffer.pop_conflicts(), [[self.path, ['rice']]])
+        self.assertEqual(self.buffer.pop_conflicts(), [])
+
+
+class TestMonthlySpend(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_dir = os.path.join(self.temp_dir, 'log files')
+        self.date = datetime.date(2020, 5, 1)
+        self.spend_patcher = patch.object(data, 'month_spend', data.MonthlySpend())
+        self.spend_patcher.start()
+        for day, cost in [(1, '4.5'), (2, '6'), (31, '1.25')]:
+            write_day(self.log_dir, datetime.date(2020, 5, day), cost=cost)
+        write_day(self.log_dir, datetime.date(2020, 6, 1), cost='100')
+
+    def tearDown(self):
+        self.spend_patcher.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def test_running_total(self):
+        """The month's logs should be read once, and the total then kept up to date by each write."""
+        self.assertEqual(data.get_month_spend(self.log_dir, self.date), 1175)
+        with patch('healthhelper.data.get_entries', side_effect=AssertionError):
+            self.assertEqual(data.get_month_spend(self.log_dir, datetime.date(2020, 5, 20)), 1175)
+            path = write_day(self.log_dir, self.date, cost='2')
+            write_day(self.log_dir, datetime.date(2020, 5, 3), cost='3')
+            self.assertEqual(data.get_month_spend(self.log_dir, self.date), 1225)
+            data.write_buffer.remove(path)
+            self.assertEqual(data.get_month_spend(self.log_dir, self.date), 1025)
+
+        # Buffered changes count before they are written.
+        buffer = data.WriteBuffer()
+        with patch.object(data, 'write_buffer', buffer):
+            buffer.start(os.path.join(self.temp_dir, 'pending_writes.jsonl'), delay=60)
+            buffer.write(path, [['rice', "['1', 'cup']", '1', '200'] + [''] * 14 + ['7']])
+            self.assertEqual(data.get_month_spend(self.log_dir, self.date), 1725)
+            buffer.stop()
+        self.assertEqual(data.get_month_spend(self.log_dir, self.date), 1725)
+
+    def test_other_process(self):
+        """Logs written or deleted by another process should be noticed, and the month read again."""
+        self.assertEqual(data.get_month_spend(self.log_dir, self.date), 1175)
+        # Leave time for the directory's modification time to change.
+        time.sleep(0.05)
+        with patch.object(data, 'month_spend', data.MonthlySpend()):
+            write_day(self.log_dir, datetime.date(2020, 5, 3), cost='3')
+        self.assertEqual(data.get_month_spend(self.log_dir, self.date), 1475)
+        time.sleep(0.05)
+        os.remove(data.get_log_path(self.log_dir, self.date))
+        self.assertEqual(data.get_month_spend(self.log_dir, self.date), 1025)
+        self.assertEqual(data.get_month_spend(self.log_dir, datetime.date(2021, 1, 1)), 0)
+
+    def test_archived(self):
+        """Only the month's directory and its year's archive should be read, not the whole log files directory."""
+        write_day(self.log_dir, datetime.date(2019, 5, 1), cost='50')
+        archive.pack_year(self.log_dir, 2020)
+        with patch.object(data, 'month_spend', data.MonthlySpend()), patch('os.walk') as walk_mock:
+            self.assertEqual(data.get_month_spend(self.log_dir, self.date), 1175)
+            self.assertEqual(data.get_month_spend(self.log_dir, datetime.date(2020, 6, 1)), 10000)
+            self.assertEqual(data.get_month_spend(self.log_dir, datetime.date(2019, 5, 1)), 5000)
+            walk_mock.assert_not_called()
+
+
+def rewrite_forever(path, contents):
+    """Rewrite a file with each of the given lists of rows in turn, until the process is killed."""
+    while True:
+        for rows in contents:
+            data.write_entries(path, rows)
+
+
+class TestReplaceFile(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'food_dictionary.csv')
+        # Large enough that a write takes several system calls.
+        self.contents = [[[f'food {num}', "{'cup': '1'}", str(version)] + ['1.5'] * 16 for num in range(2000)]
+                         for version in range(2)]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_failed_write(self):
+        """A write that fails at any step should leave the file unchanged and no temporary file behind."""
+        data.write_entries(self.path, self.contents[0])
+        for target in ['os.fsync', 'os.replace', 'csv.writer']:
+            with self.subTest(target=target), patch(target, side_effect=OSError('disk full')):
+                with self.assertRaises(OSError):
+                    data.write_entries(self.path, self.contents[1])
+            self.assertEqual(data.read_file_rows(self.path), self.contents[0])
+            self.assertEqual(os.listdir(self.temp_dir), ['food_dictionary.csv'])
+
+    @unittest.skipIf(os.name == 'nt', 'processes are killed with SIGKILL')
+    def test_killed_writer(self):
+        """A writer killed at random points should always leave the file whole, with its old or its new rows."""
+        data.write_entries(self.path, self.contents[0])
+        rand = random.Random(46)
+        for _ in range(20):
+            writer = multiprocessing.Process(target=rewrite_forever, args=(self.path, self.contents))
+            writer.start()
+            time.sleep(rand.uniform(0, 0.05))
+            writer.kill()
+            writer.join()
+            self.assertIn(data.read_file_rows(self.path), self.contents)
+
 
 if __name__ == "__main__":
     unittest.main()
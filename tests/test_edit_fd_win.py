@@ -1,14 +1,18 @@
 """Test the Food Dictionary edit widget."""
 
 import os
+import shutil
+import tempfile
 import unittest
-from unittest.mock import patch, mock_open
+from unittest.mock import patch
 
 from PyQt5.QtTest import QTest
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QApplication
 
 import healthhelper.interface as interface
+from healthhelper import data
+from healthhelper import store
 
 # Directory containing this file
 this_dir = os.path.abspath(os.path.dirname(__file__))
@@ -18,6 +22,24 @@ TEST_FD_PATH = os.path.join(this_dir, 'test_files', 'test_food_dictionary_file.c
 app = QApplication([])
 
 
+def setUpModule():
+    """Record undoable changes and price changes in a temporary directory rather than the application's files
+    directory.
+    """
+    global journal_dir, journal_patcher, prices_patcher
+    journal_dir = tempfile.mkdtemp()
+    journal_patcher = patch('healthhelper.interface.JOURNAL_PATH', os.path.join(journal_dir, 'journal.jsonl'))
+    journal_patcher.start()
+    prices_patcher = patch('healthhelper.interface.PRICE_HISTORY_PATH', os.path.join(journal_dir, 'prices.csv'))
+    prices_patcher.start()
+
+
+def tearDownModule():
+    journal_patcher.stop()
+    prices_patcher.stop()
+    shutil.rmtree(journal_dir)
+
+
 class TestEditFoodDictWin(unittest.TestCase):
 
     @patch.object(interface, 'FoodDictWin')
@@ -47,21 +69,99 @@ class TestEditFoodDictWin(unittest.TestCase):
         edit_fd_win.info1_layout.itemAt(3).itemAt(1).widget().setCurrentText('oz')
 
         with patch.object(interface, 'FoodDictWin') as fd_win_mock, \
-                patch('healthhelper.interface.open', mock_open()) as open_mock, \
+                patch.object(interface.data.write_buffer, 'write') as write_mock, \
                 patch('os.makedirs', return_value=None) as makedirs_mock:
             QTest.mouseClick(edit_fd_win.done_btn, Qt.LeftButton)
-            open_mock.assert_called()
+            write_mock.assert_called()
             fd_win_mock.assert_called()
 
     @patch('healthhelper.interface.FD_PATH', TEST_FD_PATH)
     def test_fd_file_edit(self):
         edit_fd_win = interface.EditFoodDictWin(edit_entry_name='cereal')
         with patch.object(interface, 'FoodDictWin') as fd_win_mock, \
-                patch('healthhelper.interface.open', mock_open()) as open_mock:
+                patch.object(interface.data.write_buffer, 'write') as write_mock:
             QTest.mouseClick(edit_fd_win.done_btn, Qt.LeftButton)
-            open_mock.assert_called()
+            write_mock.assert_called()
             fd_win_mock.assert_called()
 
+    @patch('healthhelper.interface.FD_PATH', TEST_FD_PATH)
+    def test_fd_file_edit_propagate(self):
+        """The edited entry should be applied to existing logs only if the user opts in."""
+        edit_fd_win = interface.EditFoodDictWin(edit_entry_name='cereal')
+        with patch.object(interface, 'FoodDictWin'), \
+                patch.object(interface.data.write_buffer, 'write'), \
+                patch('healthhelper.data.propagate_fd_entry') as propagate_mock:
+            QTest.mouseClick(edit_fd_win.done_btn, Qt.LeftButton)
+            propagate_mock.assert_not_called()
+
+        def propagate(log_dir, fd_entry, old_name=None, changed_logs=None):
+            changed_logs.append(['12.csv', [['cereal', "['1', 'Serving(s)']", '1', '200']],
+                                 [['cereal', "['1', 'Serving(s)']", '1', '225']]])
+            return {'12.csv': [1, 0]}
+
+        edit_fd_win = interface.EditFoodDictWin(edit_entry_name='cereal')
+        edit_fd_win.propagate_checkbox.setChecked(True)
+        with patch.object(interface, 'FoodDictWin'), \
+                patch.object(interface.data.write_buffer, 'write'), \
+                patch('healthhelper.data.propagate_fd_entry', side_effect=propagate) as propagate_mock:
+            QTest.mouseClick(edit_fd_win.done_btn, Qt.LeftButton)
+            propagate_mock.assert_called_once()
+            self.assertEqual(propagate_mock.call_args[1]['old_name'], 'cereal')
+        # The changed log is recorded with the edit, so they are undone together.
+        fd_change, log_change = list(interface.journal.load_journal(interface.JOURNAL_PATH).undo_stack)[-2:]
+        self.assertEqual([fd_change['path'], log_change['path']], [TEST_FD_PATH, os.path.abspath('12.csv')])
+        self.assertEqual(log_change['group'], fd_change['id'])
+
+    def test_rename_keeps_id(self):
+        """A renamed entry should keep its id, so log entries made from it take the new name without the logs being
+        rewritten. Entries whose names contain the edited name should be kept.
+        """
+        temp_dir = tempfile.mkdtemp()
+        try:
+            fd_path = os.path.join(temp_dir, 'food_dictionary.csv')
+            data.write_entries(fd_path, store.assign_ids(data.get_entries(TEST_FD_PATH, return_all=True)))
+            with data.file_lock(fd_path):
+                rows = data.get_entries(fd_path, return_all=True)
+                data.write_entries(fd_path, [['oat'] + rows[2][1:19]] + rows)
+            log_path = os.path.join(temp_dir, 'log.csv')
+            data.write_entries(log_path, [['oats', "['1', 'cup']", '4'] + ['1'] * 16 + ['3']])
+
+            with patch('healthhelper.interface.FD_PATH', fd_path), patch.object(interface, 'FoodDictWin'):
+                edit_fd_win = interface.EditFoodDictWin(edit_entry_name='oats')
+                edit_fd_win.info1_layout.itemAt(1).widget().setText('rolled oats')
+                QTest.mouseClick(edit_fd_win.done_btn, Qt.LeftButton)
+
+            fd_store = store.load_fd_store(fd_path)
+            self.assertEqual(fd_store.names, ['cereal', 'chocolate', 'oat', 'peanut butter', 'rolled oats'])
+            self.assertEqual(fd_store.get_id('rolled oats'), 3)
+            self.assertEqual(fd_store.get_id('oat'), 5)
+            self.assertEqual(store.get_log_entries(fd_path, log_path)[0][0], 'rolled oats')
+            self.assertEqual(data.get_file_entry_names(log_path), ['oats'])
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_cost_edit_recorded(self):
+        """Changing an entry's cost should record the old and new costs in the price history."""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            fd_path = os.path.join(temp_dir, 'food_dictionary.csv')
+            history_path = os.path.join(temp_dir, 'prices.csv')
+            shutil.copy(TEST_FD_PATH, fd_path)
+            with patch('healthhelper.interface.FD_PATH', fd_path), \
+                    patch('healthhelper.interface.PRICE_HISTORY_PATH', history_path), \
+                    patch.object(interface, 'FoodDictWin'):
+                edit_fd_win = interface.EditFoodDictWin(edit_entry_name='cereal')
+                edit_fd_win.info2_layout.itemAt(19).itemAt(1).widget().setText('2.40')
+                QTest.mouseClick(edit_fd_win.done_btn, Qt.LeftButton)
+                # Saving without changing the cost records nothing.
+                edit_fd_win = interface.EditFoodDictWin(edit_entry_name='cereal')
+                QTest.mouseClick(edit_fd_win.done_btn, Qt.LeftButton)
+            rows = data.get_entries(history_path, return_all=True)
+            self.assertEqual([row[:1] + row[2:] for row in rows], [['', 'cereal', '2.00', '8'],
+                                                                  [rows[1][0], 'cereal', '2.40', '8']])
+        finally:
+            shutil.rmtree(temp_dir)
+
     def test_no_name_given(self):
         """MessageWin should be called if no name is provided."""
         edit_fd_win = interface.EditFoodDictWin()
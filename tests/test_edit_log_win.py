@@ -1,8 +1,10 @@
 """Test the Log Window edit widget."""
 
 import os
+import shutil
+import tempfile
 import unittest
-from unittest.mock import patch, mock_open
+from unittest.mock import patch
 
 from PyQt5.QtTest import QTest
 from PyQt5.QtCore import Qt
@@ -20,6 +22,19 @@ TEST_LOG_PATH = os.path.join(this_dir, 'test_files', 'test_log_file.csv')
 app = QApplication([])
 
 
+def setUpModule():
+    """Record undoable changes in a temporary journal rather than the application's files directory."""
+    global journal_dir, journal_patcher
+    journal_dir = tempfile.mkdtemp()
+    journal_patcher = patch('healthhelper.interface.JOURNAL_PATH', os.path.join(journal_dir, 'journal.jsonl'))
+    journal_patcher.start()
+
+
+def tearDownModule():
+    journal_patcher.stop()
+    shutil.rmtree(journal_dir)
+
+
 @patch('healthhelper.interface.FD_PATH', TEST_FD_PATH)
 class TestEditLogWin(unittest.TestCase):
 
@@ -62,7 +77,7 @@ class TestEditLogWin(unittest.TestCase):
         amount_cell_widget.layout().itemAt(0).widget().setText('60')
         unit_cell_widget = edit_log_win.edit_table.cellWidget(0, 2)
         unit_cell_widget.layout().itemAt(0).widget().setCurrentText('grams')
-        with patch('healthhelper.interface.open', mock_open()), \
+        with patch.object(interface.data.write_buffer, 'write'), \
                 patch('os.makedirs', return_value=None) as makedirs_mock, \
                 patch.object(interface, 'LogWin') as log_win_mock:
             QTest.mouseClick(edit_log_win.update_btn, Qt.LeftButton)
@@ -76,7 +91,7 @@ class TestEditLogWin(unittest.TestCase):
         edit_log_win.edit_table.item(2, 0).setCheckState(2)
         amount_cell_widget = edit_log_win.edit_table.cellWidget(2, 1)
         amount_cell_widget.layout().itemAt(0).widget().setText('5')
-        with patch('healthhelper.interface.open', mock_open()), \
+        with patch.object(interface.data.write_buffer, 'write'), \
                 patch.object(interface, 'LogWin') as log_win_mock:
             QTest.mouseClick(edit_log_win.update_btn, Qt.LeftButton)
             log_win_mock.assert_called()
@@ -88,7 +103,7 @@ class TestEditLogWin(unittest.TestCase):
         edit_log_win.edit_table.item(0, 0).setCheckState(2)
         amount_cell_widget = edit_log_win.edit_table.cellWidget(0, 1)
         amount_cell_widget.layout().itemAt(0).widget().setText('5')
-        with patch('healthhelper.interface.open', mock_open()), \
+        with patch.object(interface.data.write_buffer, 'write'), \
                 patch.object(interface, 'MessageWin') as message_win_mock:
             QTest.mouseClick(edit_log_win.update_btn, Qt.LeftButton)
             message_win_mock.assert_called()
@@ -99,7 +114,7 @@ class TestEditLogWin(unittest.TestCase):
         edit_log_win.edit_table.item(0, 0).setCheckState(2)
         amount_cell_widget = edit_log_win.edit_table.cellWidget(0, 1)
         amount_cell_widget.layout().itemAt(0).widget().setText('.')
-        with patch('healthhelper.interface.open', mock_open()), \
+        with patch.object(interface.data.write_buffer, 'write'), \
                 patch.object(interface, 'MessageWin') as message_win_mock:
             QTest.mouseClick(edit_log_win.update_btn, Qt.LeftButton)
             message_win_mock.assert_called()
@@ -108,7 +123,7 @@ class TestEditLogWin(unittest.TestCase):
         """MessageWin should be called if the user doesn't provide an amount to add for a selected entry."""
         edit_log_win = interface.EditLogWin(self.edit_date, TEST_LOG_PATH, self.edit_geo, edit=False)
         edit_log_win.edit_table.item(0, 0).setCheckState(2)
-        with patch('healthhelper.interface.open', mock_open()), \
+        with patch.object(interface.data.write_buffer, 'write'), \
                 patch.object(interface, 'MessageWin') as message_win_mock:
             QTest.mouseClick(edit_log_win.update_btn, Qt.LeftButton)
             message_win_mock.assert_called()
@@ -116,7 +131,7 @@ class TestEditLogWin(unittest.TestCase):
     def test_no_selected_entries_to_add(self):
         """MessageWin should be called if the user clicks the update button without selecting any entries to add."""
         edit_log_win = interface.EditLogWin(self.edit_date, TEST_LOG_PATH, self.edit_geo, edit=False)
-        with patch('healthhelper.interface.open', mock_open()), \
+        with patch.object(interface.data.write_buffer, 'write'), \
                 patch.object(interface, 'MessageWin') as message_win_mock:
             QTest.mouseClick(edit_log_win.update_btn, Qt.LeftButton)
             message_win_mock.assert_called()
@@ -127,7 +142,7 @@ class TestEditLogWin(unittest.TestCase):
                                             edit_entry_names=['cereal'], edit=True)
         amount_cell_widget = edit_log_win.edit_table.cellWidget(0, 1)
         amount_cell_widget.layout().itemAt(0).widget().setText('2')
-        with patch('healthhelper.interface.open', mock_open()), \
+        with patch.object(interface.data.write_buffer, 'write'), \
                 patch.object(interface, 'LogWin') as log_win_mock:
             QTest.mouseClick(edit_log_win.update_btn, Qt.LeftButton)
             log_win_mock.assert_called()
@@ -1,8 +1,10 @@
 """Test the Food Dictionary widget."""
 
 import os
+import shutil
+import tempfile
 import unittest
-from unittest.mock import patch, mock_open
+from unittest.mock import patch
 
 from PyQt5.QtTest import QTest
 from PyQt5.QtCore import Qt
@@ -18,6 +20,19 @@ TEST_FD_PATH = os.path.join(this_dir, 'test_files', 'test_food_dictionary_file.c
 app = QApplication([])
 
 
+def setUpModule():
+    """Record undoable changes in a temporary journal rather than the application's files directory."""
+    global journal_dir, journal_patcher
+    journal_dir = tempfile.mkdtemp()
+    journal_patcher = patch('healthhelper.interface.JOURNAL_PATH', os.path.join(journal_dir, 'journal.jsonl'))
+    journal_patcher.start()
+
+
+def tearDownModule():
+    journal_patcher.stop()
+    shutil.rmtree(journal_dir)
+
+
 class TestFoodDictWin(unittest.TestCase):
 
     def test_fd_to_log_win(self):
@@ -26,6 +41,28 @@ class TestFoodDictWin(unittest.TestCase):
             QTest.mouseClick(fd_win.goto_log_win_btn, Qt.LeftButton)
             log_win_mock.assert_called()
 
+    @patch('healthhelper.interface.FD_PATH', TEST_FD_PATH)
+    def test_fd_to_cost_analytics_win(self):
+        fd_win = interface.FoodDictWin()
+        with patch.object(interface, 'CostAnalyticsWin') as analytics_win_mock:
+            QTest.mouseClick(fd_win.cost_analytics_btn, Qt.LeftButton)
+            analytics_win_mock.assert_called()
+
+    def test_fd_to_recipes_win(self):
+        fd_win = interface.FoodDictWin()
+        with patch.object(interface, 'RecipesWin') as recipes_win_mock:
+            QTest.mouseClick(fd_win.recipes_btn, Qt.LeftButton)
+            recipes_win_mock.assert_called()
+
+    @patch('healthhelper.interface.FD_PATH', TEST_FD_PATH)
+    def test_write_conflicts(self):
+        """Buffered changes that weren't written because of a conflict should be shown to the user once."""
+        with patch.object(interface.data.write_buffer, 'conflicts', [[TEST_FD_PATH, ['cereal', 'rice']]]):
+            fd_win = interface.FoodDictWin()
+            self.assertEqual([fd_win.conflicts_win.key, fd_win.conflicts_win.entry_name], ['write conflict',
+                                                                                          'cereal, rice'])
+            self.assertIsNone(interface.FoodDictWin().conflicts_win)
+
     @patch('healthhelper.interface.FD_PATH', TEST_FD_PATH)
     def test_fd_win_table(self):
         """Check that all entries in the table are checked or unchecked after clicking the
@@ -39,6 +76,22 @@ class TestFoodDictWin(unittest.TestCase):
         for entry_index in range(fd_win.fd_table.rowCount()):
             self.assertEqual(fd_win.fd_table.item(entry_index, 0).checkState(), 0)
 
+    @patch('healthhelper.interface.FD_PATH', TEST_FD_PATH)
+    def test_fd_win_sort(self):
+        """Clicking a column header should sort the entries by that column, with blank values last."""
+        fd_win = interface.FoodDictWin()
+        fd_win.fd_table.item(0, 0).setCheckState(2)
+        fd_h_header = fd_win.fd_table.horizontalHeader()
+        fd_h_header.sectionClicked.emit(2)
+        self.assertEqual(interface.data.get_table_entry_names(fd_win.fd_table)[:2],
+                         [['oats', 'cereal', 'chocolate', 'peanut butter'], ['cereal']])
+        fd_h_header.sectionClicked.emit(2)
+        self.assertEqual(interface.data.get_table_entry_names(fd_win.fd_table)[0],
+                         ['cereal', 'oats', 'chocolate', 'peanut butter'])
+        fd_h_header.sectionClicked.emit(17)
+        self.assertEqual(interface.data.get_table_entry_names(fd_win.fd_table)[0],
+                         ['cereal', 'chocolate', 'oats', 'peanut butter'])
+
     @patch('healthhelper.interface.FD_PATH', 'nonexistent_path')
     def test_delete_fd_with_no_fd_file(self):
         """MessageWin should be called if the user clicks 'delete all entries' while no FD file exists."""
@@ -90,9 +143,9 @@ class TestFoodDictWin(unittest.TestCase):
 
         # Check that the file is edited and FoodDictWin is called.
         with patch.object(interface, 'FoodDictWin') as fd_win_mock, \
-                patch('healthhelper.interface.open', mock_open()) as open_mock:
+                patch.object(interface.data.write_buffer, 'write') as write_mock:
             QTest.mouseClick(fd_win.yes_btn, Qt.LeftButton)
-            open_mock.assert_called()
+            write_mock.assert_called()
             fd_win_mock.assert_called()
 
     @patch('healthhelper.interface.FD_PATH', TEST_FD_PATH)
@@ -0,0 +1,172 @@
+"""Test the integrity checker of the Food Dictionary and log files."""
+import io
+import os
+import shutil
+import datetime
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from healthhelper import archive
+from healthhelper import data
+from healthhelper import fsck
+from healthhelper.__main__ import main
+
+# Directory containing this file
+this_dir = os.path.abspath(os.path.dirname(__file__))
+# Path to the test food dictionary file.
+TEST_FD_PATH = os.path.join(this_dir, 'test_files', 'test_food_dictionary_file.csv')
+
+OATS_ROW = ['oats', "['1', 'cup']", '6.25', '937.5', '15.62'] + [''] * 13 + ['0.5']
+
+
+class TestCheckRows(unittest.TestCase):
+
+    def test_log_row(self):
+        """Problems of a log row should be found, and repaired where it can be done without guessing."""
+        known_names = {'oats'}
+        self.assertEqual(fsck.check_log_row(OATS_ROW, known_names), [OATS_ROW, []])
+
+        fixed, problems = fsck.check_log_row(['oats', "['1', 'cup']", '6.25', ' 1,200'], known_names)
+        self.assertEqual(fixed, ['oats', "['1', 'cup']", '6.25', '1200'] + [''] * 15)
+        self.assertEqual([kind for kind, message, fixable in problems], ['short row', 'non-numeric'])
+
+        fixed, problems = fsck.check_log_row(OATS_ROW[:3] + ['lots'] + OATS_ROW[4:] + ['', ''], known_names)
+        self.assertIsNone(fixed)
+        self.assertEqual(problems, [['long row', '21 cells instead of 19', True],
+                                    ['non-numeric', "cell 4 is 'lots'", False]])
+
+        fixed, problems = fsck.check_log_row(['toast', "['1'", 'x'] + OATS_ROW[3:], known_names)
+        self.assertEqual([kind for kind, message, fixable in problems], ['bad row', 'bad row', 'orphan'])
+        self.assertEqual(fsck.check_log_row(['oats'], known_names)[1], [['bad row', 'only 1 of 19 cells', False]])
+        self.assertEqual(fsck.check_log_row([], known_names)[1], [['bad row', 'no name', False]])
+
+        # An entry of a renamed FD entry is found by its id.
+        self.assertEqual(fsck.check_log_row(['toast'] + OATS_ROW[1:] + ['3'], known_names, {3})[1], [])
+        fixed, problems = fsck.check_log_row(OATS_ROW + ['x'], known_names, {3})
+        self.assertEqual([fixed, [kind for kind, message, fixable in problems]], [OATS_ROW, ['non-numeric']])
+
+    def test_fd_row(self):
+        """Problems of a Food Dictionary row should be found, and repaired where it can be done without guessing."""
+        for row in data.get_entries(TEST_FD_PATH, return_all=True):
+            self.assertEqual(fsck.check_fd_row(row), [row, []])
+
+        fixed, problems = fsck.check_fd_row(['rice', "{'cup': '1'}", '200'])
+        self.assertEqual(fixed, ['rice', "{'cup': '1'}", '200'] + [''] * 16)
+        fixed, problems = fsck.check_fd_row(['rice', '{}', '200'] + [''] * 14 + ['[2, 8]', 'NaN'])
+        self.assertIsNone(fixed)
+        self.assertEqual([kind for kind, message, fixable in problems],
+                         ['bad row', 'bad row', 'non-numeric'])
+
+    def test_duplicates(self):
+        """Only an exact copy of an earlier row should be repaired, by removing it."""
+        checked = fsck.check_rows([OATS_ROW, OATS_ROW, ['oats'] + OATS_ROW[1:3] + ['1'] + OATS_ROW[4:]],
+                                  lambda row: fsck.check_log_row(row, {'oats'}))
+        self.assertEqual(checked[0], [OATS_ROW, OATS_ROW, []])
+        self.assertEqual(checked[1][1:], [None, [['duplicate', "'oats' is also in an earlier row", True]]])
+        self.assertEqual(checked[2][2], [['duplicate', "'oats' is also in an earlier row", False]])
+
+
+class TestCheckData(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a Food Dictionary and logs with problems in a temporary directory."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.fd_path = os.path.join(self.temp_dir, 'food_dictionary.csv')
+        shutil.copy(TEST_FD_PATH, self.fd_path)
+        with open(self.fd_path, 'a') as f:
+            f.write('rice,"{\'cup\': \'1\'}",200\n')
+        self.log_dir = os.path.join(self.temp_dir, 'log files')
+        self.recipes_path = os.path.join(self.temp_dir, 'recipes.csv')
+        data.write_entries(self.recipes_path, [['oat bowl', "[['oats', '1', 'cup']]", '2']])
+        self.quarantine_dir = os.path.join(self.temp_dir, 'quarantine')
+
+        self.good_path = self.write_log(datetime.date(2019, 5, 1), [OATS_ROW, ['oat bowl'] + OATS_ROW[1:]])
+        self.bad_path = self.write_log(datetime.date(2020, 5, 1), [
+            OATS_ROW, OATS_ROW, ['rice', "['1', 'cup']", '1', '200'], ['toast'] + OATS_ROW[1:],
+            OATS_ROW[:3] + ['lots'] + OATS_ROW[4:]])
+        self.orphan_path = self.write_log(datetime.date(2020, 5, 2), [['toast'] + OATS_ROW[1:]])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_log(self, date, rows):
+        path = data.get_log_path(self.log_dir, date)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data.write_entries(path, rows)
+        return path
+
+    def check(self, repair=False, quarantine=False, max_workers=None):
+        return fsck.check_data(self.fd_path, self.log_dir, self.recipes_path, repair,
+                               self.quarantine_dir if quarantine else None, max_workers)
+
+    def test_report(self):
+        """Every problem should be reported, and no file changed."""
+        archive.pack_year(self.log_dir, 2019)
+        num_logs, problems = self.check()
+        self.assertEqual(num_logs, 3)
+        self.assertEqual([problem[:3] for problem in problems], [
+            [self.fd_path, 5, 'short row'],
+            [self.bad_path, 2, 'duplicate'],
+            [self.bad_path, 3, 'short row'],
+            [self.bad_path, 4, 'orphan'],
+            [self.bad_path, 5, 'non-numeric'],
+            [self.bad_path, 5, 'duplicate'],
+            [self.orphan_path, 1, 'orphan']])
+        self.assertEqual({problem[4] for problem in problems}, {''})
+        self.assertEqual(len(data.get_entries(self.bad_path, return_all=True)), 5)
+
+    def test_repair_and_quarantine(self):
+        """Fixable rows should be repaired, and the rest moved to the quarantine directory."""
+        num_logs, problems = self.check(repair=True)
+        self.assertEqual([problem[4] for problem in problems], ['repaired', 'repaired', 'repaired', '', '', '', ''])
+        self.assertEqual(data.get_entries(self.fd_path, ['rice'])[0][3:], [''] * 16)
+        self.assertEqual(len(data.get_entries(self.bad_path, return_all=True)), 4)
+
+        num_logs, problems = self.check(repair=True, quarantine=True)
+        self.assertEqual({problem[4] for problem in problems}, {'quarantined'})
+        self.assertEqual(data.get_file_entry_names(self.bad_path), ['oats', 'rice'])
+        self.assertFalse(os.path.exists(self.orphan_path))
+        quarantine_path = os.path.join(self.quarantine_dir, 'log files', '2020', '05 - May', '01.csv')
+        self.assertEqual(data.get_file_entry_names(quarantine_path), ['toast', 'oats'])
+        self.assertEqual(self.check(), [2, []])
+
+    def test_archived(self):
+        """Archived logs should be checked but not changed."""
+        archived_path = self.write_log(datetime.date(2019, 5, 2), [['toast'] + OATS_ROW[1:]])
+        archive.pack_year(self.log_dir, 2019)
+        num_logs, problems = self.check(repair=True, quarantine=True)
+        self.assertEqual(problems[1], [archived_path, 1, 'orphan',
+                                       "'toast' is not in the Food Dictionary or the recipes", 'archived'])
+        self.assertEqual(len(data.get_entries(archived_path, return_all=True)), 1)
+
+    def test_parallel(self):
+        """Checking logs across worker processes should give the same results in the same order."""
+        date = datetime.date(2018, 1, 1)
+        for day in range(2 * fsck.CHUNK_SIZE):
+            self.write_log(date + datetime.timedelta(days=day), [OATS_ROW, ['toast'] + OATS_ROW[1:]])
+        num_logs, problems = self.check(max_workers=1)
+        self.assertEqual(self.check(max_workers=2), [num_logs, problems])
+        self.assertEqual(len(problems), 2 * fsck.CHUNK_SIZE + 7)
+
+        os.remove(self.recipes_path)
+        self.check(repair=True, quarantine=True, max_workers=2)
+        self.assertEqual(self.check(max_workers=2), [num_logs - 1, []])
+
+    def test_command(self):
+        """The fsck command should print the problems and fail if any are left."""
+        with patch('healthhelper.interface.FD_PATH', self.fd_path), \
+                patch('healthhelper.interface.LOG_FILES_DIR', self.log_dir), \
+                patch('healthhelper.interface.RECIPES_PATH', self.recipes_path), \
+                redirect_stdout(io.StringIO()) as output:
+            with self.assertRaises(SystemExit):
+                main(['fsck', '--repair'])
+            self.assertIn(f'{self.orphan_path}:1: orphan:', output.getvalue())
+            main(['fsck', '--repair', '--quarantine'])
+        self.assertTrue(output.getvalue().endswith('4 problem(s) found, 4 resolved.\n'))
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, 'quarantine', 'log files')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+"""Test the daily goals."""
+import os
+import shutil
+import datetime
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from PyQt5.QtTest import QTest
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+
+import healthhelper.interface as interface
+from healthhelper import archive
+from healthhelper import data
+from healthhelper import goals
+from tests.utils import write_day
+
+# Directory containing this file
+this_dir = os.path.abspath(os.path.dirname(__file__))
+# Path to the test log file.
+TEST_LOG_PATH = os.path.join(this_dir, 'test_files', 'test_log_file.csv')
+
+app = QApplication([])
+
+
+class TestGoals(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.goals_path = os.path.join(self.temp_dir, 'goals.csv')
+        self.log_dir = os.path.join(self.temp_dir, 'log files')
+        self.goals = {'calories': [180000, 220000], 'sodium': [None, 230000], 'protein': [12000, None],
+                      'cost': [None, 1500]}
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_load_and_write(self):
+        """Goals should be written in hundredths and read back unchanged."""
+        self.assertEqual(goals.load_goals(self.goals_path), {})
+        goals.write_goals(self.goals_path, self.goals)
+        self.assertEqual(data.get_entries(self.goals_path, ['cost'])[0], ['cost', '', '15'])
+        self.assertEqual(goals.load_goals(self.goals_path), self.goals)
+        goals.write_goals(self.goals_path, {})
+        self.assertFalse(os.path.exists(self.goals_path))
+
+        # The monthly budget is kept in the same file.
+        self.assertIsNone(goals.load_monthly_budget(self.goals_path))
+        goals.write_goals(self.goals_path, {}, 30000)
+        self.assertEqual(goals.load_goals(self.goals_path), {})
+        self.assertEqual(goals.load_monthly_budget(self.goals_path), 30000)
+        goals.write_goals(self.goals_path, self.goals, 25050)
+        self.assertEqual([goals.load_goals(self.goals_path), goals.load_monthly_budget(self.goals_path)],
+                         [self.goals, 25050])
+
+    def test_load_malformed(self):
+        """Rows of a hand-edited goals file that can't be read should be skipped."""
+        with open(self.goals_path, 'w') as f:
+            f.write('calories,1800,2200\nsodium,2300\nprotein,120,,extra\ntotal fat,lots,\ncost,,inf\n'
+                    'monthly budget,\n')
+        self.assertEqual(goals.load_goals(self.goals_path), {'calories': [180000, 220000]})
+        self.assertIsNone(goals.load_monthly_budget(self.goals_path))
+        with open(self.goals_path, 'w') as f:
+            f.write('monthly budget,,a lot\n')
+        self.assertIsNone(goals.load_monthly_budget(self.goals_path))
+
+    def test_budget_status(self):
+        """The burn rate should be the spending per day so far, and the projection the whole month at that rate."""
+        today = datetime.date(2020, 6, 10)
+        status = goals.get_budget_status(10000, 30000, 2020, 6, today)
+        self.assertEqual(status, {'spend': 10000, 'budget': 30000, 'remaining': 20000, 'burn rate': 1000,
+                                  'projected': 30000})
+        status = goals.get_budget_status(31000, 30000, 2020, 5, today)
+        self.assertEqual([status['remaining'], status['burn rate'], status['projected']], [-1000, 1000, 31000])
+        status = goals.get_budget_status(0, None, 2020, 7, today)
+        self.assertEqual([status['remaining'], status['burn rate'], status['projected']], [None, None, None])
+
+    def test_progress(self):
+        """Progress should be measured against the minimum until it is reached, then against the maximum."""
+        totals = [0] * 16
+        totals[0] = 150000
+        totals[7] = 250000
+        totals[14] = 13000
+        totals[15] = 1234
+        progress = goals.get_progress(totals, self.goals)
+        self.assertEqual(progress[0], ['83%\nof 1800', '300', False])
+        self.assertEqual(progress[7], ['109%\nof 2300', '-200', False])
+        self.assertEqual(progress[14], ['108%\nof 120', '0', True])
+        self.assertEqual(progress[15], ['82%\nof 15.00', '2.66', True])
+        self.assertNotIn(1, progress)
+
+    def test_remaining(self):
+        """What is left of a goal should be measured to its minimum, or to its maximum if it has no minimum."""
+        totals = [0] * 16
+        totals[0] = 200000
+        totals[14] = 4550
+        totals[15] = 1600
+        self.assertEqual(goals.get_remaining(totals, self.goals), {'sodium': 2300, 'protein': 74.5})
+
+    def test_streaks(self):
+        """A day that misses a goal or has no log should end the goal's streak."""
+        calories_goal = {'calories': [180000, 220000]}
+        write_day(self.log_dir, datetime.date(2020, 7, 1), '2000', '5')
+        write_day(self.log_dir, datetime.date(2020, 7, 2), '1900', '5')
+        write_day(self.log_dir, datetime.date(2020, 7, 3), '2500', '5')
+        write_day(self.log_dir, datetime.date(2020, 7, 4), '2000', '5')
+        write_day(self.log_dir, datetime.date(2020, 7, 6), '2000', '5')
+        write_day(self.log_dir, datetime.date(2020, 7, 7), '2100', '5')
+        streaks = goals.get_streaks(self.log_dir, calories_goal, datetime.date(2020, 7, 8))
+        self.assertEqual(streaks, {'calories': [2, 2], None: [2, 2]})
+        self.assertEqual(goals.get_streaks(self.log_dir, calories_goal, datetime.date(2020, 7, 10))['calories'],
+                         [0, 2])
+
+        # Summaries are recalculated when a log changes.
+        write_day(self.log_dir, datetime.date(2020, 7, 3), '2000', '5')
+        streaks = goals.get_streaks(self.log_dir, calories_goal, datetime.date(2020, 7, 4))
+        self.assertEqual(streaks['calories'], [4, 4])
+
+        # Archived days count too.
+        archive.pack_year(self.log_dir, 2020)
+        streaks = goals.get_streaks(self.log_dir, calories_goal, datetime.date(2020, 7, 7))
+        self.assertEqual(streaks['calories'], [2, 4])
+
+    def test_log_win_progress(self):
+        """The log window should show the progress toward each goal below the totals."""
+        goals.write_goals(self.goals_path, self.goals)
+        with patch('healthhelper.interface.GOALS_PATH', self.goals_path), \
+                patch('os.path.join', return_value=TEST_LOG_PATH):
+            log_win = interface.LogWin()
+        self.assertEqual(log_win.totals_table.rowCount(), 4)
+        self.assertEqual(log_win.totals_table.item(2, 1).text(), '17%\nof 1800')
+        self.assertEqual(log_win.totals_table.item(3, 16).text(), '13.28')
+        self.assertEqual(log_win.totals_table.item(2, 2).text(), '')
+
+    def test_log_win_budget(self):
+        """The log window should show the month's spending against the budget, in red if it is projected to go over."""
+        goals.write_goals(self.goals_path, {}, 800)
+        with patch('healthhelper.interface.GOALS_PATH', self.goals_path), \
+                patch('healthhelper.interface.LOG_FILES_DIR', self.log_dir), \
+                patch.object(data, 'month_spend', data.MonthlySpend()):
+            write_day(self.log_dir, datetime.date(2020, 7, 1), '2000', '5')
+            write_day(self.log_dir, datetime.date(2020, 7, 2), '2000', '3.5')
+            log_win = interface.LogWin(datetime.date(2020, 7, 2))
+        self.assertTrue(log_win.budget_label.text().startswith('July spending: $8.50 of $8.00 budget, $0.50 over.'))
+        self.assertIn('color: red', log_win.budget_label.styleSheet())
+
+        goals.write_goals(self.goals_path, {})
+        with patch('healthhelper.interface.GOALS_PATH', self.goals_path):
+            log_win = interface.LogWin(datetime.date(2020, 7, 2))
+        self.assertEqual(log_win.budget_label.text(), '')
+
+    def test_goals_win(self):
+        """The goals window should save valid goals and reject invalid ones."""
+        with patch('healthhelper.interface.GOALS_PATH', self.goals_path), \
+                patch('healthhelper.interface.LOG_FILES_DIR', self.log_dir):
+            goals_win = interface.GoalsWin(datetime.date.today())
+            goals_win.goals_table.item(0, 1).setText('1800')
+            goals_win.goals_table.item(0, 2).setText('2200')
+            QTest.mouseClick(goals_win.save_btn, Qt.LeftButton)
+            self.assertEqual(goals.load_goals(self.goals_path), {'calories': [180000, 220000]})
+            self.assertIsNone(goals.load_monthly_budget(self.goals_path))
+
+            goals_win.budget_textbox.setText('250.5')
+            QTest.mouseClick(goals_win.save_btn, Qt.LeftButton)
+            self.assertEqual(goals.load_monthly_budget(self.goals_path), 25050)
+            new_goals_win = interface.GoalsWin(datetime.date.today())
+            self.assertEqual(new_goals_win.budget_textbox.text(), '250.50')
+
+            goals_win.goals_table.item(7, 1).setText('3000')
+            goals_win.goals_table.item(7, 2).setText('2300')
+            with patch.object(interface, 'MessageWin') as message_win_mock:
+                QTest.mouseClick(goals_win.save_btn, Qt.LeftButton)
+                message_win_mock.assert_called_with('invalid goal', entry_name='Sodium (mg)')
+            goals_win.goals_table.item(7, 1).setText('lots')
+            with patch.object(interface, 'MessageWin') as message_win_mock:
+                QTest.mouseClick(goals_win.save_btn, Qt.LeftButton)
+                message_win_mock.assert_called()
+            self.assertEqual(goals.load_goals(self.goals_path), {'calories': [180000, 220000]})
+
+    def test_log_to_goals_win(self):
+        log_win = interface.LogWin()
+        with patch.object(interface, 'GoalsWin') as goals_win_mock:
+            QTest.mouseClick(log_win.goals_btn, Qt.LeftButton)
+            goals_win_mock.assert_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+"""Test the undo and redo journal."""
+import os
+import shutil
+import datetime
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from PyQt5.QtTest import QTest
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+
+import healthhelper.interface as interface
+from healthhelper import data
+from healthhelper import journal
+
+app = QApplication([])
+
+ENTRIES = [['chocolate', "['3', 'item(s)']", '3', '300'],
+           ['oats', "['80', 'g']", '2', '250'],
+           ['cereal', "['60', 'g']", '1', '225']]
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a temporary log file and journal."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.temp_dir, '12.csv')
+        self.journal_path = os.path.join(self.temp_dir, 'journal.jsonl')
+        data.write_entries(self.log_path, ENTRIES)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_undo_redo(self):
+        """Undoing a change should restore the removed rows in place, and redoing it should remove them again."""
+        log_journal = journal.Journal(self.journal_path)
+        new_entries = [ENTRIES[0], ['oats', "['40', 'g']", '1', '125']]
+        data.write_entries(self.log_path, new_entries)
+        log_journal.record('Edit log entries', self.log_path, ENTRIES, new_entries)
+
+        self.assertEqual(log_journal.undo()['label'], 'Edit log entries')
+        self.assertEqual(data.get_entries(self.log_path, return_all=True), ENTRIES)
+        self.assertIsNone(log_journal.undo())
+        self.assertEqual(log_journal.redo()['label'], 'Edit log entries')
+        self.assertEqual(data.get_entries(self.log_path, return_all=True), new_entries)
+        self.assertIsNone(log_journal.redo())
+
+    def test_undo_delete(self):
+        """Undoing the deletion of a file should recreate it, and redoing it should delete it again."""
+        log_journal = journal.Journal(self.journal_path)
+        os.remove(self.log_path)
+        log_journal.record('Delete log', self.log_path, ENTRIES, None)
+
+        log_journal.undo()
+        self.assertEqual(data.get_entries(self.log_path, return_all=True), ENTRIES)
+        log_journal.redo()
+        self.assertFalse(os.path.exists(self.log_path))
+
+    def test_group(self):
+        """The changes of a group should be undone and redone together, in turn with other changes."""
+        log_journal = journal.Journal(self.journal_path)
+        fd_path = os.path.join(self.temp_dir, 'food_dictionary.csv')
+        other_log_path = os.path.join(self.temp_dir, '13.csv')
+        data.write_entries(other_log_path, ENTRIES[:1])
+        data.write_entries(self.log_path, ENTRIES[:2])
+        log_journal.record('Remove log entries', self.log_path, ENTRIES, ENTRIES[:2])
+        fd_entries = [['chocolate', "{'item(s)': '1'}", '110']]
+        data.write_entries(fd_path, fd_entries)
+        group = log_journal.record('Edit Food Dictionary entry', fd_path, None, fd_entries)
+        for path, old_entries in [[self.log_path, ENTRIES[:2]], [other_log_path, ENTRIES[:1]]]:
+            new_entries = [['chocolate', "['3', 'item(s)']", '3', '330']] + old_entries[1:]
+            data.write_entries(path, new_entries)
+            log_journal.record('Edit Food Dictionary entry', path, old_entries, new_entries, group=group)
+
+        self.assertEqual(log_journal.undo()['id'], group)
+        self.assertFalse(os.path.exists(fd_path))
+        self.assertEqual(data.get_entries(self.log_path, return_all=True), ENTRIES[:2])
+        self.assertEqual(data.get_entries(other_log_path, return_all=True), ENTRIES[:1])
+        self.assertEqual(len(journal.Journal(self.journal_path).redo_stack), 3)
+        self.assertEqual(log_journal.redo()['id'], group)
+        self.assertEqual(data.get_entries(other_log_path, return_all=True)[0][3], '330')
+        self.assertTrue(os.path.exists(fd_path))
+        log_journal.undo()
+        # The change before the group is undone on its own.
+        self.assertEqual(log_journal.undo()['label'], 'Remove log entries')
+        self.assertEqual(data.get_entries(self.log_path, return_all=True), ENTRIES)
+        self.assertFalse(log_journal.can_undo())
+
+    def test_replay(self):
+        """A journal loaded from the journal file should have the same undo and redo stacks."""
+        log_journal = journal.Journal(self.journal_path)
+        data.write_entries(self.log_path, ENTRIES[:2])
+        log_journal.record('Remove log entries', self.log_path, ENTRIES, ENTRIES[:2])
+        data.write_entries(self.log_path, ENTRIES[:1])
+        log_journal.record('Remove log entries', self.log_path, ENTRIES[:2], ENTRIES[:1])
+        log_journal.undo()
+
+        reloaded = journal.Journal(self.journal_path)
+        self.assertEqual([change['id'] for change in reloaded.undo_stack], [1])
+        self.assertEqual([change['id'] for change in reloaded.redo_stack], [2])
+        reloaded.undo()
+        self.assertEqual(data.get_entries(self.log_path, return_all=True), ENTRIES)
+
+        # A new change clears the redo stack.
+        log_journal = journal.Journal(self.journal_path)
+        log_journal.record('Remove log entries', self.log_path, ENTRIES, ENTRIES[1:])
+        self.assertFalse(journal.Journal(self.journal_path).can_redo())
+
+    def test_conflict(self):
+        """A change should not be undone if the file no longer matches it."""
+        log_journal = journal.Journal(self.journal_path)
+        new_entries = ENTRIES + [['rice', "['1', 'cup']", '1', '200']]
+        log_journal.record('Add log entries', self.log_path, ENTRIES, new_entries)
+        self.assertEqual(log_journal.undo(), 'undo conflict')
+        self.assertEqual(data.get_entries(self.log_path, return_all=True), ENTRIES)
+        self.assertTrue(log_journal.can_undo())
+
+    def test_bounds(self):
+        """Only the most recent changes should be kept, and the journal file should be compacted to them."""
+        log_journal = journal.Journal(self.journal_path, max_changes=3, max_bytes=1000)
+        for i in range(20):
+            log_journal.record('Add log entries', self.log_path, ENTRIES, ENTRIES + [[f'food {i}', '', '1', '1']])
+        self.assertEqual([change['id'] for change in log_journal.undo_stack], [18, 19, 20])
+        self.assertLessEqual(os.path.getsize(self.journal_path), 1000)
+        reloaded = journal.Journal(self.journal_path, max_changes=3)
+        self.assertEqual([change['id'] for change in reloaded.undo_stack], [18, 19, 20])
+
+
+class TestUndoButtons(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a temporary log files directory and journal."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_dir = os.path.join(self.temp_dir, 'log files')
+        self.date = datetime.date(2020, 6, 12)
+        self.log_path = os.path.join(self.log_dir, '2020', '06 - June', '12.csv')
+        os.makedirs(os.path.dirname(self.log_path))
+        data.write_entries(self.log_path, ENTRIES)
+        self.patchers = [patch('healthhelper.interface.LOG_FILES_DIR', self.log_dir),
+                         patch('healthhelper.interface.JOURNAL_PATH', os.path.join(self.temp_dir, 'journal.jsonl'))]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def test_undo_delete_log(self):
+        """The undo button should restore a deleted log and take the user to it."""
+        log_win = interface.LogWin(self.date)
+        with patch.object(interface, 'QDialog'):
+            QTest.mouseClick(log_win.delete_log_btn, Qt.LeftButton)
+        with patch.object(interface, 'LogWin'):
+            QTest.mouseClick(log_win.yes_btn, Qt.LeftButton)
+        self.assertFalse(os.path.exists(self.log_path))
+
+        log_win = interface.LogWin(self.date)
+        with patch.object(interface, 'LogWin') as log_win_mock:
+            QTest.mouseClick(log_win.undo_btn, Qt.LeftButton)
+            self.assertEqual(log_win_mock.call_args[0][0], self.date)
+        self.assertEqual(data.get_entries(self.log_path, return_all=True), ENTRIES)
+
+        with patch.object(interface, 'LogWin'):
+            QTest.mouseClick(log_win.redo_btn, Qt.LeftButton)
+        self.assertFalse(os.path.exists(self.log_path))
+
+    def test_nothing_to_undo(self):
+        """MessageWin should be called if there is nothing to undo or redo."""
+        log_win = interface.LogWin(self.date)
+        with patch.object(interface, 'MessageWin') as message_win_mock:
+            QTest.mouseClick(log_win.undo_btn, Qt.LeftButton)
+            message_win_mock.assert_called_with('nothing to undo')
+            QTest.mouseClick(log_win.redo_btn, Qt.LeftButton)
+            message_win_mock.assert_called_with('nothing to redo')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,225 @@
+"""Test the file locks that keep concurrent writers from losing each other's changes."""
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import threading
+import multiprocessing
+from unittest.mock import patch
+
+from healthhelper import data
+
+NUM_WRITERS = 8
+ENTRIES_PER_WRITER = 25
+
+
+def add_entries(path, writer_num):
+    """Add entries to a file one at a time, each with a read-modify-write of the whole file."""
+    for entry_num in range(ENTRIES_PER_WRITER):
+        data.modify_entries(path, lambda entries: entries + [[f'food {writer_num}-{entry_num}', "['1', 'g']", '1']])
+
+
+def try_lock(path, queue):
+    """Report whether an exclusive lock on the file can be taken without waiting."""
+    fd = os.open(data.get_lock_path(path), os.O_RDWR | os.O_CREAT)
+    try:
+        data.fcntl.flock(fd, data.fcntl.LOCK_EX | data.fcntl.LOCK_NB)
+        queue.put(True)
+    except BlockingIOError:
+        queue.put(False)
+    else:
+        os.remove(data.get_lock_path(path))
+    finally:
+        os.close(fd)
+
+
+def buffered_edit(path, journal_path, queue, flush):
+    """Change every row of a file through a write buffer, report it, and write the change when told to, reporting
+    the conflicts.
+    """
+    buffer = data.WriteBuffer()
+    with patch.object(data, 'write_buffer', buffer):
+        buffer.start(journal_path, delay=60)
+        with data.file_lock(path):
+            rows = data.get_entries(path, return_all=True)
+            buffer.write(path, [[name, amount, '2'] for name, amount, servings in rows])
+        queue.put('buffered')
+        flush.wait(10)
+        buffer.flush()
+    queue.put(buffer.pop_conflicts())
+
+
+def hold_lock(path, queue, done):
+    """Lock the file, report it, and hold the lock until told to release it."""
+    with data.file_lock(path):
+        queue.put('locked')
+        done.wait(10)
+
+
+@unittest.skipIf(data.fcntl is None, 'file locks require fcntl')
+class TestFileLock(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, '01.csv')
+        self.context = multiprocessing.get_context('fork')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_concurrent_writers(self):
+        """No entry should be lost when many processes change the same file at once."""
+        writers = [self.context.Process(target=add_entries, args=(self.path, writer_num))
+                   for writer_num in range(NUM_WRITERS)]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+            self.assertEqual(writer.exitcode, 0)
+
+        entry_names = data.get_file_entry_names(self.path)
+        self.assertEqual(len(entry_names), NUM_WRITERS * ENTRIES_PER_WRITER)
+        self.assertEqual(len(set(entry_names)), NUM_WRITERS * ENTRIES_PER_WRITER)
+
+    def test_exclusive_lock(self):
+        """An exclusive lock should exclude other processes until it is released."""
+        queue = self.context.Queue()
+        with data.file_lock(self.path):
+            process = self.context.Process(target=try_lock, args=(self.path, queue))
+            process.start()
+            self.assertFalse(queue.get(timeout=10))
+            process.join()
+        process = self.context.Process(target=try_lock, args=(self.path, queue))
+        process.start()
+        self.assertTrue(queue.get(timeout=10))
+        process.join()
+
+    def test_reentrant(self):
+        """A thread that holds a file's lock should be able to lock and read the file again without waiting on itself,
+        while other threads are still excluded.
+        """
+        data.write_entries(self.path, [['rice', "['1', 'cup']", '1']])
+        versions = iter(range(1, 2 * data.READ_ATTEMPTS + 1))
+        results = []
+
+        def read_locked():
+            with data.file_lock(self.path):
+                # The file keeps changing, so it is read under the lock.
+                with patch('healthhelper.data.get_disk_version', side_effect=lambda path: next(versions)):
+                    results.append(data.read_file_rows(self.path))
+                with data.file_lock(self.path):
+                    results.append('nested')
+
+        thread = threading.Thread(target=read_locked, daemon=True)
+        thread.start()
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(results, [[['rice', "['1', 'cup']", '1']], 'nested'])
+
+        locked = threading.Event()
+
+        def lock_in_thread():
+            with data.file_lock(self.path, shared=True):
+                locked.set()
+
+        with data.file_lock(self.path):
+            thread = threading.Thread(target=lock_in_thread, daemon=True)
+            thread.start()
+            self.assertFalse(locked.wait(0.2))
+        thread.join(10)
+        self.assertTrue(locked.is_set())
+
+        with data.file_lock(self.path, shared=True):
+            with self.assertRaises(RuntimeError):
+                with data.file_lock(self.path):
+                    pass
+
+    def test_lock_files(self):
+        """Lock files should be kept in a directory only the user can access, and removed once they are released."""
+        lock_dir = os.path.join(self.temp_dir, 'locks')
+        with patch('healthhelper.data.LOCK_DIR', lock_dir), patch('healthhelper.data._lock_dir_made', False):
+            for num in range(20):
+                with data.file_lock(f'{self.path}{num}'):
+                    with data.file_lock(f'{self.path}{num}', shared=True):
+                        self.assertEqual(len(os.listdir(lock_dir)), 1)
+                with data.file_lock(f'{self.path}{num}', shared=True):
+                    pass
+            self.assertEqual(os.listdir(lock_dir), [])
+            self.assertEqual(os.stat(lock_dir).st_mode & 0o777, 0o700)
+
+            # A process that waited for the lock while its holder removed the lock file locks the file of the name.
+            queue = self.context.Queue()
+            done = self.context.Event()
+            with data.file_lock(self.path):
+                process = self.context.Process(target=hold_lock, args=(self.path, queue, done))
+                process.start()
+                time.sleep(0.2)
+            self.assertEqual(queue.get(timeout=10), 'locked')
+            try_lock(self.path, queue)
+            self.assertFalse(queue.get(timeout=10))
+            done.set()
+            process.join()
+            self.assertEqual(os.listdir(lock_dir), [])
+
+        os.chmod(lock_dir, 0o777)
+        with patch('healthhelper.data.LOCK_DIR', lock_dir), patch('healthhelper.data._lock_dir_made', False):
+            with self.assertRaises(PermissionError):
+                with data.file_lock(self.path):
+                    pass
+
+    def test_buffered_writer(self):
+        """A change waiting in another process's write buffer shouldn't overwrite a row changed in the meantime, and
+        sorted rows should stay sorted.
+        """
+        data.write_entries(self.path, [['oats', "['1', 'cup']", '1'], ['rice', "['1', 'cup']", '1']])
+        queue = self.context.Queue()
+        flush = self.context.Event()
+        process = self.context.Process(target=buffered_edit, args=(self.path, os.path.join(self.temp_dir, 'pending'),
+                                                                     queue, flush))
+        process.start()
+        self.assertEqual(queue.get(timeout=10), 'buffered')
+        data.modify_entries(self.path, lambda entries: sorted([['apple', "['1', 'item(s)']", '1'], entries[0],
+                                                               ['rice', "['1', 'cup']", '3']]))
+        flush.set()
+        self.assertEqual(queue.get(timeout=10), [[self.path, ['rice']]])
+        process.join()
+        self.assertEqual(data.get_entries(self.path, return_all=True), [['apple', "['1', 'item(s)']", '1'],
+                                                                        ['oats', "['1', 'cup']", '2'],
+                                                                        ['rice', "['1', 'cup']", '3']])
+
+    def test_modify_unchanged(self):
+        """Returning None from the modify function should leave the file as it is."""
+        self.assertEqual(data.modify_entries(self.path, lambda entries: None), 'file not found')
+        self.assertFalse(os.path.exists(self.path))
+        data.write_entries(self.path, [['rice', "['1', 'cup']", '1']])
+        self.assertEqual(data.modify_entries(self.path, lambda entries: None), [['rice', "['1', 'cup']", '1']])
+
+
+class TestOptimisticRead(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, '01.csv')
+        data.write_entries(self.path, [['rice', "['1', 'cup']", '1']])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_retry(self):
+        """A file that changes while it is read should be read again."""
+        versions = iter([1, 2, 2, 2])
+        with patch('healthhelper.data.get_disk_version', side_effect=lambda path: next(versions)):
+            self.assertEqual(data.get_entries(self.path, return_all=True), [['rice', "['1', 'cup']", '1']])
+
+    def test_locked_read(self):
+        """A file that keeps changing should be read under a shared lock."""
+        versions = iter(range(1, 2 * data.READ_ATTEMPTS + 1))
+        with patch('healthhelper.data.get_disk_version', side_effect=lambda path: next(versions)), \
+                patch('healthhelper.data.file_lock', wraps=data.file_lock) as lock_mock:
+            self.assertEqual(data.get_entries(self.path, return_all=True), [['rice', "['1', 'cup']", '1']])
+            lock_mock.assert_called_once_with(self.path, shared=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,10 @@
 """Test the the Log Window widget."""
 
 import os
+import shutil
+import tempfile
 import unittest
-from unittest.mock import patch, mock_open
+from unittest.mock import patch
 
 from PyQt5.QtTest import QTest
 from PyQt5.QtCore import Qt
@@ -20,6 +22,19 @@ TEST_FD_PATH = os.path.join(this_dir, 'test_files', 'test_food_dictionary_file.c
 app = QApplication([])
 
 
+def setUpModule():
+    """Record undoable changes in a temporary journal rather than the application's files directory."""
+    global journal_dir, journal_patcher
+    journal_dir = tempfile.mkdtemp()
+    journal_patcher = patch('healthhelper.interface.JOURNAL_PATH', os.path.join(journal_dir, 'journal.jsonl'))
+    journal_patcher.start()
+
+
+def tearDownModule():
+    journal_patcher.stop()
+    shutil.rmtree(journal_dir)
+
+
 class TestLogWin(unittest.TestCase):
 
     def test_help_win(self):
@@ -29,6 +44,14 @@ class TestLogWin(unittest.TestCase):
             QTest.mouseClick(log_win.help_btn, Qt.LeftButton)
             dialog_mock.assert_called()
 
+    def test_debug_win(self):
+        """The debug shortcut should show the row cache counters."""
+        log_win = interface.LogWin()
+        with patch.object(interface.data.row_cache, 'hits', 3), patch.object(interface.data.row_cache, 'misses', 1):
+            log_win.debug_shortcut.activated.emit()
+        self.assertIn('Hits: 3\nMisses: 1\nHit rate: 75%', log_win.dlg.findChild(interface.QLabel).text())
+        log_win.dlg.close()
+
     def test_log_to_fd_win(self):
         """Test transition from log display window to food dictionary display window."""
         log_win = interface.LogWin()
@@ -51,6 +74,40 @@ class TestLogWin(unittest.TestCase):
             # Unchecked entries have a checkState() equal to 0.
             self.assertEqual(log_win.log_table.item(entry_index, 0).checkState(), 0)
 
+    @patch('os.path.join', return_value=TEST_LOG_PATH)
+    def test_log_win_totals(self, join_mock):
+        """The totals and subtotals should be summed from the log parsed on load, without reading the file again."""
+        log_win = interface.LogWin()
+        self.assertEqual(log_win.totals_table.item(0, 1).text(), '300')
+        self.assertEqual(log_win.totals_table.item(0, 16).text(), '1.72')
+
+        with patch.object(interface.data, 'get_entries') as get_entries_mock:
+            log_win.log_table.item(1, 0).setCheckState(2)
+            log_win.log_table.item(2, 0).setCheckState(2)
+            get_entries_mock.assert_not_called()
+        self.assertEqual(log_win.totals_table.item(1, 1).text(), '0')
+        self.assertEqual(log_win.totals_table.item(1, 16).text(), '1.34')
+
+        log_win.log_table.item(1, 0).setCheckState(0)
+        log_win.log_table.item(2, 0).setCheckState(0)
+        self.assertEqual(log_win.totals_table.item(1, 16).text(), '')
+
+    @patch('os.path.join', return_value=TEST_LOG_PATH)
+    def test_log_win_sort(self, join_mock):
+        """Clicking a column header should sort the entries by that column, and the subtotals should follow the
+        sorted rows."""
+        log_win = interface.LogWin()
+        log_h_header = log_win.log_table.horizontalHeader()
+        log_h_header.sectionClicked.emit(17)
+        self.assertEqual(interface.data.get_table_entry_names(log_win.log_table)[0],
+                         ['cereal', 'chocolate', 'peanut butter'])
+        log_h_header.sectionClicked.emit(17)
+        self.assertEqual(interface.data.get_table_entry_names(log_win.log_table)[0],
+                         ['chocolate', 'cereal', 'peanut butter'])
+
+        log_win.log_table.item(0, 0).setCheckState(2)
+        self.assertEqual(log_win.totals_table.item(1, 16).text(), '1.34')
+
     @patch('os.path.join', return_value='fakepath')
     def test_log_to_delete_log_win_no_log_file(self, join_mock):
         """Test transition from log display window to message window when user clicks 'delete log'
@@ -76,9 +133,9 @@ class TestLogWin(unittest.TestCase):
             remove_mock.assert_called()
             log_win_mock.assert_called()
 
-    @patch('healthhelper.interface.open', mock_open())
+    @patch.object(interface.data.write_buffer, 'write')
     @patch('os.path.join', return_value=TEST_LOG_PATH)
-    def test_log_to_log_win_remove_entries_with_log_file(self, join_mock):
+    def test_log_to_log_win_remove_entries_with_log_file(self, join_mock, write_mock):
         """Test transition from log display window to log display window when removing entries from a log."""
         log_win = interface.LogWin()
         # Select the first entry in the table.
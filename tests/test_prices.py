@@ -0,0 +1,157 @@
+"""Test the food price history and the spending analytics."""
+import os
+import shutil
+import datetime
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from PyQt5.QtTest import QTest
+from PyQt5.QtCore import Qt, QDate
+from PyQt5.QtWidgets import QApplication
+
+import healthhelper.interface as interface
+from healthhelper import analytics
+from healthhelper import archive
+from healthhelper import data
+from healthhelper import prices
+from tests.utils import write_day
+
+app = QApplication([])
+
+OATS_ROW = ['oats', "{'cup': '0.25'}", '150'] + [''] * 14 + ["['4.00', '20']", '0.2', '3']
+RICE_ROW = ['rice', "{'cup': '1'}", '200'] + [''] * 14 + ["['10.00', '40']", '0.25', '4']
+
+
+def with_cost(row, total_cost, servings):
+    """Return a copy of a Food Dictionary row with a different cost."""
+    return row[:17] + [str([total_cost, servings])] + row[18:]
+
+
+class TestPriceHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'price_history.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_record(self):
+        """Only changed and added costs should be recorded, with the cost before the first change undated."""
+        self.assertEqual(prices.record_price_changes(self.path, [OATS_ROW], [OATS_ROW, RICE_ROW[:17] + ['', '']]), 0)
+        new_oats = with_cost(OATS_ROW, '5.00', '20')
+        self.assertEqual(prices.record_price_changes(self.path, [OATS_ROW], [new_oats, RICE_ROW],
+                                                     datetime.date(2020, 3, 1)), 3)
+        self.assertEqual(data.get_entries(self.path, return_all=True), [
+            ['', '3', 'oats', '4.00', '20'], ['2020-03-01', '3', 'oats', '5.00', '20'],
+            ['2020-03-01', '4', 'rice', '10.00', '40']])
+
+        # A renamed entry is matched by its id, and its earlier cost isn't recorded again.
+        renamed_oats = ['rolled oats'] + with_cost(OATS_ROW, '6.00', '20')[1:]
+        prices.record_price_changes(self.path, [new_oats], [renamed_oats], datetime.date(2021, 3, 1))
+        history = prices.load_price_history(self.path)
+        self.assertEqual(history[('id', 3)], [[None, 'oats', 0.2], [datetime.date(2020, 3, 1), 'oats', 0.25],
+                                              [datetime.date(2021, 3, 1), 'rolled oats', 0.3]])
+
+    def test_inflation(self):
+        """Price changes should compare the prices in effect on each date, and the index their geometric mean."""
+        new_oats = with_cost(OATS_ROW, '5.00', '20')
+        bread = ['bread'] + RICE_ROW[1:19] + ['5']
+        prices.record_price_changes(self.path, [OATS_ROW, RICE_ROW],
+                                    [new_oats, with_cost(RICE_ROW, '8.10', '40'), bread], datetime.date(2020, 3, 1))
+        prices.record_price_changes(self.path, [new_oats], [with_cost(OATS_ROW, '6.25', '20')],
+                                    datetime.date(2020, 9, 1))
+        history = prices.load_price_history(self.path)
+
+        changes = prices.get_price_changes(history, datetime.date(2020, 1, 1), datetime.date(2020, 12, 31))
+        self.assertEqual([change[0] for change in changes], ['oats', 'rice'])
+        self.assertAlmostEqual(changes[0][3], 56.25)
+        self.assertAlmostEqual(changes[1][3], -19)
+        # Oats rose by a quarter twice, and rice fell by 19%: (1.25 * 1.25 * 0.81) ** 0.5 = 1.125.
+        self.assertAlmostEqual(prices.get_price_index(changes), 12.5)
+
+        changes = prices.get_price_changes(history, datetime.date(2020, 4, 1), datetime.date(2020, 8, 31))
+        self.assertEqual(changes, [])
+        self.assertIsNone(prices.get_price_index(changes))
+        # Bread was added with its first price, so it had no price to change from.
+        self.assertEqual(len(history), 3)
+        self.assertEqual(len(prices.get_price_changes(history, datetime.date(2019, 1, 1),
+                                                      datetime.date(2020, 12, 31))), 2)
+
+
+class TestMonthlySpend(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_dir = os.path.join(self.temp_dir, 'log files')
+        write_day(self.log_dir, datetime.date(2019, 12, 30), cost='10')
+        write_day(self.log_dir, datetime.date(2019, 12, 31), cost='5.5')
+        write_day(self.log_dir, datetime.date(2020, 1, 15), cost='20')
+        write_day(self.log_dir, datetime.date(2020, 3, 1), cost='11')
+        archive.pack_year(self.log_dir, 2019)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_monthly_sums(self):
+        """Every month of the series should be totalled, including months without a log."""
+        stats = analytics.SeriesStats(analytics.get_daily_series(self.log_dir))
+        self.assertEqual(analytics.get_monthly_sums(stats, 'cost'), [[2019, 12, 15.5, 2], [2020, 1, 20, 1],
+                                                                     [2020, 2, 0, 0], [2020, 3, 11, 1]])
+
+    def test_monthly_spend(self):
+        """Spending should be grouped by month, with the change from the month before."""
+        months = prices.get_monthly_spend(self.log_dir, datetime.date(2020, 1, 1), datetime.date(2020, 4, 30))
+        self.assertEqual([month[:4] for month in months], [[2020, 1, 20, 1], [2020, 2, 0, 0], [2020, 3, 11, 1],
+                                                          [2020, 4, 0, 0]])
+        self.assertEqual([month[4] for month in months], [None, -100, None, -100])
+        self.assertAlmostEqual(prices.get_monthly_spend(self.log_dir)[1][4], 100 * (20 / 15.5 - 1))
+
+
+class TestPricesWin(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_dir = os.path.join(self.temp_dir, 'log files')
+        self.history_path = os.path.join(self.temp_dir, 'price_history.csv')
+        write_day(self.log_dir, datetime.date(2020, 1, 15), cost='20')
+        write_day(self.log_dir, datetime.date(2020, 3, 1), cost='11')
+        prices.record_price_changes(self.history_path, [OATS_ROW], [with_cost(OATS_ROW, '5.00', '20')],
+                                    datetime.date(2020, 2, 1))
+        self.patchers = [patch('healthhelper.interface.LOG_FILES_DIR', self.log_dir),
+                         patch('healthhelper.interface.PRICE_HISTORY_PATH', self.history_path)]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def test_tables(self):
+        """The window should show the price changes and monthly spending of the chosen dates."""
+        prices_win = interface.PricesWin()
+        prices_win.start_date_edit.setDate(QDate(2020, 1, 1))
+        prices_win.end_date_edit.setDate(QDate(2020, 3, 31))
+        self.assertEqual(prices_win.prices_table.rowCount(), 1)
+        self.assertEqual([prices_win.prices_table.item(0, col).text() for col in range(4)],
+                         ['oats', '0.200', '0.250', '+25.0%'])
+        self.assertEqual(prices_win.inflation_label.text(), 'Price changes: +25.0% across 1 food(s)')
+        self.assertEqual([prices_win.spend_table.item(2, col).text() for col in range(4)],
+                         ['Mar 2020', '11.00', '1', ''])
+        self.assertEqual(prices_win.spend_label.text(), 'Monthly spending: $31.00 in total')
+
+        prices_win.end_date_edit.setDate(QDate(2020, 1, 31))
+        self.assertEqual([prices_win.prices_table.rowCount(), prices_win.spend_table.rowCount()], [0, 1])
+
+    def test_cost_analytics_to_prices_win(self):
+        with patch('healthhelper.interface.FD_PATH', os.path.join(self.temp_dir, 'food_dictionary.csv')):
+            cost_analytics_win = interface.CostAnalyticsWin()
+        with patch.object(interface, 'PricesWin') as prices_win_mock:
+            QTest.mouseClick(cost_analytics_win.prices_btn, Qt.LeftButton)
+            prices_win_mock.assert_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""Test the recipe widgets."""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from PyQt5.QtTest import QTest
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+
+import healthhelper.interface as interface
+from healthhelper import data
+
+# Directory containing this file
+this_dir = os.path.abspath(os.path.dirname(__file__))
+# Path to the test food dictionary file
+TEST_FD_PATH = os.path.join(this_dir, 'test_files', 'test_food_dictionary_file.csv')
+
+app = QApplication([])
+
+
+@patch('healthhelper.interface.FD_PATH', TEST_FD_PATH)
+class TestRecipeWin(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a temporary recipes file."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.recipes_path = os.path.join(self.temp_dir, 'recipes.csv')
+        with open(self.recipes_path, 'w') as f:
+            f.write("""porridge,"[['oats', '80', 'g'], ['cereal', '60', 'g']]",2\n"""
+                    """snack,"[['porridge', '1', 'Serving(s)']]",1\n""")
+        self.patcher = patch('healthhelper.interface.RECIPES_PATH', self.recipes_path)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def test_recipes_table(self):
+        """Each recipe should be listed with its per-serving totals."""
+        recipes_win = interface.RecipesWin()
+        self.assertEqual(data.get_table_entry_names(recipes_win.recipe_table)[0], ['porridge', 'snack'])
+        self.assertEqual(recipes_win.recipe_table.item(0, 3).text(), '250')
+        self.assertEqual(recipes_win.recipe_table.item(0, 5).text(), '0.12')
+
+    def test_remove_recipe_in_use(self):
+        """MessageWin should be called if the user removes a recipe that another recipe uses."""
+        recipes_win = interface.RecipesWin()
+        recipes_win.recipe_table.item(0, 0).setCheckState(2)
+        with patch.object(interface, 'MessageWin') as message_win_mock:
+            QTest.mouseClick(recipes_win.remove_recipes_btn, Qt.LeftButton)
+            message_win_mock.assert_called_with('recipe in use', entry_name='porridge')
+
+        recipes_win.recipe_table.item(1, 0).setCheckState(2)
+        with patch.object(interface, 'RecipesWin') as recipes_win_mock:
+            QTest.mouseClick(recipes_win.remove_recipes_btn, Qt.LeftButton)
+            recipes_win_mock.assert_called()
+        self.assertEqual(data.get_entries(self.recipes_path, return_all=True), [])
+
+    def test_add_recipe(self):
+        """A new recipe should be written to the recipes file."""
+        edit_recipe_win = interface.EditRecipeWin()
+        edit_recipe_win.name_textbox.setText('oat snack')
+        edit_recipe_win.servings_textbox.setText('4')
+        table = edit_recipe_win.ingredient_table
+        table.item(2, 0).setCheckState(2)
+        table.cellWidget(2, 1).layout().itemAt(0).widget().setText('1')
+        table.cellWidget(2, 2).layout().itemAt(0).widget().setCurrentText('cup')
+        with patch.object(interface, 'RecipesWin') as recipes_win_mock:
+            QTest.mouseClick(edit_recipe_win.save_btn, Qt.LeftButton)
+            recipes_win_mock.assert_called()
+        self.assertEqual(data.get_entries(self.recipes_path, ['oat snack']),
+                         [['oat snack', "[['oats', '1', 'cup']]", '4']])
+
+    def test_recipe_cycle(self):
+        """MessageWin should be called if a recipe would contain itself."""
+        edit_recipe_win = interface.EditRecipeWin('porridge')
+        table = edit_recipe_win.ingredient_table
+        snack_row = data.get_table_entry_names(table)[0].index('snack')
+        table.item(snack_row, 0).setCheckState(2)
+        table.cellWidget(snack_row, 1).layout().itemAt(0).widget().setText('1')
+        with patch.object(interface, 'MessageWin') as message_win_mock:
+            QTest.mouseClick(edit_recipe_win.save_btn, Qt.LeftButton)
+            message_win_mock.assert_called_with('recipe cycle')
+
+    def test_duplicate_name(self):
+        """MessageWin should be called if the recipe name matches an FD entry."""
+        edit_recipe_win = interface.EditRecipeWin('snack')
+        edit_recipe_win.name_textbox.setText('oats')
+        with patch.object(interface, 'MessageWin') as message_win_mock:
+            QTest.mouseClick(edit_recipe_win.save_btn, Qt.LeftButton)
+            message_win_mock.assert_called_with('duplicate recipe')
+
+
+if __name__ == "__main__":
+    unittest.main()
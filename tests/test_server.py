@@ -0,0 +1,218 @@
+"""Test the local JSON API server."""
+import io
+import os
+import json
+import shutil
+import asyncio
+import datetime
+import tempfile
+import unittest
+import threading
+from contextlib import redirect_stdout
+from unittest.mock import patch, MagicMock
+
+from healthhelper import archive
+from healthhelper import data
+from healthhelper import server
+from healthhelper.__main__ import main
+
+# Directory containing this file
+this_dir = os.path.abspath(os.path.dirname(__file__))
+# Path to the test food dictionary file.
+TEST_FD_PATH = os.path.join(this_dir, 'test_files', 'test_food_dictionary_file.csv')
+# Path to the test log files directory.
+TEST_LOG_FILE_DIR = os.path.join(this_dir, 'test_files', 'other_test_log_files')
+
+
+async def request(port, method, target, body=None):
+    """Send one request to the server and return the response status and JSON object."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    payload = b'' if body is None else json.dumps(body).encode('utf-8')
+    writer.write(f'{method} {target} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n'
+                 f'Content-Length: {len(payload)}\r\n\r\n'.encode('latin-1') + payload)
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+class TestDataServer(unittest.TestCase):
+
+    def setUp(self):
+        """Copy the test Food Dictionary and log files into a temporary directory."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.fd_path = os.path.join(self.temp_dir, 'food_dictionary.csv')
+        shutil.copy(TEST_FD_PATH, self.fd_path)
+        self.log_dir = os.path.join(self.temp_dir, 'log files')
+        shutil.copytree(TEST_LOG_FILE_DIR, self.log_dir)
+        self.recipes_path = os.path.join(self.temp_dir, 'recipes.csv')
+        self.log_path = data.get_log_path(self.log_dir, datetime.date(2020, 8, 1))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def run_with_server(self, scenario):
+        """Run a coroutine function with a server listening on a free port."""
+        async def run():
+            data_server = server.DataServer(self.fd_path, self.log_dir, self.recipes_path)
+            port = await data_server.start(port=0)
+            try:
+                await scenario(data_server, port)
+            finally:
+                await data_server.close()
+        asyncio.run(run())
+
+    def test_read(self):
+        """The Food Dictionary and logs should be served as JSON."""
+        async def scenario(data_server, port):
+            status, response = await request(port, 'GET', '/fd')
+            self.assertEqual(status, 200)
+            self.assertEqual([entry['name'] for entry in response['entries']],
+                             ['cereal', 'chocolate', 'oats', 'peanut butter'])
+            status, response = await request(port, 'GET', '/fd/peanut%20butter')
+            self.assertEqual(response['serving_sizes'], {'g': '32', 'tbsp': '2'})
+            status, response = await request(port, 'GET', '/fd/toast')
+            self.assertEqual(status, 404)
+
+            status, response = await request(port, 'GET', '/logs?start=2020-07-01')
+            self.assertEqual(response['dates'], ['2020-07-01'])
+            status, response = await request(port, 'GET', '/logs/2020-07-01')
+            self.assertEqual(status, 200)
+            self.assertEqual(response['entries'][0]['name'], 'bread')
+            self.assertEqual(response['totals']['calories'], '190')
+            status, response = await request(port, 'GET', '/logs/2020-07-01/eggs')
+            self.assertEqual([response['amount'], response['unit']], ['1', 'item(s)'])
+            status, response = await request(port, 'GET', '/logs/2020-07-02')
+            self.assertEqual(status, 404)
+            status, response = await request(port, 'GET', '/logs/July')
+            self.assertEqual(status, 400)
+            status, response = await request(port, 'GET', '/totals?start=2020-01-01&end=2020-12-31')
+            self.assertEqual(response['days'], 2)
+        self.run_with_server(scenario)
+
+    def test_change_log(self):
+        """Entries should be added, edited, and removed, and the log deleted with its last entry."""
+        async def scenario(data_server, port):
+            status, response = await request(port, 'POST', '/logs/2020-08-01', {'entries': [
+                {'name': 'cereal', 'amount': 1.5, 'unit': 'Serving(s)'},
+                {'name': 'oats', 'amount': '1', 'unit': 'cup'}]})
+            self.assertEqual(status, 201)
+            self.assertEqual(data.get_entries(self.log_path, ['cereal'])[0][3], '300')
+            self.assertEqual(data.get_entries(self.log_path, ['oats'])[0][3], '600')
+
+            status, response = await request(port, 'POST', '/logs/2020-08-01', {'entries': [
+                {'name': 'oats', 'amount': '2', 'unit': 'cup'}]})
+            self.assertEqual(status, 409)
+            status, response = await request(port, 'POST', '/logs/2020-08-01', {'entries': [
+                {'name': 'cereal', 'amount': 'lots', 'unit': 'g'}]})
+            self.assertEqual(status, 400)
+
+            status, response = await request(port, 'POST', '/logs/2020-08-01', {'entries': [
+                {'name': 'cereal', 'amount': 'inf', 'unit': 'g'}]})
+            self.assertEqual(status, 400)
+
+            status, response = await request(port, 'PUT', '/logs/2020-08-01/cereal', {'amount': '30', 'unit': 'g'})
+            self.assertEqual(status, 200)
+            self.assertEqual(response['values']['calories'], '100')
+            self.assertEqual(data.get_file_entry_names(self.log_path), ['cereal', 'oats'])
+
+            await request(port, 'DELETE', '/logs/2020-08-01/cereal')
+            status, response = await request(port, 'DELETE', '/logs/2020-08-01/cereal')
+            self.assertEqual(status, 404)
+            await request(port, 'DELETE', '/logs/2020-08-01/oats')
+            self.assertFalse(os.path.exists(self.log_path))
+        self.run_with_server(scenario)
+
+    def test_concurrent_changes(self):
+        """Concurrent changes to a log should all be written, in fewer writes than changes."""
+        async def scenario(data_server, port):
+            names = ['cereal', 'chocolate', 'oats', 'peanut butter']
+            results = await asyncio.gather(*[
+                request(port, 'POST', '/logs/2020-08-01', {'entries': [{'name': name, 'amount': '1',
+                                                                        'unit': 'Serving(s)'}]})
+                for name in names])
+            self.assertEqual([status for status, response in results], [201] * 4)
+            self.assertEqual(sorted(data.get_file_entry_names(self.log_path)), names)
+            self.assertLess(data_server.num_writes, 4)
+        self.run_with_server(scenario)
+
+    def test_outside_changes(self):
+        """Changes made to a log by the app should be seen by the server, and archived logs can't be changed."""
+        async def scenario(data_server, port):
+            july_path = data.get_log_path(self.log_dir, datetime.date(2020, 7, 1))
+            await request(port, 'GET', '/logs/2020-07-01')
+            data.write_entries(july_path, data.get_entries(july_path, return_all=True)[:1])
+            status, response = await request(port, 'GET', '/logs/2020-07-01')
+            self.assertEqual(len(response['entries']), 1)
+
+            archive.pack_year(self.log_dir, 2020)
+            status, response = await request(port, 'GET', '/logs/2020-07-01')
+            self.assertEqual(len(response['entries']), 1)
+            status, response = await request(port, 'DELETE', '/logs/2020-07-01/bread')
+            self.assertEqual(status, 409)
+        self.run_with_server(scenario)
+
+    def test_errors(self):
+        """An unexpected error should be logged and answered with status 500."""
+        async def scenario(data_server, port):
+            os.makedirs(os.path.dirname(self.log_path))
+            with open(self.log_path, 'w') as f:
+                f.write('cereal,"[1, \'Serving(s)\'",1\n')
+            with self.assertLogs('healthhelper.server', 'ERROR'):
+                status, response = await request(port, 'GET', '/logs/2020-08-01')
+            self.assertEqual(status, 500)
+            # The malformed entry can still be removed, which deletes the log through the write buffer.
+            with patch.object(data.write_buffer, 'remove', wraps=data.write_buffer.remove) as remove:
+                status, response = await request(port, 'DELETE', '/logs/2020-08-01/cereal')
+            self.assertEqual(status, 200)
+            remove.assert_called_once_with(self.log_path)
+            self.assertFalse(os.path.exists(self.log_path))
+            status, response = await request(port, 'GET', '/logs/2020-07-01')
+            self.assertEqual(status, 200)
+        self.run_with_server(scenario)
+
+    def test_body_size(self):
+        """A request body above the limit should be refused without being read, and a negative length rejected."""
+        async def send(port, length):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(f'POST /logs/2020-08-01 HTTP/1.1\r\nHost: localhost\r\n'
+                         f'Content-Length: {length}\r\n\r\n{{}}'.encode('latin-1'))
+            response = await reader.read()
+            writer.close()
+            return int(response.split()[1])
+
+        async def scenario(data_server, port):
+            self.assertEqual(await send(port, server.MAX_BODY_SIZE + 1), 413)
+            self.assertEqual(await send(port, -1), 400)
+            self.assertFalse(os.path.exists(self.log_path))
+        self.run_with_server(scenario)
+
+    def test_concurrent_reads(self):
+        """A slow read shouldn't hold up the requests of other clients."""
+        release = threading.Event()
+
+        def slow_totals(*args):
+            release.wait(10)
+            return [0, []]
+
+        async def scenario(data_server, port):
+            with patch('healthhelper.data.get_range_totals', side_effect=slow_totals):
+                totals = asyncio.ensure_future(request(port, 'GET', '/totals?start=2000-01-01&end=2020-12-31'))
+                status, response = await asyncio.wait_for(request(port, 'GET', '/logs/2020-07-01'), 5)
+                self.assertEqual(status, 200)
+                self.assertFalse(totals.done())
+                release.set()
+                status, response = await totals
+            self.assertEqual([status, response['days']], [200, 0])
+        self.run_with_server(scenario)
+
+    def test_command(self):
+        """The serve command should serve the app's files on the given host and port."""
+        with patch('healthhelper.server.serve', new_callable=MagicMock) as serve_mock, patch('asyncio.run'), \
+                redirect_stdout(io.StringIO()):
+            main(['serve', '--port', '9000'])
+            self.assertEqual(serve_mock.call_args[0][3:], ('127.0.0.1', 9000))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,248 @@
+"""Test the store module."""
+import os
+import math
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from healthhelper import store
+
+# Directory containing this file
+this_dir = os.path.abspath(os.path.dirname(__file__))
+# Path to the test food dictionary file
+TEST_FD_PATH = os.path.join(this_dir, 'test_files', 'test_food_dictionary_file.csv')
+
+
+class TestFoodDictStore(unittest.TestCase):
+
+    def setUp(self):
+        self.fd_store = store.FoodDictStore(TEST_FD_PATH)
+
+    def test_vectors(self):
+        """Each entry should have a float vector of calories to protein, followed by the cost per serving."""
+        self.assertEqual(self.fd_store.names, ['cereal', 'chocolate', 'oats', 'peanut butter'])
+        self.assertEqual(list(self.fd_store.vectors[0]),
+                         [200, 1.5, 0, 0, 0, 0, 0, 10, 48, 8, 2, 6, 0, 0, 7, 0.25])
+        # Blank values are NaN.
+        self.assertTrue(all(math.isnan(val) for val in self.fd_store.vectors[1][:15]))
+        self.assertEqual(self.fd_store.vectors[1][15], 0.446)
+
+    def test_unit_options(self):
+        """Units convertible into a serving size option should be offered after the options themselves."""
+        options = self.fd_store.unit_options('oats')
+        self.assertEqual(options[:3], ['Serving(s)', 'g', 'cup'])
+        self.assertIn('oz', options)
+        self.assertIn('tbsp', options)
+        self.assertEqual(self.fd_store.unit_options('chocolate')[:3], ['Serving(s)', 'item(s)', 'g'])
+
+    def test_display(self):
+        """The serving size options and container costs should be kept parsed, as they are given in the file."""
+        self.assertEqual(self.fd_store.serving_options[1], (('item(s)', '1'), ('g', '25')))
+        self.assertEqual(self.fd_store.serving_options[2], (('g', '40'), ('cup', '0.25')))
+        self.assertEqual(self.fd_store.containers, [['2.00', '8'], ['2.23', '5'], None, None])
+
+    def test_calculate(self):
+        """The values of an amount in a converted unit should match the equivalent amount in the original unit."""
+        self.assertEqual(self.fd_store.get_servings('cereal', '120', 'g'), 2)
+        self.assertAlmostEqual(self.fd_store.get_servings('cereal', 60 / 28.349523125, 'oz'), 1)
+        calculated = self.fd_store.calculate('oats', '1', 'cup')
+        self.assertEqual(calculated[0], 600)
+        self.assertEqual(calculated[14], 20)
+        self.assertTrue(math.isnan(calculated[15]))
+
+    def test_load_fd_store(self):
+        """The same store should be returned until the file changes."""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, 'food_dictionary.csv')
+            shutil.copy(TEST_FD_PATH, path)
+            fd_store = store.load_fd_store(path)
+            self.assertIs(store.load_fd_store(path), fd_store)
+            self.assertEqual(len(fd_store), 4)
+
+            with open(path, 'a') as f:
+                f.write("rice,{'cup': '1'},200,,,,,,,,,,,,,,,,\n")
+            self.assertIs(store.load_fd_store(path), fd_store)
+            self.assertIn('rice', fd_store)
+
+            # A file replaced by one of the same size and modification time is still noticed.
+            stat = os.stat(path)
+            with open(path) as f:
+                contents = f.read()
+            with open(path + '.new', 'w') as f:
+                f.write(contents.replace('rice', 'rize'))
+            os.utime(path + '.new', ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            os.replace(path + '.new', path)
+            self.assertIn('rize', store.load_fd_store(path))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_cache(self):
+        """A store should be loaded from the cache while the file is unchanged, and parse the file again otherwise."""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, 'food_dictionary.csv')
+            shutil.copy(TEST_FD_PATH, path)
+            store.FoodDictStore(path)
+            self.assertFalse(os.path.exists(store.get_cache_path(path)))
+
+            with patch.object(store, 'CACHE_MIN_ENTRIES', 1):
+                parsed = store.FoodDictStore(path)
+                self.assertTrue(os.path.exists(store.get_cache_path(path)))
+                with patch.object(store.FoodDictStore, 'add_row') as add_row_mock:
+                    cached = store.FoodDictStore(path)
+                    add_row_mock.assert_not_called()
+                # Blank values are NaN, which isn't equal to itself, so the attributes are compared as text.
+                for name in store.CACHED_ATTRIBUTES + ['rows', 'vectors']:
+                    self.assertEqual(str(getattr(cached, name)), str(getattr(parsed, name)))
+
+                # A changed file is parsed, even if its size and modification time are the same.
+                stat = os.stat(path)
+                with open(path, 'r+') as f:
+                    f.write('C')
+                os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+                self.assertIn('Cereal', store.FoodDictStore(path))
+
+                with open(store.get_cache_path(path), 'wb') as f:
+                    f.write(b'not a cache')
+                self.assertEqual(store.FoodDictStore(path).names, ['Cereal', 'chocolate', 'oats', 'peanut butter'])
+                self.assertIn('Cereal', store.FoodDictStore(path))
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+class TestIds(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a Food Dictionary whose entries have ids, and a log with an entry by id and one by name only."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.fd_path = os.path.join(self.temp_dir, 'food_dictionary.csv')
+        rows = store.data.get_entries(TEST_FD_PATH, return_all=True)
+        store.data.write_entries(self.fd_path, store.assign_ids(rows))
+        self.log_path = os.path.join(self.temp_dir, 'log.csv')
+        self.oats_row = ['oats', "['1', 'cup']", '4'] + ['1'] * 16
+        store.data.write_entries(self.log_path, [['porridge'] + self.oats_row[1:] + ['3'], self.oats_row,
+                                                 ['toast'] + self.oats_row[1:]])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_assign_ids(self):
+        """Rows without an id should be given the next unused ids, and rows with one should keep it."""
+        rows = [['a'] + [''] * 18 + ['5'], ['b'] + [''] * 18, ['c'] + [''] * 10]
+        store.assign_ids(rows)
+        self.assertEqual([store.data.get_row_id(row) for row in rows], [5, 6, 7])
+        self.assertEqual(len(rows[2]), 20)
+
+    def test_indexes(self):
+        """Entries should be found by name and by id."""
+        fd_store = store.load_fd_store(self.fd_path)
+        self.assertEqual(fd_store.ids, [1, 2, 3, 4])
+        self.assertEqual(fd_store.get_id('oats'), 3)
+        self.assertEqual(fd_store.get_row_by_id(3)[0], 'oats')
+        self.assertIsNone(fd_store.get_row_by_id(9))
+        self.assertIsNone(store.FoodDictStore(TEST_FD_PATH).get_id('oats'))
+
+    def test_resolve_log_rows(self):
+        """A log entry with an id should be named after its FD entry, and one without should be linked by name."""
+        rows = store.get_log_entries(self.fd_path, self.log_path)
+        self.assertEqual([row[0] for row in rows], ['oats', 'oats', 'toast'])
+        self.assertEqual([store.data.get_row_id(row) for row in rows], [3, 3, None])
+        self.assertEqual(rows[1][:19], self.oats_row)
+        self.assertEqual(len(store.data.get_entries(self.log_path, return_all=True)[1]), 19)
+
+        self.assertEqual(store.get_log_entries(self.fd_path, self.log_path, ['toast', 'oats']),
+                         [rows[2], rows[0], rows[1]])
+        self.assertEqual(store.get_log_entries(self.fd_path, self.log_path, ['oats'], match=False), [rows[2]])
+
+        # A new log entry takes the id of its FD entry.
+        fd_row = list(store.load_fd_store(self.fd_path).get_row_by_id(3))
+        calculated = store.data.calculate_entry_info([fd_row], [['1', 'cup']])
+        self.assertEqual(calculated[0][3], 600)
+        self.assertEqual(store.data.get_row_id(calculated[0]), 3)
+
+
+class TestRecipeBook(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a copy of the test FD and a recipes file with a recipe that uses another recipe."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.fd_path = os.path.join(self.temp_dir, 'food_dictionary.csv')
+        shutil.copy(TEST_FD_PATH, self.fd_path)
+        self.recipes_path = os.path.join(self.temp_dir, 'recipes.csv')
+        with open(self.recipes_path, 'w') as f:
+            # Cereal has no volume serving size, so the 'bad porridge' recipe can't be calculated.
+            f.write("""bad porridge,"[['oats', '80', 'g'], ['cereal', '0.5', 'cup']]",2\n"""
+                    """breakfast,"[['porridge', '1', 'Serving(s)'], ['chocolate', '2', 'item(s)']]",1\n"""
+                    """porridge,"[['oats', '80', 'g'], ['cereal', '60', 'g']]",2\n"""
+                    """snack,"[['chocolate', '1', 'item(s)']]",1\n""")
+        self.book = store.load_recipe_book(self.recipes_path, self.fd_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_flatten(self):
+        """A recipe's per-serving vector should be the sum of its ingredients divided by its servings. A value
+        should be blank only if it's blank for every ingredient.
+        """
+        # 80 g of oats is 2 servings (300 calories), and 60 g of cereal is 1 serving (200 calories).
+        porridge = self.book.get_vector('porridge')
+        self.assertEqual(porridge[0], (300 + 200) / 2)
+        # Only cereal has cost info.
+        self.assertEqual(porridge[15], 0.25 / 2)
+
+        breakfast = self.book.get_vector('breakfast')
+        self.assertEqual(breakfast[0], 250)
+        self.assertAlmostEqual(breakfast[15], 0.125 + 2 * 0.446)
+        self.assertTrue(math.isnan(self.book.get_vector('snack')[0]))
+
+        self.assertRaises(KeyError, self.book.get_vector, 'bad porridge')
+
+    def test_memoize_and_invalidate(self):
+        """Editing an FD entry should only invalidate the recipes that depend on it."""
+        breakfast = self.book.get_vector('breakfast')
+        snack = self.book.get_vector('snack')
+        self.assertIs(self.book.get_vector('breakfast'), breakfast)
+
+        fd_entries = store.data.get_entries(self.fd_path, return_all=True)
+        fd_entries[2][2] = '300'  # Double the calories of oats.
+        store.data.write_entries(self.fd_path, fd_entries)
+        # The file size is unchanged, so make sure the modification time differs.
+        os.utime(self.fd_path, ns=(0, 0))
+        book = store.load_recipe_book(self.recipes_path, self.fd_path)
+        self.assertIs(book, self.book)
+        self.assertNotIn('porridge', book.vectors)
+        self.assertNotIn('breakfast', book.vectors)
+        self.assertIs(book.vectors['snack'], snack)
+        self.assertEqual(book.get_vector('breakfast')[0], 400)
+
+    def test_cycle(self):
+        """A recipe that contains itself should be detected."""
+        self.assertEqual(self.book.find_cycle('porridge', [['breakfast', '1', 'Serving(s)']]),
+                         ['porridge', 'breakfast', 'porridge'])
+        self.assertIsNone(self.book.find_cycle('snack', [['breakfast', '1', 'Serving(s)']]))
+
+        with open(self.recipes_path, 'a') as f:
+            f.write("""loop,"[['loop', '1', 'Serving(s)']]",1\n""")
+        self.book.sync()
+        self.assertRaises(store.RecipeCycleError, self.book.get_vector, 'loop')
+
+    def test_loggable_rows(self):
+        """A recipe row should be logged like a Food Dictionary entry, by the serving. Recipes that can't be
+        calculated are left out.
+        """
+        self.assertEqual(store.get_loggable_names(self.fd_path, self.recipes_path),
+                         ['cereal', 'chocolate', 'oats', 'peanut butter', 'breakfast', 'porridge', 'snack'])
+        rows = store.get_loggable_rows(self.fd_path, self.recipes_path, ['snack', 'oats'])
+        self.assertEqual(rows[0], ['snack', '{}', *[''] * 16, '0.446'])
+        self.assertEqual(rows[1][0], 'oats')
+        self.assertEqual(store.get_unit_options(self.fd_path, 'snack'), ['Serving(s)'])
+
+        calculated = store.data.calculate_entry_info(rows[:1], [['2', 'Serving(s)']])
+        self.assertEqual(calculated[0][2], 2)
+        self.assertEqual(calculated[0][-1], 0.89)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,15 @@
+"""Helpers shared by the tests."""
+import os
+
+from healthhelper import data
+
+
+def write_day(log_dir, date, calories='200', cost=''):
+    """Write a log with one entry of the given calories and cost.
+
+    :returns: A string of the log file pathname.
+    """
+    path = data.get_log_path(log_dir, date)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data.write_entries(path, [['rice', "['1', 'cup']", '1', calories] + [''] * 14 + [cost]])
+    return path